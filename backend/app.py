@@ -10,6 +10,7 @@ _backend_dir_str = str(_backend_dir)
 if _backend_dir_str not in sys.path:
     sys.path.insert(0, _backend_dir_str)
 
+import click
 from flask import Flask, jsonify, request
 from config import Config
 from models import db
@@ -299,6 +300,21 @@ if DEBUG_ROUTES_ENABLED:
             }
         }), 200
 
+    @app.get("/__debug/auth-cache")
+    def debug_auth_cache():
+        """Treffer und Fehlgriffe der Token- und JWKS-Zwischenspeicher."""
+        from helpers.clerk_auth import auth_cache_stats
+        return jsonify(auth_cache_stats()), 200
+
+    @app.get("/__debug/shared-store")
+    def debug_shared_store():
+        """Backend des geteilten Speichers und Zähler seines Nahcaches."""
+        from helpers import shared_store
+        return jsonify({
+            "backend": shared_store.backend_name(),
+            "near_cache": shared_store.near_cache_stats(),
+        }), 200
+
 # Health check endpoint that verifies DB connectivity
 @app.get("/healthz")
 def healthz():
@@ -330,18 +346,27 @@ def healthz():
 # Migration endpoint removed after successful migration
 
 
+def _cron_forbidden():
+    """Fehlerantwort, wenn CRON_SECRET gesetzt ist und nicht mitgeschickt wurde."""
+    cron_secret = os.getenv("CRON_SECRET")
+    if cron_secret:
+        provided = request.headers.get("X-Cron-Secret") or request.args.get("secret")
+        if provided != cron_secret:
+            return error_response("forbidden", "Invalid cron secret", 403)
+    return None
+
+
 # --- Cron endpoint for daily availability update ---
 @app.route("/api/cron/auto-availability", methods=["POST"])
 def cron_auto_availability():
     """
-    Daily cron: add day+365 availability for all approved artists.
+    Daily cron: add day+365 availability for all approved artists, plus any
+    days missed since the last successful run.
     Protected by CRON_SECRET header to prevent unauthorized access.
     """
-    cron_secret = os.getenv("CRON_SECRET")
-    if cron_secret:
-        provided = request.headers.get("X-Cron-Secret") or request.args.get("secret")
-        if provided != cron_secret:
-            return error_response("forbidden", "Invalid cron secret", 403)
+    forbidden = _cron_forbidden()
+    if forbidden:
+        return forbidden
 
     try:
         from cron_jobs.auto_availability import run_daily_availability
@@ -352,5 +377,100 @@ def cron_auto_availability():
         return error_response("internal_error", str(e), 500)
 
 
+# --- Cron endpoint: liegengebliebene Preisberechnungen nachholen ---
+@app.route("/api/cron/pending-prices", methods=["POST"])
+def cron_pending_prices():
+    """
+    Catch-up for booking requests still on price_status 'pending'.
+    Protected by CRON_SECRET header to prevent unauthorized access.
+    """
+    forbidden = _cron_forbidden()
+    if forbidden:
+        return forbidden
+
+    try:
+        from cron_jobs.pending_prices import run_pending_prices
+        result = run_pending_prices()
+        return jsonify({"status": "ok", "result": result}), 200
+    except Exception as e:
+        app.logger.exception("Cron pending-prices failed: %s", e)
+        return error_response("internal_error", str(e), 500)
+
+
+# --- Cron endpoint: abgebrochene Gage-Neuberechnung fortsetzen ---
+@app.route("/api/cron/gage-recalculation", methods=["POST"])
+def cron_gage_recalculation():
+    """
+    Resume a gage recalculation job that failed or stopped sending heartbeats.
+    Protected by CRON_SECRET header to prevent unauthorized access.
+    """
+    forbidden = _cron_forbidden()
+    if forbidden:
+        return forbidden
+
+    try:
+        from cron_jobs.recalculate_gages import run_gage_recalculation
+        result = run_gage_recalculation()
+        return jsonify({"status": "ok", "result": result}), 200
+    except Exception as e:
+        app.logger.exception("Cron gage-recalculation failed: %s", e)
+        return error_response("internal_error", str(e), 500)
+
+
+
+# --- Cron endpoint: Mails aus der Outbox verschicken ---
+@app.route("/api/cron/email-outbox", methods=["POST"])
+def cron_email_outbox():
+    """
+    Send due emails from the outbox over one SMTP session per batch.
+    Protected by CRON_SECRET header to prevent unauthorized access.
+    """
+    forbidden = _cron_forbidden()
+    if forbidden:
+        return forbidden
+
+    try:
+        from cron_jobs.email_outbox import run_email_outbox
+        result = run_email_outbox()
+        return jsonify({"status": "ok", "result": result}), 200
+    except Exception as e:
+        app.logger.exception("Cron email-outbox failed: %s", e)
+        return error_response("internal_error", str(e), 500)
+
+
+@app.cli.command("send-emails")
+@click.option("--loop", is_flag=True, help="Dauerhaft laufen statt einmal die Outbox zu leeren.")
+@click.option("--interval", default=30.0, show_default=True, help="Sekunden zwischen zwei Läufen mit --loop.")
+def send_emails_command(loop, interval):
+    """Fällige Mails aus der Outbox verschicken."""
+    import time
+    from cron_jobs.email_outbox import run_email_outbox
+
+    while True:
+        result = run_email_outbox()
+        click.echo(f"sent={result['sent']} retried={result['retried']} failed={result['failed']}")
+        if not loop:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+
+# Worker-Thread für die Outbox: nur in dauerhaft laufenden Prozessen. Auf
+# Serverless lebt kein Thread über den Aufruf hinaus; dort verschickt ein
+# Hintergrundlauf nach dem Commit, der Cron-Endpunkt holt Liegengebliebenes nach.
+if (app.config.get("EMAIL_OUTBOX_DELIVERY") == "thread"
+        and not IS_SERVERLESS and not app.config.get("TESTING")):
+    from helpers import email_outbox as _email_outbox
+    _email_outbox.start_worker(app, app.config.get("EMAIL_OUTBOX_INTERVAL", 30))
+
+
+# JWKS schon beim Start laden: Der erste authentifizierte Request soll nicht
+# auf den Abruf bei Clerk warten.
+if not app.config.get("TESTING"):
+    from helpers.clerk_auth import prefetch_jwks
+    with app.app_context():
+        prefetch_jwks()
+
+
 if __name__=="__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -69,6 +69,32 @@ class Config:
 
     AGENCY_FEE_PERCENT = int(os.getenv("AGENCY_FEE_PERCENT", "20"))
     RATE_PER_KM = 0.5
+    # Preis neuer Anfragen im Hintergrund rechnen (Antwort mit price_status
+    # 'pending'). Ohne die Variable nur für Clients mit `Prefer: respond-async`.
+    ASYNC_PRICING = os.getenv("ASYNC_PRICING", "").strip().lower() in ("1", "true", "yes")
+    # Nur Artists in diesem Umkreis (km) um das Event anfragen; leer = alle.
+    MATCH_RADIUS_KM = float(os.getenv("MATCH_RADIUS_KM") or 0) or None
+    # Speicherung der Verfügbarkeit: 'rows' (je verfügbarem Tag eine Zeile in
+    # `availabilities`, täglicher Cron) oder 'exceptions' (rollender Standard
+    # je Artist plus gesperrte Tage in `blocked_dates`, kein Cron).
+    AVAILABILITY_MODE = os.getenv("AVAILABILITY_MODE", "rows").strip().lower()
+    # PLZ- und Ortsstufe der Adresssuche aus dem Offline-Ortsverzeichnis
+    # (services/gazetteer.py). Mitgeliefert ist nur ein Grundbestand; erst mit
+    # dem vollständigen Verzeichnis aus scripts/build_gazetteer.py (Datei unter
+    # GAZETTEER_PATH) einschalten.
+    GEO_GAZETTEER = os.getenv("GEO_GAZETTEER", "").strip().lower() in ("1", "true", "yes")
+
+    # --- Bildverarbeitung (services/image_processing.py) ---
+    # Worker-Prozesse für Decodieren/Skalieren/WebP; 0 = im Request-Thread
+    # (Vercel: keine Unterprozesse). Ohne Angabe: 0 auf Vercel, sonst 2.
+    IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS") or (0 if os.getenv("VERCEL") else 2))
+    # Mehr Bilder gleichzeitig in Arbeit oder Warteschlange: 503 statt warten
+    IMAGE_POOL_MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", "4"))
+    IMAGE_TIMEOUT_SECONDS = float(os.getenv("IMAGE_TIMEOUT_SECONDS", "20"))
+    # Encoder-Profil beim Upload und für die spätere Neucodierung im
+    # Hintergrund (leer = keine Neucodierung); siehe ENCODER_PROFILES.
+    IMAGE_UPLOAD_PROFILE = os.getenv("IMAGE_UPLOAD_PROFILE", "fast").strip().lower()
+    IMAGE_REENCODE_PROFILE = os.getenv("IMAGE_REENCODE_PROFILE", "max").strip().lower()
 
     # --- SMTP / App Settings ---
     APP_URL = os.getenv("APP_URL")
@@ -78,6 +104,19 @@ class Config:
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
     SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
+    # Nur für lokale SMTP-Stand-ins ohne TLS abschalten.
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1").strip().lower() not in ("0", "false", "no")
+    # Wer die Outbox leert: 'thread' (eigener Worker-Thread, dauerhaft
+    # laufender Server), 'background' (nach jedem Commit mit neuen Mails ein
+    # Lauf im Hintergrund-Thread, Serverless) oder 'cron' (nur per Cron bzw.
+    # `flask send-emails`). Ohne Angabe: 'background' auf Vercel, sonst 'thread'.
+    EMAIL_OUTBOX_DELIVERY = (
+        os.getenv("EMAIL_OUTBOX_DELIVERY")
+        or ("background" if os.getenv("VERCEL") else "thread")
+    ).strip().lower()
+    EMAIL_OUTBOX_INTERVAL = float(os.getenv("EMAIL_OUTBOX_INTERVAL", "30"))
+    # Gleichzeitige SMTP-Verbindungen je Prozess
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
 
 
     # --- Swagger / OpenAPI Settings ---
@@ -101,4 +140,6 @@ class Config:
 class TestConfig(Config):
     """Konfiguration für Tests mit In-Memory-Datenbank."""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+    # Tests leeren die Outbox selbst, wenn sie es brauchen.
+    EMAIL_OUTBOX_DELIVERY = "cron"
\ No newline at end of file
@@ -5,6 +5,16 @@ Run daily between 0:01 and 6:00.
 For each approved artist, ensures that the date 365 days from today is set to available
 (unless the artist has manually blocked it).
 
+Catch-up: the last covered day is kept in `cron_runs`. If runs were missed,
+every day after it up to today+365 is filled in the same single INSERT ...
+SELECT, so a failed night no longer leaves a permanent hole. Days that were
+already covered are not touched again — days an artist removed stay removed.
+Without a recorded run only today+365 is filled, as before.
+
+With AVAILABILITY_MODE='exceptions' there is nothing to do: every artist's
+default window rolls forward by itself and only blocked days are stored.
+The job then returns immediately; the schedule can be dropped.
+
 Can be triggered via:
   - Direct script execution: python cron_jobs/auto_availability.py
   - HTTP endpoint: POST /api/cron/auto-availability (with CRON_SECRET header)
@@ -14,8 +24,9 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from app import app, db
-from managers.availability_manager import AvailabilityManager
-from datetime import date, timedelta
+from managers.availability_manager import AvailabilityManager, availability_mode
+from models import CronRun
+from datetime import date, datetime, timedelta
 
 import logging
 logging.basicConfig(
@@ -25,18 +36,46 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_daily_availability():
+JOB_NAME = "auto_availability"
+DAYS_AHEAD = 365
+
+
+def run_daily_availability(catch_up: bool = True):
     """
-    Add the day that is 365 days from now for all approved artists.
-    This is the daily rolling window update.
+    Add the day that is 365 days from now for all approved artists, plus
+    every day missed since the last successful run (unless catch_up=False).
+    Returns rows created/skipped, the filled range and the time it took.
     """
+    if availability_mode() == "exceptions":
+        logger.info("Daily availability cron: AVAILABILITY_MODE=exceptions, nothing to do")
+        return {"mode": "exceptions", "created": 0, "skipped": 0}
+
     manager = AvailabilityManager()
-    target_date = date.today() + timedelta(days=365)
+    today = date.today()
+    target_date = today + timedelta(days=DAYS_AHEAD)
+
+    run = db.session.get(CronRun, JOB_NAME)
+    start = target_date
+    if catch_up and run is not None and run.covered_until is not None:
+        start = max(run.covered_until + timedelta(days=1), today)
+
+    if start <= target_date:
+        result = manager.ensure_available_for_all_between(start, target_date, only_approved=True)
+    else:
+        result = {"created": 0, "skipped": 0, "from": None, "to": None, "elapsed_ms": 0.0}
+    result["date"] = target_date.isoformat()
+
+    if run is None:
+        run = CronRun(name=JOB_NAME)
+        db.session.add(run)
+    run.last_success_at = datetime.utcnow()
+    run.covered_until = max(target_date, run.covered_until or target_date)
+    db.session.commit()
 
-    result = manager.ensure_available_for_all_on(target_date, only_approved=True)
     logger.info(
-        "Daily availability cron: date=%s created=%s skipped=%s",
-        result.get("date"), result.get("created"), result.get("skipped")
+        "Daily availability cron: %s..%s created=%s skipped=%s in %s ms",
+        result.get("from"), result.get("to"), result.get("created"), result.get("skipped"),
+        result.get("elapsed_ms"),
     )
     return result
 
@@ -44,7 +83,7 @@ def run_daily_availability():
 if __name__ == "__main__":
     with app.app_context():
         try:
-            result = run_daily_availability()
+            result = run_daily_availability(catch_up="--no-catch-up" not in sys.argv[1:])
             logger.info("Auto-Availability cron finished: %s", result)
         except Exception as e:
             logger.exception("Auto-Availability cron failed")
@@ -0,0 +1,46 @@
+"""
+Versand der Mails aus der Outbox (`email_outbox`).
+
+Alle fälligen Mails gehen über eine SMTP-Verbindung je Schub raus;
+Fehlschläge werden mit wachsendem Abstand neu eingeplant (siehe
+`helpers/email_outbox.py`). Ohne laufenden Worker-Thread empfiehlt sich ein
+Lauf jede Minute.
+
+Can be triggered via:
+  - Direct script execution: python cron_jobs/email_outbox.py
+  - Flask CLI: flask send-emails [--loop]
+  - HTTP endpoint: POST /api/cron/email-outbox (with CRON_SECRET header)
+"""
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from helpers import email_outbox
+
+logger = logging.getLogger(__name__)
+
+
+def run_email_outbox(batch_size: int = email_outbox.BATCH_SIZE):
+    """Alle fälligen Mails verschicken."""
+    result = email_outbox.drain_all(batch_size)
+    logger.info("Email outbox cron: %s", result)
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    from app import app
+
+    with app.app_context():
+        try:
+            result = run_email_outbox()
+            logger.info("Email outbox cron finished: %s", result)
+        except Exception:
+            logger.exception("Email outbox cron failed")
+            sys.exit(1)
@@ -0,0 +1,78 @@
+"""
+Nachlauf der Preisberechnung: Anfragen, die noch auf 'pending' stehen.
+
+Im Normalfall rechnet der Hintergrund-Thread den Preis wenige Sekunden nach
+dem Anlegen der Anfrage (siehe `helpers/background.py`). Geht der Prozess
+vorher verloren, bleibt die Anfrage auf 'pending' stehen; dieser Job holt
+sie nach. Es empfiehlt sich ein Lauf alle paar Minuten.
+
+Can be triggered via:
+  - Direct script execution: python cron_jobs/pending_prices.py
+  - HTTP endpoint: POST /api/cron/pending-prices (with CRON_SECRET header)
+"""
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from managers.booking_requests_manager import BookingRequestManager
+
+logger = logging.getLogger(__name__)
+
+# Kürzer unangetastet ist eine Anfrage vermutlich noch beim Hintergrund-Thread
+# in Arbeit: Ein kalter Geocoder braucht je Adresse bis zu vier Aufrufe im
+# Sekundentakt, bei einem Timeout jeweils bis zu 8 s.
+MIN_AGE_SECONDS = 300
+
+
+def finish_pending_request(request_id: int):
+    """Preis einer Anfrage nachrechnen und erst dann benachrichtigen.
+
+    Die Mails gehen bewusst erst nach der Preisberechnung raus: Die Admin-Mail
+    nennt den Preisrahmen.
+    """
+    from helpers.emails import notify_new_request
+
+    manager = BookingRequestManager()
+    req = manager.complete_pricing(request_id)
+    if req is None:
+        return None
+    artists = manager.sort_by_distance(list(req.artists), req._artist_distances)
+    notify_new_request(req, artists)
+    manager.db.session.commit()
+    return req
+
+
+def run_pending_prices(min_age_seconds: int = MIN_AGE_SECONDS):
+    """Alle liegengebliebenen Anfragen nachrechnen."""
+    manager = BookingRequestManager()
+    ids = manager.pending_pricing_ids(older_than_seconds=min_age_seconds)
+    done = failed = 0
+    for request_id in ids:
+        try:
+            if finish_pending_request(request_id) is not None:
+                done += 1
+        except Exception:
+            logger.exception("Pending pricing failed for request %s", request_id)
+            manager.db.session.rollback()
+            failed += 1
+    logger.info("Pending prices cron: found=%s done=%s failed=%s", len(ids), done, failed)
+    return {"found": len(ids), "done": done, "failed": failed}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    from app import app
+
+    with app.app_context():
+        try:
+            result = run_pending_prices()
+            logger.info("Pending prices cron finished: %s", result)
+        except Exception:
+            logger.exception("Pending prices cron failed")
+            sys.exit(1)
@@ -0,0 +1,209 @@
+"""
+Gage-Neuberechnung über alle Artists als Hintergrundlauf.
+
+`POST /api/admin/gage/recalculate-all` rechnete bisher alle Artists im
+Request und in einer Transaktion neu; bei vielen Artists lief das in den
+Gunicorn-Timeout (120 s) und alles wurde zurückgerollt. Jetzt legt die Route
+einen `GageRecalcJob` an und antwortet sofort mit 202. Der Lauf geht in
+Blöcken nach ID durch die Artists (`ArtistManager.recalculate_gage_chunk`),
+jeder Block mit eigenem Commit samt Fortschritt.
+
+Bricht ein Lauf ab (Fehler, Neustart des Prozesses), setzt der nächste Start
+hinter dem letzten fertigen Block wieder an. Ein Lauf, dessen Lebenszeichen
+älter als `STALE_SECONDS` ist, gilt als abgebrochen. Den nächsten Start
+übernimmt `run_gage_recalculation` per Cron, ohne dass ein Admin erneut
+auslösen muss.
+
+Can be triggered via:
+  - Direct script execution: python cron_jobs/recalculate_gages.py
+    (mit --single-update: alle Artists in einem UPDATE in der Datenbank,
+    siehe `ArtistManager.reprice_all_artists`)
+  - HTTP endpoint: POST /api/admin/gage/recalculate-all (admin), Status über
+    GET /api/admin/gage/recalculate-all/<job_id>
+  - HTTP endpoint: POST /api/cron/gage-recalculation (with CRON_SECRET header),
+    setzt nur einen abgebrochenen oder fehlgeschlagenen Lauf fort
+"""
+
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from models import db, Artist, GageRecalcJob
+from managers.artist_manager import ArtistManager
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE_DEFAULT = 500
+CHUNK_SIZE_MAX = 5000
+# Ohne Lebenszeichen so lange gilt ein laufender Job als abgebrochen;
+# ein Block braucht selbst bei CHUNK_SIZE_MAX nur Sekunden.
+STALE_SECONDS = 300
+# Nur die letzten Blöcke im Status mitführen
+CHUNKS_KEPT = 100
+
+
+class JobRunning(Exception):
+    """Es läuft schon ein Job; `job` ist dieser."""
+
+    def __init__(self, job):
+        super().__init__(f"Gage recalculation {job.id} is still running")
+        self.job = job
+
+
+def _is_stale(job, now=None) -> bool:
+    seen = job.heartbeat_at or job.created_at
+    return seen < (now or datetime.utcnow()) - timedelta(seconds=STALE_SECONDS)
+
+
+def latest_job():
+    return GageRecalcJob.query.order_by(GageRecalcJob.id.desc()).first()
+
+
+def start_job(chunk_size=CHUNK_SIZE_DEFAULT, limit=None, restart=False):
+    """Job anlegen oder den zuletzt abgebrochenen fortsetzen; mit Commit.
+
+    Returns:
+        (GageRecalcJob, resumed: bool)
+
+    Raises:
+        JobRunning: solange ein anderer Job lebt
+    """
+    job = latest_job()
+    if job is not None and job.status in ('queued', 'running') and not _is_stale(job):
+        raise JobRunning(job)
+    if job is not None and job.status != 'done' and not restart:
+        job.status = 'queued'
+        job.error = None
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        return job, True
+
+    job = GageRecalcJob(status='queued', chunk_size=chunk_size, limit=limit,
+                        last_artist_id=0, processed=0, updated=0, chunks=[],
+                        heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job, False
+
+
+def run_job(job_id):
+    """Job `job_id` ab `last_artist_id` zu Ende rechnen.
+
+    Fehler landen im Job (`status='failed'`, `error`); fertige Blöcke
+    bleiben gespeichert.
+    """
+    manager = ArtistManager()
+    job = db.session.get(GageRecalcJob, job_id)
+    if job is None or job.status == 'done':
+        return job
+
+    job.status = 'running'
+    job.heartbeat_at = datetime.utcnow()
+    if job.total is None:
+        total = db.session.query(db.func.count(Artist.id)).scalar()
+        job.total = min(total, job.limit) if job.limit else total
+    db.session.commit()
+
+    try:
+        while job.limit is None or job.processed < job.limit:
+            size = job.chunk_size
+            if job.limit is not None:
+                size = min(size, job.limit - job.processed)
+            chunk = manager.recalculate_gage_chunk(job.last_artist_id, size)
+            if not chunk['rows']:
+                break
+            # Fortschritt in derselben Transaktion wie die Gagen
+            job.last_artist_id = chunk['last_id']
+            job.processed += chunk['rows']
+            job.updated += chunk['updated']
+            job.chunks = (list(job.chunks or []) + [chunk])[-CHUNKS_KEPT:]
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+            if chunk['rows'] < size:
+                break
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Gage recalculation %s failed after artist %s", job_id, job.last_artist_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        return job
+
+    job.status = 'done'
+    job.total = max(job.total or 0, job.processed)
+    job.finished_at = job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+    logger.info("Gage recalculation %s finished: processed=%s updated=%s",
+                job_id, job.processed, job.updated)
+    return job
+
+
+def run_gage_recalculation():
+    """Nachlauf für den Cron: den letzten Job zu Ende rechnen, falls er liegenblieb.
+
+    Ein fertiger oder noch lebender Job bleibt unberührt; es wird nie ein
+    neuer Lauf begonnen.
+    """
+    job = latest_job()
+    if job is None or job.status == 'done':
+        return {"resumed": False, "job": job_status(job) if job else None}
+    try:
+        job, _ = start_job()
+    except JobRunning as running:
+        return {"resumed": False, "job": job_status(running.job)}
+    logger.info("Gage recalculation %s resumed by cron after artist %s", job.id, job.last_artist_id)
+    job = run_job(job.id)
+    return {"resumed": True, "job": job_status(job)}
+
+
+def job_status(job) -> dict:
+    """Fortschritt und Laufzeiten für den Status-Endpunkt."""
+    chunks = job.chunks or []
+    total_ms = sum(c['ms'] for c in chunks)
+    status = job.status
+    if status in ('queued', 'running') and _is_stale(job):
+        status = 'stale'
+    return {
+        'job_id': job.id,
+        'status': status,
+        'total': job.total,
+        'processed': job.processed,
+        'updated': job.updated,
+        'progress': round(job.processed / job.total, 4) if job.total else (1.0 if status == 'done' else 0.0),
+        'last_artist_id': job.last_artist_id,
+        'chunk_size': job.chunk_size,
+        'limit': job.limit,
+        'chunks': chunks,
+        'avg_chunk_ms': round(total_ms / len(chunks), 1) if chunks else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    from app import app
+
+    with app.app_context():
+        if "--single-update" in sys.argv[1:]:
+            logger.info("Gage repricing finished: %s", ArtistManager().reprice_all_artists())
+            sys.exit(0)
+        try:
+            job, resumed = start_job()
+            logger.info("Gage recalculation %s %s", job.id, "resumed" if resumed else "started")
+            job = run_job(job.id)
+            logger.info("Gage recalculation finished: %s", job_status(job))
+            if job.status != 'done':
+                sys.exit(1)
+        except Exception:
+            logger.exception("Gage recalculation failed")
+            sys.exit(1)
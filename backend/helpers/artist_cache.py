@@ -0,0 +1,78 @@
+"""Clerk-UID -> Artist-ID, zwischengespeichert in `shared_store`.
+
+`get_current_artist` läuft bei fast jedem authentifizierten Request. Ohne
+Zwischenspeicher ist das jedes Mal eine Suche über `lower(supabase_user_id)`;
+mit ihm ein `get` über den Primärschlüssel, das oft schon aus der Identity
+Map der Session kommt.
+
+Der Eintrag fällt weg, sobald ein Artist geändert oder gelöscht wird (nach
+dem Commit, für die alte und die neue UID). Bulk-Deletes über `Query.delete`
+umgehen die Session-Events; dagegen prüft `lookup` jeden Treffer gegen die
+UID der geladenen Zeile und fragt bei Abweichung neu.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from helpers import shared_store
+from models import Artist, db
+
+TTL_SECONDS = 3600
+# So lange darf ein Prozess die Zuordnung aus seinem Nahcache nehmen, ohne
+# Upstash zu fragen. Eine Änderung in einem anderen Prozess fällt trotzdem
+# sofort auf: `lookup` prüft die UID der geladenen Zeile. Mehr als
+# `SHARED_STORE_NEAR_MAX_TTL` (Standard 30 s) lässt `shared_store` nicht zu.
+NEAR_TTL_SECONDS = 30
+
+_SESSION_KEY = 'artist_cache_stale_uids'
+
+
+def _key(uid: str) -> str:
+    return f"artist_by_sub:{uid.lower()}"
+
+
+def lookup(uid: str) -> Artist | None:
+    """Artist zur Clerk-UID (Groß-/Kleinschreibung egal), None wenn keiner."""
+    key = _key(uid)
+    cached = shared_store.get_json(key, near_ttl=NEAR_TTL_SECONDS)
+    if cached is not None:
+        artist = db.session.get(Artist, cached)
+        if artist is not None and (artist.supabase_user_id or '').lower() == uid.lower():
+            return artist
+        shared_store.delete(key)
+
+    artist = Artist.query.filter(func.lower(Artist.supabase_user_id) == uid.lower()).first()
+    if artist is not None:
+        shared_store.set_json(key, artist.id, TTL_SECONDS, near_ttl=NEAR_TTL_SECONDS)
+    return artist
+
+
+def forget(uid: str | None) -> None:
+    if uid:
+        shared_store.delete(_key(uid))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_artists(session, flush_context):
+    stale = session.info.setdefault(_SESSION_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Artist):
+            continue
+        history = inspect(obj).attrs.supabase_user_id.history
+        stale.update(uid for uid in (*history.deleted, *history.unchanged, *history.added) if uid)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_after_commit(session):
+    for uid in session.info.pop(_SESSION_KEY, ()):
+        forget(uid)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+__all__ = ["lookup", "forget", "TTL_SECONDS"]
@@ -0,0 +1,79 @@
+"""Arbeit nach der Antwort: ein einzelner Hintergrund-Thread je Prozess.
+
+Gedacht für Schritte, die den Kunden nicht warten lassen sollen, etwa
+Geocoding und Preisberechnung einer frisch angelegten Anfrage. Ein Thread
+genügt: Die Arbeit hängt ohnehin am Nominatim-Limit von einem Aufruf pro
+Sekunde, mehr Threads würden nur gemeinsam warten.
+
+Lange Stapelläufe (die Gage-Neuberechnung über alle Artists, die
+Neucodierung hochgeladener Bilder) gehen mit `submit_batch` in einen zweiten
+Thread. Im ersten würden sie jede frische
+Anfrage minutenlang auf ihren Preis warten lassen.
+
+Was hier läuft, ist nicht dauerhaft. Stirbt der Prozess (Neustart, Ende einer
+Serverless-Funktion), geht die Warteschlange verloren. Jede Aufgabe braucht
+deshalb einen Nachlauf, der liegengebliebene Arbeit aus der Datenbank findet
+— für die Preisberechnung ist das `POST /api/cron/pending-prices`, für die
+Gage-Neuberechnung `POST /api/cron/gage-recalculation`.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from flask import current_app
+
+# Thread-Präfix -> Executor mit je einem Thread
+_executors: "dict[str, ThreadPoolExecutor]" = {}
+_executor_lock = threading.Lock()
+_pending: "set[Future]" = set()
+
+
+def _get_executor(prefix: str = "pepe-bg") -> ThreadPoolExecutor:
+    with _executor_lock:
+        if prefix not in _executors:
+            _executors[prefix] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=prefix)
+        return _executors[prefix]
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Führt `fn(*args, **kwargs)` im Hintergrund mit eigenem App-Context aus.
+
+    Muss innerhalb eines App-Contexts aufgerufen werden. Fehler werden geloggt,
+    nicht weitergereicht — es gibt niemanden mehr, der sie fangen könnte.
+    """
+    return _submit("pepe-bg", fn, args, kwargs)
+
+
+def submit_batch(fn, *args, **kwargs) -> Future:
+    """Wie `submit`, aber im eigenen Thread für lange Stapelläufe."""
+    return _submit("pepe-batch", fn, args, kwargs)
+
+
+def _submit(prefix: str, fn, args, kwargs) -> Future:
+    app = current_app._get_current_object()
+
+    def run():
+        from models import db
+
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                app.logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+                db.session.rollback()
+                return None
+            finally:
+                db.session.remove()
+
+    future = _get_executor(prefix).submit(run)
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    return future
+
+
+def wait_for_idle(timeout: float | None = None) -> bool:
+    """Wartet, bis alle eingereichten Aufgaben fertig sind (Tests, Shutdown)."""
+    done, not_done = wait(list(_pending), timeout=timeout)
+    return not not_done
@@ -3,8 +3,13 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
 import ssl
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
 from jwt import PyJWKClient
 from jwt.exceptions import PyJWKClientError
@@ -34,6 +39,18 @@ CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", "").strip()
 # nicht auf. Leer gelassen bleibt das Verhalten wie bisher.
 CLERK_ISSUER = os.getenv("CLERK_ISSUER", "").strip()
 
+# Wie lange ein geladenes JWKS ohne Auffrischen gilt. Danach wird es weiter
+# benutzt und im Hintergrund neu geladen (stale-while-revalidate).
+CLERK_JWKS_REFRESH_SECONDS = float(os.getenv("CLERK_JWKS_REFRESH_SECONDS", "300"))
+
+# JWKS beim Start im Hintergrund laden, damit schon der erste Request die
+# Schlüssel vorfindet. Die Tests schalten das ab (kein Netz).
+CLERK_JWKS_PREFETCH = os.getenv("CLERK_JWKS_PREFETCH", "1").strip().lower() not in ("0", "false", "no")
+
+# Anzahl geprüfter Tokens, deren Claims bis zum `exp` aufgehoben werden.
+# 0 schaltet den Zwischenspeicher ab.
+CLERK_TOKEN_CACHE_SIZE = int(os.getenv("CLERK_TOKEN_CACHE_SIZE", "1024"))
+
 # Cache the JWKS client
 _jwks_client = None
 
@@ -53,6 +70,177 @@ def get_jwks_client():
     return _jwks_client
 
 
+# --- Zwischenspeicher -------------------------------------------------------
+#
+# Das Frontend schickt dasselbe kurzlebige Clerk-Token mit jedem Aufruf einer
+# Seite. Ohne Zwischenspeicher kostet jeder davon das Heraussuchen des
+# Schlüssels aus dem JWKS und eine volle RS256-Prüfung. Zwei Stufen:
+#   - geprüfte Claims je Token (Schlüssel: SHA-256 des Tokens), längstens bis
+#     zu dessen `exp`, in einem LRU begrenzter Größe
+#   - die Signierschlüssel des JWKS nach `kid`, einmal geparst und im
+#     Hintergrund aufgefrischt; ein Request wartet nur bei unbekanntem `kid`
+#     auf einen Abruf
+
+_stats = {
+    "token_hits": 0,
+    "token_misses": 0,
+    "jwks_refreshes": 0,
+    "jwks_refresh_failures": 0,
+    "jwks_key_misses": 0,
+}
+
+
+class _TokenCache:
+    """LRU geprüfter Claims, jeder Eintrag gilt bis zum `exp` seines Tokens."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                _stats["token_hits"] += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+            _stats["token_misses"] += 1
+            return None
+
+    def put(self, key: bytes, claims: dict) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (dict(claims), float(claims["exp"]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_token_cache = _TokenCache(CLERK_TOKEN_CACHE_SIZE)
+
+
+class _SigningKeys:
+    """Signierschlüssel eines JWKS-Clients nach `kid`.
+
+    Ein bekannter `kid` kommt ohne Netz und ohne erneutes Parsen des JWKS
+    zurück. Ist das letzte Laden älter als `CLERK_JWKS_REFRESH_SECONDS`, lädt
+    ein Hintergrundlauf neu, der Request nimmt solange die bisherigen
+    Schlüssel. Schlägt das Laden fehl, bleiben die bisherigen gültig — anders
+    als bei `PyJWKClient`, der seinen Cache dann leert. Ein unbekannter `kid`
+    (Schlüsselwechsel bei Clerk) geht wie bisher an den Client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.keys: dict = {}
+        self.fetched_at: float | None = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def for_token(self, token: str):
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            _stats["jwks_key_misses"] += 1
+            key = self.client.get_signing_key_from_jwt(token)
+            self.keys[kid] = key
+        elif self.fetched_at is not None and time.monotonic() - self.fetched_at > CLERK_JWKS_REFRESH_SECONDS:
+            self.refresh_in_background()
+        return key
+
+    def refresh(self) -> bool:
+        """JWKS neu laden; bei Fehler bleiben die bisherigen Schlüssel."""
+        try:
+            keys = self.client.get_signing_keys(refresh=True)
+        except PyJWKClientError as e:
+            _stats["jwks_refresh_failures"] += 1
+            current_app.logger.warning("Clerk-JWKS konnte nicht aufgefrischt werden: %s", e)
+            return False
+        self.keys = {k.key_id: k for k in keys}
+        self.fetched_at = time.monotonic()
+        _stats["jwks_refreshes"] += 1
+        return True
+
+    def refresh_in_background(self) -> None:
+        """Höchstens ein Auffrischen gleichzeitig; braucht einen App-Context."""
+        from helpers import background
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        background.submit(run)
+
+
+_signing_keys: _SigningKeys | None = None
+
+
+def get_signing_keys() -> _SigningKeys:
+    """Schlüsselspeicher zum aktuellen JWKS-Client (wird mit ihm neu gebaut)."""
+    global _signing_keys
+    client = get_jwks_client()
+    keys = _signing_keys
+    if keys is None or keys.client is not client:
+        keys = _signing_keys = _SigningKeys(client)
+    return keys
+
+
+def prefetch_jwks() -> None:
+    """JWKS im Hintergrund laden, bevor der erste Request es braucht.
+
+    Im App-Context aufrufen (app.py beim Start). Ohne `CLERK_JWKS_URL` oder
+    mit `CLERK_JWKS_PREFETCH=0` passiert nichts.
+    """
+    if not (CLERK_JWKS_URL and CLERK_JWKS_PREFETCH):
+        return
+    get_signing_keys().refresh_in_background()
+
+
+def auth_cache_stats() -> dict:
+    """Zähler der beiden Zwischenspeicher (für /__debug/auth-cache)."""
+    keys = _signing_keys
+    return {
+        **_stats,
+        "token_cache_size": len(_token_cache),
+        "jwks_keys": len(keys.keys) if keys else 0,
+        "jwks_age_seconds": (
+            round(time.monotonic() - keys.fetched_at, 1)
+            if keys and keys.fetched_at is not None else None
+        ),
+    }
+
+
+def reset_caches() -> None:
+    """Beide Zwischenspeicher und die Zähler leeren (Tests)."""
+    global _signing_keys
+    _token_cache.clear()
+    _signing_keys = None
+    for name in _stats:
+        _stats[name] = 0
+
+
 def verify_clerk_token(token: str) -> dict | None:
     """Verify a Clerk JWT token and return the claims.
 
@@ -69,12 +257,20 @@ def verify_clerk_token(token: str) -> dict | None:
         (SPEC-4, O1). Abgefangen wird nur, was fachlich vorkommen kann:
         Fehlkonfiguration, unerreichbares JWKS, ungültiges Token. Alle drei
         ergeben eine eigene, unterscheidbare Logzeile.
+
+    Ein einmal geprüftes Token kommt bis zu seinem `exp` aus dem
+    Zwischenspeicher, ohne Schlüsselsuche und ohne Signaturprüfung.
     """
     if not token:
         return None
 
+    cache_key = _TokenCache.key(token)
+    claims = _token_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
     try:
-        jwks_client = get_jwks_client()
+        signing_keys = get_signing_keys()
     except RuntimeError as e:
         # Fehlkonfiguration, kein Token-Problem: Ohne JWKS-URL ist keine
         # Prüfung möglich. Nach aussen bleibt es 401, im Log ist der
@@ -87,7 +283,7 @@ def verify_clerk_token(token: str) -> dict | None:
         decode_kwargs["issuer"] = CLERK_ISSUER
 
     try:
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        signing_key = signing_keys.for_token(token)
         claims = jwt.decode(
             token,
             signing_key.key,
@@ -115,6 +311,7 @@ def verify_clerk_token(token: str) -> dict | None:
     if not claims.get("sub"):
         current_app.logger.warning("Clerk token without sub claim rejected")
         return None
+    _token_cache.put(cache_key, claims)
     return claims
 
 
@@ -194,7 +391,8 @@ def get_current_artist():
     """Resolve the Artist row belonging to the authenticated Clerk user.
 
     Pure lookup — this never creates rows. Use `ensure_artist_for_current_user`
-    in api_routes for the onboarding path.
+    in api_routes for the onboarding path. Die Zuordnung UID -> Artist-ID
+    kommt meist aus `helpers.artist_cache`.
 
     Returns:
         Artist instance or None.
@@ -205,12 +403,9 @@ def get_current_artist():
     artist = None
     uid = get_clerk_user_id()
     if uid and isinstance(uid, str):
-        from sqlalchemy import func
-        from models import Artist
+        from helpers import artist_cache
         try:
-            artist = Artist.query.filter(
-                func.lower(Artist.supabase_user_id) == uid.lower()
-            ).first()
+            artist = artist_cache.lookup(uid)
         except Exception:
             current_app.logger.exception("get_current_artist lookup failed for uid=%s", uid)
             artist = None
@@ -0,0 +1,207 @@
+"""Outbox für ausgehende Mails: erst speichern, dann gesammelt verschicken.
+
+Bisher ging jede Mail direkt aus dem Request heraus, jede über eine eigene
+SMTP-Verbindung mit STARTTLS und Login. Eine Anfrage mit fünf Artists
+wartete so auf sechs TLS-Handshakes, bevor die Antwort rausging, und ein
+SMTP-Ausfall verlor die Mails stillschweigend.
+
+Jetzt legt `enqueue` die Mail als Zeile in `email_outbox` an, ohne zu
+committen — sie wird zusammen mit ihrem Anlass geschrieben oder gar nicht.
+`drain` verschickt die fälligen Einträge über die offenen Verbindungen des
+SMTP-Pools (`helpers.emails.send_many`) und plant Fehlschläge mit
+wachsendem Abstand neu ein.
+
+Wer `drain` aufruft (`EMAIL_OUTBOX_DELIVERY`):
+  - 'thread': ein Worker-Thread im Prozess, den ein Commit mit neuen Mails
+    sofort weckt (Standard auf einem dauerhaft laufenden Server)
+  - 'background': nach einem solchen Commit ein Lauf im Hintergrund-Thread
+    (`helpers/background.py`, Standard auf Vercel)
+  - immer zusätzlich: POST /api/cron/email-outbox und `flask send-emails`,
+    die auch fällige Wiederholungen verschicken
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from helpers.emails import get_smtp_pool
+from models import EmailOutbox, db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+
+# Abstand bis zum nächsten Versuch nach dem 1., 2., … Fehlschlag.
+_BACKOFF_SECONDS = (60, 300, 900, 3600, 3 * 3600)
+
+# So lange gehört ein abgeholter Eintrag dem Worker, der ihn abgeholt hat.
+# Stirbt der Worker mittendrin, wird der Eintrag danach wieder fällig.
+_LEASE_SECONDS = 120
+
+_SESSION_FLAG = 'email_outbox_enqueued'
+_wakeup = threading.Event()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(to_email: str, subject: str, html: str) -> EmailOutbox:
+    """Mail in die Outbox legen. Geschrieben wird mit dem nächsten Commit."""
+    entry = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html=html,
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(entry)
+    db.session.info[_SESSION_FLAG] = True
+    return entry
+
+
+@event.listens_for(Session, 'after_commit')
+def _deliver_after_commit(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        _kick()
+
+
+def _kick() -> None:
+    """Neue Mails sind committet: je nach `EMAIL_OUTBOX_DELIVERY` verschicken."""
+    _wakeup.set()
+    if not has_app_context():
+        return
+    if current_app.config.get('EMAIL_OUTBOX_DELIVERY') == 'background':
+        from helpers import background
+        background.submit(drain_all)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(_SESSION_FLAG, None)
+
+
+def _claim(batch_size: int, now: datetime) -> list:
+    """Fällige Einträge abholen und für die Dauer des Versands reservieren.
+
+    `SKIP LOCKED` lässt zwei gleichzeitige Worker (Thread und Cron) an
+    verschiedenen Einträgen arbeiten, statt dieselben doppelt zu senden.
+    SQLite kennt das nicht und ignoriert es.
+    """
+    entries = (
+        EmailOutbox.query
+        .filter(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for entry in entries:
+        entry.attempts += 1
+        entry.next_attempt_at = now + timedelta(seconds=_LEASE_SECONDS)
+    db.session.commit()
+    return entries
+
+
+def _schedule_retry(entry: EmailOutbox, error: str, now: datetime) -> str:
+    entry.last_error = str(error)[:1000]
+    if entry.attempts >= MAX_ATTEMPTS:
+        entry.status = 'failed'
+        logger.error("Email %s to %s given up after %s attempts: %s",
+                     entry.id, entry.to_email, entry.attempts, entry.last_error)
+        return 'failed'
+    delay = _BACKOFF_SECONDS[min(entry.attempts, len(_BACKOFF_SECONDS)) - 1]
+    entry.next_attempt_at = now + timedelta(seconds=delay)
+    logger.warning("Email %s to %s failed (attempt %s), retry in %ss: %s",
+                   entry.id, entry.to_email, entry.attempts, delay, entry.last_error)
+    return 'retried'
+
+
+def drain(batch_size: int = BATCH_SIZE) -> dict:
+    """Einen Schub fälliger Mails über den SMTP-Pool verschicken.
+
+    Rückgabe: {'claimed', 'sent', 'retried', 'failed'}. Ohne SMTP-Zugang
+    bleibt die Outbox unangetastet; die Einträge verbrauchen dann keine
+    Versuche.
+    """
+    result = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    pool = get_smtp_pool()
+    if pool is None:
+        logger.warning("Email outbox not drained — SMTP is not configured")
+        return result
+
+    entries = _claim(batch_size, datetime.utcnow())
+    result['claimed'] = len(entries)
+    if not entries:
+        return result
+    messages = [(e.to_email, e.subject, e.html) for e in entries]
+
+    def record(i, sent):
+        entry, now = entries[i], datetime.utcnow()
+        if sent.ok:
+            entry.status = 'sent'
+            entry.sent_at = now
+            entry.last_error = None
+            result['sent'] += 1
+        else:
+            result[_schedule_retry(entry, sent.error, now)] += 1
+        # Je Mail festhalten: Stirbt der Worker, wird höchstens eine Handvoll
+        # gerade verschickter Mails ein zweites Mal gesendet.
+        db.session.commit()
+
+    try:
+        pool.send_many(messages, on_result=record)
+    finally:
+        db.session.commit()
+
+    logger.info("Email outbox: %s", result)
+    return result
+
+
+def drain_all(batch_size: int = BATCH_SIZE) -> dict:
+    """`drain`, bis kein voller Schub mehr fällig ist."""
+    total = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        result = drain(batch_size)
+        for key in total:
+            total[key] += result[key]
+        if result['claimed'] < batch_size:
+            return total
+
+
+def start_worker(app, interval_seconds: float = 30.0) -> threading.Thread:
+    """Hintergrund-Thread, der die Outbox leert.
+
+    Er wacht nach jedem Commit mit neuen Mails auf und spätestens alle
+    `interval_seconds`, um fällige Wiederholungen zu verschicken. Nur für
+    dauerhaft laufende Prozesse; Serverless nutzt den Cron-Endpunkt.
+    """
+    global _worker
+
+    def run():
+        while True:
+            _wakeup.wait(interval_seconds)
+            _wakeup.clear()
+            with app.app_context():
+                try:
+                    drain_all()
+                except Exception:
+                    app.logger.exception("Email outbox worker failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run, name="pepe-email-outbox", daemon=True)
+            _worker.start()
+        return _worker
+
+
+__all__ = ["enqueue", "drain", "drain_all", "start_worker", "BATCH_SIZE", "MAX_ATTEMPTS"]
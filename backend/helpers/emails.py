@@ -6,13 +6,20 @@ Die Builder bleiben bewusst je eine eigenständige f-String-Funktion — kein
 Template-System, siehe SPEC-2.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
 from email.message import EmailMessage
+import logging
 import smtplib
 import ssl
+import threading
+import time
+from typing import Callable, NamedTuple
 
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
 
 def format_event_date(value) -> str:
     """Formatiert ein Event-Datum als TT.MM.JJJJ.
@@ -110,8 +117,8 @@ def format_planning_status(value) -> str:
     return _PLANNING_LABELS.get(str(value).strip(), str(value))
 
 
-def send_email(to_email: str, subject: str, html: str) -> bool:
-    """Send an HTML email using SMTP settings from Flask config.
+def smtp_settings() -> dict | None:
+    """SMTP-Zugang aus der Flask-Config, None wenn unvollständig.
 
     Required config keys:
       - SMTP_HOST
@@ -119,35 +126,277 @@ def send_email(to_email: str, subject: str, html: str) -> bool:
       - SMTP_USER
       - SMTP_PASSWORD
       - SMTP_FROM (defaults to SMTP_USER)
+      - SMTP_STARTTLS (default True)
     """
     host = current_app.config.get('SMTP_HOST')
-    port = int(current_app.config.get('SMTP_PORT', 587))
     user = current_app.config.get('SMTP_USER')
     password = current_app.config.get('SMTP_PASSWORD')
-    from_addr = current_app.config.get('SMTP_FROM', user)
+    if not (host and user and password):
+        return None
+    return {
+        'host': host,
+        'port': int(current_app.config.get('SMTP_PORT', 587)),
+        'user': user,
+        'password': password,
+        'from_addr': current_app.config.get('SMTP_FROM') or user,
+        'starttls': current_app.config.get('SMTP_STARTTLS', True),
+    }
 
-    if not (host and user and password and to_email):
-        current_app.logger.warning("Email not sent — missing SMTP config or recipient")
-        return False
 
+def build_message(from_addr: str, to_email: str, subject: str, html: str) -> EmailMessage:
     msg = EmailMessage()
     msg['Subject'] = subject
     msg['From'] = from_addr
     msg['To'] = to_email
     msg.set_content("Neue Anfrage. Bitte im Browser öffnen.")
     msg.add_alternative(html, subtype='html')
+    return msg
+
 
+def open_smtp(settings: dict, timeout: float = 30.0) -> smtplib.SMTP:
+    """Angemeldete SMTP-Verbindung; der Aufrufer schließt sie mit `quit()`."""
+    server = smtplib.SMTP(settings['host'], settings['port'], timeout=timeout)
     try:
-        with smtplib.SMTP(host, port) as server:
+        if settings['starttls']:
             server.starttls(context=ssl.create_default_context())
-            server.login(user, password)
+        server.login(settings['user'], settings['password'])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+# --- Versand über wiederverwendete Verbindungen ------------------------------
+#
+# Verbindungsaufbau, STARTTLS und Login kosten bei einem externen Anbieter
+# schnell mehrere hundert Millisekunden — ein Vielfaches des eigentlichen
+# Versands. Der Pool hält angemeldete Verbindungen offen und gibt sie an den
+# nächsten Versand weiter. Vor der Wiederverwendung prüft ein NOOP, ob der
+# Server die Verbindung inzwischen geschlossen hat.
+
+# Fehler, nach denen die Verbindung weiter nutzbar ist: Sie betreffen nur die
+# eine Mail (Empfänger abgelehnt, Inhalt abgelehnt).
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+# Länger ungenutzte Verbindungen werden geschlossen statt geprüft; viele
+# Server trennen nach wenigen Minuten Leerlauf ohnehin.
+_SMTP_IDLE_SECONDS = 120
+
+
+class SendResult(NamedTuple):
+    to_email: str
+    ok: bool
+    error: str | None = None
+
+
+class SMTPPool:
+    """Bis zu `size` angemeldete SMTP-Verbindungen für dieselben Zugangsdaten."""
+
+    def __init__(self, settings: dict, size: int = 4):
+        self.settings = dict(settings)
+        self.size = max(1, int(size))
+        self._idle: list = []  # [(server, zuletzt benutzt)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._executor: ThreadPoolExecutor | None = None
+        self.opened = 0
+
+    def _executor_for_fanout(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.size, thread_name_prefix="pepe-smtp"
+                )
+            return self._executor
+
+    def acquire(self) -> smtplib.SMTP:
+        """Verbindung aus dem Pool, geprüft per NOOP; sonst eine neue."""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    server, last_used = self._idle.pop()
+                if time.monotonic() - last_used > _SMTP_IDLE_SECONDS:
+                    _close_quietly(server)
+                    continue
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+                _close_quietly(server)
+            server = open_smtp(self.settings)
+            with self._lock:
+                self.opened += 1
+            return server
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server: smtplib.SMTP, reusable: bool = True) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append((server, time.monotonic()))
+        else:
+            _close_quietly(server)
+        self._slots.release()
+
+    def _send_one(self, to_email: str, subject: str, html: str):
+        """(SendResult, ob eine Verbindung zustande kam). Wirft nie."""
+        try:
+            server = self.acquire()
+        except Exception as e:
+            return SendResult(to_email, False, _describe(e)), False
+        msg = build_message(self.settings['from_addr'], to_email, subject, html)
+        try:
             server.send_message(msg)
-        current_app.logger.info(f"Email sent to {to_email} (subject: {subject})")
-        return True
-    except Exception as e:
-        current_app.logger.exception(f"Failed to send email to {to_email}: {e}")
+        except Exception as e:
+            self.release(server, reusable=isinstance(e, MESSAGE_ERRORS))
+            return SendResult(to_email, False, _describe(e)), True
+        self.release(server)
+        return SendResult(to_email, True), True
+
+    def send(self, to_email: str, subject: str, html: str) -> SendResult:
+        """Eine Mail über eine Verbindung aus dem Pool. Wirft nie."""
+        return self._send_one(to_email, subject, html)[0]
+
+    def send_many(self, messages, on_result: Callable | None = None) -> list:
+        """Mehrere Mails parallel über bis zu `size` Verbindungen.
+
+        `messages` ist eine Folge von (to, subject, html). Rückgabe ist eine
+        Liste von `SendResult` in derselben Reihenfolge. `on_result(i, result)`
+        läuft im aufrufenden Thread, sobald Mail i durch ist — dort kann der
+        Aufrufer etwa den Versand in der Datenbank festhalten.
+
+        Scheitert der Verbindungsaufbau, bekommen die noch wartenden Mails
+        denselben Fehler, statt jede für sich ins Timeout zu laufen.
+        """
+        messages = list(messages)
+        results: list = [None] * len(messages)
+        if not messages:
+            return results
+        connect_error: list = []
+
+        def job(to_email, subject, html):
+            if connect_error:
+                return SendResult(to_email, False, connect_error[0])
+            result, connected = self._send_one(to_email, subject, html)
+            if not connected:
+                connect_error.append(result.error)
+            return result
+
+        if len(messages) == 1:
+            results[0] = job(*messages[0])
+            if on_result:
+                on_result(0, results[0])
+            return results
+
+        executor = self._executor_for_fanout()
+        futures = {executor.submit(job, *m): i for i, m in enumerate(messages)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result:
+                on_result(i, results[i])
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            executor, self._executor = self._executor, None
+        for server, _ in idle:
+            _close_quietly(server)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def _close_quietly(server) -> None:
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+_pool: SMTPPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool | None:
+    """Prozessweiter Pool für die aktuelle SMTP-Config, None ohne Zugang."""
+    global _pool
+    settings = smtp_settings()
+    if settings is None:
+        return None
+    size = int(current_app.config.get('SMTP_POOL_SIZE', 4))
+    with _pool_lock:
+        if _pool is None or _pool.settings != settings or _pool.size != size:
+            if _pool is not None:
+                _pool.close()
+            _pool = SMTPPool(settings, size)
+        return _pool
+
+
+def close_smtp_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+def send_many(messages, on_result: Callable | None = None) -> list:
+    """Mehrere Mails über den Verbindungs-Pool; je Mail ein `SendResult`.
+
+    `messages`: Folge von (to, subject, html). Ohne SMTP-Zugang scheitern
+    alle mit Fehlertext, ohne dass etwas geworfen wird.
+    """
+    messages = list(messages)
+    pool = get_smtp_pool()
+    if pool is None:
+        current_app.logger.warning("Emails not sent — missing SMTP config")
+        results = [SendResult(m[0], False, "SMTP not configured") for m in messages]
+        if on_result:
+            for i, r in enumerate(results):
+                on_result(i, r)
+        return results
+    results = pool.send_many(messages, on_result=on_result)
+    failed = [r for r in results if not r.ok]
+    if failed:
+        current_app.logger.warning("%s of %s emails failed: %s", len(failed), len(results),
+                                   "; ".join(f"{r.to_email}: {r.error}" for r in failed[:5]))
+    return results
+
+
+def send_email(to_email: str, subject: str, html: str) -> bool:
+    """Send an HTML email right away, über den Verbindungs-Pool.
+
+    Für Mails aus einem Request besser `helpers.email_outbox.enqueue`: Dort
+    hängt der Versand nicht an der Antwortzeit.
+    """
+    if not to_email or smtp_settings() is None:
+        current_app.logger.warning("Email not sent — missing SMTP config or recipient")
         return False
 
+    result = send_many([(to_email, subject, html)])[0]
+    if result.ok:
+        current_app.logger.info(f"Email sent to {to_email} (subject: {subject})")
+    else:
+        current_app.logger.error(f"Failed to send email to {to_email}: {result.error}")
+    return result.ok
+
 
 def is_deliverable_address(email: str | None) -> bool:
     """Filter Platzhalter-Adressen (z. B. `…@clerk.placeholder`) heraus.
@@ -164,6 +413,49 @@ def is_deliverable_address(email: str | None) -> bool:
     return not (domain.endswith('.placeholder') or domain.endswith('.invalid'))
 
 
+def notify_new_request(req, artists) -> None:
+    """Legt die Mails an die gematchten Artists und den Admin in die Outbox.
+
+    Committet nicht: Die Mails gehen mit dem nächsten Commit des Aufrufers in
+    die Datenbank, zusammen mit der Änderung, die sie ankündigen. Fehler beim
+    Aufbau einer Mail werden nur geloggt — eine Anfrage ist angelegt, auch
+    wenn eine Mail nicht rausgeht.
+    """
+    from helpers import email_outbox
+
+    try:
+        date_str = format_event_date(req.event_date)
+        city = event_city(req.event_address)
+        subject = f"Neue Booking-Anfrage – {date_str}{', ' + city if city else ''}"
+
+        for artist in artists:
+            # Platzhalter-Adressen (…@clerk.placeholder) sind nicht zustellbar
+            # und würden den Versand nur mit Fehlern fluten.
+            if not is_deliverable_address(getattr(artist, 'email', None)):
+                current_app.logger.warning(
+                    "Skipping email for artist %s – no deliverable address on record",
+                    getattr(artist, 'id', '?'),
+                )
+                continue
+
+            html = build_artist_new_request_email(artist, req)
+            email_outbox.enqueue(artist.email, subject, html)
+    except Exception as e:
+        current_app.logger.exception(f"Error while queueing artist notification emails: {e}")
+
+    try:
+        admin_email = current_app.config.get('ADMIN_EMAIL')
+        if admin_email:
+            admin_subject = f"[Pepe Shows] Neue Buchungsanfrage #{req.id}"
+            admin_html = build_admin_new_request_email(req)
+            email_outbox.enqueue(admin_email, admin_subject, admin_html)
+            current_app.logger.info(f"Admin notification queued for request {req.id} to {admin_email}")
+        else:
+            current_app.logger.warning("Admin email notification skipped - ADMIN_EMAIL not configured")
+    except Exception as e:
+        current_app.logger.exception(f"Error while queueing admin notification email: {e}")
+
+
 def build_artist_new_request_email(artist, req):
     """Build a beautifully styled HTML email for a new booking request."""
     app_url = current_app.config.get('APP_URL', 'https://app.example.com')
@@ -541,6 +833,15 @@ def build_artist_rejected_email(artist, reason: str | None = None):
 
 __all__ = [
     "send_email",
+    "send_many",
+    "SendResult",
+    "SMTPPool",
+    "get_smtp_pool",
+    "close_smtp_pool",
+    "smtp_settings",
+    "open_smtp",
+    "build_message",
+    "notify_new_request",
     "is_deliverable_address",
     "format_event_date",
     "format_disciplines",
@@ -0,0 +1,297 @@
+"""Idempotency-Keys: erst beanspruchen, dann arbeiten.
+
+Usage:
+    claim = idempotency.claim("booking", key)
+    if claim.busy:
+        claim = idempotency.wait(claim, timeout=10)
+    if claim.replay is not None:
+        ...                          # Antwort des ersten Aufrufs wiederholen
+    try:
+        ...
+        claim.complete(payload)      # Antwort für Wiederholungen ablegen
+    finally:
+        claim.release()              # nach complete() ohne Wirkung
+
+Notes:
+- Bisher wurde die Antwort erst am Ende abgelegt. Zwei gleichzeitige
+  Aufrufe mit demselben Key (Doppelklick auf eine langsame Anfrage) liefen
+  beide ganz durch und legten zwei Buchungen an. Jetzt setzt der erste
+  Aufruf vorab eine Sperre mit Ablaufzeit (SET NX EX); wer sie nicht
+  bekommt, wartet auf die Antwort oder bekommt sie gleich.
+- Die Sperre läuft nach `LEASE_SECONDS` ab. Stirbt der Prozess mittendrin,
+  ist der Key danach wieder frei.
+- Mit Upstash liegt alles dort. Ohne Upstash oder bei einem Fehler liegt
+  es in der Tabelle `idempotency_keys` mit dem Key als Primärschlüssel —
+  nicht im Prozessspeicher, der über Instanzen hinweg nicht schützt.
+- Schlägt auch die Datenbank fehl, läuft der Aufruf ungeschützt weiter.
+  Eine doppelte Anfrage ist ärgerlich, eine verlorene schlimmer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from helpers import shared_store
+
+# Sperre während der Bearbeitung; großzügig über der längsten Anfrage
+# (Geocoding-Kaskade, Preis, Outbox).
+LEASE_SECONDS = 60
+# Wie lange die fertige Antwort für Wiederholungen bereitliegt
+RESULT_TTL_SECONDS = 3600
+# Abstand zwischen zwei Blicken auf eine fremde Sperre
+POLL_SECONDS = 0.2
+
+# Länge von idempotency_keys.key; längere Keys werden gehasht.
+_DB_KEY_MAX = 255
+# Abgelaufene Zeilen höchstens so oft wegräumen (je Prozess)
+_DB_PURGE_INTERVAL = 600.0
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+# KEYS[1]: Key. ARGV: Sperre, Sekunden. Rückgabe {1, Sperre} oder {0, Stand}.
+_CLAIM_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2], 'NX') then
+  return {1, ARGV[1]}
+end
+return {0, redis.call('GET', KEYS[1])}
+"""
+
+# Nur ersetzen bzw. löschen, solange die eigene Sperre noch steht.
+_COMPLETE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Claim:
+    """Ergebnis von `claim`: genau eines von `owned`, `replay` oder `busy`."""
+
+    def __init__(self, scope: str, key: str, backend: str,
+                 lease: Optional[str] = None, replay: Any = None):
+        self.scope = scope
+        self.key = key
+        self.backend = backend  # 'store' | 'db' | 'none'
+        self.lease = lease      # eigene Sperre, solange `owned`
+        self.replay = replay    # fertige Antwort eines früheren Aufrufs
+
+    @property
+    def owned(self) -> bool:
+        return self.lease is not None
+
+    @property
+    def busy(self) -> bool:
+        return self.lease is None and self.replay is None
+
+    def complete(self, payload: dict) -> None:
+        """Antwort ablegen und die Sperre damit ersetzen."""
+        if not self.owned:
+            return
+        lease, self.lease = self.lease, None
+        if self.backend == "store":
+            _store_script(_COMPLETE_LUA, self.scope, self.key,
+                          [lease, json.dumps(payload), RESULT_TTL_SECONDS])
+        elif self.backend == "db":
+            _db_complete(_db_key(self.scope, self.key), lease, payload)
+
+    def release(self) -> None:
+        """Sperre freigeben, ohne eine Antwort abzulegen (Fehler, Ablehnung)."""
+        if not self.owned:
+            return
+        lease, self.lease = self.lease, None
+        if self.backend == "store":
+            _store_script(_RELEASE_LUA, self.scope, self.key, [lease])
+        elif self.backend == "db":
+            _db_release(_db_key(self.scope, self.key), lease)
+
+
+def _store_key(scope: str, key: str) -> str:
+    return f"idem:{scope}:{key}"
+
+
+def _new_lease() -> str:
+    return json.dumps({"_lease": secrets.token_hex(8)})
+
+
+def _store_script(script: str, scope: str, key: str, args) -> None:
+    try:
+        shared_store.pipeline().eval(script, [_store_key(scope, key)], args, lambda: 0).execute()
+    except Exception as e:
+        current_app.logger.warning("idempotency: %s:%s nicht aktualisiert: %s", scope, key, e)
+
+
+# --- Tabelle als Rückfall ------------------------------------------------------
+#
+# Über eine eigene Verbindung, damit der Eintrag nie mit der Transaktion des
+# Aufrufers festgeschrieben oder zurückgerollt wird.
+
+def _db_key(scope: str, key: str) -> str:
+    full = f"{scope}:{key}"
+    if len(full) > _DB_KEY_MAX:
+        full = f"{scope}:sha256:{hashlib.sha256(key.encode()).hexdigest()}"
+    return full
+
+
+def _db_claim(scope: str, key: str) -> Claim:
+    from models import db, IdempotencyKey
+
+    table = IdempotencyKey.__table__
+    full, lease, now = _db_key(scope, key), _new_lease(), datetime.utcnow()
+    expires = now + timedelta(seconds=LEASE_SECONDS)
+    _db_purge(now)
+    try:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(
+                    key=full, lease=lease, created_at=now, expires_at=expires))
+            return Claim(scope, key, "db", lease=lease)
+        except IntegrityError:
+            pass
+        with db.engine.begin() as conn:
+            # Abgelaufene Sperre oder Antwort: übernehmen
+            taken = conn.execute(
+                table.update()
+                .where(table.c.key == full, table.c.expires_at <= now)
+                .values(lease=lease, response=None, created_at=now, expires_at=expires)
+            ).rowcount
+            if taken:
+                return Claim(scope, key, "db", lease=lease)
+            row = conn.execute(select(table.c.response).where(table.c.key == full)).first()
+    except Exception as e:
+        current_app.logger.warning("idempotency: Tabelle nicht erreichbar, %s:%s ungeschützt: %s",
+                                   scope, key, e)
+        return Claim(scope, key, "none", lease=lease)
+    if row is None:
+        # Zwischen INSERT und SELECT freigegeben: beim nächsten Blick erneut
+        return Claim(scope, key, "db")
+    return Claim(scope, key, "db", replay=row.response)
+
+
+def _db_complete(full: str, lease: str, payload: dict) -> None:
+    from models import db, IdempotencyKey
+
+    table = IdempotencyKey.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                table.update()
+                .where(table.c.key == full, table.c.lease == lease)
+                .values(lease=None, response=payload,
+                        expires_at=datetime.utcnow() + timedelta(seconds=RESULT_TTL_SECONDS))
+            )
+    except Exception as e:
+        current_app.logger.warning("idempotency: Antwort zu %s nicht gespeichert: %s", full, e)
+
+
+def _db_release(full: str, lease: str) -> None:
+    from models import db, IdempotencyKey
+
+    table = IdempotencyKey.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.key == full, table.c.lease == lease))
+    except Exception as e:
+        current_app.logger.warning("idempotency: Sperre %s nicht freigegeben: %s", full, e)
+
+
+def _db_purge(now: datetime) -> None:
+    global _last_purge
+    with _purge_lock:
+        if time.monotonic() - _last_purge < _DB_PURGE_INTERVAL:
+            return
+        _last_purge = time.monotonic()
+    from models import db, IdempotencyKey
+
+    table = IdempotencyKey.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.expires_at <= now))
+    except Exception as e:
+        current_app.logger.warning("idempotency: Aufräumen fehlgeschlagen: %s", e)
+
+
+# --- Aufrufe --------------------------------------------------------------------
+
+def claim_in(pipe: "shared_store.Pipeline", scope: str, key: str) -> Callable[[list], Claim]:
+    """Key beanspruchen, als Teil von `pipe` (ein Round-Trip mit anderem).
+
+    Rückgabe ist eine Funktion, die aus den Ergebnissen von `pipe.execute()`
+    den `Claim` liest. Ohne Upstash oder bei einem Fehler dort entscheidet
+    die Tabelle.
+    """
+    lease = _new_lease()
+    index = len(pipe)
+    fallback = []
+
+    def db_fallback():
+        fallback.append(_db_claim(scope, key))
+        return None
+
+    pipe.eval(_CLAIM_LUA, [_store_key(scope, key)], [lease, LEASE_SECONDS], db_fallback)
+
+    def decide(results) -> Claim:
+        if fallback:
+            return fallback[0]
+        won, current = results[index]
+        if int(won):
+            return Claim(scope, key, "store", lease=lease)
+        value = json.loads(current) if isinstance(current, str) else None
+        if isinstance(value, dict) and "_lease" in value:
+            return Claim(scope, key, "store")
+        if value is None:
+            # Zwischen SET und GET abgelaufen oder freigegeben
+            return Claim(scope, key, "store")
+        return Claim(scope, key, "store", replay=value)
+
+    return decide
+
+
+def claim(scope: str, key: str) -> Claim:
+    """Key beanspruchen (siehe `claim_in`)."""
+    pipe = shared_store.pipeline()
+    decide = claim_in(pipe, scope, key)
+    return decide(pipe.execute())
+
+
+def wait(pending: Claim, timeout: float) -> Claim:
+    """Auf einen laufenden Aufruf mit demselben Key warten.
+
+    Liefert dessen Antwort, sobald sie da ist, oder die eigene Sperre, wenn
+    er ohne Antwort aufgegeben hat. Nach `timeout` Sekunden kommt der Claim
+    weiter `busy` zurück.
+    """
+    deadline = time.monotonic() + timeout
+    current = pending
+    while current.busy and time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        current = claim(pending.scope, pending.key)
+    return current
+
+
+__all__ = [
+    "Claim",
+    "claim",
+    "claim_in",
+    "wait",
+    "LEASE_SECONDS",
+    "RESULT_TTL_SECONDS",
+]
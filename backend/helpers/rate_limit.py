@@ -0,0 +1,297 @@
+"""Rate-Limits je Route und Schlüssel (IP oder Clerk-UID) über `shared_store`.
+
+Usage:
+    from helpers.rate_limit import rate_limited, hit, too_many_requests
+
+    @upload_bp.route('/image', methods=['POST'])
+    @artist_required
+    @rate_limited('upload')          # Policy aus POLICIES
+    def upload_image(): ...
+
+    decision = hit('quote')          # Schlüssel laut Policy aus dem Request
+    if not decision.allowed:
+        return too_many_requests(decision)
+
+Notes:
+- Zwei Verfahren. 'sliding': gleitendes Fenster aus zwei festen Fenstern,
+  das vorige anteilig gewichtet — kein Sprung auf volles Kontingent zur
+  vollen Stunde. 'bucket': Token-Bucket mit `limit` Tokens, der sich in
+  `window_seconds` ganz auffüllt — erlaubt kurze Schübe, begrenzt die Rate.
+- Mit Upstash rechnet ein Lua-Skript (EVAL) Lesen, Prüfen und Zählen in
+  einem Round-Trip und atomar. Ohne Upstash rechnet dieselbe Logik in
+  Python unter dem Lock des Prozessspeichers.
+- Abgelehnte Versuche zählen nicht mit; wer wartet, kommt wieder durch.
+- Vorprüfung im Prozess (nur mit Upstash): Jeder Prozess führt dieselbe
+  Rechnung über die Treffer, die er selbst durchgelassen hat. Die globale
+  Zahl ist nie kleiner; lehnt schon die lokale Rechnung ab, lehnt Upstash
+  sicher auch ab, und eine Flut von einer IP kostet keinen Netzaufruf.
+- Die Uhrzeit kommt vom aufrufenden Prozess, nicht vom Redis-Server.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, NamedTuple
+
+from flask import request
+
+from helpers import shared_store
+from helpers.http_responses import error_response
+
+
+class Policy(NamedTuple):
+    name: str
+    limit: int
+    window_seconds: int
+    algorithm: str = "sliding"  # 'sliding' | 'bucket'
+    key: str = "ip"             # 'ip' | 'sub' (Clerk-UID, sonst IP)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: int = 0  # Sekunden bis zum nächsten erlaubten Versuch
+
+
+POLICIES = {
+    # Öffentliche Buchungsanfrage: wenige echte Anfragen je Stunde und IP
+    "booking": Policy("booking", 5, 3600, "sliding", "ip"),
+    # Preisauskunft: Formulare fragen beim Tippen nach, daher Schübe erlaubt
+    "quote": Policy("quote", 120, 600, "bucket", "ip"),
+    # Uploads je Artist; Admins laden auch für andere hoch
+    "upload": Policy("upload", 30, 600, "bucket", "sub"),
+    # Löschen je Artist, eigenes Kontingent: Aufräumen der Galerie soll den
+    # nächsten Upload nicht sperren und umgekehrt
+    "delete": Policy("delete", 60, 600, "bucket", "sub"),
+}
+
+
+def client_ip() -> str:
+    """Best-effort client IP extraction (respects X-Forwarded-For)."""
+    xff = request.headers.get('X-Forwarded-For')
+    if xff:
+        return xff.split(',')[0].strip()
+    return request.remote_addr or 'unknown'
+
+
+def identity_for(policy: Policy) -> str:
+    if policy.key == "sub":
+        from helpers.clerk_auth import get_clerk_user_id
+        uid = get_clerk_user_id()
+        if uid:
+            return f"sub:{uid}"
+    return f"ip:{client_ip()}"
+
+
+# --- Verfahren ----------------------------------------------------------------
+#
+# Beide gibt es zweimal: als Lua-Skript für Redis und als Python-Funktion für
+# den Prozessspeicher und die Vorprüfung. Die Rohergebnisse haben dieselbe
+# Form, `_decide` macht daraus die Entscheidung.
+
+_SLIDING_LUA = """
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local cur = tonumber(redis.call('GET', KEYS[1]) or '0')
+if prev * tonumber(ARGV[1]) + cur + 1 > tonumber(ARGV[2]) then
+  return {0, cur, prev}
+end
+cur = redis.call('INCR', KEYS[1])
+if cur == 1 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+return {1, cur, prev}
+"""
+
+_BUCKET_LUA = """
+local rate, cap, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or cap
+local ts = tonumber(state[2]) or now
+tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
+
+
+def _sliding_step(state, now: float, policy: Policy):
+    """Python-Fassung von `_SLIDING_LUA`; `state` = {'w': Fenster, 'c': …, 'p': …}."""
+    window = policy.window_seconds
+    idx = int(now // window)
+    if not state or state["w"] < idx - 1:
+        cur, prev = 0, 0
+    elif state["w"] == idx - 1:
+        cur, prev = 0, state["c"]
+    else:
+        cur, prev = state["c"], state["p"]
+    weight = 1 - (now % window) / window
+    allowed = prev * weight + cur + 1 <= policy.limit
+    if allowed:
+        cur += 1
+    return [int(allowed), cur, prev], {"w": idx, "c": cur, "p": prev}
+
+
+def _bucket_step(state, now: float, policy: Policy):
+    """Python-Fassung von `_BUCKET_LUA`; `state` = {'t': Tokens, 'ts': Zeit}."""
+    rate = policy.limit / policy.window_seconds
+    tokens = state["t"] if state else float(policy.limit)
+    ts = state["ts"] if state else now
+    tokens = min(policy.limit, tokens + max(0.0, now - ts) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return [int(allowed), repr(tokens)], {"t": tokens, "ts": now}
+
+
+_STEPS = {"sliding": _sliding_step, "bucket": _bucket_step}
+
+
+def _decide(policy: Policy, raw, now: float) -> Decision:
+    if int(raw[0]):
+        return Decision(True)
+    window = policy.window_seconds
+    if policy.algorithm == "bucket":
+        rate = policy.limit / window
+        return Decision(False, max(1, math.ceil((1 - float(raw[1])) / rate)))
+    cur, prev = int(raw[1]), int(raw[2])
+    elapsed = now % window
+    if cur + 1 > policy.limit:
+        # Erst im nächsten Fenster, wenn der jetzige Stand genug verblasst ist
+        fraction = 1 - (policy.limit - 1) / cur
+        wait = window - elapsed + fraction * window
+    else:
+        fraction = 1 - (policy.limit - cur - 1) / prev
+        wait = fraction * window - elapsed
+    return Decision(False, max(1, math.ceil(wait)))
+
+
+def _store_key(policy: Policy, identity: str) -> str:
+    return f"ratelimit:{policy.name}:{identity}"
+
+
+def _queue(pipe: "shared_store.Pipeline", policy: Policy, identity: str, now: float) -> None:
+    """Skript samt Python-Rückfall an die Pipeline hängen."""
+    key = _store_key(policy, identity)
+    step = _STEPS[policy.algorithm]
+    ttl = 2 * policy.window_seconds if policy.algorithm == "sliding" else policy.window_seconds
+
+    def fallback():
+        return shared_store.update_in_process(key, lambda state: step(state, now, policy), ttl)
+
+    if policy.algorithm == "sliding":
+        idx = int(now // policy.window_seconds)
+        weight = 1 - (now % policy.window_seconds) / policy.window_seconds
+        pipe.eval(_SLIDING_LUA, [f"{key}:{idx}", f"{key}:{idx - 1}"],
+                  [repr(weight), policy.limit, ttl], fallback)
+    else:
+        pipe.eval(_BUCKET_LUA, [key],
+                  [repr(policy.limit / policy.window_seconds), policy.limit, repr(now), ttl],
+                  fallback)
+
+
+# --- Vorprüfung im Prozess ------------------------------------------------------
+
+_LOCAL_MAX_ENTRIES = 10_000
+_local: "OrderedDict[tuple[str, str], dict]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _local_rejects(policy: Policy, identity: str, now: float) -> Decision | None:
+    with _local_lock:
+        state = _local.get((policy.name, identity))
+    raw, _ = _STEPS[policy.algorithm](state, now, policy)
+    return None if raw[0] else _decide(policy, raw, now)
+
+
+def _local_record(policy: Policy, identity: str, now: float) -> None:
+    with _local_lock:
+        k = (policy.name, identity)
+        _, _local[k] = _STEPS[policy.algorithm](_local.get(k), now, policy)
+        _local.move_to_end(k)
+        while len(_local) > _LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def reset_local() -> None:
+    """Vorprüfung vergessen (Tests)."""
+    with _local_lock:
+        _local.clear()
+
+
+# --- Aufrufe --------------------------------------------------------------------
+
+def hit_in(pipe: "shared_store.Pipeline", name: str, identity: str | None = None) -> Callable[[list], Decision]:
+    """Einen Treffer für Policy `name` an `pipe` hängen.
+
+    Für Routen, die im selben Round-Trip noch anderes lesen. Rückgabe ist
+    eine Funktion, die aus den Ergebnissen von `pipe.execute()` die
+    Entscheidung liest. Lehnt schon die Vorprüfung ab, kommt nichts in die
+    Pipeline.
+    """
+    policy = POLICIES[name]
+    identity = identity or identity_for(policy)
+    now = time.time()
+    shared = shared_store.is_shared()
+    if shared:
+        rejected = _local_rejects(policy, identity, now)
+        if rejected is not None:
+            return lambda results: rejected
+    index = len(pipe)
+    _queue(pipe, policy, identity, now)
+
+    def decide(results) -> Decision:
+        decision = _decide(policy, results[index], now)
+        if shared and decision.allowed:
+            _local_record(policy, identity, now)
+        return decision
+
+    return decide
+
+
+def hit(name: str, identity: str | None = None) -> Decision:
+    """Einen Treffer für Policy `name` zählen; Schlüssel laut Policy."""
+    pipe = shared_store.pipeline()
+    decide = hit_in(pipe, name, identity)
+    return decide(pipe.execute())
+
+
+def too_many_requests(decision: Decision):
+    resp, status = error_response("rate_limited", "Too many requests. Try again later.", 429)
+    resp.headers["Retry-After"] = str(decision.retry_after)
+    return resp, status
+
+
+def rate_limited(name: str):
+    """Decorator: 429 mit Retry-After, sobald Policy `name` ausgeschöpft ist.
+
+    Bei Policies mit key='sub' unter den Auth-Decorator setzen, damit die
+    Clerk-UID schon feststeht.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            decision = hit(name)
+            if not decision.allowed:
+                return too_many_requests(decision)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+__all__ = [
+    "Policy",
+    "Decision",
+    "POLICIES",
+    "client_ip",
+    "hit",
+    "hit_in",
+    "rate_limited",
+    "too_many_requests",
+    "reset_local",
+]
@@ -8,22 +8,32 @@ Idempotency-Key verhindert keine Doppelbuchung beim Neuladen. Beides fällt
 niemandem auf, es hört einfach auf zu schützen.
 
 Backend ist Upstash Redis über die REST-Schnittstelle: kein zusätzliches Paket
-(`requests` ist bereits Abhängigkeit) und keine offene TCP-Verbindung, die zu
-einer kurzlebigen Funktion schlecht passt.
+(`requests` ist bereits Abhängigkeit) und kein Redis-Protokoll, das eine
+dauerhaft offene Verbindung voraussetzt. Eine `requests.Session` hält die
+HTTPS-Verbindung trotzdem offen, solange die Instanz lebt — so kostet nur der
+erste Aufruf den TLS-Handshake. Mehrere Kommandos gehen über `pipeline()` in
+einem Round-Trip (Upstash: /pipeline bzw. /multi-exec).
 
 Ohne konfigurierte Zugangsdaten fällt das Modul auf einen prozesslokalen Speicher
 zurück. Damit bleibt die lokale Entwicklung unverändert, und ein Ausfall von
 Upstash macht die Anfrage-Route nicht kaputt — sie schützt dann nur schlechter.
+
+Lesen mit `near_ttl` nutzt zusätzlich einen kleinen Nahcache im Prozess: Ein
+warmer Prozess beantwortet wiederholte Lesezugriffe dann ohne Netz. Das passt
+für Werte, die sich selten ändern oder bei denen ein paar Sekunden Verzug
+nicht schaden (Preisauskünfte, UID -> Artist). Zähler wie das Rate-Limit
+lesen ohne `near_ttl` und damit immer aus Upstash.
 """
 
 from __future__ import annotations
 
+import heapq
 import json
 import os
 import threading
 import time
 from collections import OrderedDict
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import requests
 
@@ -35,8 +45,19 @@ _HTTP_TIMEOUT = 3.0
 
 _MEMORY_MAX_ENTRIES = 5_000
 _memory: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+# Min-Heap (Ablaufzeit, Schlüssel) neben `_memory`: Das Aufräumen schaut nur
+# auf die Einträge, deren Zeit um ist, statt bei jedem Zugriff alle zu prüfen.
+_memory_expiry: "list[tuple[float, str]]" = []
 _memory_lock = threading.Lock()
 
+# Nahcache vor Upstash: obere Grenze für `near_ttl` und Anzahl Einträge.
+# SHARED_STORE_NEAR_MAX_TTL=0 schaltet ihn ab.
+_NEAR_MAX_TTL = float(os.getenv("SHARED_STORE_NEAR_MAX_TTL", "30"))
+_NEAR_MAX_ENTRIES = int(os.getenv("SHARED_STORE_NEAR_MAX_ENTRIES", "1000"))
+_near: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_near_lock = threading.Lock()
+_near_stats = {"hits": 0, "misses": 0}
+
 
 def is_shared() -> bool:
     """True, wenn ein instanzübergreifender Speicher konfiguriert ist."""
@@ -50,12 +71,32 @@ def backend_name() -> str:
 # --- prozesslokaler Rückfall ------------------------------------------------
 
 def _memory_prune(now: float) -> None:
-    for key in [k for k, (expires, _) in _memory.items() if expires <= now]:
-        _memory.pop(key, None)
+    """Abgelaufene Einträge entfernen; O(log n) je abgelaufenem Eintrag.
+
+    Der Heap darf veraltete Paare enthalten — der Schlüssel wurde neu
+    gesetzt, verdrängt oder gelöscht. Sie fallen beim Herausnehmen auf, weil
+    die Ablaufzeit nicht mehr zum Eintrag passt, und werden übersprungen.
+    """
+    heap = _memory_expiry
+    while heap and heap[0][0] <= now:
+        expires, key = heapq.heappop(heap)
+        entry = _memory.get(key)
+        if entry is not None and entry[0] == expires:
+            del _memory[key]
     while len(_memory) > _MEMORY_MAX_ENTRIES:
         _memory.popitem(last=False)
 
 
+def _memory_track(key: str, expires: float) -> None:
+    heapq.heappush(_memory_expiry, (expires, key))
+    # Veraltete Paare nicht endlos ansammeln: Ist der Heap doppelt so groß
+    # wie der Speicher, neu aus den lebenden Einträgen aufbauen. Das kostet
+    # O(n), kommt aber erst nach n überzähligen Paaren wieder vor.
+    if len(_memory_expiry) > 2 * len(_memory) + 64:
+        _memory_expiry[:] = [(exp, k) for k, (exp, _) in _memory.items()]
+        heapq.heapify(_memory_expiry)
+
+
 def _memory_get(key: str):
     with _memory_lock:
         now = time.time()
@@ -73,6 +114,7 @@ def _memory_set(key: str, value: Any, ttl_seconds: int) -> None:
         _memory_prune(now)
         _memory[key] = (now + ttl_seconds, value)
         _memory.move_to_end(key)
+        _memory_track(key, now + ttl_seconds)
         while len(_memory) > _MEMORY_MAX_ENTRIES:
             _memory.popitem(last=False)
 
@@ -88,21 +130,114 @@ def _memory_incr(key: str, ttl_seconds: int) -> int:
         else:
             count = 1
             _memory[key] = (now + ttl_seconds, count)
+            _memory_track(key, now + ttl_seconds)
         _memory.move_to_end(key)
         return count
 
 
+def update_in_process(key: str, fn: Callable[[Any], tuple], ttl_seconds: float):
+    """Eintrag im Prozessspeicher lesen und ersetzen, ohne dass ein anderer
+    Thread dazwischenkommt — das Gegenstück zu einem Lua-Skript für den
+    Rückfall. `fn(alter Wert oder None)` gibt (Ergebnis, neuer Wert) zurück;
+    der neue Wert gilt `ttl_seconds` ab jetzt."""
+    with _memory_lock:
+        now = time.time()
+        _memory_prune(now)
+        entry = _memory.get(key)
+        result, value = fn(entry[1] if entry else None)
+        _memory[key] = (now + ttl_seconds, value)
+        _memory.move_to_end(key)
+        _memory_track(key, now + ttl_seconds)
+        return result
+
+
+# --- Nahcache vor Upstash ---------------------------------------------------
+#
+# Hält den JSON-Text, nicht das Objekt: Jeder Treffer bekommt eine eigene
+# Kopie, die der Aufrufer gefahrlos verändern kann.
+
+def _near_get(key: str):
+    """(True, Wert) bei einem Treffer, sonst (False, None)."""
+    with _near_lock:
+        entry = _near.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _near.move_to_end(key)
+            _near_stats["hits"] += 1
+            raw = entry[1]
+        else:
+            if entry is not None:
+                del _near[key]
+            _near_stats["misses"] += 1
+            return False, None
+    return True, json.loads(raw)
+
+
+def _near_put(key: str, raw: str, near_ttl: float) -> None:
+    ttl = min(near_ttl, _NEAR_MAX_TTL)
+    if ttl <= 0:
+        return
+    with _near_lock:
+        _near[key] = (time.monotonic() + ttl, raw)
+        _near.move_to_end(key)
+        while len(_near) > _NEAR_MAX_ENTRIES:
+            _near.popitem(last=False)
+
+
+def _near_drop(key: str) -> None:
+    with _near_lock:
+        _near.pop(key, None)
+
+
+def near_cache_stats() -> dict:
+    """Treffer und Fehlgriffe des Nahcaches seit Prozessstart."""
+    with _near_lock:
+        return {**_near_stats, "size": len(_near), "max_ttl": _NEAR_MAX_TTL}
+
+
 # --- Upstash über REST ------------------------------------------------------
 
-def _rest(*command: str):
-    """Ein Redis-Kommando über die REST-Schnittstelle. Wirft bei Problemen."""
-    resp = requests.post(
-        f"{_REST_URL}/{'/'.join(requests.utils.quote(str(c), safe='') for c in command)}",
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _http() -> requests.Session:
+    """Prozessweite Session: Keep-Alive statt neuer TLS-Verbindung je Aufruf."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+def _post(path: str, body) -> Any:
+    resp = _http().post(
+        f"{_REST_URL}{path}",
+        json=body,
         headers={"Authorization": f"Bearer {_REST_TOKEN}"},
         timeout=_HTTP_TIMEOUT,
     )
     resp.raise_for_status()
-    return resp.json().get("result")
+    return resp.json()
+
+
+def _rest(*command: str):
+    """Ein Redis-Kommando über die REST-Schnittstelle. Wirft bei Problemen."""
+    data = _post("/", [str(c) for c in command])
+    if data.get("error"):
+        raise RuntimeError(data["error"])
+    return data.get("result")
+
+
+def _rest_many(commands, transaction: bool = False) -> list:
+    """Mehrere Kommandos in einem Round-Trip; `transaction` führt sie atomar aus."""
+    data = _post("/multi-exec" if transaction else "/pipeline",
+                 [[str(c) for c in command] for command in commands])
+    if isinstance(data, dict):  # Fehler der ganzen Transaktion
+        raise RuntimeError(data.get("error") or data)
+    errors = [item["error"] for item in data if item.get("error")]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return [item.get("result") for item in data]
 
 
 def _log_fallback(action: str, exc: Exception) -> None:
@@ -116,57 +251,199 @@ def _log_fallback(action: str, exc: Exception) -> None:
         pass
 
 
-def get_json(key: str) -> Optional[Any]:
-    """Wert lesen. None, wenn nicht vorhanden oder abgelaufen."""
+def _decode(raw) -> Optional[Any]:
+    return json.loads(raw) if isinstance(raw, str) else None
+
+
+class Pipeline:
+    """Sammelt Aufrufe und schickt sie in einem Round-Trip an Upstash.
+
+    Usage:
+        pipe = shared_store.pipeline(transaction=True)
+        pipe.incr_with_ttl("ratelimit:…", 3600)
+        pipe.get_json("idem:…")
+        count, cached = pipe.execute()
+
+    `execute` liefert die Ergebnisse in Aufrufreihenfolge, mit denselben
+    Werten wie die gleichnamigen Modulfunktionen. Scheitert Upstash, laufen
+    alle Aufrufe gegen den Prozessspeicher — wie bei den Einzelaufrufen.
+    """
+
+    def __init__(self, transaction: bool = False):
+        self.transaction = transaction
+        # je Aufruf: (Redis-Kommandos, Auswertung ihrer Ergebnisse, Prozessspeicher-Variante)
+        self._ops: list = []
+
+    def get_json(self, key: str) -> "Pipeline":
+        self._ops.append(([("GET", key)], lambda r: _decode(r[0]), lambda: _memory_get(key)))
+        return self
+
+    def set_json(self, key: str, value: Any, ttl_seconds: int) -> "Pipeline":
+        raw = json.dumps(value)
+        _near_drop(key)
+        self._ops.append(([("SET", key, raw, "EX", int(ttl_seconds))], lambda r: None,
+                          lambda: _memory_set(key, value, ttl_seconds)))
+        return self
+
+    def delete(self, key: str) -> "Pipeline":
+        _near_drop(key)
+
+        def memory():
+            with _memory_lock:
+                _memory.pop(key, None)
+        self._ops.append(([("DEL", key)], lambda r: None, memory))
+        return self
+
+    def incr_with_ttl(self, key: str, ttl_seconds: int) -> "Pipeline":
+        # SET … NX legt den Zähler mit Ablaufzeit an, falls es ihn noch nicht
+        # gibt; INCR behält die Ablaufzeit. Das Fenster bleibt also fest wie
+        # bisher mit INCR und EXPIRE beim ersten Treffer — nur ohne zweiten
+        # Round-Trip.
+        self._ops.append(([("SET", key, 0, "EX", int(ttl_seconds), "NX"), ("INCR", key)],
+                          lambda r: int(r[1]), lambda: _memory_incr(key, ttl_seconds)))
+        return self
+
+    def eval(self, script: str, keys, args, fallback: Callable[[], Any]) -> "Pipeline":
+        """Lua-Skript auf Upstash; ohne Upstash `fallback()` (im Prozess).
+
+        Das Ergebnis kommt roh zurück, so wie Redis es liefert. `fallback`
+        muss dieselbe Form liefern.
+        """
+        keys, args = list(keys), list(args)
+        self._ops.append(([("EVAL", script, len(keys), *keys, *args)], lambda r: r[0], fallback))
+        return self
+
+    def mget_json(self, keys) -> "Pipeline":
+        keys = list(keys)
+        self._ops.append(([("MGET", *keys)] if keys else [],
+                          lambda r: [_decode(v) for v in r[0]] if keys else [],
+                          lambda: [_memory_get(k) for k in keys]))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def execute(self) -> list:
+        if not self._ops:
+            return []
+        if is_shared():
+            commands = [c for cmds, _, _ in self._ops for c in cmds]
+            try:
+                results = _rest_many(commands, transaction=self.transaction) if commands else []
+            except Exception as e:
+                _log_fallback("PIPELINE", e)
+            else:
+                out, i = [], 0
+                for cmds, decode, _ in self._ops:
+                    out.append(decode(results[i:i + len(cmds)]))
+                    i += len(cmds)
+                return out
+        return [memory() for _, _, memory in self._ops]
+
+
+def pipeline(transaction: bool = False) -> Pipeline:
+    """Mehrere Aufrufe in einem Round-Trip (siehe `Pipeline`).
+
+    Mit `transaction=True` führt Upstash die Kommandos atomar aus (MULTI/EXEC).
+    """
+    return Pipeline(transaction)
+
+
+def get_json(key: str, near_ttl: float | None = None) -> Optional[Any]:
+    """Wert lesen. None, wenn nicht vorhanden oder abgelaufen.
+
+    Ohne `near_ttl` liest der Aufruf immer aus dem geteilten Speicher. Mit
+    `near_ttl` (Sekunden, höchstens `SHARED_STORE_NEAR_MAX_TTL`) darf die
+    Antwort aus dem Nahcache im Prozess kommen und so alt sein. Fehlende
+    Werte werden dort nicht vermerkt.
+    """
     if is_shared():
+        near = bool(near_ttl) and _NEAR_MAX_TTL > 0
+        if near:
+            hit, value = _near_get(key)
+            if hit:
+                return value
         try:
             raw = _rest("GET", key)
-            return json.loads(raw) if isinstance(raw, str) else None
         except Exception as e:
             _log_fallback("GET", e)
+        else:
+            if near and isinstance(raw, str):
+                _near_put(key, raw, near_ttl)
+            return _decode(raw)
     return _memory_get(key)
 
 
-def set_json(key: str, value: Any, ttl_seconds: int) -> None:
-    """Wert mit Ablaufzeit schreiben."""
+def mget_json(keys) -> list:
+    """Mehrere Werte in einem Round-Trip lesen; None für fehlende."""
+    return pipeline().mget_json(keys).execute()[0]
+
+
+def set_json(key: str, value: Any, ttl_seconds: int, near_ttl: float | None = None) -> None:
+    """Wert mit Ablaufzeit schreiben.
+
+    Ein Eintrag im Nahcache dieses Prozesses wird ersetzt (mit `near_ttl`)
+    oder verworfen; andere Prozesse sehen den neuen Wert spätestens nach
+    ihrem `near_ttl`.
+    """
     if is_shared():
+        raw = json.dumps(value)
+        _near_drop(key)
         try:
-            _rest("SET", key, json.dumps(value), "EX", str(int(ttl_seconds)))
+            _rest("SET", key, raw, "EX", str(int(ttl_seconds)))
+            if near_ttl:
+                _near_put(key, raw, min(near_ttl, ttl_seconds))
             return
         except Exception as e:
             _log_fallback("SET", e)
     _memory_set(key, value, ttl_seconds)
 
 
+def delete(key: str) -> None:
+    """Wert entfernen. Der Prozessspeicher wird immer mit geleert: Dort kann
+    ein Wert aus einer Zeit liegen, in der Upstash nicht erreichbar war."""
+    if is_shared():
+        _near_drop(key)
+        try:
+            _rest("DEL", key)
+        except Exception as e:
+            _log_fallback("DEL", e)
+    with _memory_lock:
+        _memory.pop(key, None)
+
+
 def incr_with_ttl(key: str, ttl_seconds: int) -> int:
     """Zähler erhöhen und die Ablaufzeit beim ersten Treffer setzen.
 
     Rückgabe: der Zählerstand nach dem Erhöhen. Die Ablaufzeit wird bewusst nur
     beim ersten Treffer gesetzt, damit das Zeitfenster fest bleibt und nicht bei
-    jeder Anfrage nach vorn rutscht.
+    jeder Anfrage nach vorn rutscht. Bei Upstash ein Round-Trip (MULTI/EXEC).
     """
-    if is_shared():
-        try:
-            count = int(_rest("INCR", key))
-            if count == 1:
-                _rest("EXPIRE", key, str(int(ttl_seconds)))
-            return count
-        except Exception as e:
-            _log_fallback("INCR", e)
-    return _memory_incr(key, ttl_seconds)
+    return pipeline(transaction=True).incr_with_ttl(key, ttl_seconds).execute()[0]
 
 
 def reset_for_tests() -> None:
-    """Prozessspeicher leeren. Nur für Tests."""
+    """Prozessspeicher und Nahcache leeren. Nur für Tests."""
     with _memory_lock:
         _memory.clear()
+        _memory_expiry.clear()
+    with _near_lock:
+        _near.clear()
+        for name in _near_stats:
+            _near_stats[name] = 0
 
 
 __all__ = [
     "is_shared",
     "backend_name",
     "get_json",
+    "mget_json",
     "set_json",
+    "delete",
     "incr_with_ttl",
+    "update_in_process",
+    "pipeline",
+    "Pipeline",
+    "near_cache_stats",
     "reset_for_tests",
 ]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from models import db, AdminOffer, Artist
 from datetime import datetime, timezone
 import logging
-from managers.availability_manager import AvailabilityManager
+from managers.availability_manager import AvailabilityManager, DEFAULT_DAYS_AHEAD
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +81,7 @@ class AdminOfferManager:
         if getattr(artist, "approval_status", None) == "approved":
             logger.info("approve_artist: already approved (id=%s), ensuring availability", artist_id)
             try:
-                AvailabilityManager().ensure_auto_availability_for_artist(artist.id, days_ahead=365)
+                AvailabilityManager().ensure_auto_availability_for_artist(artist.id, days_ahead=DEFAULT_DAYS_AHEAD)
             except Exception as e:
                 logger.exception("Auto-availability fill failed for already-approved artist_id=%s: %s", artist.id, e)
             return artist
@@ -101,7 +101,7 @@ class AdminOfferManager:
             logger.info("Artist approved: id=%s by admin_id=%s", artist.id, admin_id)
 
             try:
-                AvailabilityManager().ensure_auto_availability_for_artist(artist.id, days_ahead=365)
+                AvailabilityManager().ensure_auto_availability_for_artist(artist.id, days_ahead=DEFAULT_DAYS_AHEAD)
             except Exception as e:
                 logger.exception("Auto-availability fill failed for artist_id=%s: %s", artist.id, e)
 
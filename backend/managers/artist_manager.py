@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 from models import db, Artist
-from models import Discipline, Availability, Artist
+from models import Discipline, Availability, Artist, BlockedDate
 from datetime import date
 from managers.discipline_manager import DisciplineManager
 from datetime import date, timedelta
-from managers.availability_manager import AvailabilityManager
+from managers.availability_manager import AvailabilityManager, DEFAULT_DAYS_AHEAD, availability_mode
+from managers.booking_requests_manager import BookingRequestManager
 from services.gage_calculator import GageCalculator
 from services.geo import geocode_address, geocode_address_cascade
+from services.spatial_index import SpatialIndex
+from sqlalchemy import and_, bindparam, case, false, func, select, true
 from sqlalchemy.exc import IntegrityError
 import logging
+import threading
+import time
 logger = logging.getLogger(__name__)
 
+# Räumlicher Index über die Koordinaten aller freigegebenen Artists, geteilt
+# im Prozess. Vor jeder Nutzung wird eine Kennzahl der Tabelle abgefragt
+# (Anzahl, höchste ID, Summe der Koordinaten); ändert sie sich — neuer Artist,
+# Freigabe, Umzug —, wird der Index neu gebaut. Das greift auch, wenn eine
+# andere Instanz die Änderung geschrieben hat.
+_spatial_cache = {"signature": None, "index": None}
+_spatial_lock = threading.Lock()
+
 
 class ArtistManager:
     """
@@ -118,13 +131,17 @@ class ArtistManager:
             self.geocode_and_set(artist)
 
             self.db.session.add(artist)
-            self.db.session.flush()
-            # Standard-Verfügbarkeit: 365 Tage ab heute — in einem Rutsch statt
-            # als 365 einzelne Transaktionen.
-            today = date.today()
-            self.availability_mgr.add_availabilities_bulk(
-                artist.id, [today + timedelta(days=i) for i in range(365)]
-            )
+            if availability_mode() == 'exceptions':
+                # Standard-Verfügbarkeit als eine Zahl statt 365 Zeilen
+                artist.default_available_days = DEFAULT_DAYS_AHEAD
+            else:
+                self.db.session.flush()
+                # Standard-Verfügbarkeit: 365 Tage ab heute — in einem Rutsch statt
+                # als 365 einzelne Transaktionen.
+                today = date.today()
+                self.availability_mgr.add_availabilities_bulk(
+                    artist.id, [today + timedelta(days=i) for i in range(DEFAULT_DAYS_AHEAD)]
+                )
             self.db.session.commit()
             return artist
         except IntegrityError as e:
@@ -148,6 +165,10 @@ class ArtistManager:
         Gibt Artists zurück, die am angegebenen Datum verfügbar sind und
         mindestens eine der gegebenen Disziplinen beherrschen.
         """
+        return self._available_query(disciplines, event_date).all()
+
+    def _available_query(self, disciplines, event_date):
+        """Query der Artists mit passender Disziplin und Verfügbarkeit am Datum."""
         if isinstance(disciplines, str):
             disciplines = [disciplines]
 
@@ -173,10 +194,26 @@ class ArtistManager:
         # Query: join disciplines und availabilities
         # Use SQL-level normalization to handle DB inconsistencies
         # (e.g. DB has "Cyr Wheel" but ALLOWED_DISCIPLINES has "Cyr-Wheel")
-        from sqlalchemy import func
         disc_norm = func.replace(func.lower(Discipline.name), '-', ' ')
         normalized_cmp_list = list(normalized_cmp)
 
+        if availability_mode() == 'exceptions':
+            # Verfügbar ist, wessen Standard das Datum abdeckt und wer es nicht
+            # gesperrt hat: Anti-Join auf blocked_dates statt Join auf 365
+            # Zeilen je Artist.
+            offset = (event_date - date.today()).days
+            return (
+                Artist.query
+                .join(Artist.disciplines)
+                .outerjoin(BlockedDate, (BlockedDate.artist_id == Artist.id) & (BlockedDate.date == event_date))
+                .filter(
+                    disc_norm.in_(normalized_cmp_list),
+                    Artist.default_available_days > offset,
+                    true() if offset >= 0 else false(),
+                    BlockedDate.id.is_(None),
+                )
+            )
+
         return (
             Artist.query
             .join(Artist.disciplines)
@@ -185,9 +222,65 @@ class ArtistManager:
                 disc_norm.in_(normalized_cmp_list),
                 Availability.date == event_date
             )
-            .all()
         )
 
+    # --- Räumliche Suche ---------------------------------------------------
+
+    def spatial_index(self) -> SpatialIndex:
+        """Index über die freigegebenen Artists mit Koordinaten, bei Bedarf neu gebaut."""
+        approved = (Artist.approval_status == 'approved', Artist.lat.isnot(None), Artist.lon.isnot(None))
+        signature = tuple(
+            self.db.session.query(
+                func.count(Artist.id), func.max(Artist.id), func.sum(Artist.lat), func.sum(Artist.lon)
+            ).filter(*approved).one()
+        )
+        with _spatial_lock:
+            if _spatial_cache["index"] is not None and _spatial_cache["signature"] == signature:
+                return _spatial_cache["index"]
+        rows = self.db.session.query(Artist.id, Artist.lat, Artist.lon).filter(*approved).all()
+        index = SpatialIndex(rows)
+        with _spatial_lock:
+            _spatial_cache.update(signature=signature, index=index)
+        logger.info('Spatial index rebuilt: %s artists', len(index))
+        return index
+
+    def _with_artists(self, ranked):
+        """[(id, km)] -> [(Artist, km)] mit einer einzigen Abfrage."""
+        if not ranked:
+            return []
+        by_id = {a.id: a for a in Artist.query.filter(Artist.id.in_([pid for pid, _ in ranked])).all()}
+        return [(by_id[pid], km) for pid, km in ranked if pid in by_id]
+
+    def _available_filter(self, disciplines, event_date):
+        """accept-Funktion für `SpatialIndex.nearest`: IDs mit Disziplin und Datum."""
+        if disciplines is None:
+            return None
+
+        def accept(ids):
+            q = self._available_query(disciplines, event_date).filter(Artist.id.in_(ids))
+            return {row[0] for row in q.with_entities(Artist.id).all()}
+        return accept
+
+    def get_nearest_available_artists(self, disciplines, event_date, coord, k=5, max_km=None):
+        """Die k nächsten freigegebenen Artists als [(Artist, km)], der nächste zuerst.
+
+        Mit `disciplines=None` ohne Filter auf Disziplin und Datum. Artists ohne
+        Koordinaten tauchen nicht auf — ihre Entfernung ist unbekannt.
+        """
+        ranked = self.spatial_index().nearest(
+            coord, k, max_km=max_km, accept=self._available_filter(disciplines, event_date)
+        )
+        return self._with_artists(ranked)
+
+    def get_available_artists_within(self, disciplines, event_date, coord, radius_km):
+        """Alle freigegebenen Artists im Umkreis als [(Artist, km)], der nächste zuerst."""
+        ranked = self.spatial_index().within(coord, radius_km)
+        accept = self._available_filter(disciplines, event_date)
+        if accept is not None and ranked:
+            ok = accept([pid for pid, _ in ranked])
+            ranked = [(pid, km) for pid, km in ranked if pid in ok]
+        return self._with_artists(ranked)
+
 
     def delete_artist(self, artist_id):
         """
@@ -283,6 +376,7 @@ class ArtistManager:
                 artist.price_max = price_max
 
             self.db.session.commit()
+            BookingRequestManager().refresh_recommendations(artist_ids=[artist.id])
             return artist
 
         except Exception:
@@ -302,57 +396,141 @@ class ArtistManager:
 
         return GageCalculator.get_gage_breakdown(artist)
 
-    def recalculate_all_gages(self, limit=None):
+    # Spalten, aus denen GageCalculator rechnet, plus der bisherige Stand
+    _GAGE_COLUMNS = (
+        Artist.id, Artist.calculated_gage, Artist.admin_gage_override,
+        Artist.stage_experience, Artist.employment_type, Artist.circus_education,
+        Artist.awards_level, Artist.pepe_years, Artist.pepe_exclusivity,
+    )
+
+    def recalculate_gage_chunk(self, after_id=0, chunk_size=500):
+        """Gagen der nächsten `chunk_size` Artists hinter `after_id` neu rechnen; ohne Commit.
+
+        Liest nur Spalten, keine Artist-Objekte, und schreibt die geänderten
+        Gagen mit je einem executemany (mit bzw. ohne Admin-Override). Die
+        gespeicherten Preisempfehlungen dieser Artists werden verworfen.
+
+        Returns:
+            dict: first_id, last_id, rows, updated, ms — rows=0 heißt: fertig
+        """
+        started = time.perf_counter()
+        rows = self.db.session.execute(
+            select(*self._GAGE_COLUMNS)
+            .where(Artist.id > after_id)
+            .order_by(Artist.id)
+            .limit(chunk_size)
+        ).all()
+
+        priced, overridden = [], []
+        for row in rows:
+            new_gage = GageCalculator.calculate_gage(row)
+            if new_gage == row.calculated_gage:
+                continue
+            if row.admin_gage_override:
+                overridden.append({'b_id': row.id, 'gage': new_gage})
+            else:
+                price_min, price_max = GageCalculator.get_price_range(row)
+                priced.append({'b_id': row.id, 'gage': new_gage,
+                               'pmin': price_min, 'pmax': price_max})
+
+        table = Artist.__table__
+        if priced:
+            self.db.session.execute(
+                table.update().where(table.c.id == bindparam('b_id'))
+                .values(calculated_gage=bindparam('gage'),
+                        price_min=bindparam('pmin'), price_max=bindparam('pmax')),
+                priced,
+            )
+        if overridden:
+            # Preisband bleibt beim Override, wie bei set_admin_gage_override
+            self.db.session.execute(
+                table.update().where(table.c.id == bindparam('b_id'))
+                .values(calculated_gage=bindparam('gage')),
+                overridden,
+            )
+        changed = [p['b_id'] for p in priced + overridden]
+        if changed:
+            # Empfehlungen mit altem Preisband verwerfen; der Posteingang
+            # rechnet sie beim nächsten Laden neu.
+            BookingRequestManager().invalidate_recommendations(changed)
+
+        return {
+            'first_id': rows[0].id if rows else None,
+            'last_id': rows[-1].id if rows else after_id,
+            'rows': len(rows),
+            'updated': len(changed),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def recalculate_all_gages(self, limit=None, chunk_size=500):
         """
-        Recalculates gages for all artists (admin function).
+        Recalculates gages for all artists, one committed chunk at a time.
+
+        Läuft direkt durch (Skripte, Tests). Für die Admin-Oberfläche gibt es
+        den Hintergrundlauf in `cron_jobs/recalculate_gages.py`.
 
         Args:
             limit: Optional limit for number of artists to process
+            chunk_size: Artists per chunk and transaction
 
         Returns:
-            dict: Summary of recalculated gages
+            dict: total_artists, updated_count, chunks (Laufzeit je Block)
         """
+        after_id, total, updated, chunks = 0, 0, 0, []
         try:
-            query = Artist.query
-            if limit:
-                query = query.limit(limit)
-            artists = query.all()
-
-            updated_count = 0
-            results = []
-
-            for artist in artists:
-                old_gage = artist.calculated_gage
-                new_gage = GageCalculator.calculate_gage(artist)
-
-                if old_gage != new_gage:
-                    artist.calculated_gage = new_gage
-                    # Only update price range if no admin override
-                    if not artist.admin_gage_override:
-                        price_min, price_max = GageCalculator.get_price_range(artist)
-                        artist.price_min = price_min
-                        artist.price_max = price_max
-                    updated_count += 1
-
-                results.append({
-                    'artist_id': artist.id,
-                    'artist_name': artist.name,
-                    'old_gage': old_gage,
-                    'new_gage': new_gage,
-                    'updated': old_gage != new_gage
-                })
+            while limit is None or total < limit:
+                size = chunk_size if limit is None else min(chunk_size, limit - total)
+                chunk = self.recalculate_gage_chunk(after_id, size)
+                if not chunk['rows']:
+                    break
+                self.db.session.commit()
+                after_id = chunk['last_id']
+                total += chunk['rows']
+                updated += chunk['updated']
+                chunks.append(chunk)
+                if chunk['rows'] < size:
+                    break
+        except Exception:
+            self.db.session.rollback()
+            raise
 
-            self.db.session.commit()
+        return {'total_artists': total, 'updated_count': updated, 'chunks': chunks}
+
+    def reprice_all_artists(self):
+        """
+        Recomputes calculated_gage, price_min and price_max for all artists in one UPDATE.
 
-            return {
-                'total_artists': len(artists),
-                'updated_count': updated_count,
-                'results': results
-            }
+        Rechnet mit `GageCalculator.gage_expression` in der Datenbank, z. B.
+        nach einer Änderung der Gewichte. Geschrieben werden nur Artists,
+        deren Gage sich ändert; mit Admin-Override bleibt das Preisband.
 
+        Returns:
+            dict: updated_count, ms
+        """
+        started = time.perf_counter()
+        table = Artist.__table__
+        gage = GageCalculator.gage_expression(table)
+        overridden = and_(table.c.admin_gage_override.isnot(None), table.c.admin_gage_override != 0)
+        try:
+            updated = self.db.session.execute(
+                table.update()
+                .where(GageCalculator.gage_changed(table, gage))
+                .values(
+                    calculated_gage=gage,
+                    price_min=case((overridden, table.c.price_min),
+                                   else_=GageCalculator.price_min_expression(gage)),
+                    price_max=case((overridden, table.c.price_max), else_=gage),
+                )
+            ).rowcount
+            if updated:
+                # Welche es waren, sagt das UPDATE nicht; der Posteingang
+                # rechnet verworfene Empfehlungen beim nächsten Laden neu.
+                BookingRequestManager().invalidate_recommendations()
+            self.db.session.commit()
         except Exception:
             self.db.session.rollback()
             raise
+        return {'updated_count': updated, 'ms': round((time.perf_counter() - started) * 1000, 1)}
 
     def set_admin_gage_override(self, artist_id, override_gage):
         """
@@ -384,7 +562,9 @@ class ArtistManager:
                 artist.price_min = price_min
                 artist.price_max = price_max
 
+            BookingRequestManager().invalidate_recommendations([artist.id])
             self.db.session.commit()
+            BookingRequestManager().refresh_recommendations(artist_ids=[artist.id])
             return artist
 
         except Exception:
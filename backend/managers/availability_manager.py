@@ -1,10 +1,49 @@
+import base64
 import logging
-from models import db, Availability, Artist
+import time
+from collections import namedtuple
+from flask import current_app, has_app_context
+from models import db, Availability, Artist, BlockedDate
 from datetime import timedelta, date as _date
+from sqlalchemy import Date, Integer, Select, cast, delete, exists, func, insert, literal, literal_column, select, true, update
 from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
 
+_EPOCH = _date(1970, 1, 1)
+
+# Standard-Verfügbarkeit neuer bzw. freigegebener Artists (Tage ab heute)
+DEFAULT_DAYS_AHEAD = 365
+
+# Modus 'exceptions': Slot-IDs gibt es nicht mehr als Zeilen. Damit
+# /api/availability weiter IDs liefern und per DELETE annehmen kann, wird
+# die ID aus Artist und Tag gebildet: artist_id * _SLOT_ID_BASE + Tagnummer
+# seit 1970 (heute rund 20.000).
+_SLOT_ID_BASE = 100_000
+
+# Verfügbarer Tag im Modus 'exceptions'; dieselben Felder wie `Availability`.
+Slot = namedtuple('Slot', 'id artist_id date')
+
+
+class AvailabilityWindowError(ValueError):
+    """Tag liegt außerhalb des rollenden Standards (Modus 'exceptions')."""
+
+
+def availability_mode() -> str:
+    """'rows' (eine Zeile je verfügbarem Tag) oder 'exceptions' (Standard plus Sperren)."""
+    if has_app_context():
+        return current_app.config.get('AVAILABILITY_MODE', 'rows')
+    return 'rows'
+
+
+def slot_id_for(artist_id: int, day: _date) -> int:
+    return artist_id * _SLOT_ID_BASE + (day - _EPOCH).days
+
+
+def _decode_slot_id(slot_id: int):
+    artist_id, day = divmod(slot_id, _SLOT_ID_BASE)
+    return artist_id, _EPOCH + timedelta(days=day)
+
 # helper: inclusive date range generator
 def _date_range_inclusive(start: _date, end: _date):
     cur = start
@@ -12,9 +51,41 @@ def _date_range_inclusive(start: _date, end: _date):
         yield cur
         cur = cur + timedelta(days=1)
 
+def _collapse(dates):
+    """Sortierte Tage zu [(von, bis), …] zusammenhängender Läufe."""
+    runs = []
+    for d in dates:
+        if runs and (d - runs[-1][1]).days == 1:
+            runs[-1][1] = d
+        else:
+            runs.append([d, d])
+    return [(a, b) for a, b in runs]
+
+
+def encode_bitset(runs, start: _date, end: _date) -> str:
+    """Läufe als Bitfeld über [start, end], base64.
+
+    Bit i (Byte i // 8, niederwertigstes Bit zuerst) steht für start + i Tage.
+    Ein Jahr sind 46 Bytes, base64 62 Zeichen.
+    """
+    days = (end - start).days + 1
+    bits = bytearray((days + 7) // 8)
+    for a, b in runs:
+        for i in range(max(0, (a - start).days), min(days - 1, (b - start).days) + 1):
+            bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode()
+
+
 class AvailabilityManager:
     """
     Verwaltet Verfügbarkeitstage von Artists.
+
+    Zwei Speicherarten (Config `AVAILABILITY_MODE`): 'rows' legt je
+    verfügbarem Tag eine Zeile in `availabilities` an, ein täglicher Cron
+    schiebt das Jahr weiter. 'exceptions' speichert je Artist nur den
+    rollenden Standard (`default_available_days`) und die gesperrten Tage in
+    `blocked_dates` — ein paar Zeilen statt 365, kein Cron. Die öffentlichen
+    Methoden sprechen in beiden Fällen von verfügbaren Tagen.
     """
 
     def __init__(self):
@@ -23,6 +94,8 @@ class AvailabilityManager:
 
     def get_availabilities(self, artist_id=None):
         """Gibt Verfügbarkeits-Slots zurück, optional gefiltert nach Artist-ID. Sortiert nach Datum aufsteigend."""
+        if self._exceptions():
+            return self._open_slots(artist_id)
         try:
             query = Availability.query
             if artist_id is not None:
@@ -33,23 +106,78 @@ class AvailabilityManager:
             logger.exception('Fehler beim Laden der Availabilities für artist_id=%s', artist_id)
             return []
 
-    def get_all_availabilities(self):
-        """Gibt alle Verfügbarkeitstage aller Artists zurück."""
+    def get_all_availabilities(self, start=None, end=None):
+        """Gibt alle Verfügbarkeitstage aller Artists zurück, optional nur in [start, end]."""
+        if self._exceptions():
+            return [
+                {'id': slot.id, 'date': slot.date.isoformat(), 'artist_id': slot.artist_id}
+                for slot in self._open_slots(None, start, end)
+            ]
         try:
-            slots = Availability.query.order_by(Availability.artist_id, Availability.date).all()
+            stmt = select(Availability.id, Availability.date, Availability.artist_id)
+            if start is not None:
+                stmt = stmt.where(Availability.date >= start)
+            if end is not None:
+                stmt = stmt.where(Availability.date <= end)
+            rows = self.db.session.execute(stmt.order_by(Availability.artist_id, Availability.date))
             # Serialize slots to include artist_id
             return [
                 {
-                    'id': slot.id,
-                    'date': slot.date.isoformat(),
-                    'artist_id': slot.artist_id,
+                    'id': slot_id,
+                    'date': slot_date.isoformat(),
+                    'artist_id': artist_id,
                 }
-                for slot in slots
+                for slot_id, slot_date, artist_id in rows
             ]
         except Exception as e:
             logger.exception('Fehler beim Laden aller Availabilities')
             return []
 
+    def availability_runs(self, start: _date, end: _date, artist_ids=None) -> dict:
+        """{artist_id: [(von, bis), …]}: verfügbare Tage in [start, end] als Läufe.
+
+        Statt je Tag eine Zeile (bei 365 vorab angelegten Tagen je Artist
+        schnell zehntausende) fasst die Datenbank zusammenhängende Tage
+        selbst zusammen: Tagnummer minus Zeilennummer ist innerhalb eines
+        Laufs konstant (gaps and islands). Zurück kommt eine Zeile je Lauf.
+        """
+        if self._exceptions():
+            return self._exception_runs(start, end, artist_ids)
+        dialect = self.db.session.get_bind().dialect.name
+        where = [Availability.date >= start, Availability.date <= end]
+        if artist_ids is not None:
+            where.append(Availability.artist_id.in_(list(artist_ids)))
+
+        out = {}
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                day = Availability.date - literal(_EPOCH)  # date - date = integer
+            else:
+                day = cast(func.julianday(Availability.date) - func.julianday(_EPOCH.isoformat()), Integer)
+            row_no = func.row_number().over(partition_by=Availability.artist_id, order_by=Availability.date)
+            days = select(Availability.artist_id, Availability.date, (day - row_no).label('island')) \
+                .where(*where).subquery()
+            first = func.min(days.c.date)
+            rows = self.db.session.execute(
+                select(days.c.artist_id, first, func.max(days.c.date))
+                .group_by(days.c.artist_id, days.c.island)
+                .order_by(days.c.artist_id, first)
+            )
+            for artist_id, a, b in rows:
+                if isinstance(a, str):  # SQLite ohne Typinfo
+                    a, b = _date.fromisoformat(a), _date.fromisoformat(b)
+                out.setdefault(artist_id, []).append((a, b))
+            return out
+
+        rows = self.db.session.execute(
+            select(Availability.artist_id, Availability.date).where(*where)
+            .order_by(Availability.artist_id, Availability.date)
+        )
+        by_artist = {}
+        for artist_id, d in rows:
+            by_artist.setdefault(artist_id, []).append(d)
+        return {artist_id: _collapse(dates) for artist_id, dates in by_artist.items()}
+
     def add_availability(self, artist_id, date_obj):
         """Fügt einen Verfügbarkeitstag für einen Artist an einem bestimmten Datum hinzu. Idempotent (duplikate werden nicht erneut angelegt)."""
         if isinstance(date_obj, str):
@@ -58,6 +186,8 @@ class AvailabilityManager:
             except ValueError:
                 logger.warning('Ungültiges Datumsformat beim Hinzufügen der Availability: %s', date_obj)
                 raise
+        if self._exceptions():
+            return self._unblock(artist_id, date_obj)
         try:
             existing = Availability.query.filter_by(
                 artist_id=artist_id, date=date_obj
@@ -118,8 +248,19 @@ class AvailabilityManager:
         )
         return len(missing)
 
+    def get_slot(self, slot_id):
+        """Verfügbarkeitstag anhand seiner ID oder None."""
+        if self._exceptions():
+            artist_id, day = _decode_slot_id(slot_id)
+            if day not in self._open_days(artist_id, day, day):
+                return None
+            return Slot(slot_id, artist_id, day)
+        return self.db.session.get(Availability, slot_id)
+
     def remove_availability(self, availability_id):
         """Entfernt einen Verfügbarkeitstag anhand seiner ID. Gibt das gelöschte Slot-Objekt zurück oder None."""
+        if self._exceptions():
+            return self._block(availability_id)
         try:
             slot = Availability.query.get(availability_id)
             if slot:
@@ -144,29 +285,41 @@ class AvailabilityManager:
                     logger.warning('Überspringe ungültiges Datum beim Ersetzen: %s', d)
             elif isinstance(d, _date):
                 normalized.add(d)
-        # bestehende Slots
-        existing_slots = self.get_availabilities(artist_id)
-        existing_dates = {s.date for s in existing_slots}
-
-        to_add = normalized - existing_dates
-        to_remove = existing_dates - normalized
-
-        added = []
-        removed = []
-        for dt in to_add:
-            try:
-                slot = self.add_availability(artist_id, dt)
-                added.append(slot)
-            except Exception:
-                logger.exception('Konnte Availability nicht hinzufügen: %s for artist %s', dt, artist_id)
-        for dt in to_remove:
-            slot = Availability.query.filter_by(artist_id=artist_id, date=dt).first()
-            if slot:
-                self.remove_availability(slot.id)
-                removed.append(slot)
+        if self._exceptions():
+            return self._replace_blocks(artist_id, normalized)
+        # Bestand als (Datum, ID) — eine Abfrage, ein DELETE, ein INSERT, ein Commit
+        # statt je Tag eigener Abfrage, Löschung und Transaktion.
+        started = time.perf_counter()
+        existing = dict(self.db.session.execute(
+            select(Availability.date, Availability.id).where(Availability.artist_id == artist_id)
+        ).all())
+        to_add = sorted(normalized - existing.keys())
+        to_remove = sorted(existing.keys() - normalized)
+        try:
+            if to_remove:
+                self.db.session.execute(
+                    delete(Availability).where(Availability.artist_id == artist_id,
+                                               Availability.date.in_(to_remove))
+                )
+            if to_add:
+                self._insert_days([{'artist_id': artist_id, 'date': d} for d in to_add])
+                added = [row_id for row_id, in self.db.session.execute(
+                    select(Availability.id)
+                    .where(Availability.artist_id == artist_id, Availability.date.in_(to_add))
+                    .order_by(Availability.date)
+                )]
+            else:
+                added = []
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Ersetzen der Availabilities für artist_id=%s', artist_id)
+            raise
+        logger.info('Availabilities ersetzt: artist_id=%s +%s -%s in %.1f ms', artist_id,
+                    len(added), len(to_remove), (time.perf_counter() - started) * 1000)
         return {
-            'added': [s.id for s in added],
-            'removed': [s.id for s in removed],
+            'added': added,
+            'removed': [existing[d] for d in to_remove],
         }
 
     def get_availabilities_for_user(self, supabase_user_id):
@@ -197,7 +350,7 @@ class AvailabilityManager:
         """
         Legt für alle (oder nur freigegebene) Artists einen Verfügbarkeits-Slot am gegebenen Datum an.
         `target` akzeptiert date-Objekt oder ISO-String. Idempotent – bestehende Einträge werden übersprungen.
-        Rückgabe: {"created": n, "skipped": m}
+        Rückgabe: {"created": n, "skipped": m, "date": …, "elapsed_ms": …}
         """
         if isinstance(target, str):
             try:
@@ -205,46 +358,26 @@ class AvailabilityManager:
             except ValueError:
                 logger.warning('Ungültiges Datum in ensure_available_for_all_on: %s', target)
                 raise
-        created = 0
-        skipped = 0
-        try:
-            q = Artist.query
-            # Falls es ein approval_status-Feld gibt, optional darauf filtern
-            try:
-                if only_approved and hasattr(Artist, 'approval_status'):
-                    q = q.filter(Artist.approval_status == 'approved')
-            except Exception:
-                # falls Schema anders ist, kein Filter – wir fahren fort
-                pass
-            artists = q.all()
-
-            # Existierende Slots an diesem Tag für alle Artists abfragen, um N+1 zu vermeiden
-            existing = (
-                Availability.query
-                .filter(Availability.date == target)
-                .with_entities(Availability.artist_id)
-                .all()
-            )
-            existing_ids = {row[0] for row in existing}
+        result = self.ensure_available_for_all_between(target, target, only_approved=only_approved)
+        return {"created": result["created"], "skipped": result["skipped"],
+                "date": target.isoformat(), "elapsed_ms": result["elapsed_ms"]}
 
-            to_create = [
-                Availability(artist_id=artist.id, date=target)
-                for artist in artists
-                if artist.id not in existing_ids
-            ]
+    def ensure_available_for_all_between(self, start, end, only_approved: bool = True) -> dict:
+        """
+        Legt für alle (oder nur freigegebene) Artists jeden Tag in [start, end] an, der fehlt.
 
-            if to_create:
-                self.db.session.bulk_save_objects(to_create)
-                self.db.session.commit()
-                created = len(to_create)
-            else:
-                created = 0
-            skipped = len(artists) - created
-            return {"created": created, "skipped": skipped, "date": target.isoformat()}
-        except Exception:
-            self.db.session.rollback()
-            logger.exception('Fehler in ensure_available_for_all_on für Datum %s', target)
-            raise
+        Eine Anweisung für alle Artists und Tage: INSERT … SELECT aus
+        Artists × Tagesreihe, bestehende Paare fängt ON CONFLICT DO NOTHING
+        ab. Rückgabe: {"created", "skipped", "from", "to", "elapsed_ms"}
+        """
+        if end < start:
+            start, end = end, start
+        if self._exceptions():
+            # Der Standard rollt von selbst mit, es gibt nichts anzulegen.
+            return {"created": 0, "skipped": 0, "from": start.isoformat(), "to": end.isoformat(),
+                    "elapsed_ms": 0.0}
+        where = [Artist.approval_status == 'approved'] if only_approved else []
+        return self._fill_range(start, end, where)
 
     def ensure_today_available_for_all(self, only_approved: bool = True):
         """Cron-Helfer: setzt den heutigen Tag für alle (oder nur freigegebene) Artists auf verfügbar."""
@@ -263,42 +396,297 @@ class AvailabilityManager:
             end = _date.fromisoformat(end)
         if end < start:
             start, end = end, start
+        if self._exceptions():
+            return self._open_range(artist_id, start, end)
+        result = self._fill_range(start, end, [Artist.id == artist_id])
+        return {"added": result["created"], "skipped": result["skipped"]}
+
+    def ensure_auto_availability_for_artist(self, artist_id: int, days_ahead: int = DEFAULT_DAYS_AHEAD) -> dict:
+        """
+        Convenience: Füllt alle Tage von heute bis heute+days_ahead-1 für einen Artist (idempotent).
+        """
+        start = _date.today()
+        end = start + timedelta(days=days_ahead - 1)
+        return self.ensure_availability_range_for_artist(artist_id, start, end)
+
+    def _fill_range(self, start: _date, end: _date, where) -> dict:
+        """Alle Paare (Artist laut `where`, Tag in [start, end]) anlegen, die fehlen; mit Commit."""
+        started = time.perf_counter()
+        n_days = (end - start).days + 1
         try:
-            # existierende Slots im Bereich laden (nur Datum)
-            existing = (
-                Availability.query
-                .filter(Availability.artist_id == artist_id)
-                .filter(Availability.date >= start, Availability.date <= end)
-                .with_entities(Availability.date)
-                .all()
+            n_artists = self.db.session.execute(select(func.count(Artist.id)).where(*where)).scalar()
+            days = self._day_series(start, end)
+            if days is not None:
+                created = self._insert_days(select(Artist.id, days.c.day).where(*where))
+            else:
+                ids = [row_id for row_id, in self.db.session.execute(select(Artist.id).where(*where))]
+                created = self._insert_days([{'artist_id': a, 'date': d} for a in ids
+                                             for d in _date_range_inclusive(start, end)])
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Auffüllen der Availabilities %s..%s', start, end)
+            raise
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info('Availabilities %s..%s: %s angelegt, %s vorhanden, %.1f ms',
+                    start, end, created, n_artists * n_days - created, elapsed_ms)
+        return {"created": created, "skipped": n_artists * n_days - created,
+                "from": start.isoformat(), "to": end.isoformat(), "elapsed_ms": elapsed_ms}
+
+    def _day_series(self, start: _date, end: _date):
+        """Tage [start, end] als Unterabfrage mit Spalte `day`; None, wenn die Datenbank es nicht kann."""
+        dialect = self.db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            series = func.generate_series(literal(start, Date), literal(end, Date), literal_column("interval '1 day'"))
+            return select(cast(series, Date).label('day')).subquery('days')
+        if dialect == 'sqlite':
+            # Rekursive CTE; SQLite speichert Date als 'YYYY-MM-DD'. Verschachtelt
+            # (nesting=True), damit die Anweisung mit INSERT beginnt — sonst
+            # meldet sqlite3 keine rowcount.
+            days = select(literal(start.isoformat()).label('day')).cte('days', recursive=True, nesting=True)
+            days = days.union_all(
+                select(func.date(days.c.day, '+1 day')).where(days.c.day < end.isoformat())
             )
-            existing_dates = {row[0] for row in existing}
+            return select(days.c.day).subquery('days')
+        return None
 
-            to_create = [
-                Availability(artist_id=artist_id, date=dt)
-                for dt in _date_range_inclusive(start, end)
-                if dt not in existing_dates
-            ]
-            added = 0
-            if to_create:
-                self.db.session.bulk_save_objects(to_create)
-                self.db.session.commit()
-                added = len(to_create)
+    def _insert_days(self, rows) -> int:
+        """(artist_id, date)-Paare einfügen, vorhandene überspringen; Anzahl neuer Zeilen.
+
+        `rows` ist ein SELECT mit genau diesen zwei Spalten (INSERT … SELECT)
+        oder eine Liste von Dicts (ein mehrzeiliges INSERT … VALUES).
+        """
+        dialect = self.db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            dialect_insert = None
+
+        if dialect_insert is not None:
+            stmt = dialect_insert(Availability)
+            if isinstance(rows, Select):
+                # WHERE ist Pflicht: ohne liest SQLite das ON CONFLICT als Join-Bedingung
+                stmt = stmt.from_select(['artist_id', 'date'], rows.where(true()))
             else:
-                added = 0
-            skipped = len(existing_dates)
-            return {"added": added, "skipped": skipped}
+                stmt = stmt.values(rows)
+            stmt = stmt.on_conflict_do_nothing(index_elements=['artist_id', 'date'])
+            return self.db.session.execute(stmt).rowcount
+
+        # Ohne ON CONFLICT: nur Paare, die es noch nicht gibt
+        if not isinstance(rows, Select):
+            wanted = {(r['artist_id'], r['date']) for r in rows}
+            existing = set(self.db.session.execute(
+                select(Availability.artist_id, Availability.date).where(
+                    Availability.artist_id.in_({a for a, _ in wanted}),
+                    Availability.date.in_({d for _, d in wanted}),
+                )
+            ).all())
+            missing = [{'artist_id': a, 'date': d} for a, d in wanted if (a, d) not in existing]
+            if missing:
+                self.db.session.execute(insert(Availability), missing)
+            return len(missing)
+        artist_col, date_col = rows.selected_columns
+        rows = rows.where(~exists().where(Availability.artist_id == artist_col, Availability.date == date_col))
+        return self.db.session.execute(insert(Availability).from_select(['artist_id', 'date'], rows)).rowcount
+
+    # --- Modus 'exceptions' -------------------------------------------------
+
+    def _exceptions(self) -> bool:
+        return availability_mode() == 'exceptions'
+
+    def _windows(self, artist_ids=None, start=None, end=None) -> dict:
+        """{artist_id: (von, bis)}: rollender Standard, beschnitten auf [start, end]."""
+        today = _date.today()
+        stmt = select(Artist.id, Artist.default_available_days) \
+            .where(Artist.default_available_days > 0)
+        if artist_ids is not None:
+            stmt = stmt.where(Artist.id.in_(list(artist_ids)))
+        windows = {}
+        for artist_id, days in self.db.session.execute(stmt.order_by(Artist.id)):
+            a = max(today, start) if start else today
+            b = today + timedelta(days=days - 1)
+            b = min(b, end) if end else b
+            if a <= b:
+                windows[artist_id] = (a, b)
+        return windows
+
+    def _exception_runs(self, start=None, end=None, artist_ids=None) -> dict:
+        """Wie `availability_runs`: Standard-Fenster minus gesperrte Tage."""
+        windows = self._windows(artist_ids, start, end)
+        if not windows:
+            return {}
+        stmt = select(BlockedDate.artist_id, BlockedDate.date).where(
+            BlockedDate.date >= min(a for a, _ in windows.values()),
+            BlockedDate.date <= max(b for _, b in windows.values()),
+        )
+        if artist_ids is not None:
+            stmt = stmt.where(BlockedDate.artist_id.in_(list(windows)))
+        blocked = {}
+        for artist_id, d in self.db.session.execute(stmt.order_by(BlockedDate.artist_id, BlockedDate.date)):
+            blocked.setdefault(artist_id, []).append(d)
+
+        out = {}
+        one = timedelta(days=1)
+        for artist_id, (a, b) in windows.items():
+            runs, cur = [], a
+            for d in blocked.get(artist_id, ()):
+                if d < cur or d > b:
+                    continue
+                if d > cur:
+                    runs.append((cur, d - one))
+                cur = d + one
+            if cur <= b:
+                runs.append((cur, b))
+            if runs:
+                out[artist_id] = runs
+        return out
+
+    def _open_slots(self, artist_id=None, start=None, end=None) -> list:
+        ids = None if artist_id is None else [artist_id]
+        return [
+            Slot(slot_id_for(aid, d), aid, d)
+            for aid, runs in self._exception_runs(start, end, ids).items()
+            for a, b in runs
+            for d in _date_range_inclusive(a, b)
+        ]
+
+    def _open_days(self, artist_id, start, end) -> set:
+        return {slot.date for slot in self._open_slots(artist_id, start, end)}
+
+    def _window(self, artist_id):
+        return self._windows([artist_id]).get(artist_id)
+
+    def _unblock(self, artist_id, day):
+        """Tag wieder freigeben. Außerhalb des Standards: AvailabilityWindowError."""
+        window = self._window(artist_id)
+        if window is None or not window[0] <= day <= window[1]:
+            raise AvailabilityWindowError(f'{day.isoformat()} liegt außerhalb des Verfügbarkeitsfensters')
+        try:
+            self.db.session.execute(
+                delete(BlockedDate).where(BlockedDate.artist_id == artist_id, BlockedDate.date == day)
+            )
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Freigeben von %s für artist_id=%s', day, artist_id)
+            raise
+        return Slot(slot_id_for(artist_id, day), artist_id, day)
+
+    def _block(self, slot_id):
+        """Tag sperren; None, wenn er nicht verfügbar war."""
+        slot = self.get_slot(slot_id)
+        if slot is None:
+            return None
+        try:
+            self.db.session.add(BlockedDate(artist_id=slot.artist_id, date=slot.date))
+            self.db.session.commit()
+            return slot
+        except IntegrityError:
+            # parallel schon gesperrt
+            self.db.session.rollback()
+            return slot
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Sperren von Slot %s', slot_id)
+            return None
+
+    def _replace_blocks(self, artist_id, wanted: set) -> dict:
+        """`replace_availabilities_for_artist` als Sperren: alles im Fenster, was fehlt."""
+        window = self._window(artist_id)
+        if window is None:
+            logger.warning('Artist %s hat keine Standard-Verfügbarkeit, Tage ignoriert', artist_id)
+            return {'added': [], 'removed': []}
+        start, end = window
+        outside = [d for d in wanted if not start <= d <= end]
+        if outside:
+            logger.info('Artist %s: %s Tage außerhalb des Fensters ignoriert', artist_id, len(outside))
+        blocked = {
+            d for (d,) in self.db.session.execute(
+                select(BlockedDate.date).where(BlockedDate.artist_id == artist_id,
+                                               BlockedDate.date >= start, BlockedDate.date <= end)
+            )
+        }
+        to_open = sorted(d for d in wanted if d in blocked)
+        to_block = sorted(d for d in _date_range_inclusive(start, end) if d not in wanted and d not in blocked)
+        try:
+            # Vergangene Sperren gleich mit wegräumen
+            self.db.session.execute(
+                delete(BlockedDate).where(
+                    BlockedDate.artist_id == artist_id,
+                    (BlockedDate.date < start) | BlockedDate.date.in_(to_open),
+                )
+            )
+            if to_block:
+                self.db.session.execute(
+                    insert(BlockedDate), [{'artist_id': artist_id, 'date': d} for d in to_block]
+                )
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Ersetzen der Sperren für artist_id=%s', artist_id)
+            raise
+        return {
+            'added': [slot_id_for(artist_id, d) for d in to_open],
+            'removed': [slot_id_for(artist_id, d) for d in to_block],
+        }
+
+    def _open_range(self, artist_id, start, end) -> dict:
+        """`ensure_availability_range_for_artist`: Standard verlängern, Sperren im Bereich lösen."""
+        days = (end - _date.today()).days + 1
+        try:
+            artist = self.db.session.get(Artist, artist_id)
+            if artist is None:
+                raise ValueError(f'Artist {artist_id} nicht gefunden')
+            if days > (artist.default_available_days or 0):
+                artist.default_available_days = days
+            added = self.db.session.execute(
+                delete(BlockedDate).where(BlockedDate.artist_id == artist_id,
+                                          BlockedDate.date >= start, BlockedDate.date <= end)
+            ).rowcount
+            self.db.session.commit()
+            return {"added": added, "skipped": 0}
         except Exception:
             self.db.session.rollback()
             logger.exception('Fehler bei ensure_availability_range_for_artist artist_id=%s', artist_id)
             raise
 
-    def ensure_auto_availability_for_artist(self, artist_id: int, days_ahead: int = 365) -> dict:
-        """
-        Convenience: Füllt alle Tage von heute bis heute+days_ahead-1 für einen Artist (idempotent).
+    def convert_rows_to_exceptions(self, days_ahead: int = DEFAULT_DAYS_AHEAD, drop_rows: bool = False) -> dict:
+        """Bestehende Tage aus `availabilities` in Standard plus Sperren übertragen.
+
+        Jeder Artist mit mindestens einem Tag im Fenster [heute, heute +
+        days_ahead) bekommt den Standard `days_ahead`; jeder Tag im Fenster
+        ohne Zeile wird gesperrt. Artists ohne Tag im Fenster bleiben ohne
+        Standard, also nicht verfügbar. Tage jenseits des Fensters gehen
+        verloren. Idempotent; `drop_rows` leert danach `availabilities`.
         """
-        start = _date.today()
-        end = start + timedelta(days=days_ahead - 1)
-        return self.ensure_availability_range_for_artist(artist_id, start, end)
+        today = _date.today()
+        end = today + timedelta(days=days_ahead - 1)
+        by_artist = {}
+        rows = self.db.session.execute(
+            select(Availability.artist_id, Availability.date)
+            .where(Availability.date >= today, Availability.date <= end)
+        )
+        for artist_id, d in rows:
+            by_artist.setdefault(artist_id, set()).add(d)
 
-   
\ No newline at end of file
+        window = list(_date_range_inclusive(today, end))
+        blocked = 0
+        try:
+            for artist_id, dates in by_artist.items():
+                self.db.session.execute(
+                    update(Artist).where(Artist.id == artist_id).values(default_available_days=days_ahead)
+                )
+                self.db.session.execute(delete(BlockedDate).where(BlockedDate.artist_id == artist_id))
+                missing = [{'artist_id': artist_id, 'date': d} for d in window if d not in dates]
+                if missing:
+                    self.db.session.execute(insert(BlockedDate), missing)
+                blocked += len(missing)
+            dropped = self.db.session.execute(delete(Availability)).rowcount if drop_rows else 0
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            logger.exception('Fehler beim Übertragen der Availabilities')
+            raise
+        return {"artists": len(by_artist), "blocked": blocked, "dropped_rows": dropped}
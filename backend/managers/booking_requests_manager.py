@@ -1,14 +1,19 @@
+import base64
+
 from models import db, BookingRequest, booking_artists, Artist
 from services.calculate_price import (
     calculate_price,
+    calculate_prices_batch,
     client_price,
+    pricing_version,
+    requires_individual_offer,
     team_size_to_people,
 )
 from flask import current_app
 from datetime import date, datetime, time, timedelta
 from typing import Optional, List, Tuple
-from services.geo import geocode_address_cascade, haversine_km
-from sqlalchemy import func
+from services.geo import geocode_address_cascade, haversine_km, haversine_km_batch
+from sqlalchemy import bindparam, func, select, tuple_
 
 # Zulässige Statuswerte für Buchungsanfragen
 ALLOWED_STATUSES = ["angefragt", "angeboten", "akzeptiert", "abgelehnt", "storniert"]
@@ -34,9 +39,76 @@ def normalize_status(value: Optional[str]) -> Optional[str]:
         return raw
     return STATUS_ALIASES.get(raw)
 
+# Seitengröße der Admin-Listen (`page_requests`): Vorgabe und Obergrenze
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 500
+
+
+# Spalten des Artist-Posteingangs; gelesen als Zeilen, nicht als ORM-Objekte
+_INBOX_COLUMNS = (
+    BookingRequest.id, BookingRequest.created_at, BookingRequest.client_name,
+    BookingRequest.client_email, BookingRequest.event_date, BookingRequest.event_time,
+    BookingRequest.duration_minutes, BookingRequest.event_type, BookingRequest.show_type,
+    BookingRequest.show_discipline, BookingRequest.team_size, BookingRequest.number_of_guests,
+    BookingRequest.event_address, BookingRequest.is_indoor, BookingRequest.special_requests,
+    BookingRequest.needs_light, BookingRequest.needs_sound, BookingRequest.status,
+    BookingRequest.artist_offer_date,
+)
+
+
+def _id_list(value) -> List[int]:
+    """Ergebnis von array_agg (Liste) bzw. group_concat ('3,1') als sortierte IDs."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return sorted(int(v) for v in value)
+
+
+def encode_cursor(created_at: datetime, request_id: int) -> str:
+    """Cursor für die Seite nach (created_at, id); für Clients undurchsichtig."""
+    raw = f"{created_at.isoformat()}|{request_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Gegenstück zu `encode_cursor`; ValueError bei kaputtem Cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, request_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(request_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+# Ab so vielen Artists lohnt die Entfernungsberechnung in einem Durchgang
+# (`haversine_km_batch`); darunter überwiegt der Aufwand, die Arrays anzulegen.
+BATCH_DISTANCE_THRESHOLD = 8
+
 # Zulässige Event-Typen für Buchungsanfragen
 ALLOWED_EVENT_TYPES = ['Private Feier', 'Firmenfeier', 'Incentive', 'Streetshow']
 
+# Zustand der Preisauskunft (SPEC-3, Kriterien 1, 3, 6)
+PRICE_STATUS_RANGE = 'range'            # price_min/price_max sind gesetzt
+PRICE_STATUS_INDIVIDUAL = 'individual_offer'  # bewusst kein automatischer Preis
+PRICE_STATUS_UNAVAILABLE = 'unavailable'      # Preis konnte nicht ermittelt werden
+PRICE_STATUS_PENDING = 'pending'              # Berechnung läuft im Hintergrund
+
+
+def normalize_event_type(event_type):
+    """Schreibweise aus ALLOWED_EVENT_TYPES; ValueError bei unbekanntem Typ."""
+    if not isinstance(event_type, str):
+        return event_type
+    matched = next(
+        (e for e in ALLOWED_EVENT_TYPES if e.lower() == event_type.strip().lower()),
+        None
+    )
+    if not matched:
+        raise ValueError(
+            f"Invalid event_type: {event_type}. Allowed: {ALLOWED_EVENT_TYPES}"
+        )
+    return matched
+
 
 class BookingRequestManager:
     """
@@ -98,6 +170,77 @@ class BookingRequestManager:
         items = q.limit(max(0, int(limit))).offset(max(0, int(offset))).all()
         return items, int(total)
 
+    def page_requests(
+        self,
+        columns,
+        *,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = PAGE_LIMIT_DEFAULT,
+    ) -> Tuple[list, Optional[str]]:
+        """Eine Seite Anfragen, neueste zuerst, als Zeilen statt ORM-Objekte.
+
+        `columns` sind die gewünschten Spalten von BookingRequest; id und
+        created_at kommen immer dazu. Geblättert wird per Keyset über
+        (created_at, id) — jede Seite kostet gleich viel, egal wie weit
+        hinten sie liegt, und neue Anfragen verschieben nichts. `date_from`
+        und `date_to` filtern auf das Eventdatum (jeweils einschließlich).
+
+        Rückgabe: (Zeilen, Cursor der nächsten Seite oder None). ValueError
+        bei kaputtem Cursor. `limit=None` liest alle Zeilen in einer Abfrage.
+        """
+        if limit is not None:
+            limit = max(1, min(int(limit), PAGE_LIMIT_MAX))
+        cols = [BookingRequest.id, BookingRequest.created_at]
+        cols += [c for c in columns if c.key not in ("id", "created_at")]
+        stmt = select(*cols)
+        if status:
+            norm = normalize_status(status)
+            if not norm:
+                # wenn unbekannter Status-Filter: keine Ergebnisse
+                return [], None
+            stmt = stmt.where(BookingRequest.status == norm)
+        if date_from:
+            stmt = stmt.where(BookingRequest.event_date >= date_from)
+        if date_to:
+            stmt = stmt.where(BookingRequest.event_date <= date_to)
+        return self._keyset_page(stmt, cursor, limit)
+
+    def _keyset_page(self, stmt, cursor: Optional[str], limit: Optional[int]) -> Tuple[list, Optional[str]]:
+        """`stmt` neueste zuerst über (created_at, id) blättern; limit=None liest alles.
+
+        `stmt` muss BookingRequest.id und BookingRequest.created_at liefern.
+        """
+        if cursor:
+            stmt = stmt.where(
+                tuple_(BookingRequest.created_at, BookingRequest.id) < tuple_(*decode_cursor(cursor))
+            )
+        stmt = stmt.order_by(BookingRequest.created_at.desc(), BookingRequest.id.desc())
+        if limit is None:
+            return self.db.session.execute(stmt).all(), None
+        rows = self.db.session.execute(stmt.limit(limit + 1)).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    def artist_ids_by_request(self, request_ids) -> dict:
+        """{request_id: [artist_id, …]} in einer Abfrage auf booking_artists."""
+        ids = list(request_ids)
+        out = {rid: [] for rid in ids}
+        if not ids:
+            return out
+        pairs = self.db.session.execute(
+            select(booking_artists.c.booking_id, booking_artists.c.artist_id)
+            .where(booking_artists.c.booking_id.in_(ids))
+            .order_by(booking_artists.c.booking_id, booking_artists.c.artist_id)
+        )
+        for booking_id, artist_id in pairs:
+            out[booking_id].append(artist_id)
+        return out
+
     def _artist_coord(self, artist) -> Optional[Tuple[float, float]]:
         """Koordinate eines Artists, notfalls einmalig nachgeocodiert.
 
@@ -137,16 +280,24 @@ class BookingRequestManager:
         """
         if not event_coord:
             return {}
-        result = {}
+        ids, coords = [], []
         for a in artists:
-            coord = self._artist_coord(a)
-            if not coord:
-                continue
             aid = getattr(a, 'id', None)
             if aid is None:
                 continue
-            result[aid] = round(haversine_km(coord, event_coord), 1)
-        return result
+            coord = self._artist_coord(a)
+            if not coord:
+                continue
+            ids.append(aid)
+            coords.append(coord)
+
+        if len(coords) > BATCH_DISTANCE_THRESHOLD:
+            kms = haversine_km_batch(
+                event_coord, [c[0] for c in coords], [c[1] for c in coords]
+            )
+        else:
+            kms = [haversine_km(c, event_coord) for c in coords]
+        return {aid: round(km, 1) for aid, km in zip(ids, kms)}
 
     def _compute_travel_distance(self, event_address, artists) -> Tuple[Optional[Tuple[float, float]], dict]:
         """Ermittelt (Event-Koordinate, {artist_id: km}) für eine Anfrage.
@@ -197,13 +348,18 @@ class BookingRequestManager:
         planning_status=None,
         location_details=None,
         needs_stage_floor=False,
-        needs_rigging=False
+        needs_rigging=False,
+        defer_pricing=False,
     ):
         """Erstellt eine neue Buchungsanfrage und verknüpft sie mit Artists.
 
         Rückgabe: die gespeicherte Anfrage. Die Einzelentfernungen der Artists
         hängen als `_artist_distances` (dict) an ihr, damit die Route den Preis
         je Artist rechnen kann, ohne die Koordinaten erneut zu laden.
+
+        Mit `defer_pricing=True` wird nicht geocodiert: Die Anfrage wird mit
+        `price_status='pending'` gespeichert, `_artist_distances` bleibt leer,
+        und `complete_pricing` holt Entfernungen und Preis später nach.
         """
         current_app.logger.info(f"create_request called with client={client_name}, disciplines={show_discipline}, artists={[getattr(a, 'id', a) for a in artists]}")
 
@@ -214,22 +370,15 @@ class BookingRequestManager:
             event_time = time.fromisoformat(event_time)
 
         # Event-Type validieren
-        if isinstance(event_type, str):
-            matched = next(
-                (e for e in ALLOWED_EVENT_TYPES if e.lower() == event_type.strip().lower()),
-                None
-            )
-            if matched:
-                event_type = matched
-            else:
-                raise ValueError(
-                    f"Invalid event_type: {event_type}. Allowed: {ALLOWED_EVENT_TYPES}"
-                )
+        event_type = normalize_event_type(event_type)
 
         # --- Distanzberechnung Event <-> Artists (rein serverseitig) ---
         # Ein vom Client mitgeschickter distance_km-Wert wird ignoriert; er ist
         # preisrelevant und damit manipulierbar (SPEC-2, Kriterium 6).
-        event_coord, distances = self._compute_travel_distance(event_address, artists)
+        if defer_pricing:
+            event_coord, distances = None, {}
+        else:
+            event_coord, distances = self._compute_travel_distance(event_address, artists)
 
         # `distance_km` an der Anfrage ist ab jetzt die kürzeste Anreise unter
         # den gematchten Artists, also die des nächstgelegenen. Sie dient der
@@ -263,7 +412,8 @@ class BookingRequestManager:
             client_company=client_company,
             budget_range=budget_range,
             planning_status=planning_status,
-            location_details=location_details
+            location_details=location_details,
+            price_status=PRICE_STATUS_PENDING if defer_pricing else None,
         )
 
         # 1) Request speichern (flush, um ID zu erhalten)
@@ -293,11 +443,227 @@ class BookingRequestManager:
 
         # 3) final commit
         self.db.session.commit()
+        # 4) Empfehlungen für den Posteingang gleich mitspeichern; schlägt das
+        #    fehl, rechnet der Posteingang sie beim Lesen.
+        if artist_ids:
+            try:
+                self.refresh_recommendations(request_ids=[req.id])
+            except Exception:
+                self.db.session.rollback()
+                current_app.logger.exception("Empfehlungen für Anfrage %s nicht gerechnet", req.id)
         # Die Einzelentfernungen anhängen: sie stecken in keiner Spalte, die
         # Route braucht sie aber gleich für den Preis je Artist.
         req._artist_distances = distances
         return req
 
+    # --- Preisauskunft für den Kunden -------------------------------------
+
+    def quote(self, req, artists, team_size, distances) -> dict:
+        """Preisspanne einer Anfrage aus ihren gematchten Artists.
+
+        `artists` muss nach Entfernung sortiert sein (der nächstgelegene
+        zuerst); bei einem Duo bestimmt die Reihenfolge, welche zwei gerechnet
+        werden. Rückgabe: dict mit price_min, price_max, price_status,
+        price_reason sowie duo_min/duo_max (nur beim Duo gesetzt).
+        """
+        result = dict(price_min=None, price_max=None, price_status=PRICE_STATUS_RANGE,
+                      price_reason=None, duo_min=None, duo_max=None)
+
+        # Sonderfälle zuerst: ohne sie wäre jede Zahl geraten (SPEC-3, Kriterien 3 & 6)
+        individual_reason = requires_individual_offer(req.duration_minutes, team_size)
+
+        if not artists:
+            result.update(price_status=PRICE_STATUS_UNAVAILABLE, price_reason='no_artists')
+            return result
+        if individual_reason:
+            result.update(price_status=PRICE_STATUS_INDIVIDUAL, price_reason=individual_reason)
+            return result
+
+        # Die Anfahrt hängt am einzelnen Artist, nicht an der Anfrage. Ein
+        # Artist ohne auflösbare Adresse taucht in `distances` nicht auf; für
+        # ihn wird die Anreise mit 0 angesetzt, sonst würde eine fehlende
+        # Adresse den Preis nach oben verzerren.
+        def leg(artist) -> float:
+            return float(distances.get(getattr(artist, 'id', None), 0.0))
+
+        # Alles, was für jede Besetzung gleich ist. Was je Artist
+        # unterschiedlich ist (Gage, Anfahrt), kommt pro Aufruf dazu.
+        common = dict(
+            fee_pct         = self._fee_pct(),
+            newsletter      = req.newsletter_opt_in,
+            event_type      = req.event_type,
+            num_guests      = req.number_of_guests,
+            is_weekend      = req.event_date.weekday() >= 5,
+            is_indoor       = req.is_indoor,
+            needs_light     = req.needs_light,
+            needs_sound     = req.needs_sound,
+            show_discipline = req.show_discipline,
+            duration        = req.duration_minutes,
+            event_address   = req.event_address,
+            distance_km     = 0,
+        )
+
+        try:
+            if team_size == 2:
+                # Duo: die zwei nächstgelegenen Artists, jeder mit seiner
+                # eigenen Gage und seiner eigenen Anreise.
+                if len(artists) < 2:
+                    result.update(price_status=PRICE_STATUS_UNAVAILABLE, price_reason='not_enough_artists')
+                    return result
+                pair = artists[:2]
+                duo_min = sum(getattr(a, 'price_min', 0) for a in pair)
+                duo_max = sum(getattr(a, 'price_max', 0) for a in pair)
+                pmin, pmax = calculate_price(
+                    base_min  = duo_min,
+                    base_max  = duo_max,
+                    distances = [leg(a) for a in pair],
+                    team_count = 2,
+                    **common,
+                )
+                result.update(duo_min=duo_min, duo_max=duo_max)
+            else:
+                # Solo: jeder Artist wird für sich durchgerechnet, mit seiner
+                # Gage und seiner Anreise. Die angezeigte Spanne ist die
+                # Hülle dieser Einzelpreise. Vorher lief eine Sammelspanne
+                # aus dem billigsten Minimum und dem teuersten Maximum durch
+                # die Rechnung — eine Kombination, die kein Artist anbietet.
+                # Alle Artists in einem Durchgang; gleiche Zahlen wie je ein
+                # `calculate_price` pro Artist.
+                per_artist = calculate_prices_batch(
+                    base_mins = [a.price_min for a in artists],
+                    base_maxs = [a.price_max for a in artists],
+                    distances = [leg(a) for a in artists],
+                    **common,
+                )
+                pmin = min(p[0] for p in per_artist)
+                pmax = max(p[1] for p in per_artist)
+        except Exception as e:
+            current_app.logger.exception("calculate_price failed: %s", e)
+            result.update(price_status=PRICE_STATUS_UNAVAILABLE, price_reason='calculation_failed')
+            return result
+
+        result.update(price_min=pmin, price_max=pmax)
+        return result
+
+    def preview(self, event_date, duration_minutes, event_type, show_discipline,
+                team_size, number_of_guests, event_address, is_indoor,
+                needs_light, needs_sound, artists, event_coord=None):
+        """Preisauskunft ohne Anlage: dieselbe Rechnung wie bei POST /requests.
+
+        Baut eine Anfrage nur im Speicher (nicht in der Session, ohne
+        verknüpfte Artists), rechnet Entfernungen und Preis und gibt
+        `(req, artists_nach_entfernung, distances, quote)` zurück. Eine
+        bereits bekannte `event_coord` spart das erneute Geocoding.
+        """
+        if isinstance(event_date, str):
+            event_date = date.fromisoformat(event_date)
+        if event_coord is None:
+            event_coord, distances = self._compute_travel_distance(event_address, artists)
+        else:
+            distances = self.artist_distances(event_coord, artists)
+
+        req = BookingRequest(
+            event_date=event_date,
+            duration_minutes=duration_minutes,
+            event_type=normalize_event_type(event_type),
+            show_discipline=",".join(show_discipline) if isinstance(show_discipline, list) else show_discipline,
+            team_size=team_size,
+            number_of_guests=number_of_guests,
+            event_address=event_address,
+            is_indoor=is_indoor,
+            needs_light=needs_light,
+            needs_sound=needs_sound,
+            newsletter_opt_in=False,
+            distance_km=min(distances.values()) if distances else 0.0,
+            event_lat=event_coord[0] if event_coord else None,
+            event_lon=event_coord[1] if event_coord else None,
+        )
+        artists = self.sort_by_distance(artists, distances)
+        return req, artists, distances, self.quote(req, artists, team_size, distances)
+
+    @staticmethod
+    def sort_by_distance(artists, distances) -> list:
+        """Der nächstgelegene zuerst; ohne bekannte Entfernung ans Ende.
+
+        Der nächstgelegene ist die wahrscheinliche Besetzung, und bei einem Duo
+        bestimmt die Reihenfolge, welche zwei gerechnet werden. Eine unbekannte
+        Entfernung wird nicht als null behandelt.
+        """
+        return sorted(artists, key=lambda a: distances.get(getattr(a, 'id', None), float('inf')))
+
+    def known_distances(self, req) -> dict:
+        """{artist_id: km} aus bereits gespeicherten Koordinaten, ohne Geocoding.
+
+        Für Lesepfade wie die Preisabfrage: Fehlende Koordinaten werden hier
+        nicht nachgeschlagen, der Artist fehlt dann einfach im Ergebnis.
+        """
+        if req.event_lat is None or req.event_lon is None:
+            return {}
+        event_coord = (float(req.event_lat), float(req.event_lon))
+        return {
+            a.id: round(haversine_km((float(a.lat), float(a.lon)), event_coord), 1)
+            for a in req.artists
+            if a.lat is not None and a.lon is not None
+        }
+
+    def complete_pricing(self, request_id: int):
+        """Holt Geocoding, Entfernungen und Preis einer 'pending'-Anfrage nach.
+
+        Rückgabe: die aktualisierte Anfrage (mit `_artist_distances`), oder
+        None, wenn es sie nicht gibt, sie nicht mehr 'pending' ist oder ein
+        anderer Lauf sie gerade bearbeitet.
+
+        Hintergrund-Thread und Nachlauf können dieselbe Anfrage greifen. Wer
+        sie bearbeitet, setzt deshalb zuerst `updated_at` neu — bedingt auf den
+        gelesenen Wert, sodass nur einer von beiden durchkommt. Der Nachlauf
+        lässt frisch angefasste Anfragen in Ruhe (`pending_pricing_ids`).
+        """
+        req = self.get_request(request_id)
+        if req is None or req.price_status != PRICE_STATUS_PENDING:
+            return None
+        table = BookingRequest.__table__
+        claimed = self.db.session.execute(
+            table.update()
+            .where(table.c.id == req.id)
+            .where(table.c.price_status == PRICE_STATUS_PENDING)
+            .where(table.c.updated_at == req.updated_at)
+            .values(updated_at=datetime.utcnow())
+        ).rowcount
+        self.db.session.commit()
+        if not claimed:
+            return None
+
+        artists = list(req.artists)
+        event_coord, distances = self._compute_travel_distance(req.event_address, artists)
+        artists = self.sort_by_distance(artists, distances)
+        team_size = team_size_to_people(req.team_size)
+        result = self.quote(req, artists, team_size, distances)
+
+        req.event_lat = event_coord[0] if event_coord else None
+        req.event_lon = event_coord[1] if event_coord else None
+        req.distance_km = min(distances.values()) if distances else 0.0
+        req.price_min = result['price_min']
+        req.price_max = result['price_max']
+        req.price_status = result['price_status']
+        req.price_reason = result['price_reason']
+        # Nachgetragene Artist-Koordinaten (`_artist_coord`) gehen mit raus.
+        self.db.session.commit()
+
+        req._artist_distances = distances
+        return req
+
+    def pending_pricing_ids(self, older_than_seconds: int = 300) -> List[int]:
+        """IDs der 'pending'-Anfragen, die seit so lange niemand angefasst hat."""
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+        rows = (
+            self.db.session.query(BookingRequest.id)
+            .filter(BookingRequest.price_status == PRICE_STATUS_PENDING)
+            .filter(BookingRequest.updated_at <= cutoff)
+            .order_by(BookingRequest.id.asc())
+            .all()
+        )
+        return [r[0] for r in rows]
+
     def set_offer(self, request_id, artist_id, price_offered):
         """Speichert ein Angebot und aktualisiert den Status bei Solo oder nach vollständigen Angeboten."""
         current_app.logger.info(f"set_offer called for request_id={request_id}, artist_id={artist_id}, price_offered={price_offered}")
@@ -458,8 +824,13 @@ class BookingRequestManager:
         self.db.session.commit()
         return res.rowcount > 0
 
-    def set_artists_status(self, request_id: int, artist_ids: List[int], status: str, comment: Optional[str] = None) -> int:
-        """Setzt den Status für eine Menge von Artists; gibt Anzahl aktualisierter Zeilen zurück."""
+    def set_artists_status(self, request_id: int, artist_ids: List[int], status: str, comment: Optional[str] = None,
+                           commit: bool = True) -> int:
+        """Setzt den Status für eine Menge von Artists; gibt Anzahl aktualisierter Zeilen zurück.
+
+        Mit `commit=False` bleibt die Änderung in der Session; der Aufrufer
+        committet (oder rollt zurück), etwa zusammen mit den Benachrichtigungen.
+        """
         if status not in ALLOWED_STATUSES or not artist_ids:
             return 0
         update_values = {'status': status}
@@ -471,11 +842,16 @@ class BookingRequestManager:
             .where(booking_artists.c.artist_id.in_(artist_ids))
             .values(**update_values)
         )
-        self.db.session.commit()
+        if commit:
+            self.db.session.commit()
         return res.rowcount
 
-    def set_all_artists_status(self, request_id: int, status: str, comment: Optional[str] = None) -> int:
-        """Setzt den Status für ALLE Artists einer Anfrage; gibt Anzahl aktualisierter Zeilen zurück."""
+    def set_all_artists_status(self, request_id: int, status: str, comment: Optional[str] = None,
+                               commit: bool = True) -> int:
+        """Setzt den Status für ALLE Artists einer Anfrage; gibt Anzahl aktualisierter Zeilen zurück.
+
+        `commit` wie bei `set_artists_status`.
+        """
         if status not in ALLOWED_STATUSES:
             return 0
         update_values = {'status': status}
@@ -486,7 +862,8 @@ class BookingRequestManager:
             .where(booking_artists.c.booking_id == request_id)
             .values(**update_values)
         )
-        self.db.session.commit()
+        if commit:
+            self.db.session.commit()
         return res.rowcount
 
     def get_artist_statuses(self, request_id: int):
@@ -555,66 +932,100 @@ class BookingRequestManager:
 
     def get_requests_for_artist_with_recommendation(self, artist_id):
         """
-        Gibt zukünftige Buchungsanfragen zurück, die für den angegebenen Artist empfohlen werden,
+        Gibt die Buchungsanfragen des angegebenen Artists zurück, neueste zuerst,
         inklusive einer empfohlenen Preis-Spanne auf Basis von Artist-Parametern.
         """
-        current_app.logger.info(f"get_requests_for_artist_with_recommendation called for artist_id={artist_id}")
+        items, _ = self.page_requests_for_artist(artist_id, limit=None)
+        return items
+
+    def page_requests_for_artist(
+        self,
+        artist_id,
+        *,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = PAGE_LIMIT_DEFAULT,
+    ) -> Tuple[list, Optional[str]]:
+        """Posteingang eines Artists: eine Seite Anfragen mit Empfehlung, neueste zuerst.
+
+        Eine Abfrage liefert Anfrage-Spalten, die Pivot-Spalten des Artists
+        (Status, Gage, Kommentar) und die IDs aller beteiligten Artists —
+        bisher kamen je Anfrage noch eine Abfrage auf booking_artists und ein
+        Nachladen von `r.artists` dazu. `status` filtert auf den Status, den
+        der Artist sieht (eigener Pivot-Status, sonst der der Anfrage),
+        `date_from`/`date_to` auf das Eventdatum. limit=None liest alles.
+
+        Rückgabe: (Einträge, Cursor der nächsten Seite oder None). ValueError
+        bei kaputtem Cursor.
+        """
         try:
             aid = int(artist_id)
         except (TypeError, ValueError):
-            return []
+            return [], None
 
-        artist = Artist.query.get(aid)
-        if not artist:
+        prices = self.db.session.execute(
+            select(Artist.price_min, Artist.price_max).where(Artist.id == aid)
+        ).first()
+        if prices is None:
             current_app.logger.warning(f"No artist found with id={aid}")
-            return []
-
-        relevant = self.get_requests_for_artist(aid)
-        current_app.logger.info(f"Relevant requests for artist {aid}: {[r.id for r in relevant]}")
+            return [], None
 
+        others = booking_artists.alias('others')
+        artist_ids = (
+            select(self._aggregate_ids(others.c.artist_id))
+            .where(others.c.booking_id == BookingRequest.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                *_INBOX_COLUMNS,
+                booking_artists.c.status.label('artist_status'),
+                booking_artists.c.requested_gage,
+                booking_artists.c.comment.label('artist_comment'),
+                booking_artists.c.recommended_min,
+                booking_artists.c.recommended_max,
+                booking_artists.c.client_price_min,
+                booking_artists.c.client_price_max,
+                booking_artists.c.pricing_version,
+                artist_ids.label('artist_ids'),
+            )
+            .join_from(BookingRequest, booking_artists, booking_artists.c.booking_id == BookingRequest.id)
+            .where(booking_artists.c.artist_id == aid, BookingRequest.status.in_(ALLOWED_STATUSES))
+        )
+        if status:
+            norm = normalize_status(status)
+            if not norm:
+                return [], None
+            stmt = stmt.where(func.coalesce(booking_artists.c.status, BookingRequest.status) == norm)
+        if date_from:
+            stmt = stmt.where(BookingRequest.event_date >= date_from)
+        if date_to:
+            stmt = stmt.where(BookingRequest.event_date <= date_to)
+        if limit is not None:
+            limit = max(1, min(int(limit), PAGE_LIMIT_MAX))
+        rows, next_cursor = self._keyset_page(stmt, cursor, limit)
+        current_app.logger.debug(f"Inbox for artist {aid}: {[r.id for r in rows]}")
+
+        # Empfehlungen stehen an der Verknüpfung; gerechnet wird nur, wo der
+        # gespeicherte Stand nicht mehr passt (neue Anfrage vor dem Speichern,
+        # geändertes Preisband, andere Gebühr oder Formel).
         fee_pct = self._fee_pct()
-
+        version = pricing_version(fee_pct, prices.price_min, prices.price_max)
+        stale = []
         result = []
-        for r in relevant:
-            # Bewusst fee_pct=0: die Empfehlung ist die **Netto-Gage** des
-            # Artists. Der Kundenpreis inkl. Agenturgebühr steht separat
-            # darunter, damit beide Zahlen nicht mehr verwechselt werden können.
-            rec_min, rec_max = calculate_price(
-                base_min=artist.price_min,
-                base_max=artist.price_max,
-                distance_km=0,
-                fee_pct=0,
-                newsletter=False,
-                event_type=r.event_type,
-                num_guests=r.number_of_guests,
-                is_weekend=r.event_date.weekday() >= 5,
-                is_indoor=r.is_indoor,
-                needs_light=False,
-                needs_sound=False,
-                show_discipline=r.show_discipline,
-                team_size=1,
-                duration=r.duration_minutes,
-                event_address=r.event_address
-            )
-            current_app.logger.info(f"Calculated recommendation for request {r.id}: min={rec_min}, max={rec_max}")
-
-            # Pivot-Daten (pro Artist) laden: Status & gesendete Gage
-            pivot_row = self.db.session.execute(
-                booking_artists.select()
-                .with_only_columns(
-                    booking_artists.c.status,
-                    booking_artists.c.requested_gage,
-                    booking_artists.c.comment
-                )
-                .where(booking_artists.c.booking_id == r.id)
-                .where(booking_artists.c.artist_id == aid)
-            ).fetchone()
-            artist_status = pivot_row[0] if pivot_row else None
-            requested_gage = pivot_row[1] if pivot_row else None
-            artist_comment = pivot_row[2] if pivot_row else None
-            current_app.logger.debug(
-                f"artist pivot for request {r.id} & artist {aid}: status={artist_status}, requested_gage={requested_gage}, comment={artist_comment}"
-            )
+        for r in rows:
+            if r.pricing_version == version:
+                rec = {
+                    'recommended_min': r.recommended_min,
+                    'recommended_max': r.recommended_max,
+                    'client_price_min': r.client_price_min,
+                    'client_price_max': r.client_price_max,
+                }
+            else:
+                rec = self._recommend(prices.price_min, prices.price_max, r, fee_pct)
+                stale.append({'b_id': r.id, 'b_aid': aid, 'pricing_version': version, **rec})
 
             result.append({
                 'id': r.id,
@@ -624,7 +1035,7 @@ class BookingRequestManager:
                 'event_time': r.event_time.isoformat() if r.event_time else None,
                 'duration_minutes': r.duration_minutes,
                 'event_type': r.event_type,
-                'show_type': getattr(r, 'show_type', None),
+                'show_type': r.show_type,
                 'show_discipline': r.show_discipline,
                 'team_size': r.team_size,
                 'number_of_guests': r.number_of_guests,
@@ -633,22 +1044,131 @@ class BookingRequestManager:
                 'special_requests': r.special_requests,
                 'needs_light': r.needs_light,
                 'needs_sound': r.needs_sound,
-                'status': artist_status or r.status,
-                'artist_status': artist_status,
-                'artist_ids': [a.id for a in r.artists],
+                'status': r.artist_status or r.status,
+                'artist_status': r.artist_status,
+                'artist_ids': _id_list(r.artist_ids),
                 # Netto-Empfehlung für den Artist …
-                'recommended_price_min': rec_min,
-                'recommended_price_max': rec_max,
+                'recommended_price_min': rec['recommended_min'],
+                'recommended_price_max': rec['recommended_max'],
                 # … und was der Kunde dafür zahlen würde (inkl. Agenturgebühr)
-                'client_price_min': client_price(rec_min, fee_pct),
-                'client_price_max': client_price(rec_max, fee_pct),
+                'client_price_min': rec['client_price_min'],
+                'client_price_max': rec['client_price_max'],
                 # Neu: tatsächliches Angebot und Datum
-                'artist_gage': requested_gage,
-                'artist_comment': artist_comment,
-                'artist_offer_date': r.artist_offer_date.isoformat() if getattr(r, 'artist_offer_date', None) else None
+                'artist_gage': r.requested_gage,
+                'artist_comment': r.artist_comment,
+                'artist_offer_date': r.artist_offer_date.isoformat() if r.artist_offer_date else None
             })
-        return result
-    
+        if stale:
+            self._store_recommendations(stale)
+        return result, next_cursor
+
+    # --- Gespeicherte Empfehlungen -----------------------------------------
+
+    @staticmethod
+    def _recommend(price_min, price_max, r, fee_pct) -> dict:
+        """Empfehlung für einen Artist zu Anfrage `r` (Zeile oder Objekt mit den Preisfeldern)."""
+        # Bewusst fee_pct=0: die Empfehlung ist die **Netto-Gage** des
+        # Artists. Der Kundenpreis inkl. Agenturgebühr steht separat
+        # daneben, damit beide Zahlen nicht mehr verwechselt werden können.
+        rec_min, rec_max = calculate_price(
+            base_min=price_min,
+            base_max=price_max,
+            distance_km=0,
+            fee_pct=0,
+            newsletter=False,
+            event_type=r.event_type,
+            num_guests=r.number_of_guests,
+            is_weekend=r.event_date.weekday() >= 5,
+            is_indoor=r.is_indoor,
+            needs_light=False,
+            needs_sound=False,
+            show_discipline=r.show_discipline,
+            team_size=1,
+            duration=r.duration_minutes,
+            event_address=r.event_address
+        )
+        return {
+            'recommended_min': rec_min,
+            'recommended_max': rec_max,
+            'client_price_min': client_price(rec_min, fee_pct),
+            'client_price_max': client_price(rec_max, fee_pct),
+        }
+
+    def _store_recommendations(self, rows) -> None:
+        """Empfehlungen an die Verknüpfungen schreiben (ein executemany, mit Commit).
+
+        `rows`: Dicts mit b_id, b_aid, pricing_version und den Preisfeldern.
+        Ein Fehler hier kostet nur die Ersparnis beim nächsten Lesen.
+        """
+        stmt = (
+            booking_artists.update()
+            .where(booking_artists.c.booking_id == bindparam('b_id'),
+                   booking_artists.c.artist_id == bindparam('b_aid'))
+            .values(
+                recommended_min=bindparam('recommended_min'),
+                recommended_max=bindparam('recommended_max'),
+                client_price_min=bindparam('client_price_min'),
+                client_price_max=bindparam('client_price_max'),
+                pricing_version=bindparam('pricing_version'),
+            )
+        )
+        try:
+            self.db.session.execute(stmt, rows)
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.warning("Empfehlungen nicht gespeichert: %s", e)
+
+    def refresh_recommendations(self, *, request_ids=None, artist_ids=None) -> int:
+        """Empfehlungen der Verknüpfungen neu rechnen und speichern; Rückgabe: Anzahl.
+
+        Eingeschränkt auf `request_ids` und/oder `artist_ids`; ohne beides alle.
+        Aufgerufen beim Anlegen einer Anfrage und wenn sich die Gage eines
+        Artists ändert.
+        """
+        stmt = (
+            select(
+                booking_artists.c.booking_id, booking_artists.c.artist_id,
+                Artist.price_min, Artist.price_max,
+                BookingRequest.event_type, BookingRequest.number_of_guests,
+                BookingRequest.event_date, BookingRequest.is_indoor,
+                BookingRequest.show_discipline, BookingRequest.duration_minutes,
+                BookingRequest.event_address,
+            )
+            .join(BookingRequest, BookingRequest.id == booking_artists.c.booking_id)
+            .join(Artist, Artist.id == booking_artists.c.artist_id)
+        )
+        if request_ids is not None:
+            stmt = stmt.where(booking_artists.c.booking_id.in_(list(request_ids)))
+        if artist_ids is not None:
+            stmt = stmt.where(booking_artists.c.artist_id.in_(list(artist_ids)))
+        fee_pct = self._fee_pct()
+        rows = [
+            {'b_id': r.booking_id, 'b_aid': r.artist_id,
+             'pricing_version': pricing_version(fee_pct, r.price_min, r.price_max),
+             **self._recommend(r.price_min, r.price_max, r, fee_pct)}
+            for r in self.db.session.execute(stmt)
+        ]
+        if rows:
+            self._store_recommendations(rows)
+        return len(rows)
+
+    def invalidate_recommendations(self, artist_ids=None) -> int:
+        """Gespeicherte Empfehlungen verwerfen (alle oder die der Artists); ohne Commit.
+
+        Sie werden beim nächsten Lesen des Posteingangs neu gerechnet.
+        """
+        stmt = booking_artists.update().values(pricing_version=None)
+        if artist_ids is not None:
+            stmt = stmt.where(booking_artists.c.artist_id.in_(list(artist_ids)))
+        return self.db.session.execute(stmt).rowcount
+
+    def _aggregate_ids(self, column):
+        """Aggregat, das die IDs einer Gruppe in einer Spalte sammelt (siehe `_id_list`)."""
+        if self.db.session.get_bind().dialect.name == 'postgresql':
+            return func.array_agg(column)
+        return func.group_concat(column)
+
     def get_artist_offer(self, request_id, artist_id):
         """Gibt das vom Artist eingereichte Angebot (Pivot) für eine bestimmte Anfrage zurück."""
         # Verifizieren, dass die Anfrage existiert und der Artist zugeordnet ist
@@ -0,0 +1,39 @@
+"""store price recommendations on booking_artists
+
+Der Posteingang eines Artists rechnete bei jedem Laden für jede Anfrage die
+Empfehlung neu. Jetzt steht sie an der Verknüpfung Anfrage–Artist, samt
+Stand (`pricing_version`: Formel, Agenturgebühr, Preisband des Artists);
+gerechnet wird nur, wenn der Stand nicht mehr passt.
+
+Revision ID: a8e3c5f17b49
+Revises: f4d7b1e93c25
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e3c5f17b49'
+down_revision = 'f4d7b1e93c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('booking_artists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recommended_min', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('recommended_max', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('client_price_min', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('client_price_max', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('pricing_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('booking_artists', schema=None) as batch_op:
+        batch_op.drop_column('pricing_version')
+        batch_op.drop_column('client_price_max')
+        batch_op.drop_column('client_price_min')
+        batch_op.drop_column('recommended_max')
+        batch_op.drop_column('recommended_min')
@@ -0,0 +1,44 @@
+"""add gage_recalc_jobs table
+
+Die Gage-Neuberechnung lief im HTTP-Request über alle Artists in einer
+Transaktion und stieß an den Gunicorn-Timeout. Jetzt läuft sie im
+Hintergrund in Blöcken; diese Tabelle hält Fortschritt und Laufzeiten.
+
+Revision ID: b5d1f8c27e93
+Revises: a8e3c5f17b49
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1f8c27e93'
+down_revision = 'a8e3c5f17b49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'gage_recalc_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('limit', sa.Integer(), nullable=True),
+        sa.Column('last_artist_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.Integer(), nullable=False),
+        sa.Column('chunks', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('gage_recalc_jobs')
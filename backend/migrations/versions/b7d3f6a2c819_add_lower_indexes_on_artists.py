@@ -0,0 +1,32 @@
+"""add lower() indexes on artists.supabase_user_id and artists.email
+
+`get_current_artist` sucht per `lower(supabase_user_id) = ...`, das
+Onboarding per `lower(email) = ...`. Die Unique-Indizes auf den Spalten
+selbst kann keiner der beiden Ausdrücke nutzen.
+
+Revision ID: b7d3f6a2c819
+Revises: a4c8e2f19d05
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3f6a2c819'
+down_revision = 'a4c8e2f19d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_artists_lower_supabase_user_id', 'artists',
+                    [sa.text('lower(supabase_user_id)')], unique=False)
+    op.create_index('ix_artists_lower_email', 'artists',
+                    [sa.text('lower(email)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artists_lower_email', table_name='artists')
+    op.drop_index('ix_artists_lower_supabase_user_id', table_name='artists')
@@ -0,0 +1,39 @@
+"""add idempotency_keys table
+
+Die Anfrage-Route beansprucht einen Idempotency-Key jetzt zu Beginn statt
+die Antwort erst am Ende abzulegen. Ohne Upstash (oder bei dessen Ausfall)
+übernimmt diese Tabelle das; der Key als Primärschlüssel sorgt dafür, dass
+von zwei gleichzeitigen Aufrufen nur einer durchkommt.
+
+Revision ID: c9e4a1f27d30
+Revises: b7d3f6a2c819
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a1f27d30'
+down_revision = 'b7d3f6a2c819'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('lease', sa.String(length=64), nullable=True),
+        sa.Column('response', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(op.f('ix_idempotency_keys_expires_at'), 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,28 @@
+"""add (created_at, id) index on booking_requests
+
+Die Admin-Listen blättern jetzt per Keyset über (created_at, id) statt alle
+Anfragen auf einmal zu laden. Der Index deckt Sortierung und Vergleich ab;
+jede Seite liest nur so viele Zeilen, wie sie zeigt.
+
+Revision ID: d3b8f5e62a14
+Revises: c9e4a1f27d30
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b8f5e62a14'
+down_revision = 'c9e4a1f27d30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_booking_requests_created_at_id', 'booking_requests',
+                    ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_booking_requests_created_at_id', table_name='booking_requests')
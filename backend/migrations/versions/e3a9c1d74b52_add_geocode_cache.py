@@ -0,0 +1,43 @@
+"""add geocode_cache table
+
+Der Geocoding-Cache lag nur im Prozessspeicher. Jede neue Serverless-Instanz
+und jeder Neustart begann leer, und dieselben Adressen liefen erneut in das
+Limit von einem Nominatim-Aufruf pro Sekunde. Die Tabelle haelt Treffer und
+Fehlschlaege instanzuebergreifend fest.
+
+Revision ID: e3a9c1d74b52
+Revises: d5f2b8c14a37
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c1d74b52'
+down_revision = 'd5f2b8c14a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'geocode_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query_key', sa.String(length=255), nullable=False),
+        sa.Column('lat', sa.Float(), nullable=True),
+        sa.Column('lon', sa.Float(), nullable=True),
+        sa.Column('precision', sa.String(length=10), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('query_key', name='uq_geocode_cache_query_key'),
+    )
+    op.create_index(op.f('ix_geocode_cache_expires_at'), 'geocode_cache', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_geocode_cache_expires_at'), table_name='geocode_cache')
+    op.drop_table('geocode_cache')
@@ -0,0 +1,40 @@
+"""add blocked_dates table and artists.default_available_days
+
+Alternative zu den vorab angelegten Verfügbarkeitstagen: Mit
+AVAILABILITY_MODE='exceptions' ist ein Artist von heute an für
+`default_available_days` Tage verfügbar, außer an den Tagen in
+`blocked_dates`. Bestehende Zeilen in `availabilities` bleiben unberührt;
+übertragen werden sie mit `python -m scripts.availability_to_exceptions`.
+
+Revision ID: e6c2a9d41f58
+Revises: d3b8f5e62a14
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c2a9d41f58'
+down_revision = 'd3b8f5e62a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('artists', sa.Column('default_available_days', sa.Integer(), nullable=True))
+    op.create_table(
+        'blocked_dates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['artist_id'], ['artists.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('artist_id', 'date', name='uq_blocked_artist_date'),
+    )
+
+
+def downgrade():
+    op.drop_table('blocked_dates')
+    op.drop_column('artists', 'default_available_days')
@@ -0,0 +1,34 @@
+"""add cron_runs table
+
+Der Verfügbarkeits-Cron legte nur den Tag heute + 365 an; fiel ein Lauf
+aus, blieb der Tag für immer leer. Jetzt merkt er sich, bis wohin der
+letzte erfolgreiche Lauf gekommen ist, und füllt alles dazwischen nach.
+
+Revision ID: f4d7b1e93c25
+Revises: e6c2a9d41f58
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d7b1e93c25'
+down_revision = 'e6c2a9d41f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cron_runs',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('last_success_at', sa.DateTime(), nullable=False),
+        sa.Column('covered_until', sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('cron_runs')
@@ -0,0 +1,33 @@
+"""add price_status and price_reason to booking_requests
+
+Der Zustand der Preisauskunft stand bisher nur in der Antwort auf
+POST /requests. Mit der nachgelagerten Preisberechnung ('pending') muss er an
+der Anfrage selbst stehen, damit der Kunde ihn abfragen und ein Nachlauf
+liegengebliebene Anfragen finden kann.
+
+Revision ID: f7b2d9e41c63
+Revises: e3a9c1d74b52
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b2d9e41c63'
+down_revision = 'e3a9c1d74b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('booking_requests', sa.Column('price_status', sa.String(length=20), nullable=True))
+    op.add_column('booking_requests', sa.Column('price_reason', sa.String(length=40), nullable=True))
+    op.create_index(op.f('ix_booking_requests_price_status'), 'booking_requests', ['price_status'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_booking_requests_price_status'), table_name='booking_requests')
+    op.drop_column('booking_requests', 'price_reason')
+    op.drop_column('booking_requests', 'price_status')
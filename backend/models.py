@@ -13,7 +13,15 @@ booking_artists = db.Table(
     db.Column('artist_id',  db.Integer, db.ForeignKey('artists.id'), primary_key=True),
     db.Column('requested_gage', db.Integer, nullable=True),
     db.Column('status', db.String(20), nullable=False, server_default='angefragt'),
-    db.Column('comment', db.Text, nullable=True)
+    db.Column('comment', db.Text, nullable=True),
+    # Gespeicherte Preisempfehlung für den Artist (Netto-Gage) und was der
+    # Kunde dafür zahlen würde; gültig, solange `pricing_version` zum
+    # aktuellen Stand passt (siehe BookingRequestManager.refresh_recommendations).
+    db.Column('recommended_min', db.Integer, nullable=True),
+    db.Column('recommended_max', db.Integer, nullable=True),
+    db.Column('client_price_min', db.Integer, nullable=True),
+    db.Column('client_price_max', db.Integer, nullable=True),
+    db.Column('pricing_version', db.String(64), nullable=True),
 )
 
 
@@ -63,6 +71,9 @@ class Artist(UserMixin, db.Model):
     awards_level = db.Column(db.String(20), nullable=True)  # 'international', 'national', 'regional', 'lokal', 'keine'
     pepe_years = db.Column(db.Integer, default=0)  # Jahre bei Pepe
     pepe_exclusivity = db.Column(db.Boolean, default=False)  # Exklusiv für Pepe
+    # Nur mit AVAILABILITY_MODE='exceptions': verfügbar von heute an für so
+    # viele Tage, außer an den Tagen in `blocked_dates`. NULL = nie verfügbar.
+    default_available_days = db.Column(db.Integer, nullable=True)
 
     # Admin-Freigabe
     approval_status  = db.Column(db.String(20), nullable=False, server_default='unsubmitted')  # unsubmitted | pending | approved | rejected
@@ -104,6 +115,13 @@ class Artist(UserMixin, db.Model):
         return check_password_hash(self.password_hash, pw)
 
 
+# Suchen ohne Rücksicht auf Groß-/Kleinschreibung (Clerk-UID beim Login,
+# E-Mail beim Onboarding). Die Unique-Indizes auf den Spalten selbst helfen
+# einem `lower(...) = ...` nicht.
+db.Index('ix_artists_lower_supabase_user_id', db.func.lower(Artist.supabase_user_id))
+db.Index('ix_artists_lower_email', db.func.lower(Artist.email))
+
+
 class BookingRequest(db.Model):
     """Buchungsanfrage eines Clients mit Details wie Datum, Ort, Disziplinen und zugeordnete Artists."""
     __tablename__ = 'booking_requests'
@@ -145,6 +163,11 @@ class BookingRequest(db.Model):
     newsletter_opt_in  = db.Column(db.Boolean, default=False)
     price_min          = db.Column(db.Integer, nullable=True)
     price_max          = db.Column(db.Integer, nullable=True)
+    # Zustand der Preisauskunft: 'range' | 'individual_offer' | 'unavailable',
+    # oder 'pending', solange die Preisberechnung noch im Hintergrund läuft.
+    # NULL bei Anfragen, die vor Einführung der Spalte angelegt wurden.
+    price_status       = db.Column(db.String(20), nullable=True, index=True)
+    price_reason       = db.Column(db.String(40), nullable=True)
     price_offered      = db.Column(db.Integer, nullable=True)
     artist_gage        = db.Column(db.Integer, nullable=True)
     artist_offer_date  = db.Column(db.DateTime, nullable=True)
@@ -161,6 +184,11 @@ class BookingRequest(db.Model):
         back_populates='bookings'
     )
 
+    __table_args__ = (
+        # Keyset-Blättern der Admin-Listen: ORDER BY created_at DESC, id DESC
+        db.Index('ix_booking_requests_created_at_id', 'created_at', 'id'),
+    )
+
 class Availability(db.Model):
     """Verfügbarkeitstag eines Artists für (ganztägige) Buchungen."""
     __tablename__ = 'availabilities'
@@ -178,6 +206,26 @@ class Availability(db.Model):
     )
 
 
+class BlockedDate(db.Model):
+    """Gesperrter Tag eines Artists (AVAILABILITY_MODE='exceptions').
+
+    Statt jeden verfügbaren Tag als Zeile vorzuhalten, steht hier nur die
+    Ausnahme vom rollenden Standard (`Artist.default_available_days`).
+    """
+    __tablename__ = 'blocked_dates'
+    __table_args__ = (
+        db.UniqueConstraint('artist_id', 'date', name='uq_blocked_artist_date'),
+    )
+    id           = db.Column(db.Integer, primary_key=True)
+    artist_id    = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
+    date         = db.Column(db.Date, nullable=False)
+
+    artist       = db.relationship(
+        'Artist',
+        backref=db.backref('blocked_dates', cascade='all, delete-orphan')
+    )
+
+
 class AdminOffer(db.Model):
     """Verwaltungs-Angebot eines Admin-Users für eine Buchungsanfrage."""
     __tablename__ = 'admin_offers'
@@ -225,4 +273,105 @@ class Invoice(db.Model):
     artist = db.relationship(
         'Artist',
         backref=db.backref('invoices', cascade='all, delete-orphan')
-    )
\ No newline at end of file
+    )
+
+class GeocodeCacheEntry(db.Model):
+    """Ergebnis einer Nominatim-Suche, geteilt über Prozesse und Neustarts.
+
+    Schlüssel ist der normalisierte Suchtext (`services.geo._cache_key`). Ein
+    Eintrag ohne lat/lon ist ein gemerkter Fehlschlag; er läuft deutlich früher
+    ab als ein Treffer.
+    """
+    __tablename__ = 'geocode_cache'
+    id         = db.Column(db.Integer, primary_key=True)
+    query_key  = db.Column(db.String(255), nullable=False, unique=True)
+    lat        = db.Column(db.Float, nullable=True)
+    lon        = db.Column(db.Float, nullable=True)
+    # Stufe der Adresssuche, auf der dieser Suchtext gefunden wurde
+    # ('exact' | 'street' | 'postal' | 'city'), sofern bekannt.
+    precision  = db.Column(db.String(10), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class EmailOutbox(db.Model):
+    """Ausgehende Mail, geschrieben in derselben Transaktion wie ihr Anlass.
+
+    Ein Worker (`helpers/email_outbox.py`) verschickt die fälligen Einträge
+    gesammelt über eine SMTP-Verbindung. Scheitert der Versand, rückt
+    `next_attempt_at` mit wachsendem Abstand nach hinten; nach
+    `MAX_ATTEMPTS` Versuchen bleibt der Eintrag auf 'failed' stehen.
+    """
+    __tablename__ = 'email_outbox'
+    id              = db.Column(db.Integer, primary_key=True)
+    to_email        = db.Column(db.String(255), nullable=False)
+    subject         = db.Column(db.String(255), nullable=False)
+    html            = db.Column(db.Text, nullable=False)
+    # 'pending' | 'sent' | 'failed'
+    status          = db.Column(db.String(10), nullable=False, default='pending')
+    attempts        = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error      = db.Column(db.Text, nullable=True)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at         = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+
+class CronRun(db.Model):
+    """Letzter erfolgreicher Lauf eines Cron-Jobs und wie weit er gekommen ist.
+
+    Damit holt ein Job nach, was ausgefallene Läufe liegen gelassen haben,
+    statt nur den Tag des aktuellen Laufs zu bearbeiten.
+    """
+    __tablename__ = 'cron_runs'
+    name            = db.Column(db.String(64), primary_key=True)
+    last_success_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Letzter Tag, den der Job abgedeckt hat (auto_availability: heute + 365)
+    covered_until   = db.Column(db.Date, nullable=True)
+
+
+class IdempotencyKey(db.Model):
+    """Beanspruchter Idempotency-Key, wenn Upstash fehlt oder ausfällt.
+
+    Der Key ist Primärschlüssel: Von zwei gleichzeitigen Aufrufen kommt nur
+    einer mit dem INSERT durch. Solange er arbeitet, steht in `lease` seine
+    Sperre; danach steht in `response` die Antwort für Wiederholungen.
+    Siehe `helpers/idempotency.py`.
+    """
+    __tablename__ = 'idempotency_keys'
+    # '<scope>:<Idempotency-Key>'
+    key        = db.Column(db.String(255), primary_key=True)
+    lease      = db.Column(db.String(64), nullable=True)
+    response   = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class GageRecalcJob(db.Model):
+    """Lauf der Gage-Neuberechnung über alle Artists, in Blöcken nach ID.
+
+    Jeder Block schreibt seinen Fortschritt in derselben Transaktion wie die
+    Gagen. Bricht ein Lauf ab, setzt er hinter `last_artist_id` wieder an.
+    Siehe `cron_jobs/recalculate_gages.py`.
+    """
+    __tablename__ = 'gage_recalc_jobs'
+    id             = db.Column(db.Integer, primary_key=True)
+    # 'queued' | 'running' | 'done' | 'failed'
+    status         = db.Column(db.String(16), nullable=False, default='queued')
+    chunk_size     = db.Column(db.Integer, nullable=False, default=500)
+    limit          = db.Column(db.Integer, nullable=True)
+    last_artist_id = db.Column(db.Integer, nullable=False, default=0)
+    total          = db.Column(db.Integer, nullable=True)
+    processed      = db.Column(db.Integer, nullable=False, default=0)
+    updated        = db.Column(db.Integer, nullable=False, default=0)
+    # Laufzeit je Block: [{'first_id', 'last_id', 'rows', 'updated', 'ms'}, …]
+    chunks         = db.Column(db.JSON, nullable=True, default=list)
+    error          = db.Column(db.Text, nullable=True)
+    created_at     = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Letztes Lebenszeichen; steht es lange, ist der Lauf mit dem Prozess gestorben
+    heartbeat_at   = db.Column(db.DateTime, nullable=True)
+    finished_at    = db.Column(db.DateTime, nullable=True)
@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify, current_app
 from helpers.http_responses import error_response
 from flasgger import swag_from
-from managers.booking_requests_manager import BookingRequestManager
+from managers.booking_requests_manager import (
+    BookingRequestManager,
+    PAGE_LIMIT_DEFAULT,
+    PAGE_LIMIT_MAX,
+    decode_cursor,
+)
 from managers.admin_offer_manager import AdminOfferManager
-from managers.availability_manager import AvailabilityManager
+from managers.availability_manager import AvailabilityManager, encode_bitset
 from managers.artist_manager import ArtistManager
 from helpers.clerk_auth import admin_required, clerk_auth_required, get_current_artist_id
 from helpers.emails import (
@@ -15,11 +20,13 @@ from helpers.emails import (
     is_deliverable_address,
     send_email,
 )
-from models import Artist, BookingRequest
+from helpers import background, email_outbox
+from models import Artist, BookingRequest, GageRecalcJob
 from models import db
 import os
 import logging
 import requests
+from datetime import date, timedelta
 from urllib.parse import urljoin
 
 
@@ -53,6 +60,23 @@ def _send_artist_email(artist, subject: str, html: str):
         return False
 
 
+def _queue_artist_email(artist, subject: str, html: str) -> bool:
+    """Mail an einen Artist in die Outbox legen (ohne Commit). Wirft nie."""
+    email = getattr(artist, 'email', None)
+    if not is_deliverable_address(email):
+        logger.warning(
+            "Cannot queue email to artist %s – no deliverable address on record",
+            getattr(artist, 'id', '?'),
+        )
+        return False
+    try:
+        email_outbox.enqueue(email, subject, html)
+        return True
+    except Exception as e:
+        logger.exception(f"Failed to queue email to artist {getattr(artist, 'id', '?')}: {e}")
+        return False
+
+
 def _build_status_change_email(artist, req, new_status: str, comment: str = None) -> str:
     """Build HTML email notifying artist of a status change on their booking request."""
     app_url = current_app.config.get('APP_URL', 'https://pepeshows.de')
@@ -333,37 +357,96 @@ def admin_invoice_signed_url(invoice_id: int):
     
 
 
+def _page_args():
+    """Query-Parameter der Admin-Listen: (kwargs für `page_requests`, None) oder (None, Fehler).
+
+    limit (höchstens 500), cursor (`next_cursor` der vorigen Seite), status,
+    from/to (Eventdatum, ISO, einschließlich). Ohne limit und cursor kommt
+    die ganze Liste in einer Antwort (limit=None) — so liest sie das
+    Admin-Frontend, das noch nicht blättert. Mit cursor allein gilt die
+    Seitengröße 100.
+    """
+    args = request.args
+    paged = bool(args.get('limit') or args.get('cursor'))
+    try:
+        limit = int(args.get('limit') or PAGE_LIMIT_DEFAULT) if paged else None
+        date_from = date.fromisoformat(args['from']) if args.get('from') else None
+        date_to = date.fromisoformat(args['to']) if args.get('to') else None
+        cursor = args.get('cursor') or None
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return None, error_response('validation_error', f'Invalid query parameters: {e}', 400)
+    if limit is not None and limit < 1:
+        return None, error_response('validation_error', 'limit must be positive', 400)
+    return {
+        'status': args.get('status') or None,
+        'date_from': date_from,
+        'date_to': date_to,
+        'cursor': cursor,
+        'limit': min(limit, PAGE_LIMIT_MAX) if limit is not None else None,
+    }, None
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+# Spalten der Admin-Liste; gelesen als Zeilen, nicht als ORM-Objekte
+_REQUESTS_ALL_COLUMNS = (
+    BookingRequest.client_name, BookingRequest.client_email, BookingRequest.event_date,
+    BookingRequest.event_time, BookingRequest.duration_minutes, BookingRequest.event_type,
+    BookingRequest.show_discipline, BookingRequest.team_size, BookingRequest.number_of_guests,
+    BookingRequest.event_address, BookingRequest.is_indoor, BookingRequest.special_requests,
+    BookingRequest.needs_light, BookingRequest.needs_sound, BookingRequest.status,
+    BookingRequest.price_min, BookingRequest.price_max, BookingRequest.price_offered,
+)
+
+
 # Admin rights
 @admin_bp.route('/requests/all', methods=['GET'])
 @clerk_auth_required
 @swag_from(SWAG('requests_all_get.yml'))
 def list_all_requests():
-    """Gibt alle Buchungsanfragen zurück (Admin-View)."""
-    all_requests = request_mgr.get_all_requests()
-    return jsonify([{
-        'id':                r.id,
-        'client_name':       r.client_name,
-        'client_email':      r.client_email,
-        'event_date':        r.event_date.isoformat(),
-        'event_time':        r.event_time.isoformat() if r.event_time else None,
-        'duration_minutes':  r.duration_minutes,
-        'event_type':        r.event_type,
-        'show_discipline':   r.show_discipline,
-        'team_size':         r.team_size,
-        'number_of_guests':  r.number_of_guests,
-        'event_address':     r.event_address,
-        'is_indoor':         r.is_indoor,
-        'special_requests':  r.special_requests,
-        'needs_light':       r.needs_light,
-        'needs_sound':       r.needs_sound,
-        'status':            r.status,
-        'price_min':         r.price_min,
-        'price_max':         r.price_max,
-        'recommended_price_min': r.price_min,
-        'recommended_price_max': r.price_max,
-        'price_offered':     r.price_offered,
-        'artist_ids': [a.id for a in r.artists]
-    } for r in all_requests])
+    """Buchungsanfragen seitenweise, neueste zuerst (Admin-View).
+
+    Die nächste Seite holt `?cursor=<next_cursor>`; `next_cursor` ist null
+    auf der letzten Seite. Filter: status, from/to (Eventdatum).
+    """
+    page, err = _page_args()
+    if err:
+        return err
+    rows, next_cursor = request_mgr.page_requests(_REQUESTS_ALL_COLUMNS, **page)
+    artist_ids = request_mgr.artist_ids_by_request(r.id for r in rows)
+    return jsonify({
+        'requests': [{
+            'id':                r.id,
+            'client_name':       r.client_name,
+            'client_email':      r.client_email,
+            'event_date':        r.event_date.isoformat(),
+            'event_time':        _iso(r.event_time),
+            'duration_minutes':  r.duration_minutes,
+            'event_type':        r.event_type,
+            'show_discipline':   r.show_discipline,
+            'team_size':         r.team_size,
+            'number_of_guests':  r.number_of_guests,
+            'event_address':     r.event_address,
+            'is_indoor':         r.is_indoor,
+            'special_requests':  r.special_requests,
+            'needs_light':       r.needs_light,
+            'needs_sound':       r.needs_sound,
+            'status':            r.status,
+            'price_min':         r.price_min,
+            'price_max':         r.price_max,
+            'recommended_price_min': r.price_min,
+            'recommended_price_max': r.price_max,
+            'price_offered':     r.price_offered,
+            'created_at':        _iso(r.created_at),
+            'artist_ids':        artist_ids[r.id],
+        } for r in rows],
+        'next_cursor': next_cursor,
+        'limit': page['limit'],
+    })
 
 # AdminOffer CRUD
 @admin_bp.route('/requests/<int:req_id>/admin_offers', methods=['GET'])
@@ -712,69 +795,202 @@ def admin_set_artists_status_bulk(req_id):
     artist_ids = data.get('artist_ids')  # optional Liste von Artist-IDs
     if not new_status:
         return error_response('validation_error', 'status is required', 400)
-    if artist_ids and isinstance(artist_ids, list):
-        updated = request_mgr.set_artists_status(req_id, artist_ids, new_status, comment)
+
+    # Statuswechsel ohne Commit, dann die Mails in die Outbox und beides in
+    # einem Commit: Statuswechsel und Mails gehen gemeinsam in die Datenbank
+    # oder gar nicht.
+    selected = artist_ids if artist_ids and isinstance(artist_ids, list) else None
+    if selected:
+        updated = request_mgr.set_artists_status(req_id, selected, new_status, comment, commit=False)
     else:
-        updated = request_mgr.set_all_artists_status(req_id, new_status, comment)
+        updated = request_mgr.set_all_artists_status(req_id, new_status, comment, commit=False)
+    if not updated:
+        # Nichts geändert, also auch nichts anzukündigen
+        db.session.rollback()
+        return jsonify({'updated': 0, 'status': new_status, 'comment': comment}), 200
 
-    # Send email notifications to all affected artists
     try:
         req_obj = db.session.get(BookingRequest, req_id)
-        if req_obj:
-            # Get the artists linked to this request
-            affected = req_obj.artists if not artist_ids else Artist.query.filter(Artist.id.in_(artist_ids)).all()
-            status_subjects = {
-                'akzeptiert': 'Deine Buchung wurde bestätigt! ✅',
-                'abgelehnt': 'Update zu deiner Buchungsanfrage',
-                'storniert': 'Buchungsanfrage storniert',
-                'angeboten': 'Neues Angebot für deine Buchungsanfrage',
-            }
-            subject = status_subjects.get(new_status, f'Statusupdate: Anfrage #{req_id}')
-            for artist in affected:
-                try:
-                    html = _build_status_change_email(artist, req_obj, new_status, comment)
-                    _send_artist_email(artist, subject, html)
-                except Exception as e:
-                    logger.warning(f"[ADMIN] bulk status email failed for artist {artist.id}: {e}")
+        # Nur Artists dieser Anfrage — IDs außerhalb hat das UPDATE nicht erfasst
+        affected = [a for a in req_obj.artists if not selected or a.id in selected]
+        status_subjects = {
+            'akzeptiert': 'Deine Buchung wurde bestätigt! ✅',
+            'abgelehnt': 'Update zu deiner Buchungsanfrage',
+            'storniert': 'Buchungsanfrage storniert',
+            'angeboten': 'Neues Angebot für deine Buchungsanfrage',
+        }
+        subject = status_subjects.get(new_status, f'Statusupdate: Anfrage #{req_id}')
+        for artist in affected:
+            try:
+                html = _build_status_change_email(artist, req_obj, new_status, comment)
+                _queue_artist_email(artist, subject, html)
+            except Exception as e:
+                logger.warning(f"[ADMIN] bulk status email failed for artist {artist.id}: {e}")
     except Exception as e:
         logger.warning(f"[ADMIN] bulk status email failed for request {req_id}: {e}")
+    db.session.commit()
 
     return jsonify({'updated': updated, 'status': new_status, 'comment': comment}), 200
 
+@admin_bp.route('/requests/<int:req_id>/closest-artists', methods=['GET'])
+@clerk_auth_required
+def admin_closest_artists(req_id):
+    """Die nächstgelegenen Artists zu einer Anfrage (admin only).
+
+    Query parameters:
+      - k: Anzahl (default 10, max 100)
+      - radius_km: optional, nur Artists in diesem Umkreis
+      - all: '1' ignoriert Disziplin und Datum der Anfrage und listet alle
+        freigegebenen Artists nach Entfernung
+    """
+    from services.geo import geocode_address_cascade
+
+    req_obj = db.session.get(BookingRequest, req_id)
+    if not req_obj:
+        return error_response('not_found', 'Request not found', 404)
+    try:
+        k = max(1, min(int(request.args.get('k') or 10), 100))
+        radius_km = request.args.get('radius_km')
+        radius_km = float(radius_km) if radius_km not in (None, '') else None
+    except (TypeError, ValueError):
+        return error_response('validation_error', 'k and radius_km must be numbers', 400)
+    ignore_match = request.args.get('all') in ('1', 'true', 'yes')
+
+    if req_obj.event_lat is not None and req_obj.event_lon is not None:
+        event_coord = (float(req_obj.event_lat), float(req_obj.event_lon))
+    else:
+        event_coord, _ = geocode_address_cascade(req_obj.event_address)
+    if not event_coord:
+        return error_response('unprocessable', 'Event address could not be geocoded', 422)
+
+    disciplines = None if ignore_match else [
+        d.strip() for d in (req_obj.show_discipline or '').split(',') if d.strip()
+    ]
+    nearest = artist_mgr.get_nearest_available_artists(
+        disciplines, req_obj.event_date, event_coord, k=k, max_km=radius_km,
+    )
+    in_request = {a.id for a in req_obj.artists}
+    return jsonify({
+        'request_id': req_obj.id,
+        'event_lat': event_coord[0],
+        'event_lon': event_coord[1],
+        'artists': [
+            {
+                'id': a.id,
+                'name': a.name,
+                'distance_km': round(km, 1),
+                'geo_precision': a.geo_precision,
+                'price_min': a.price_min,
+                'price_max': a.price_max,
+                'in_request': a.id in in_request,
+            }
+            for a, km in nearest
+        ],
+    }), 200
+
+
+# Spalten der Angebotsliste im Dashboard
+_DASHBOARD_COLUMNS = (
+    BookingRequest.client_name, BookingRequest.client_email, BookingRequest.event_date,
+    BookingRequest.event_time, BookingRequest.event_type, BookingRequest.event_address,
+    BookingRequest.show_discipline, BookingRequest.duration_minutes, BookingRequest.team_size,
+    BookingRequest.number_of_guests, BookingRequest.is_indoor, BookingRequest.special_requests,
+    BookingRequest.needs_light, BookingRequest.needs_sound, BookingRequest.status,
+    BookingRequest.price_min, BookingRequest.price_max, BookingRequest.price_offered,
+)
+
+
+# Verfügbarkeiten im Dashboard: Vorgabefenster und größtes erlaubtes Fenster
+_AVAIL_WINDOW_DAYS = 365
+_AVAIL_WINDOW_MAX_DAYS = 731
+_AVAIL_FORMATS = ('ranges', 'bitset', 'slots')
+
+
+def _availability_args():
+    """avail_from/avail_to/avail_format: (start, end, format, None) oder (…, Fehler)."""
+    args = request.args
+    fmt = args.get('avail_format') or 'ranges'
+    try:
+        start = date.fromisoformat(args['avail_from']) if args.get('avail_from') else date.today().replace(day=1)
+        end = (date.fromisoformat(args['avail_to']) if args.get('avail_to')
+               else start + timedelta(days=_AVAIL_WINDOW_DAYS - 1))
+    except ValueError as e:
+        return None, None, None, error_response('validation_error', f'Invalid availability window: {e}', 400)
+    if fmt not in _AVAIL_FORMATS:
+        return None, None, None, error_response(
+            'validation_error', f"avail_format must be one of {', '.join(_AVAIL_FORMATS)}", 400)
+    if end < start or (end - start).days >= _AVAIL_WINDOW_MAX_DAYS:
+        return None, None, None, error_response(
+            'validation_error', f'availability window must span 1 to {_AVAIL_WINDOW_MAX_DAYS} days', 400)
+    return start, end, fmt, None
+
+
+def _availability_payload(start, end, fmt) -> dict:
+    """Verfügbarkeiten aller Artists im Fenster, je Artist kompakt kodiert.
+
+    'ranges': [[von, bis], …] (ISO, einschließlich). 'bitset': base64, Bit i
+    für `from` + i Tage (siehe `encode_bitset`). 'slots' liefert die
+    bisherige Liste mit einem Objekt je Tag, beschränkt aufs Fenster.
+    """
+    runs = avail_mgr.availability_runs(start, end)
+    if fmt == 'bitset':
+        artists = {aid: encode_bitset(r, start, end) for aid, r in runs.items()}
+    else:
+        artists = {aid: [[a.isoformat(), b.isoformat()] for a, b in r] for aid, r in runs.items()}
+    return {'from': start.isoformat(), 'to': end.isoformat(), 'encoding': fmt, 'artists': artists}
+
+
 @admin_bp.route('/dashboard')
 @clerk_auth_required
 @swag_from(SWAG('dashboard_get.yml'))
 def dashboard():
-    """Return dashboard data with availabilities and requests (admin only)."""
-    slots = avail_mgr.get_all_availabilities()
-    offers = request_mgr.get_all_requests()
+    """Return dashboard data with availabilities and requests (admin only).
+
+    `offers` ist seitenweise wie bei /requests/all (limit, cursor, status,
+    from/to); `next_cursor` führt zur nächsten Seite. `availability` enthält
+    je Artist die verfügbaren Tage im Fenster avail_from/avail_to (Vorgabe:
+    ab Monatsanfang ein Jahr) als Läufe oder Bitfeld (avail_format).
+    """
+    page, err = _page_args()
+    if err:
+        return err
+    avail_start, avail_end, avail_format, err = _availability_args()
+    if err:
+        return err
+    rows, next_cursor = request_mgr.page_requests(_DASHBOARD_COLUMNS, **page)
+    payload = {}
+    if avail_format == 'slots':
+        payload['slots'] = avail_mgr.get_all_availabilities(avail_start, avail_end)
+    else:
+        payload['availability'] = _availability_payload(avail_start, avail_end, avail_format)
     return jsonify({
-        'slots': slots,  
+        **payload,
         'offers': [
             {
                 'id': r.id,
                 'client_name': r.client_name,
                 'client_email': r.client_email,
                 'event_date': r.event_date.isoformat(),
-                'event_time': r.event_time.isoformat() if r.event_time else None,
-                'event_type': getattr(r, 'event_type', None),
-                'event_address': getattr(r, 'event_address', None),
-                'show_discipline': getattr(r, 'show_discipline', None),
-                'duration_minutes': getattr(r, 'duration_minutes', None),
+                'event_time': _iso(r.event_time),
+                'event_type': r.event_type,
+                'event_address': r.event_address,
+                'show_discipline': r.show_discipline,
+                'duration_minutes': r.duration_minutes,
                 'team_size': r.team_size,
-                'number_of_guests': getattr(r, 'number_of_guests', None),
-                'is_indoor': getattr(r, 'is_indoor', None),
-                'special_requests': getattr(r, 'special_requests', None),
-                'needs_light': getattr(r, 'needs_light', None),
-                'needs_sound': getattr(r, 'needs_sound', None),
+                'number_of_guests': r.number_of_guests,
+                'is_indoor': r.is_indoor,
+                'special_requests': r.special_requests,
+                'needs_light': r.needs_light,
+                'needs_sound': r.needs_sound,
                 'status': r.status or 'offen',
-                'created_at': r.created_at.isoformat() if getattr(r, 'created_at', None) else None,
-                'price_min': getattr(r, 'price_min', None),
-                'price_max': getattr(r, 'price_max', None),
+                'created_at': _iso(r.created_at),
+                'price_min': r.price_min,
+                'price_max': r.price_max,
                 'price_offered': r.price_offered,
             }
-            for r in offers
-        ]
+            for r in rows
+        ],
+        'next_cursor': next_cursor,
     }), 200
 
 
@@ -831,25 +1047,55 @@ def get_artist_gage_calculation(artist_id):
 @admin_bp.route('/gage/recalculate-all', methods=['POST'])
 @clerk_auth_required
 def recalculate_all_gages():
-    """Recalculate gages for all artists (admin only)."""
-    try:
-        data = request.get_json() or {}
-        limit = data.get('limit')  # Optional limit for testing
+    """Recalculate gages for all artists in the background (admin only).
 
-        if limit is not None and (not isinstance(limit, int) or limit <= 0):
-            return error_response('bad_request', 'Limit must be a positive integer', 400)
+    Antwortet mit 202 und dem Job; Fortschritt über
+    GET /api/admin/gage/recalculate-all/<job_id>. Ein abgebrochener Lauf wird
+    fortgesetzt, außer der Body enthält {"restart": true}.
+    """
+    from cron_jobs.recalculate_gages import (
+        CHUNK_SIZE_DEFAULT, CHUNK_SIZE_MAX, JobRunning, job_status, run_job, start_job,
+    )
 
-        results = artist_mgr.recalculate_all_gages(limit=limit)
+    data = request.get_json(silent=True) or {}
+    limit = data.get('limit')  # Optional limit for testing
+    chunk_size = data.get('chunk_size', CHUNK_SIZE_DEFAULT)
 
-        return jsonify({
-            'message': 'Gage recalculation completed',
-            'summary': results
-        }), 200
+    if limit is not None and (not isinstance(limit, int) or limit <= 0):
+        return error_response('bad_request', 'Limit must be a positive integer', 400)
+    if not isinstance(chunk_size, int) or not 0 < chunk_size <= CHUNK_SIZE_MAX:
+        return error_response('bad_request', f'chunk_size must be between 1 and {CHUNK_SIZE_MAX}', 400)
 
+    try:
+        job, resumed = start_job(chunk_size=chunk_size, limit=limit,
+                                 restart=bool(data.get('restart')))
+    except JobRunning as running:
+        return error_response('conflict', 'Gage recalculation is already running', 409,
+                              details={'job': job_status(running.job)})
     except Exception as e:
-        logger.exception('Failed to recalculate all gages')
+        logger.exception('Failed to start gage recalculation')
         return error_response('internal_error', f'Failed to recalculate gages: {str(e)}', 500)
 
+    # Eigener Thread: Der Lauf soll die Preisberechnung neuer Anfragen nicht aufhalten
+    background.submit_batch(run_job, job.id)
+    return jsonify({
+        'message': 'Gage recalculation resumed' if resumed else 'Gage recalculation started',
+        'status_url': f'/api/admin/gage/recalculate-all/{job.id}',
+        'job': job_status(job),
+    }), 202
+
+
+@admin_bp.route('/gage/recalculate-all/<int:job_id>', methods=['GET'])
+@clerk_auth_required
+def recalculate_all_gages_status(job_id):
+    """Fortschritt und Blocklaufzeiten eines Gage-Laufs (admin only)."""
+    from cron_jobs.recalculate_gages import job_status
+
+    job = db.session.get(GageRecalcJob, job_id)
+    if job is None:
+        return error_response('not_found', 'Job not found', 404)
+    return jsonify(job_status(job)), 200
+
 
 @admin_bp.route('/migrate-database-temp', methods=['POST'])
 @admin_required
@@ -1,11 +1,16 @@
-from flask import request, jsonify, g
+from flask import current_app, request, jsonify, g
 from flask import Blueprint
 from services.calculate_price import calculate_price
 from flasgger import swag_from
 from managers.artist_manager import ArtistManager
-from managers.availability_manager import AvailabilityManager
-from managers.booking_requests_manager import BookingRequestManager
-from models import Availability, Discipline, db
+from managers.availability_manager import AvailabilityManager, AvailabilityWindowError
+from managers.booking_requests_manager import (
+    BookingRequestManager,
+    PAGE_LIMIT_DEFAULT,
+    PAGE_LIMIT_MAX,
+    decode_cursor,
+)
+from models import Discipline, db
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 import logging
@@ -19,12 +24,15 @@ from helpers.clerk_auth import (
     get_current_artist,
 )
 
-from datetime import datetime
+from datetime import date, datetime
+import hashlib
 import os
 import tempfile
-from PIL import Image
 import io
 
+from helpers import background
+from services import image_processing
+
 logger = logging.getLogger(__name__)
 
 # Manager-Instanzen
@@ -50,53 +58,50 @@ API-Modul: Beinhaltet Endpunkte für Artists, Verfügbarkeit und Buchungsanfrage
 api_bp = Blueprint('api', __name__)
 
 
-def process_image_for_upload(image_file, max_width=1200, max_height=1200, quality=85):
+def process_image_for_upload(image_file, max_width=1200, max_height=1200, profile=None):
     """
-    Verarbeitet ein Bild: Größe anpassen und in WebP konvertieren
+    Verarbeitet ein Bild: Größe anpassen und in WebP konvertieren.
+
+    Rechnet im Prozess-Pool von `services.image_processing`; Profil ohne
+    Angabe aus `IMAGE_UPLOAD_PROFILE`. `ImagePoolBusy` und `ImageTimeout`
+    gehen an den Aufrufer.
     """
+    data = image_file.read()
     try:
-        # Bild öffnen
-        image = Image.open(image_file)
-
-        # Bei Bedarf EXIF-Orientierung korrigieren
-        if hasattr(image, '_getexif'):
-            exif = image._getexif()
-            if exif is not None:
-                for tag, value in exif.items():
-                    if tag == 274:  # Orientation tag
-                        if value == 3:
-                            image = image.rotate(180, expand=True)
-                        elif value == 6:
-                            image = image.rotate(270, expand=True)
-                        elif value == 8:
-                            image = image.rotate(90, expand=True)
-
-        # RGB konvertieren falls notwendig
-        if image.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-        elif image.mode != 'RGB':
-            image = image.convert('RGB')
-
-        # Größe anpassen
-        original_width, original_height = image.size
-        if original_width > max_width or original_height > max_height:
-            # Aspect ratio beibehalten
-            ratio = min(max_width / original_width, max_height / original_height)
-            new_width = int(original_width * ratio)
-            new_height = int(original_height * ratio)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # In WebP konvertieren
-        output = io.BytesIO()
-        image.save(output, format='WEBP', quality=quality, method=6)
-        output.seek(0)
-
-        return output
-    except Exception as e:
+        return io.BytesIO(image_processing.encode(data, max_width, max_height, profile))
+    except ValueError:
         logger.exception('Fehler bei Bildverarbeitung')
-        raise ValueError(f'Bildverarbeitung fehlgeschlagen: {str(e)}')
+        raise
+
+
+def _reencode_in_storage(bucket, file_path, original, uploaded_digest, uploaded_size, profile):
+    """Hintergrund: Bild mit `profile` neu codieren und einsetzen, wenn es kleiner ist.
+
+    Profilbilder liegen immer unter demselben Pfad. Eingesetzt wird nur, solange
+    dort noch die Datei dieses Uploads liegt (SHA-256 `uploaded_digest`) — ein
+    neuerer Upload in der Zwischenzeit bleibt stehen.
+    """
+    from supabase import create_client
+
+    # Den letzten Platz im Pool lässt die Neucodierung den Uploads
+    max_pending = current_app.config.get('IMAGE_POOL_MAX_PENDING', 4) - 1
+    try:
+        smaller = image_processing.encode(original, profile=profile, max_pending=max_pending)
+    except image_processing.ImagePoolBusy:
+        logger.info('Bild %s: Pool ausgelastet, Neucodierung entfällt', file_path)
+        return
+    if len(smaller) >= uploaded_size:
+        return
+    supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+    storage = supabase.storage.from_(bucket)
+    # Zwischen Vergleich und Ersetzen bleibt ein kurzes Fenster; ohne bedingtes
+    # Schreiben in Supabase Storage geht es nicht enger.
+    if hashlib.sha256(storage.download(file_path)).hexdigest() != uploaded_digest:
+        logger.info('Bild %s inzwischen ersetzt, Neucodierung verworfen', file_path)
+        return
+    storage.update(file_path, smaller, file_options={"content-type": "image/webp"})
+    logger.info('Bild %s neu codiert (%s): %s -> %s Bytes',
+                file_path, profile, uploaded_size, len(smaller))
 
 
 class ArtistOnboardingError(Exception):
@@ -813,6 +818,8 @@ def add_availability():
                 slots.append(create_slot(item))
         except KeyError:
             return error_response('validation_error', 'Date must be provided', 400)
+        except AvailabilityWindowError:
+            return error_response('validation_error', 'Date outside availability window', 400)
         except ValueError:
             return error_response('validation_error', 'Invalid date format', 400)
     else:
@@ -820,6 +827,8 @@ def add_availability():
             slots.append(create_slot(data))
         except KeyError:
             return error_response('validation_error', 'Date must be provided', 400)
+        except AvailabilityWindowError:
+            return error_response('validation_error', 'Date outside availability window', 400)
         except ValueError:
             return error_response('validation_error', 'Invalid date format', 400)
     return jsonify(slots), 201
@@ -868,7 +877,7 @@ def remove_availability(slot_id):
     user_id, current_artist = get_current_user()
     if not current_artist:
         return error_response('forbidden', 'Current user not linked to an artist', 403)
-    slot = Availability.query.get(slot_id)
+    slot = avail_mgr.get_slot(slot_id)
     if not slot:
         return error_response('not_found', 'Availability not found', 404)
     # permission: owner or admin
@@ -892,18 +901,33 @@ def list_my_booking_requests():
     if getattr(artist, 'approval_status', '') != 'approved':
         return error_response('forbidden', 'Artist not approved yet', 403)
     logger.debug(f"Resolved artist: id={artist.id}, supabase_user_id={artist.supabase_user_id}")
-    requests = request_mgr.get_requests_for_artist_with_recommendation(artist.id)
 
-    # Fallback-Diagnose: wenn keine empfohlenen Anfragen, hole die rohen verknüpften Requests
-    if not requests:
-        raw_reqs = request_mgr.get_requests_for_artist(artist.id)
-        logger.debug(f"Raw get_requests_for_artist returned: {[r.id for r in raw_reqs]}")
+    # Ohne limit/cursor wie bisher die ganze Liste; mit einem davon eine Seite
+    # samt Cursor der nächsten.
+    args = request.args
+    paged = bool(args.get('limit') or args.get('cursor'))
     try:
-        request_ids = [r.get('id') if isinstance(r, dict) else getattr(r, 'id', None) for r in requests]
-    except Exception:
-        request_ids = str(requests)
-    logger.debug(f"list_my_booking_requests result count={len(requests)} ids={request_ids}")
-    return jsonify(requests), 200
+        limit = int(args.get('limit') or PAGE_LIMIT_DEFAULT) if paged else None
+        date_from = date.fromisoformat(args['from']) if args.get('from') else None
+        date_to = date.fromisoformat(args['to']) if args.get('to') else None
+        cursor = args.get('cursor') or None
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return error_response('validation_error', f'Invalid query parameters: {e}', 400)
+    if limit is not None:
+        if limit < 1:
+            return error_response('validation_error', 'limit must be positive', 400)
+        limit = min(limit, PAGE_LIMIT_MAX)
+
+    requests, next_cursor = request_mgr.page_requests_for_artist(
+        artist.id, status=args.get('status') or None, date_from=date_from, date_to=date_to,
+        cursor=cursor, limit=limit,
+    )
+    logger.debug(f"list_my_booking_requests result count={len(requests)} ids={[r['id'] for r in requests]}")
+    if not paged:
+        return jsonify(requests), 200
+    return jsonify({'requests': requests, 'next_cursor': next_cursor, 'limit': limit}), 200
 
 
 
@@ -1211,7 +1235,8 @@ def upload_artist_image():
             return error_response('validation_error', 'Image type must be "profile" or "gallery"', 400)
 
         # Bild verarbeiten
-        processed_image = process_image_for_upload(image_file)
+        original = image_file.read()
+        processed_image = process_image_for_upload(io.BytesIO(original))
 
         # Supabase Storage Upload
         from supabase import create_client
@@ -1233,6 +1258,8 @@ def upload_artist_image():
             timestamp = int(datetime.utcnow().timestamp())
             file_path = f"{artist.id}/gallery/{timestamp}.webp"
 
+        uploaded = processed_image.getvalue()
+
         # Upload zu Supabase.
         # storage3 liefert eine httpx-Response zurück und wirft bei HTTP-Fehlern
         # selbst. Ein `result.error` gibt es dort nicht — der frühere Zugriff
@@ -1241,13 +1268,20 @@ def upload_artist_image():
         # "upsert" muss ein String sein, der Header wird 1:1 weitergereicht.
         supabase.storage.from_(bucket).upload(
             file_path,
-            processed_image.read(),
+            uploaded,
             file_options={
                 "content-type": "image/webp",
                 "upsert": "true" if image_type == 'profile' else "false",
             }
         )
 
+        # Kleinere Fassung später im Hintergrund nachschieben
+        reencode = current_app.config.get('IMAGE_REENCODE_PROFILE')
+        if reencode and reencode != current_app.config.get('IMAGE_UPLOAD_PROFILE'):
+            # Stapel-Thread: nicht vor der Preisberechnung neuer Anfragen
+            background.submit_batch(_reencode_in_storage, bucket, file_path, original,
+                                    hashlib.sha256(uploaded).hexdigest(), len(uploaded), reencode)
+
         # Public URL generieren
         public_url = supabase.storage.from_(bucket).get_public_url(file_path)
 
@@ -1274,6 +1308,12 @@ def upload_artist_image():
             'message': f'{image_type.title()} image uploaded and processed successfully'
         }), 200
 
+    except image_processing.ImagePoolBusy:
+        resp, status = error_response('busy', 'Too many images in progress. Try again shortly.', 503)
+        resp.headers['Retry-After'] = '5'
+        return resp, status
+    except image_processing.ImageTimeout:
+        return error_response('timeout', 'Image processing took too long', 504)
     except ValueError as e:
         return error_response('validation_error', str(e), 400)
     except Exception as e:
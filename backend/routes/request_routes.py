@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
+import json
+
 from flask import Blueprint, request, jsonify
 from helpers.clerk_auth import (
     admin_required,
@@ -7,24 +11,26 @@ from helpers.clerk_auth import (
     get_current_artist,
     is_admin,
 )
-from services.calculate_price import calculate_price, requires_individual_offer
+from services.calculate_price import city_discount, team_size_to_people
+from services.geo import geocode_address_cascade
 from flask import current_app
+from datetime import date
 from models import db, Artist, BookingRequest
 from flasgger import swag_from
 
 from helpers.http_responses import error_response
-from helpers.emails import (
-    build_admin_new_request_email,
-    build_artist_new_request_email,
-    event_city,
-    format_event_date,
-    is_deliverable_address,
-    send_email,
-)
+from helpers.emails import notify_new_request
 
-from managers.booking_requests_manager import BookingRequestManager
+from managers.booking_requests_manager import (
+    BookingRequestManager,
+    normalize_event_type,
+    PRICE_STATUS_PENDING,
+    PRICE_STATUS_RANGE,
+)
 from managers.artist_manager import ArtistManager
-from helpers import shared_store
+from helpers import background, idempotency, rate_limit, shared_store
+from helpers.rate_limit import too_many_requests
+from cron_jobs.pending_prices import finish_pending_request
 
 # Manager-Instanzen
 request_mgr = BookingRequestManager()
@@ -36,62 +42,142 @@ Booking module: Endpoints to create, list and manage booking requests.
 
 # --- Missbrauchsschutz der oeffentlichen Anfrage-Route -------------------------
 #
-# Beide Werte liegen im geteilten Store (`helpers/shared_store`), nicht mehr im
-# Prozessspeicher. Auf einem dauerhaft laufenden Server war das gleichwertig; in
-# einer Serverless-Umgebung ist jeder Aufruf potenziell eine neue Instanz, und
-# ein prozesslokaler Zaehler schuetzt dort gar nicht mehr.
-_RATE_LIMIT_WINDOW_SECONDS = 3600  # 1 hour
-_RATE_LIMIT_MAX_REQUESTS = 5       # 5 requests/hour per IP
-_IDEMPOTENCY_TTL_SECONDS = 3600
+# Rate-Limit (Policies 'booking' und 'quote' in `helpers/rate_limit`) und
+# Idempotency-Keys (`helpers/idempotency`) liegen im geteilten Store
+# (`helpers/shared_store`), nicht mehr im Prozessspeicher. Auf einem dauerhaft
+# laufenden Server war das gleichwertig; in einer Serverless-Umgebung ist jeder
+# Aufruf potenziell eine neue Instanz, und ein prozesslokaler Zaehler schuetzt
+# dort gar nicht mehr.
+#
+# So lange wartet ein zweiter Aufruf mit demselben Idempotency-Key auf die
+# Antwort des ersten, bevor er mit 409 aufgibt.
+_IDEMPOTENCY_WAIT_SECONDS = 10
+
+# Preisauskunft ohne Anlage (POST /quote). Der Buchungs-Wizard fragt bei jeder
+# Feldänderung neu; gleiche Eingaben innerhalb von zwei Minuten kommen aus dem
+# Store statt aus DB und Geocoder. Das Limit ist entsprechend großzügiger als
+# das für echte Anfragen und schützt vor allem den Geocoder.
+_QUOTE_TTL_SECONDS = 120
+# Rasterweite der Event-Koordinate im Cache-Schlüssel: 0,01° sind gut ein
+# Kilometer. Adressen im selben Raster teilen sich die Auskunft; die
+# Anfahrt weicht dabei um höchstens rund einen Euro je Artist ab.
+_QUOTE_GEOCELL_DECIMALS = 2
+
+
+def _rate_limit_and_claim(ip: str, idem_key: str | None):
+    """Rate-Limit zählen und den Idempotency-Key beanspruchen.
+
+    Beides in einem Round-Trip zum geteilten Store statt in zweien.
+    Rückgabe: (`rate_limit.Decision`, `idempotency.Claim` oder None ohne Key).
+    """
+    pipe = shared_store.pipeline()
+    decide = rate_limit.hit_in(pipe, "booking", f"ip:{ip}")
+    claim_of = idempotency.claim_in(pipe, "booking", idem_key) if idem_key else None
+    results = pipe.execute()
+    return decide(results), (claim_of(results) if claim_of else None)
 
 
-def _client_ip() -> str:
-    """Best-effort client IP extraction (respects X-Forwarded-For)."""
-    xff = request.headers.get('X-Forwarded-For')
-    if xff:
-        return xff.split(',')[0].strip()
-    return request.remote_addr or 'unknown'
+# --- 80/20 constants & helpers -------------------------------------------------
+MAX_MATCHED_ARTISTS = 5
 
+# Wie lange ein Client warten soll, bevor er eine noch offene Preisauskunft
+# erneut abfragt (Retry-After).
+_PRICE_POLL_SECONDS = 2
 
-def _rate_limit_allow(ip: str) -> bool:
-    """True, solange die IP im laufenden Fenster unter dem Limit liegt.
 
-    Gezaehlt wird hochlaufend mit fester Ablaufzeit statt mit einer Liste von
-    Zeitstempeln: ein Zaehler ist im geteilten Store eine einzige atomare
-    Operation, eine Liste waere ein Lesen-Aendern-Schreiben mit Wettlauf.
-    """
-    count = shared_store.incr_with_ttl(
-        f"ratelimit:booking:{ip}", _RATE_LIMIT_WINDOW_SECONDS
-    )
-    return count <= _RATE_LIMIT_MAX_REQUESTS
+def _wants_async_pricing() -> bool:
+    """Preis im Hintergrund rechnen? Per Config für alle oder per Header je Anfrage.
 
+    `Prefer: respond-async` (RFC 7240) erlaubt neuen Clients den Umstieg, ohne
+    dass bestehende, die den Preis in der Antwort erwarten, etwas merken.
+    """
+    if current_app.config.get('ASYNC_PRICING'):
+        return True
+    prefer = request.headers.get('Prefer', '')
+    return 'respond-async' in prefer.lower()
 
-def _idempotency_lookup(key: str):
-    """Zwischengespeicherte Antwort zu einem Idempotency-Key, sonst None."""
-    if not key:
-        return None
-    return shared_store.get_json(f"idem:booking:{key}")
 
+def _match_artists(disciplines, event_date, event_address):
+    """Passende Artists für Disziplin und Datum, optional nur im Umkreis.
 
-def _idempotency_store(key: str, payload: dict) -> None:
-    if not key:
-        return
-    shared_store.set_json(f"idem:booking:{key}", payload, _IDEMPOTENCY_TTL_SECONDS)
+    Mit `MATCH_RADIUS_KM` werden nur Artists im Umkreis des Events geladen,
+    statt alle passenden und die Entfernung erst danach zu rechnen. Artists
+    ohne Koordinaten fallen dabei heraus. Im asynchronen Modus und wenn die
+    Event-Adresse nicht auflösbar ist, bleibt es beim Abgleich ohne Umkreis —
+    dort soll die Antwort nicht auf den Geocoder warten.
+    """
+    radius_km = current_app.config.get('MATCH_RADIUS_KM')
+    if radius_km and not _wants_async_pricing():
+        event_coord, _ = geocode_address_cascade(event_address)
+        if event_coord:
+            return [
+                a for a, _ in artist_mgr.get_available_artists_within(
+                    disciplines, event_date, event_coord, radius_km
+                )
+            ]
+    return artist_mgr.get_artists_by_discipline(disciplines, event_date) or []
+
+
+def _price_token(request_id: int) -> str:
+    """Zugangsschlüssel zur Preisauskunft einer Anfrage.
+
+    Die IDs sind fortlaufend. Ohne Schlüssel könnte jeder die Preise fremder
+    Anfragen durchzählen; so kennt ihn nur, wer die Anfrage angelegt hat.
+    """
+    secret = str(current_app.config.get('SECRET_KEY') or '').encode()
+    return hmac.new(secret, f"price:{request_id}".encode(), hashlib.sha256).hexdigest()[:32]
 
 
-# --- 80/20 constants & helpers -------------------------------------------------
-MAX_MATCHED_ARTISTS = 5
+def _stored_quote(req: BookingRequest) -> dict:
+    """Preisauskunft aus den Spalten der Anfrage, ohne neu zu rechnen."""
+    return {
+        'price_min': req.price_min,
+        'price_max': req.price_max,
+        'price_status': req.price_status,
+        'price_reason': req.price_reason,
+        'duo_min': None,
+        'duo_max': None,
+    }
 
-# Zustand der Preisauskunft in der API-Antwort (SPEC-3, Kriterien 1, 3, 6)
-PRICE_STATUS_RANGE = 'range'            # price_min/price_max sind gesetzt
-PRICE_STATUS_INDIVIDUAL = 'individual_offer'  # bewusst kein automatischer Preis
-PRICE_STATUS_UNAVAILABLE = 'unavailable'      # Preis konnte nicht ermittelt werden
 
-def _config_fee_pct():
-    try:
-        return float(current_app.config.get("AGENCY_FEE_PERCENT", 20))
-    except Exception:
-        return 20.0
+def _price_payload(req: BookingRequest, artist_objs, distances: dict, quote: dict) -> dict:
+    """Antwort mit Preisauskunft, gemeinsam für POST /requests und die Abfrage."""
+    team_size = team_size_to_people(req.team_size)
+    matched_payload = [
+        {
+            "id": getattr(a, 'id', None),
+            "name": getattr(a, 'name', None),
+            "price_min": getattr(a, 'price_min', None),
+            "price_max": getattr(a, 'price_max', None),
+            "distance_km": distances.get(getattr(a, 'id', None)),
+        }
+        for a in artist_objs[:MAX_MATCHED_ARTISTS]
+    ]
+    resp = {
+        'request_id': req.id,
+        'price_min': quote['price_min'],
+        'price_max': quote['price_max'],
+        # Damit das Frontend die Fälle unterscheiden kann, ohne auf
+        # null-Preise zu raten (SPEC-3, Kriterien 1, 6, 7).
+        'price_status': quote['price_status'],
+        'price_reason': quote['price_reason'],
+        'currency': 'EUR',
+        'num_available_artists': len(artist_objs),
+        'matched_artists': matched_payload,
+    }
+    # Duo-Zusatzpreise nur dann mitsenden, wenn tatsächlich >= 2 Artists vorhanden
+    if (team_size == 2 and len(artist_objs) >= 2
+            and quote.get('duo_min') is not None and quote.get('duo_max') is not None):
+        resp['duo_price_min'] = quote['duo_min']
+        resp['duo_price_max'] = quote['duo_max']
+    # Gruppe: Flag setzen, keine Preise (bleibt für bestehende Clients erhalten)
+    if quote['price_reason'] == 'group':
+        resp['group_pricing_pending'] = True
+    if quote['price_status'] == PRICE_STATUS_PENDING:
+        resp['price_url'] = (
+            f"/api/requests/requests/{req.id}/price?token={_price_token(req.id)}"
+        )
+    return resp
 
 REQUIRED_REQUEST_FIELDS = (
     "client_name",
@@ -104,6 +190,74 @@ REQUIRED_REQUEST_FIELDS = (
     "event_address",
 )
 
+QUOTE_REQUIRED_FIELDS = (
+    "event_date",
+    "duration_minutes",
+    "event_type",
+    "number_of_guests",
+    "event_address",
+)
+
+
+def _parse_team_size(raw):
+    """Zahl oder 'solo'/'duo'/'gruppe' -> Personenzahl; ValueError sonst."""
+    if isinstance(raw, str):
+        ts_lower = raw.strip().lower()
+        if ts_lower == 'solo':
+            return 1
+        if ts_lower == 'duo':
+            return 2
+        if ts_lower in ('group', 'gruppe'):
+            return 3
+        return int(raw)
+    return raw
+
+
+def _parse_target_ids(raw):
+    """target_artist_ids prüfen. Rückgabe (ids oder None, Fehlermeldung oder None)."""
+    if raw is None:
+        return None, None
+    if not isinstance(raw, list):
+        return None, "target_artist_ids must be a list of integers"
+    try:
+        target_ids = [int(x) for x in raw]
+    except Exception:
+        return None, "target_artist_ids must be integers"
+    if len(target_ids) == 0:
+        return None, "target_artist_ids cannot be empty"
+    if len(target_ids) > MAX_MATCHED_ARTISTS:
+        return None, f"Too many target artists (max {MAX_MATCHED_ARTISTS})"
+    return target_ids, None
+
+
+def _quote_cache_key(disciplines, event_date, event_coord, event_address, team_size,
+                     duration, event_type, guests, flags, target_ids) -> str:
+    """Schlüssel der Preisauskunft aus den normalisierten Eingaben.
+
+    Statt der Adresse steht das Raster der Event-Koordinate darin, damit
+    Tippvarianten derselben Adresse denselben Eintrag treffen. Der Ortsrabatt
+    hängt dagegen am Adresstext und geht deshalb getrennt ein.
+    """
+    if event_coord:
+        place = [round(float(c), _QUOTE_GEOCELL_DECIMALS) for c in event_coord]
+    else:
+        place = " ".join(str(event_address).lower().split())
+    parts = [
+        sorted({str(d).strip().lower() for d in disciplines}),
+        str(event_date),
+        place,
+        city_discount(event_address),
+        team_size,
+        duration,
+        event_type,
+        guests,
+        flags,
+        sorted(target_ids) if target_ids is not None else None,
+    ]
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f"quote:{digest[:40]}"
+
+
 def validate_create_request_payload(data: dict) -> tuple[bool, str | None]:
     """Lightweight validation for create_request payload. Returns (ok, error_message)."""
     if not isinstance(data, dict):
@@ -149,10 +303,14 @@ def debug_matching():
 
     Gibt Namen, Disziplinen und Verfuegbarkeiten aller freigegebenen Artists aus.
     Das ist zur Fehlersuche nuetzlich, aber nichts fuer die Oeffentlichkeit —
-    deshalb nur fuer Admins.
+    deshalb nur fuer Admins. `total_availability_days` zaehlt die freien Tage
+    der naechsten DEFAULT_DAYS_AHEAD Tage, in beiden AVAILABILITY_MODE.
     """
-    from models import Artist, Discipline, Availability
-    from datetime import date as _date
+    from models import Artist
+    from datetime import date as _date, timedelta
+    from managers.availability_manager import (
+        DEFAULT_DAYS_AHEAD, AvailabilityManager, availability_mode,
+    )
 
     test_date = request.args.get('date', '2026-06-15')
     test_disc = request.args.get('discipline', 'Zauberer')
@@ -164,17 +322,23 @@ def debug_matching():
 
     # 1) All approved artists
     approved = Artist.query.filter_by(approval_status='approved').all()
+    # Über den Manager, nicht direkt `availabilities`: Im Modus 'exceptions'
+    # steht dort nichts, verfügbar ist alles außer den gesperrten Tagen.
+    avail_mgr = AvailabilityManager()
+    ids = [a.id for a in approved]
+    today = _date.today()
+    horizon = avail_mgr.availability_runs(today, today + timedelta(days=DEFAULT_DAYS_AHEAD - 1), ids)
+    on_date = avail_mgr.availability_runs(event_date, event_date, ids)
     approved_info = []
     for a in approved:
         discs = [d.name for d in a.disciplines]
-        avail_count = Availability.query.filter_by(artist_id=a.id).count()
-        has_date = Availability.query.filter_by(artist_id=a.id, date=event_date).first() is not None
+        avail_count = sum((b - f).days + 1 for f, b in horizon.get(a.id, []))
         approved_info.append({
             "id": a.id,
             "name": a.name,
             "disciplines": discs,
             "total_availability_days": avail_count,
-            "has_availability_for_date": has_date,
+            "has_availability_for_date": bool(on_date.get(a.id)),
         })
 
     # 2) Matching result
@@ -183,6 +347,7 @@ def debug_matching():
     return jsonify({
         "test_date": test_date,
         "test_discipline": test_disc,
+        "availability_mode": availability_mode(),
         "approved_artists": approved_info,
         "matched_artists": [{"id": a.id, "name": a.name} for a in (matched or [])],
         "diagnosis": (
@@ -234,6 +399,121 @@ def list_requests_admin():
         "status": status,
     })
 
+
+def _create_request(data: dict, claim: "idempotency.Claim | None"):
+    """Anfrage prüfen, anlegen und bepreisen; `claim` hält den Idempotency-Key."""
+    # --- Validation
+    ok, err = validate_create_request_payload(data)
+    if not ok:
+        return error_response("validation_error", err, 400)
+
+    # Team-Größe normalisieren: Zahlen oder Strings wie "solo"/"duo" akzeptieren
+    try:
+        team_size = _parse_team_size(data.get('team_size'))
+    except ValueError:
+        return error_response("validation_error", "Invalid team_size", 400)
+
+    # Disciplines normalization and validation
+    raw_disc = data.get('disciplines')
+    if raw_disc is None:
+        disciplines = []
+    elif isinstance(raw_disc, list):
+        disciplines = raw_disc
+    else:
+        return error_response("validation_error", "disciplines must be a list", 400)
+
+    # Optional: direct targeting of specific artists via IDs
+    target_ids, err = _parse_target_ids(data.get('target_artist_ids'))
+    if err:
+        return error_response("validation_error", err, 400)
+
+    event_date = data['event_date']  # will raise KeyError if missing
+
+    # Choose artist set: either explicitly targeted artists or recommendation by discipline/date
+    if target_ids is not None:
+        artist_objs = Artist.query.filter(Artist.id.in_(target_ids)).all()
+        if len(artist_objs) != len(target_ids):
+            return error_response("not_found", "One or more target artists not found", 404)
+    else:
+        current_app.logger.info(f"[BOOKING] Matching artists for disciplines={disciplines}, event_date={event_date}")
+        artist_objs = _match_artists(disciplines, event_date, data['event_address'])
+        current_app.logger.info(f"[BOOKING] Matched {len(artist_objs)} artists before approval filter: {[a.id for a in artist_objs]}")
+
+    # Filter only approved artists
+    artist_objs = [a for a in artist_objs if str(getattr(a, 'approval_status', '')).lower() == 'approved']
+    current_app.logger.info(f"[BOOKING] After approval filter: {len(artist_objs)} artists: {[(a.id, a.name) for a in artist_objs]}")
+    if target_ids is not None and not artist_objs:
+        return error_response("forbidden", "No approved target artists available", 403)
+    # Mit asynchroner Preisberechnung wird die Anfrage sofort gespeichert;
+    # Geocoding, Entfernungen und Preis folgen im Hintergrund. Die Antwort
+    # hängt dann nicht mehr davon ab, wie kalt der Geocoder gerade ist.
+    defer_pricing = _wants_async_pricing()
+    req = request_mgr.create_request(
+        client_name       = data['client_name'],
+        client_email      = data['client_email'],
+        event_date        = data['event_date'],
+        event_time        = data['event_time'],
+        duration_minutes  = data['duration_minutes'],
+        event_type        = data['event_type'],
+        show_type         = data.get('show_type'),
+        show_discipline   = disciplines,
+        team_size         = team_size,
+        number_of_guests  = data['number_of_guests'],
+        event_address     = data['event_address'],
+        is_indoor         = data.get('is_indoor', False),
+        special_requests  = data.get('special_requests', ''),
+        needs_light       = data.get('needs_light', False),
+        needs_sound       = data.get('needs_sound', False),
+        artists           = artist_objs,
+        # distance_km kommt bewusst NICHT vom Client — der Manager berechnet
+        # sie aus Event-Adresse und Artist-Koordinaten (SPEC-2, Kriterium 6).
+        newsletter_opt_in = data.get('newsletter_opt_in', False),
+        client_phone      = data.get('client_phone'),
+        client_company    = data.get('client_company'),
+        budget_range      = data.get('budget_range'),
+        planning_status   = data.get('planning_status'),
+        location_details  = data.get('location_details'),
+        needs_stage_floor = data.get('needs_stage_floor', False),
+        needs_rigging     = data.get('needs_rigging', False),
+        defer_pricing     = defer_pricing,
+    )
+
+    if defer_pricing:
+        background.submit(finish_pending_request, req.id)
+        resp = _price_payload(req, artist_objs, {}, _stored_quote(req))
+        status_code = 202
+    else:
+        # Einzelentfernungen Artist <-> Event. Sie hängen an der frisch
+        # angelegten Anfrage und sind die Grundlage für den Preis je Artist.
+        distances = getattr(req, '_artist_distances', {}) or {}
+        artist_objs = request_mgr.sort_by_distance(artist_objs, distances)
+        quote = request_mgr.quote(req, artist_objs, team_size, distances)
+
+        # In die DB schreiben, zusammen mit den Mails in der Outbox
+        req.price_min = quote['price_min']
+        req.price_max = quote['price_max']
+        req.price_status = quote['price_status']
+        req.price_reason = quote['price_reason']
+        notify_new_request(req, artist_objs)
+        db.session.commit()
+        resp = _price_payload(req, artist_objs, distances, quote)
+        status_code = 201
+
+    location_value = f"/api/requests/requests/{req.id}"
+    resp["_location"] = location_value  # internal for idempotent replays
+
+    # Antwort für Wiederholungen mit demselben Idempotency-Key ablegen
+    if claim is not None:
+        claim.complete(resp)
+
+    response = jsonify(resp)
+    response.status_code = status_code
+    response.headers["Location"] = location_value
+    if claim is not None:
+        response.headers["Idempotent-Replay"] = "false"
+    return response
+
+
 # kein Login erforderlich!
 @booking_bp.route('/requests', methods=['POST'])
 @swag_from('../resources/swagger/requests_post.yml')
@@ -243,301 +523,172 @@ def create_request():
         data = request.get_json(force=True)
         current_app.logger.debug("create_request payload: %s", data)
 
-        # --- Simple per-IP rate limiting (5 req/hour)
-        ip = _client_ip()
-        if not _rate_limit_allow(ip):
-            return error_response("rate_limited", "Too many requests. Try again later.", 429)
-
-        # --- Idempotency-Key support (prevent duplicate creations on reload)
+        # --- Per-IP rate limiting (policy 'booking': 5/hour) and Idempotency-Key
+        # claim (prevent duplicate creations on reload or double click), one
+        # store round trip
         idem_key = request.headers.get('Idempotency-Key')
-        cached = _idempotency_lookup(idem_key) if idem_key else None
-        if cached is not None:
+        decision, claim = _rate_limit_and_claim(rate_limit.client_ip(), idem_key)
+        if not decision.allowed:
+            if claim is not None:
+                claim.release()
+            return too_many_requests(decision)
+
+        if claim is not None and claim.busy:
+            # Derselbe Key läuft gerade (Doppelklick): auf dessen Antwort warten
+            claim = idempotency.wait(claim, _IDEMPOTENCY_WAIT_SECONDS)
+            if claim.busy:
+                resp, status = error_response(
+                    "request_in_progress",
+                    "A request with this Idempotency-Key is still being processed.", 409)
+                resp.headers["Retry-After"] = str(_PRICE_POLL_SECONDS)
+                return resp, status
+
+        if claim is not None and claim.replay is not None:
+            cached = claim.replay
             resp = jsonify(cached)
-            resp.status_code = 201
+            resp.status_code = 202 if cached.get('price_status') == PRICE_STATUS_PENDING else 201
             resp.headers["Location"] = cached.get("_location", "")
             resp.headers["Idempotent-Replay"] = "true"
             return resp
 
-        # --- Validation
-        ok, err = validate_create_request_payload(data)
-        if not ok:
-            return error_response("validation_error", err, 400)
+        try:
+            return _create_request(data, claim)
+        finally:
+            # Ohne abgelegte Antwort (Validierungsfehler, Ausnahme) ist der Key
+            # wieder frei; nach `complete()` ohne Wirkung.
+            if claim is not None:
+                claim.release()
 
-        # Team-Größe normalisieren: Zahlen oder Strings wie "solo"/"duo" akzeptieren
-        raw_team_size = data.get('team_size')
-        if isinstance(raw_team_size, str):
-            ts_lower = raw_team_size.strip().lower()
-            if ts_lower == 'solo':
-                team_size = 1
-            elif ts_lower == 'duo':
-                team_size = 2
-            elif ts_lower in ('group', 'gruppe'):
-                team_size = 3
-            else:
-                try:
-                    team_size = int(raw_team_size)
-                except ValueError:
-                    return error_response("validation_error", "Invalid team_size", 400)
-        else:
-            team_size = raw_team_size
-
-        # Disciplines normalization and validation
-        raw_disc = data.get('disciplines')
-        if raw_disc is None:
-            disciplines = []
-        elif isinstance(raw_disc, list):
-            disciplines = raw_disc
-        else:
+    except KeyError as ke:
+        current_app.logger.warning("Missing field in create_request: %s", ke)
+        return error_response("missing_field", f"Missing field: {str(ke)}", 400)
+    except Exception as e:
+        current_app.logger.exception("Error in create_request")
+        return error_response("internal_error", f"create_request failed: {str(e)}", 500)
+
+
+# kein Login erforderlich!
+@booking_bp.route('/quote', methods=['POST'])
+@swag_from('../resources/swagger/requests_quote_post.yml')
+def quote_request():
+    """Preisauskunft ohne Anlage einer Anfrage (Dry-Run).
+
+    Nimmt dieselben Felder wie POST /requests (Kundendaten und Uhrzeit sind
+    nicht nötig) und rechnet Matching, Entfernungen und Preis genauso — es
+    wird aber nichts gespeichert und niemand benachrichtigt. Gleiche
+    Eingaben kommen für kurze Zeit aus dem Cache (`X-Quote-Cache: hit`).
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return error_response("validation_error", "payload must be a JSON object", 400)
+
+        decision = rate_limit.hit("quote")
+        if not decision.allowed:
+            return too_many_requests(decision)
+
+        for k in QUOTE_REQUIRED_FIELDS:
+            if data.get(k) in (None, ""):
+                return error_response("validation_error", f"missing field: {k}", 400)
+        try:
+            duration = int(data['duration_minutes'])
+            guests = int(data['number_of_guests'])
+            team_size = _parse_team_size(data.get('team_size'))
+            event_date = date.fromisoformat(str(data['event_date']))
+            event_type = normalize_event_type(data['event_type'])
+        except (TypeError, ValueError) as e:
+            return error_response("validation_error", str(e), 400)
+
+        disciplines = data.get('disciplines') or []
+        if not isinstance(disciplines, list):
             return error_response("validation_error", "disciplines must be a list", 400)
+        target_ids, err = _parse_target_ids(data.get('target_artist_ids'))
+        if err:
+            return error_response("validation_error", err, 400)
+
+        flags = {
+            'is_indoor': bool(data.get('is_indoor', False)),
+            'needs_light': bool(data.get('needs_light', False)),
+            'needs_sound': bool(data.get('needs_sound', False)),
+        }
+        event_address = data['event_address']
+        # Meist ein Treffer im Geocode-Cache; die Koordinate wird unten
+        # weitergereicht, damit der Manager nicht noch einmal sucht.
+        event_coord, _ = geocode_address_cascade(event_address)
+
+        cache_key = _quote_cache_key(
+            disciplines, event_date, event_coord, event_address,
+            team_size_to_people(team_size), duration, event_type, guests, flags, target_ids,
+        )
+        cached = shared_store.get_json(cache_key, near_ttl=_QUOTE_TTL_SECONDS)
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers["X-Quote-Cache"] = "hit"
+            return response
 
-        # Optional: direct targeting of specific artists via IDs
-        raw_target_ids = data.get('target_artist_ids')
-        target_ids = None
-        if raw_target_ids is not None:
-            if not isinstance(raw_target_ids, list):
-                return error_response("validation_error", "target_artist_ids must be a list of integers", 400)
-            try:
-                target_ids = [int(x) for x in raw_target_ids]
-            except Exception:
-                return error_response("validation_error", "target_artist_ids must be integers", 400)
-            if len(target_ids) == 0:
-                return error_response("validation_error", "target_artist_ids cannot be empty", 400)
-            if len(target_ids) > MAX_MATCHED_ARTISTS:
-                return error_response("validation_error", f"Too many target artists (max {MAX_MATCHED_ARTISTS})", 400)
-
-        event_date = data['event_date']  # will raise KeyError if missing
-
-        # Choose artist set: either explicitly targeted artists or recommendation by discipline/date
         if target_ids is not None:
             artist_objs = Artist.query.filter(Artist.id.in_(target_ids)).all()
             if len(artist_objs) != len(target_ids):
                 return error_response("not_found", "One or more target artists not found", 404)
         else:
-            current_app.logger.info(f"[BOOKING] Matching artists for disciplines={disciplines}, event_date={event_date}")
-            artist_objs = artist_mgr.get_artists_by_discipline(disciplines, event_date) or []
-            current_app.logger.info(f"[BOOKING] Matched {len(artist_objs)} artists before approval filter: {[a.id for a in artist_objs]}")
-
-        # Filter only approved artists
+            artist_objs = _match_artists(disciplines, event_date, event_address)
         artist_objs = [a for a in artist_objs if str(getattr(a, 'approval_status', '')).lower() == 'approved']
-        current_app.logger.info(f"[BOOKING] After approval filter: {len(artist_objs)} artists: {[(a.id, a.name) for a in artist_objs]}")
-        if target_ids is not None and not artist_objs:
-            return error_response("forbidden", "No approved target artists available", 403)
-        req = request_mgr.create_request(
-            client_name       = data['client_name'],
-            client_email      = data['client_email'],
-            event_date        = data['event_date'],
-            event_time        = data['event_time'],
-            duration_minutes  = data['duration_minutes'],
-            event_type        = data['event_type'],
-            show_type         = data.get('show_type'),
+
+        req, artist_objs, distances, quote = request_mgr.preview(
+            event_date        = event_date,
+            duration_minutes  = duration,
+            event_type        = event_type,
             show_discipline   = disciplines,
             team_size         = team_size,
-            number_of_guests  = data['number_of_guests'],
-            event_address     = data['event_address'],
-            is_indoor         = data.get('is_indoor', False),
-            special_requests  = data.get('special_requests', ''),
-            needs_light       = data.get('needs_light', False),
-            needs_sound       = data.get('needs_sound', False),
+            number_of_guests  = guests,
+            event_address     = event_address,
             artists           = artist_objs,
-            # distance_km kommt bewusst NICHT vom Client — der Manager berechnet
-            # sie aus Event-Adresse und Artist-Koordinaten (SPEC-2, Kriterium 6).
-            newsletter_opt_in = data.get('newsletter_opt_in', False),
-            client_phone      = data.get('client_phone'),
-            client_company    = data.get('client_company'),
-            budget_range      = data.get('budget_range'),
-            planning_status   = data.get('planning_status'),
-            location_details  = data.get('location_details'),
-            needs_stage_floor = data.get('needs_stage_floor', False),
-            needs_rigging     = data.get('needs_rigging', False)
+            event_coord       = event_coord,
+            **flags,
         )
+        resp = _price_payload(req, artist_objs, distances, quote)
+        resp.pop('request_id', None)
+        shared_store.set_json(cache_key, resp, _QUOTE_TTL_SECONDS, near_ttl=_QUOTE_TTL_SECONDS)
 
-        # Einzelentfernungen Artist <-> Event. Sie hängen an der frisch
-        # angelegten Anfrage und sind die Grundlage für den Preis je Artist.
-        distances = getattr(req, '_artist_distances', {}) or {}
-        # Der nächstgelegene zuerst: er ist die wahrscheinliche Besetzung, und
-        # bei einem Duo bestimmt die Reihenfolge, welche zwei gerechnet werden.
-        # Ohne bekannte Entfernung ans Ende, statt sie als null zu behandeln.
-        artist_objs.sort(key=lambda a: distances.get(getattr(a, 'id', None), float('inf')))
-        matched_payload = [
-            {
-                "id": getattr(a, 'id', None),
-                "name": getattr(a, 'name', None),
-                "price_min": getattr(a, 'price_min', None),
-                "price_max": getattr(a, 'price_max', None),
-                "distance_km": distances.get(getattr(a, 'id', None)),
-            }
-            for a in artist_objs[:MAX_MATCHED_ARTISTS]
-        ]
-
-        # Preisspanne berechnen basierend auf ausgewählten Artists und Parametern
-        duo_min = duo_max = None
-        pmin = pmax = None
-        price_status = PRICE_STATUS_RANGE
-        price_reason = None
-
-        # Sonderfälle zuerst: ohne sie wäre jede Zahl geraten (SPEC-3, Kriterien 3 & 6)
-        individual_reason = requires_individual_offer(req.duration_minutes, team_size)
-
-        if not req.artists:
-            price_status = PRICE_STATUS_UNAVAILABLE
-            price_reason = 'no_artists'
-            req.price_min = None
-            req.price_max = None
-        elif individual_reason:
-            price_status = PRICE_STATUS_INDIVIDUAL
-            price_reason = individual_reason
-            req.price_min = None
-            req.price_max = None
-        else:
-            fee_pct = _config_fee_pct()
-
-            # Die Anfahrt hängt am einzelnen Artist, nicht an der Anfrage. Ein
-            # Artist ohne auflösbare Adresse taucht in `distances` nicht auf; für
-            # ihn wird die Anreise mit 0 angesetzt, sonst würde eine fehlende
-            # Adresse den Preis nach oben verzerren.
-            def leg(artist) -> float:
-                return float(distances.get(getattr(artist, 'id', None), 0.0))
-
-            # Alles, was für jede Besetzung gleich ist. Was je Artist
-            # unterschiedlich ist (Gage, Anfahrt), kommt pro Aufruf dazu.
-            common = dict(
-                fee_pct         = fee_pct,
-                newsletter      = req.newsletter_opt_in,
-                event_type      = req.event_type,
-                num_guests      = req.number_of_guests,
-                is_weekend      = req.event_date.weekday() >= 5,
-                is_indoor       = req.is_indoor,
-                needs_light     = req.needs_light,
-                needs_sound     = req.needs_sound,
-                show_discipline = req.show_discipline,
-                duration        = req.duration_minutes,
-                event_address   = req.event_address,
-                distance_km     = 0,
-            )
-
-            try:
-                if team_size == 2:
-                    # Duo: die zwei nächstgelegenen Artists, jeder mit seiner
-                    # eigenen Gage und seiner eigenen Anreise.
-                    if len(artist_objs) >= 2:
-                        pair = artist_objs[:2]
-                        duo_min = sum(getattr(a, 'price_min', 0) for a in pair)
-                        duo_max = sum(getattr(a, 'price_max', 0) for a in pair)
-                        pmin, pmax = calculate_price(
-                            base_min  = duo_min,
-                            base_max  = duo_max,
-                            distances = [leg(a) for a in pair],
-                            team_count = 2,
-                            **common,
-                        )
-                    else:
-                        price_status = PRICE_STATUS_UNAVAILABLE
-                        price_reason = 'not_enough_artists'
-                else:
-                    # Solo: jeder Artist wird für sich durchgerechnet, mit seiner
-                    # Gage und seiner Anreise. Die angezeigte Spanne ist die
-                    # Hülle dieser Einzelpreise. Vorher lief eine Sammelspanne
-                    # aus dem billigsten Minimum und dem teuersten Maximum durch
-                    # die Rechnung — eine Kombination, die kein Artist anbietet.
-                    per_artist = [
-                        calculate_price(
-                            base_min  = a.price_min,
-                            base_max  = a.price_max,
-                            distances = [leg(a)],
-                            team_count = 1,
-                            **common,
-                        )
-                        for a in artist_objs
-                    ]
-                    pmin = min(p[0] for p in per_artist)
-                    pmax = max(p[1] for p in per_artist)
-            except Exception as e:
-                current_app.logger.exception("calculate_price failed: %s", e)
-                pmin = pmax = None
-                price_status = PRICE_STATUS_UNAVAILABLE
-                price_reason = 'calculation_failed'
-
-            # In die DB schreiben
-            req.price_min = pmin
-            req.price_max = pmax
-        db.session.commit()
+        response = jsonify(resp)
+        response.headers["X-Quote-Cache"] = "miss"
+        return response
+    except Exception:
+        current_app.logger.exception("Error in quote_request")
+        return error_response("internal_error", "quote failed", 500)
 
-        # --- Notify matched artists via email (first simple version) ---
-        try:
-            date_str = format_event_date(req.event_date)
-            city = event_city(req.event_address)
-            subject = f"Neue Booking-Anfrage – {date_str}{', ' + city if city else ''}"
-
-            for artist in artist_objs:
-                # Platzhalter-Adressen (…@clerk.placeholder) sind nicht zustellbar
-                # und würden den Versand nur mit Fehlern fluten.
-                if not is_deliverable_address(getattr(artist, 'email', None)):
-                    current_app.logger.warning(
-                        "Skipping email for artist %s – no deliverable address on record",
-                        getattr(artist, 'id', '?'),
-                    )
-                    continue
-
-                html = build_artist_new_request_email(artist, req)
-                send_email(artist.email, subject, html)
-        except Exception as e:
-            # Do not fail the API if email sending has issues; just log it.
-            current_app.logger.exception(f"Error while sending artist notification emails: {e}")
-
-        # Send admin notification email
-        try:
-            admin_email = current_app.config.get('ADMIN_EMAIL')
-            if admin_email:
-                admin_subject = f"[Pepe Shows] Neue Buchungsanfrage #{req.id}"
-                admin_html = build_admin_new_request_email(req)
-                send_email(admin_email, admin_subject, admin_html)
-                current_app.logger.info(f"Admin notification sent for request {req.id} to {admin_email}")
-            else:
-                current_app.logger.warning("Admin email notification skipped - ADMIN_EMAIL not configured")
-        except Exception as e:
-            # Do not fail the API if admin email sending has issues; just log it.
-            current_app.logger.exception(f"Error while sending admin notification email: {e}")
-
-        resp = {
-            'request_id': req.id,
-            'price_min': pmin,
-            'price_max': pmax,
-            # Damit das Frontend die drei Fälle unterscheiden kann, ohne auf
-            # null-Preise zu raten (SPEC-3, Kriterien 1, 6, 7).
-            'price_status': price_status,
-            'price_reason': price_reason,
-            'currency': 'EUR',
-            'num_available_artists': len(artist_objs),
-            'matched_artists': matched_payload,
-        }
-        # Duo-Zusatzpreise nur dann mitsenden, wenn tatsächlich >= 2 Artists vorhanden
-        if team_size == 2 and len(artist_objs) >= 2 and duo_min is not None and duo_max is not None:
-            resp['duo_price_min'] = duo_min
-            resp['duo_price_max'] = duo_max
-        # Gruppe: Flag setzen, keine Preise (bleibt für bestehende Clients erhalten)
-        if price_reason == 'group':
-            resp['group_pricing_pending'] = True
 
-        location_value = f"/api/requests/requests/{req.id}"
-        resp["_location"] = location_value  # internal for idempotent replays
+# kein Login erforderlich — der Schlüssel aus der POST-Antwort genügt
+@booking_bp.route('/requests/<int:req_id>/price', methods=['GET'])
+def get_request_price(req_id: int):
+    """Preisauskunft einer Anfrage abfragen, etwa nach `price_status='pending'`.
 
-        # Cache the response if an Idempotency-Key was provided
-        if idem_key:
-            _idempotency_store(idem_key, resp)
+    Query parameters:
+      - token: der `price_url`-Schlüssel aus der Antwort auf POST /requests
 
-        response = jsonify(resp)
-        response.status_code = 201
-        response.headers["Location"] = location_value
-        if idem_key:
-            response.headers["Idempotent-Replay"] = "false"
-        return response
+    Solange der Preis noch berechnet wird, kommt `price_status='pending'` mit
+    einem `Retry-After`-Header zurück.
+    """
+    token = request.args.get('token') or ''
+    if not hmac.compare_digest(token, _price_token(req_id)):
+        return error_response("forbidden", "Invalid or missing price token", 403)
 
-    except KeyError as ke:
-        current_app.logger.warning("Missing field in create_request: %s", ke)
-        return error_response("missing_field", f"Missing field: {str(ke)}", 400)
-    except Exception as e:
-        current_app.logger.exception("Error in create_request")
-        return error_response("internal_error", f"create_request failed: {str(e)}", 500)
+    req = request_mgr.get_request(req_id)
+    if not req:
+        return error_response("not_found", "Request not found", 404)
+
+    distances = request_mgr.known_distances(req)
+    artist_objs = request_mgr.sort_by_distance(list(req.artists), distances)
+    quote = _stored_quote(req)
+    if req.price_status == PRICE_STATUS_RANGE and team_size_to_people(req.team_size) == 2 \
+            and len(artist_objs) >= 2:
+        quote['duo_min'] = sum(a.price_min or 0 for a in artist_objs[:2])
+        quote['duo_max'] = sum(a.price_max or 0 for a in artist_objs[:2])
+
+    response = jsonify(_price_payload(req, artist_objs, distances, quote))
+    if req.price_status == PRICE_STATUS_PENDING:
+        response.headers["Retry-After"] = str(_PRICE_POLL_SECONDS)
+    return response
 
 
 @booking_bp.route('/requests/<int:req_id>/offer', methods=['PUT'])
@@ -6,6 +6,7 @@ import requests as http_requests
 from flask import Blueprint, request, jsonify
 from helpers.http_responses import error_response
 from helpers.clerk_auth import artist_required, get_current_artist, is_admin
+from helpers.rate_limit import rate_limited
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +88,7 @@ def _get_storage_path(artist_id: str, upload_type: str, filename: str | None = N
 
 @upload_bp.route('/image', methods=['POST'])
 @artist_required
+@rate_limited('upload')
 def upload_image():
     """Upload an image to Vercel Blob Storage.
 
@@ -195,6 +197,7 @@ def upload_image():
 
 @upload_bp.route('/delete', methods=['POST'])
 @artist_required
+@rate_limited('delete')
 def delete_blob():
     """Delete a file from Vercel Blob Storage.
 
@@ -0,0 +1,30 @@
+"""Verfügbarkeit von Tageszeilen auf Standard plus Sperren umstellen.
+
+Überträgt `availabilities` nach `artists.default_available_days` und
+`blocked_dates` (siehe `AvailabilityManager.convert_rows_to_exceptions`).
+Danach AVAILABILITY_MODE=exceptions setzen und den täglichen Cron
+abschalten. Mehrfach ausführbar; erst mit --drop-rows werden die alten
+Zeilen gelöscht.
+
+    python -m scripts.availability_to_exceptions [--drop-rows]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app  # noqa: E402
+from managers.availability_manager import AvailabilityManager  # noqa: E402
+
+
+def main() -> int:
+    drop_rows = '--drop-rows' in sys.argv[1:]
+    with app.app_context():
+        result = AvailabilityManager().convert_rows_to_exceptions(drop_rows=drop_rows)
+    print(f"{result['artists']} Artists übertragen, {result['blocked']} gesperrte Tage, "
+          f"{result['dropped_rows']} Zeilen gelöscht")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Mikro-Benchmark: Token-Prüfung je Request, vorher gegen nachher.
+
+Vorher: `PyJWKClient.get_signing_key_from_jwt` (JWKS aus dessen Cache, aber
+bei jedem Aufruf neu geparst) und eine volle RS256-Prüfung. Nachher:
+`verify_clerk_token` mit Schlüsselspeicher und Token-Cache — einmal mit
+wiederkehrendem Token (Normalfall im Frontend), einmal mit jedes Mal neuem
+Token (nur der Schlüsselspeicher greift). Das JWKS kommt aus dem Speicher,
+gemessen wird also nur die Rechnung, kein Netz.
+
+    python -m scripts.bench_auth
+"""
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("CLERK_JWKS_URL", "https://clerk.bench.invalid/.well-known/jwks.json")
+
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from flask import Flask  # noqa: E402
+from jwt import PyJWKClient  # noqa: E402
+from jwt.algorithms import RSAAlgorithm  # noqa: E402
+
+import helpers.clerk_auth as clerk_auth  # noqa: E402
+
+NUMBER = 2_000
+
+
+class _LocalJWKSClient(PyJWKClient):
+    """PyJWKClient, dessen JWKS aus dem Speicher statt vom Netz kommt."""
+
+    def __init__(self, jwks):
+        super().__init__("https://clerk.bench.invalid/.well-known/jwks.json")
+        self._jwks = jwks
+
+    def fetch_data(self):
+        self.jwk_set_cache.put(self._jwks)
+        return self._jwks
+
+
+def _setup():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+    jwk.update(kid="bench", use="sig", alg="RS256")
+    client = _LocalJWKSClient({"keys": [jwk]})
+    clerk_auth.get_jwks_client = lambda: client
+
+    counter = iter(range(10**9))
+
+    def token():
+        now = int(time.time())
+        return jwt.encode({"sub": f"user_{next(counter)}", "iat": now, "exp": now + 60},
+                          key, algorithm="RS256", headers={"kid": "bench"})
+
+    return client, token
+
+
+def _before(client, token):
+    signing_key = client.get_signing_key_from_jwt(token)
+    return jwt.decode(token, signing_key.key, algorithms=["RS256"],
+                      options={"verify_aud": False, "require": ["exp", "sub"]})
+
+
+def _time(fn, number=NUMBER):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main() -> int:
+    app = Flask(__name__)
+    client, make_token = _setup()
+    token = make_token()
+    fresh = [make_token() for _ in range(NUMBER * 3)]
+    fresh_iter = iter(fresh)
+
+    with app.app_context():
+        clerk_auth.get_signing_keys().refresh()
+        before = _time(lambda: _before(client, token))
+        assert clerk_auth.verify_clerk_token(token)["sub"] == _before(client, token)["sub"]
+        warm = _time(lambda: clerk_auth.verify_clerk_token(token))
+        cold = _time(lambda: clerk_auth.verify_clerk_token(next(fresh_iter)))
+        stats = clerk_auth.auth_cache_stats()
+
+    print(f"{'Weg':<34} {'je Request':>12}  {'Faktor':>6}")
+    print(f"{'vorher (JWKS parsen + RS256)':<34} {before * 1e6:>9.1f} µs  {1:>5.1f}x")
+    print(f"{'nachher, neues Token':<34} {cold * 1e6:>9.1f} µs  {before / cold:>5.1f}x")
+    print(f"{'nachher, bekanntes Token':<34} {warm * 1e6:>9.1f} µs  {before / warm:>5.1f}x")
+    print(f"Zähler: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
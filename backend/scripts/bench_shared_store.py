@@ -0,0 +1,71 @@
+"""Mikro-Benchmark: Prozessspeicher von `shared_store`, Voll-Scan gegen Heap.
+
+Bisher hat `_memory_prune` bei jedem Zugriff alle Einträge nach abgelaufenen
+durchsucht. Jetzt liegt neben dem Speicher ein Heap mit den Ablaufzeiten.
+Gemessen werden Zugriffe wie auf der Anfrage-Route (ein INCR fürs
+Rate-Limit, ein GET für den Idempotency-Key) bei 5.000 und 100.000 lebenden
+Einträgen; angegeben ist die Zeit je Zugriff.
+
+    python -m scripts.bench_shared_store
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from helpers import shared_store  # noqa: E402
+
+SIZES = (5_000, 100_000)
+OPS = 2_000
+
+
+def _scan_prune(now):
+    """Die bisherige Fassung von `_memory_prune`."""
+    memory = shared_store._memory
+    for key in [k for k, (expires, _) in memory.items() if expires <= now]:
+        memory.pop(key, None)
+    while len(memory) > shared_store._MEMORY_MAX_ENTRIES:
+        memory.popitem(last=False)
+
+
+def _fill(n):
+    shared_store.reset_for_tests()
+    shared_store._MEMORY_MAX_ENTRIES = n + OPS * 2
+    now = time.time()
+    for i in range(n):
+        expires = now + 3600 + i % 1000
+        shared_store._memory[f"k{i}"] = (expires, i)
+        shared_store._memory_track(f"k{i}", expires)
+
+
+def _run(n):
+    start = time.perf_counter()
+    for i in range(OPS):
+        shared_store._memory_incr(f"ratelimit:booking:10.0.{i % 250}.{i % 7}", 3600)
+        shared_store._memory_get(f"idem:booking:{i}")
+    return (time.perf_counter() - start) / (OPS * 2)
+
+
+def main() -> int:
+    heap_prune = shared_store._memory_prune
+    limit = shared_store._MEMORY_MAX_ENTRIES
+    print(f"{'Einträge':>9}  {'Voll-Scan':>12}  {'Heap':>10}  {'Faktor':>7}")
+    try:
+        for n in SIZES:
+            shared_store._memory_prune = _scan_prune
+            _fill(n)
+            scan = _run(n)
+            shared_store._memory_prune = heap_prune
+            _fill(n)
+            heap = _run(n)
+            print(f"{n:>9}  {scan * 1e6:>9.1f} µs  {heap * 1e6:>7.2f} µs  {scan / heap:>6.0f}x")
+    finally:
+        shared_store._memory_prune = heap_prune
+        shared_store._MEMORY_MAX_ENTRIES = limit
+        shared_store.reset_for_tests()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
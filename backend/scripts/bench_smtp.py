@@ -0,0 +1,83 @@
+"""Mikro-Benchmark: Mailversand je Mail mit eigener Verbindung gegen den Pool.
+
+Vergleicht den bisherigen Weg (je Mail verbinden, anmelden, senden, `quit`)
+mit `SMTPPool.send_many` bei 1, 5 und 50 Empfängern. Gegenstelle ist der
+SMTP-Stand-in aus den Tests auf localhost; `HANDSHAKE_DELAY` verzögert dessen
+Gruß und steht für TLS und Login bei einem echten Anbieter.
+
+    python -m scripts.bench_smtp
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask  # noqa: E402
+
+from helpers.emails import SMTPPool, build_message, open_smtp, smtp_settings  # noqa: E402
+from tests.fake_smtp import FakeSMTPServer  # noqa: E402
+
+HANDSHAKE_DELAY = 0.05  # s
+SIZES = (1, 5, 50)
+POOL_SIZE = 4
+
+HTML = "<p>Neue Anfrage</p>" * 20
+
+
+def _messages(n):
+    return [(f"artist{i}@bench.invalid", "Neue Anfrage", HTML) for i in range(n)]
+
+
+def _one_by_one(settings, messages):
+    for to_email, subject, html in messages:
+        server = open_smtp(settings, timeout=10)
+        try:
+            server.send_message(build_message(settings['from_addr'], to_email, subject, html))
+        finally:
+            server.quit()
+
+
+def _pooled(settings, messages):
+    pool = SMTPPool(settings, size=POOL_SIZE)
+    try:
+        results = pool.send_many(messages)
+    finally:
+        pool.close()
+    assert all(r.ok for r in results)
+
+
+def _time(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    fake = FakeSMTPServer(handshake_delay=HANDSHAKE_DELAY)
+    app = Flask(__name__)
+    app.config.update(SMTP_HOST=fake.host, SMTP_PORT=fake.port, SMTP_USER="bench",
+                      SMTP_PASSWORD="bench", SMTP_STARTTLS=False)
+    try:
+        with app.app_context():
+            settings = smtp_settings()
+        print(f"Handshake: {HANDSHAKE_DELAY * 1e3:.0f} ms, Pool: {POOL_SIZE} Verbindungen")
+        print(f"{'Mails':>6}  {'einzeln':>10}  {'Pool':>10}  {'Faktor':>6}  {'Verbindungen':>12}")
+        for n in SIZES:
+            messages = _messages(n)
+            single = _time(_one_by_one, settings, messages)
+            before = fake.connections
+            pooled = _time(_pooled, settings, messages)
+            conns = (fake.connections - before) / 3
+            print(f"{n:>6}  {single * 1e3:>7.1f} ms  {pooled * 1e3:>7.1f} ms"
+                  f"  {single / pooled:>5.1f}x  {conns:>12.0f}")
+    finally:
+        fake.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
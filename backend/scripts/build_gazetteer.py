@@ -0,0 +1,46 @@
+"""Erzeugt services/data/dach_postal_codes.tsv aus den GeoNames-PLZ-Exporten.
+
+Die Exporte gibt es unter https://download.geonames.org/export/zip/ (DE.zip,
+AT.zip, CH.zip; jeweils die gleichnamige .txt darin). Aufruf:
+
+    python scripts/build_gazetteer.py DE.txt AT.txt CH.txt > services/data/dach_postal_codes.tsv
+
+GeoNames liefert zwölf Spalten; übernommen werden nur Land, PLZ, Ort und die
+Koordinaten. Zeilen ohne Koordinate fallen weg.
+"""
+import sys
+
+HEADER = """\
+# Postleitzahlen und Orte in DE/AT/CH mit Mittelpunkt (WGS84).
+# Spalten: Land<TAB>PLZ<TAB>Ort<TAB>lat<TAB>lon
+# Erzeugt mit scripts/build_gazetteer.py aus den GeoNames-PLZ-Exporten.
+# (Quelle: https://download.geonames.org/export/zip/, Lizenz CC BY 4.0)
+"""
+
+
+def convert(paths, out):
+    out.write(HEADER)
+    seen = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 11:
+                    continue
+                country, code, place = cols[0], cols[1], cols[2]
+                try:
+                    lat, lon = float(cols[9]), float(cols[10])
+                except ValueError:
+                    continue
+                key = (country, code, place)
+                if key in seen:
+                    continue
+                seen.add(key)
+                out.write(f"{country}\t{code}\t{place}\t{lat:.4f}\t{lon:.4f}\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    convert(sys.argv[1:], sys.stdout)
@@ -3,14 +3,28 @@ from __future__ import annotations
 import os
 import logging
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy ist optional
+    np = None
+
 logger = logging.getLogger(__name__)
 
 
+# Stand der Preisformeln. Gespeicherte Empfehlungen (booking_artists)
+# tragen ihn in `pricing_version`; hochzählen, sobald sich an
+# `calculate_price` oder `client_price` etwas am Ergebnis ändert.
+PRICING_VERSION = 1
+
 # Ab dieser Showlänge bzw. Teamgröße gibt es keinen automatischen Preis mehr,
 # sondern ein individuelles Angebot (SPEC-3, Kriterien 3 und 6).
 MAX_AUTOMATIC_DURATION_MINUTES = 45
 MAX_AUTOMATIC_TEAM_SIZE = 2
 
+# Anreisezuschlag je Strecke: (ab km, Euro), absteigend. Einzige Quelle für
+# `_distance_tier` und die NumPy-Fassung in `calculate_prices_batch`.
+_DISTANCE_TIERS = ((600, 300), (300, 200))
+
 
 def _env_float(name: str, default: float) -> float:
     try:
@@ -65,10 +79,30 @@ def _to_float(value) -> float:
 
 def _distance_tier(distance_km: float) -> int:
     """Zuschlagsstufe für eine einzelne Anreise."""
-    if distance_km >= 600:
-        return 300
-    if distance_km >= 300:
-        return 200
+    for threshold, surcharge in _DISTANCE_TIERS:
+        if distance_km >= threshold:
+            return surcharge
+    return 0
+
+
+def _tech_fee(needs_light, needs_sound) -> int:
+    tech_fee = 0
+    if needs_light:
+        tech_fee += 450
+    if needs_sound:
+        tech_fee += 450
+    return tech_fee
+
+
+def city_discount(event_address) -> int:
+    """Ortsrabatt in Euro, abgeleitet aus dem letzten Teil der Event-Adresse."""
+    city = None
+    if event_address:
+        raw_city = event_address.split(',')[-1].strip()
+        parts = raw_city.split()
+        city = parts[-1].lower() if parts else None
+    if city in ['münchen', 'muenchen', 'munich']:
+        return 100
     return 0
 
 
@@ -87,11 +121,7 @@ def surcharges(distance_km=0, needs_light=False, needs_sound=False,
     Entfernung, mehrfach gefahren) und wird nur benutzt, wenn `distances`
     fehlt. Dort gilt die Zuschlagsstufe wie bisher genau einmal.
     """
-    tech_fee = 0
-    if needs_light:
-        tech_fee += 450
-    if needs_sound:
-        tech_fee += 450
+    tech_fee = _tech_fee(needs_light, needs_sound)
 
     rate = _env_float('RATE_PER_KM', 0.5)
 
@@ -104,19 +134,20 @@ def surcharges(distance_km=0, needs_light=False, needs_sound=False,
         travel_fee = distance * rate * max(1, int(people or 1))
         surcharge = _distance_tier(distance)
 
-    city = None
-    if event_address:
-        raw_city = event_address.split(',')[-1].strip()
-        parts = raw_city.split()
-        city = parts[-1].lower() if parts else None
     # Der Ortsrabatt hängt am Veranstaltungsort, nicht an der Anreise, und
     # wird deshalb genau einmal abgezogen.
-    if city in ['münchen', 'muenchen', 'munich']:
-        surcharge -= 100
+    surcharge -= city_discount(event_address)
 
     return tech_fee + surcharge + travel_fee
 
 
+def _fee_factor(fee_pct) -> float:
+    try:
+        return 1 + float(fee_pct) / 100
+    except (TypeError, ValueError):
+        return 1.0
+
+
 def client_price(artist_gage, fee_pct, **surcharge_kwargs) -> int:
     """Kundenpreis für eine **feste** Gage: Gage + Agenturgebühr + Zuschläge.
 
@@ -124,12 +155,71 @@ def client_price(artist_gage, fee_pct, **surcharge_kwargs) -> int:
     Faktorlogik aus `calculate_price` läuft dann bewusst nicht mehr — sie ist
     im Angebot des Artists bereits enthalten und würde doppelt wirken.
     """
+    total = float(artist_gage) * _fee_factor(fee_pct) + surcharges(**surcharge_kwargs)
+    return max(0, int(round(total)))
+
+
+def factor_score(event_type='Private Feier', num_guests=0, duration=0,
+                 is_indoor=True, is_weekend=False) -> float:
+    """Mittel der Faktor-Scores (jeweils 0–1) einer Anfrage.
+
+    Hängt nur an der Anfrage, nicht am Artist — bei vielen Artists derselben
+    Anfrage genügt es, ihn einmal zu rechnen.
+    """
+    event_scores = {
+        'Private Feier': 0.0,
+        'Firmenfeier': 1.0,
+        'Teamevent': 0.7,
+        # 'Incentive' ist der Wert, den Formular und DB verwenden; fachlich das
+        # gleiche wie 'Teamevent'. Ohne diesen Eintrag fiel er auf 0.5 zurück.
+        'Incentive': 0.7,
+        'Streetshow': 0.3,
+    }
+    event_s = event_scores.get(event_type, 0.5)
+
     try:
-        fee_factor = 1 + float(fee_pct) / 100
+        guests = int(num_guests or 0)
     except (TypeError, ValueError):
-        fee_factor = 1.0
-    total = float(artist_gage) * fee_factor + surcharges(**surcharge_kwargs)
-    return max(0, int(round(total)))
+        guests = 0
+    if guests <= 200:
+        guests_s = 0.0
+    elif guests <= 500:
+        guests_s = 0.5
+    else:
+        guests_s = 1.0
+
+    try:
+        duration_minutes = int(duration or 0)
+    except (TypeError, ValueError):
+        duration_minutes = 0
+    duration_clamped = max(5, min(MAX_AUTOMATIC_DURATION_MINUTES, duration_minutes))
+    duration_s = (duration_clamped - 5) / (MAX_AUTOMATIC_DURATION_MINUTES - 5)
+
+    outdoor_s = 0.0 if is_indoor else 1.0
+    weekend_s = 1.0 if is_weekend else 0.0
+
+    return (event_s + guests_s + duration_s + outdoor_s + weekend_s) / 5.0
+
+
+def _pricing_params() -> tuple:
+    """(PRIVATE_MIN_FACTOR, PRICE_FACTOR_SPAN, PRICE_SPREAD_PCT) aus der Umgebung."""
+    return (
+        _env_float('PRIVATE_MIN_FACTOR', 0.6),
+        # Wirkungsbreite der Faktoren: Multiplikator läuft von 0,8 bis 1,2.
+        _env_float('PRICE_FACTOR_SPAN', 0.4),
+        # Breite der angezeigten Spanne um den berechneten Punktpreis.
+        _env_float('PRICE_SPREAD_PCT', 0.20),
+    )
+
+
+def pricing_version(fee_pct, base_min, base_max) -> str:
+    """Stand einer gespeicherten Empfehlung: Formel, Parameter, Gebühr, Preisband.
+
+    Ändert sich eines davon, passt der gespeicherte Stand nicht mehr und die
+    Empfehlung wird neu gerechnet.
+    """
+    params = ":".join(f"{p:g}" for p in _pricing_params())
+    return f"{PRICING_VERSION}:{params}:{float(fee_pct):g}:{base_min}:{base_max}"
 
 
 def calculate_price(base_min, base_max,
@@ -170,11 +260,7 @@ def calculate_price(base_min, base_max,
 
     Rückgabe: `(min_total, max_total)` als ganze Euro.
     """
-    PRIVATE_MIN_FACTOR = _env_float('PRIVATE_MIN_FACTOR', 0.6)
-    # Wirkungsbreite der Faktoren: Multiplikator läuft von 0,8 bis 1,2.
-    FACTOR_SPAN = _env_float('PRICE_FACTOR_SPAN', 0.4)
-    # Breite der angezeigten Spanne um den berechneten Punktpreis.
-    SPREAD_PCT = _env_float('PRICE_SPREAD_PCT', 0.20)
+    PRIVATE_MIN_FACTOR, FACTOR_SPAN, SPREAD_PCT = _pricing_params()
 
     base_min = float(base_min)
     base_max = float(base_max)
@@ -189,39 +275,7 @@ def calculate_price(base_min, base_max,
     people = team_size_to_people(team_count if team_count is not None else team_size)
 
     # --- Faktor-Scores (jeweils 0–1) ---------------------------------------
-    event_scores = {
-        'Private Feier': 0.0,
-        'Firmenfeier': 1.0,
-        'Teamevent': 0.7,
-        # 'Incentive' ist der Wert, den Formular und DB verwenden; fachlich das
-        # gleiche wie 'Teamevent'. Ohne diesen Eintrag fiel er auf 0.5 zurück.
-        'Incentive': 0.7,
-        'Streetshow': 0.3,
-    }
-    event_s = event_scores.get(event_type, 0.5)
-
-    try:
-        guests = int(num_guests or 0)
-    except (TypeError, ValueError):
-        guests = 0
-    if guests <= 200:
-        guests_s = 0.0
-    elif guests <= 500:
-        guests_s = 0.5
-    else:
-        guests_s = 1.0
-
-    try:
-        duration_minutes = int(duration or 0)
-    except (TypeError, ValueError):
-        duration_minutes = 0
-    duration_clamped = max(5, min(MAX_AUTOMATIC_DURATION_MINUTES, duration_minutes))
-    duration_s = (duration_clamped - 5) / (MAX_AUTOMATIC_DURATION_MINUTES - 5)
-
-    outdoor_s = 0.0 if is_indoor else 1.0
-    weekend_s = 1.0 if is_weekend else 0.0
-
-    score = (event_s + guests_s + duration_s + outdoor_s + weekend_s) / 5.0
+    score = factor_score(event_type, num_guests, duration, is_indoor, is_weekend)
 
     # --- Gage: Punktwert mal Faktor, begrenzt auf die Artist-Spanne --------
     basis = (min_floor + base_max) / 2.0
@@ -251,3 +305,82 @@ def calculate_price(base_min, base_max,
         result[0], result[1],
     )
     return result
+
+
+def calculate_prices_batch(base_mins, base_maxs, distances, fee_pct,
+                           event_type='Private Feier', num_guests=0,
+                           is_weekend=False, is_indoor=True,
+                           needs_light=False, needs_sound=False,
+                           duration=0, event_address=None, **_ignored):
+    """Solo-Preisspannen für viele Artists einer Anfrage in einem Durchgang.
+
+    `base_mins`, `base_maxs` und `distances` sind gleich lange Folgen, je
+    Artist ein Eintrag (seine Gage-Spanne und seine Anreise in km). Das
+    Ergebnis ist eine Liste `[(min_total, max_total), …]` in derselben
+    Reihenfolge — Wert für Wert identisch mit
+    `calculate_price(base_min, base_max, distances=[d], team_count=1, …)`.
+
+    Was nur an der Anfrage hängt (Umgebungsvariablen, Faktor-Score,
+    Technik, Ortsrabatt, Gebühr), wird einmal gerechnet; der Rest läuft mit
+    NumPy über alle Artists zugleich, ohne NumPy als einfache Schleife.
+    Weitere Schlüsselwörter von `calculate_price` (`newsletter`,
+    `show_discipline`, …) werden angenommen und ignoriert, damit beide
+    Funktionen mit denselben Argumenten aufgerufen werden können.
+    """
+    if not (len(base_mins) == len(base_maxs) == len(distances)):
+        raise ValueError("base_mins, base_maxs and distances must have the same length")
+    if not len(base_mins):
+        return []
+
+    PRIVATE_MIN_FACTOR, FACTOR_SPAN, SPREAD_PCT = _pricing_params()
+    rate = _env_float('RATE_PER_KM', 0.5)
+    score = factor_score(event_type, num_guests, duration, is_indoor, is_weekend)
+    multiplier = 1 - FACTOR_SPAN / 2 + FACTOR_SPAN * score
+    fee_factor = _fee_factor(fee_pct)
+    fixed = _tech_fee(needs_light, needs_sound)
+    discount = city_discount(event_address)
+    private = event_type == 'Private Feier'
+
+    lo = [float(v) for v in base_mins]
+    hi = [float(v) for v in base_maxs]
+    legs = [_to_float(d) for d in distances]
+
+    if np is None:
+        result = []
+        for a, b, d in zip(lo, hi, legs):
+            if b < a:
+                a, b = b, a
+            floor = min(a * PRIVATE_MIN_FACTOR if private else a, b)
+            gage = min(max((floor + b) / 2.0 * multiplier, floor), b)
+            extras = fixed + (_distance_tier(d) - discount) + d * rate
+            totals = tuple(
+                max(0, int(round(min(max(g, floor), b) * fee_factor + extras)))
+                for g in (gage * (1 - SPREAD_PCT), gage * (1 + SPREAD_PCT))
+            )
+            result.append(totals)
+        return result
+
+    a = np.asarray(lo, dtype=np.float64)
+    b = np.asarray(hi, dtype=np.float64)
+    base_min, base_max = np.minimum(a, b), np.maximum(a, b)
+    floor = np.minimum(base_min * PRIVATE_MIN_FACTOR if private else base_min, base_max)
+    gage = np.minimum(np.maximum((floor + base_max) / 2.0 * multiplier, floor), base_max)
+
+    d = np.asarray(legs, dtype=np.float64)
+    tier = np.select([d >= threshold for threshold, _ in _DISTANCE_TIERS],
+                     [surcharge for _, surcharge in _DISTANCE_TIERS], default=0)
+    # Dieselbe Reihenfolge der Additionen wie in `surcharges`, damit auch die
+    # Rundung auf den Cent genau gleich ausfällt.
+    extras = fixed + (tier - discount) + d * rate
+
+    def totals(factor):
+        g = np.minimum(np.maximum(gage * factor, floor), base_max)
+        return np.maximum(0, np.rint(g * fee_factor + extras)).astype(np.int64).tolist()
+
+    result = list(zip(totals(1 - SPREAD_PCT), totals(1 + SPREAD_PCT)))
+    logger.debug(
+        "calculate_prices_batch: %s artists, score=%.2f, fee=%s%% => %s-%s",
+        len(result), score, fee_pct,
+        min(r[0] for r in result), max(r[1] for r in result),
+    )
+    return result
@@ -14,10 +14,17 @@ Gewichtung:
 
 price_max = calculated_gage
 price_min = calculated_gage * 0.80 (20% darunter)
+
+Dieselbe Rechnung gibt es als SQL-Ausdruck (`gage_expression`), damit
+`ArtistManager.reprice_all_artists` alle Artists in einem UPDATE neu
+bepreisen kann. Beide Fassungen lesen dieselben Tabellen und Gewichte;
+`tests/unit/test_gage_calculator_sql.py` prüft jede Kombination der Kriterien.
 """
 
 import logging
 
+from sqlalchemy import Float, Integer, and_, case, cast, func, literal, or_
+
 logger = logging.getLogger(__name__)
 
 
@@ -157,6 +164,62 @@ class GageCalculator:
         price_min = int(gage * 0.80)
         return price_min, price_max
 
+    # --- Als SQL-Ausdruck -------------------------------------------------------
+    #
+    # Summiert in derselben Reihenfolge wie `calculate_gage`, damit auch die
+    # Gleitkommarundung dieselbe ist. Einziger Unterschied: ROUND rundet
+    # genau x.5 von null weg, Python zur geraden Zahl. Mit den jetzigen
+    # Tabellen liegt keine Kombination auf x.5; der Paritätstest schlägt an,
+    # wenn ein neues Gewicht das ändert.
+
+    @staticmethod
+    def _lookup(column, scores):
+        """CASE über eine Punktetabelle; NULL wie der Schlüssel None, Unbekanntes 0."""
+        whens = [(column == key, literal(score, Float)) for key, score in scores.items()
+                 if key is not None]
+        whens.insert(0, (column.is_(None), literal(scores.get(None, 0.0), Float)))
+        return case(*whens, else_=literal(0.0, Float))
+
+    @classmethod
+    def gage_expression(cls, table):
+        """SQL-Ausdruck für `calculate_gage` über die Spalten von `table` (artists)."""
+        c = table.c
+        years = case(
+            *[(c.pepe_years >= threshold, literal(score, Float))
+              for threshold, score in sorted(cls.PEPE_YEARS_SCORES.items(), reverse=True)
+              if threshold > 0],
+            else_=literal(0.0, Float),
+        )
+        flag = lambda condition: case((condition, literal(1.0, Float)), else_=literal(0.0, Float))  # noqa: E731
+        parts = [
+            (cls._lookup(c.stage_experience, cls.STAGE_EXPERIENCE_SCORES), 'stage_experience'),
+            (cls._lookup(c.employment_type, cls.EMPLOYMENT_TYPE_SCORES), 'employment_type'),
+            (flag(c.circus_education.is_(True)), 'circus_education'),
+            (flag(and_(c.awards_level.isnot(None), c.awards_level.notin_(('keine', 'none', '')))), 'awards'),
+            (years, 'pepe_years'),
+            (flag(c.pepe_exclusivity.is_(True)), 'pepe_exclusivity'),
+        ]
+        total = literal(0.0, Float)
+        for score, weight in parts:
+            total = total + score * literal(cls.WEIGHTS[weight], Float)
+        rounded = cast(func.round(total * literal(float(cls.GAGE_MAX), Float) / literal(25.0, Float)), Integer) * 25
+        scored = case((rounded < 0, 0), else_=rounded)
+        # Wie `if artist.admin_gage_override:` — NULL und 0 zählen nicht
+        return case(
+            (and_(c.admin_gage_override.isnot(None), c.admin_gage_override != 0), c.admin_gage_override),
+            else_=scored,
+        )
+
+    @staticmethod
+    def price_min_expression(gage):
+        """`int(gage * 0.80)` für ganzzahlige Gagen ≥ 0, ohne Gleitkomma in SQL."""
+        return (gage * 4) // 5
+
+    @staticmethod
+    def gage_changed(table, gage):
+        """Bedingung »gespeicherte Gage weicht ab« (NULL zählt als abweichend)."""
+        return or_(table.c.calculated_gage.is_(None), table.c.calculated_gage != gage)
+
     @classmethod
     def get_gage_breakdown(cls, artist) -> dict:
         """
@@ -0,0 +1,242 @@
+"""Offline-Ortsverzeichnis für Deutschland, Österreich und die Schweiz.
+
+Usage:
+    from services.gazetteer import lookup_postal, lookup_place
+
+Notes:
+- Liefert Mittelpunkte zu Postleitzahlen und Ortsnamen ohne Netzaufruf.
+- Die Daten liegen als TSV neben dem Modul (`data/dach_postal_codes.tsv`,
+  Spalten: Land, PLZ, Ort, lat, lon). Mitgeliefert ist nur ein Grundbestand
+  größerer Städte; den vollständigen Bestand erzeugt
+  `scripts/build_gazetteer.py` aus den GeoNames-Postleitzahl-Exporten,
+  `GAZETTEER_PATH` zeigt dann auf diese Datei.
+- Die Adresssuche (`services.geo`) fragt das Verzeichnis nur mit
+  `GEO_GAZETTEER=1` — erst einschalten, wenn der vollständige Bestand liegt.
+- Geladen wird erst beim ersten Zugriff, danach liegen die Daten in sortierten
+  Schlüssellisten mit parallelen float-Arrays — ein paar Dutzend Bytes je PLZ
+  statt eines Dicts mit Tupeln.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "dach_postal_codes.tsv"
+
+# Ländername, wie er am Ende einer Adresse steht -> ISO-Code.
+_COUNTRY_CODES = {
+    "deutschland": "DE", "germany": "DE", "de": "DE",
+    "österreich": "AT", "oesterreich": "AT", "austria": "AT", "at": "AT",
+    "schweiz": "CH", "switzerland": "CH", "ch": "CH",
+}
+
+# Ortsnamen, deren Einträge weiter als das auseinanderliegen, sind mehrdeutig
+# ("Neustadt" gibt es dutzendfach). Ein Mittelwert läge irgendwo dazwischen;
+# solche Namen beantwortet das Verzeichnis deshalb gar nicht. 40 km lassen
+# die Flächenstädte (Berlin, Hamburg, Wien) mit all ihren PLZ noch zu.
+_MAX_PLACE_SPREAD_KM = 40.0
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def country_code(name: Optional[str]) -> Optional[str]:
+    """'Deutschland' -> 'DE'; unbekannt oder leer -> None."""
+    if not name:
+        return None
+    return _COUNTRY_CODES.get(name.strip().lower())
+
+
+def normalize_place(name: str) -> str:
+    """Vergleichsform eines Ortsnamens: klein, Umlaute ausgeschrieben, ein Leerzeichen."""
+    name = (name or "").lower().translate(_UMLAUTS)
+    name = name.replace("-", " ").replace(".", " ")
+    return " ".join(name.split())
+
+
+def _distance_km(a, b) -> float:
+    # Gleiche Formel wie services.geo.haversine_km; eigener Import würde einen
+    # Zyklus erzeugen, weil geo dieses Modul benutzt.
+    lat1, lon1 = a
+    lat2, lon2 = b
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    s = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    )
+    return 2 * 6371.0 * math.atan2(math.sqrt(s), math.sqrt(1 - s))
+
+
+class _Index:
+    """Sortierte Schlüssel mit parallelen Koordinaten, Suche per Bisektion."""
+
+    __slots__ = ("keys", "lat", "lon")
+
+    def __init__(self, entries: dict):
+        self.keys = sorted(entries)
+        self.lat = array("f", (entries[k][0] for k in self.keys))
+        self.lon = array("f", (entries[k][1] for k in self.keys))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> Optional[Tuple[float, float]]:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            # float32 speichert ~7 Stellen; auf 4 Nachkommastellen (~10 m)
+            # gerundet kommt wieder der Wert aus der Datei heraus.
+            return round(self.lat[i], 4), round(self.lon[i], 4)
+        return None
+
+
+class Gazetteer:
+    """PLZ- und Ortsverzeichnis. Aufbau über `from_rows` oder `from_file`."""
+
+    def __init__(self, postal: dict, places: dict):
+        self._postal = _Index(postal)
+        self._places = _Index(places)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str, float, float]]) -> "Gazetteer":
+        """Baut das Verzeichnis aus (Land, PLZ, Ort, lat, lon)-Zeilen.
+
+        Mehrere Zeilen zur selben PLZ (mehrere Ortsteile) werden gemittelt,
+        ebenso mehrere PLZ eines Ortes.
+        """
+        postal_sums: dict = {}
+        place_points: dict = {}
+        for country, code, place, lat, lon in rows:
+            country = (country or "").strip().upper()
+            code = (code or "").strip()
+            lat, lon = float(lat), float(lon)
+            if code:
+                s = postal_sums.setdefault(f"{country}{code}", [0.0, 0.0, 0])
+                s[0] += lat
+                s[1] += lon
+                s[2] += 1
+            name = normalize_place(place)
+            if name:
+                place_points.setdefault(f"{country}|{name}", []).append((lat, lon))
+
+        postal = {k: (s[0] / s[2], s[1] / s[2]) for k, s in postal_sums.items()}
+        places = {}
+        for key, points in place_points.items():
+            center = (
+                sum(p[0] for p in points) / len(points),
+                sum(p[1] for p in points) / len(points),
+            )
+            if all(_distance_km(center, p) <= _MAX_PLACE_SPREAD_KM for p in points):
+                places[key] = center
+        return cls(postal, places)
+
+    @classmethod
+    def from_file(cls, path) -> "Gazetteer":
+        def rows():
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    cols = line.rstrip("\n").split("\t")
+                    if len(cols) < 5:
+                        continue
+                    try:
+                        yield cols[0], cols[1], cols[2], float(cols[3]), float(cols[4])
+                    except ValueError:
+                        continue
+
+        return cls.from_rows(rows())
+
+    def __len__(self) -> int:
+        return len(self._postal)
+
+    def place(self, name: str, country: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        name = normalize_place(name)
+        if not name:
+            return None
+        countries = [country] if country else ["DE", "AT", "CH"]
+        hits = [c for c in (self._places.get(f"{cc}|{name}") for cc in countries) if c]
+        # Ohne Land nur eindeutige Namen: Einen gleichnamigen Ort in zwei
+        # Ländern soll lieber Nominatim auflösen als ein Zufallstreffer.
+        return hits[0] if len(hits) == 1 else None
+
+    def postal(self, code: str, country: Optional[str] = None,
+               place: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        code = (code or "").strip()
+        if not code.isdigit():
+            return None
+        if country:
+            return self._postal.get(f"{country}{code}")
+        # Fünfstellig ist immer Deutschland. Vierstellige PLZ gibt es in
+        # Österreich und in der Schweiz; dann entscheidet der Ortsname.
+        if len(code) == 5:
+            return self._postal.get(f"DE{code}")
+        hits = {cc: self._postal.get(f"{cc}{code}") for cc in ("AT", "CH")}
+        hits = {cc: c for cc, c in hits.items() if c}
+        if len(hits) == 1:
+            return next(iter(hits.values()))
+        if place:
+            for cc, coord in hits.items():
+                named = self._places.get(f"{cc}|{normalize_place(place)}")
+                if named and _distance_km(named, coord) <= _MAX_PLACE_SPREAD_KM:
+                    return coord
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_load_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Das Verzeichnis, beim ersten Aufruf geladen.
+
+    Fehlt die Datei oder ist sie kaputt, gibt es ein leeres Verzeichnis: Die
+    Stufensuche fällt dann wie bisher auf Nominatim zurück.
+    """
+    global _gazetteer
+    if _gazetteer is not None:
+        return _gazetteer
+    with _load_lock:
+        if _gazetteer is None:
+            path = os.getenv("GAZETTEER_PATH") or _DEFAULT_PATH
+            try:
+                _gazetteer = Gazetteer.from_file(path)
+                log.info("Gazetteer geladen: %s PLZ aus %s", len(_gazetteer), path)
+            except OSError as e:
+                log.warning("Gazetteer nicht verfügbar (%s): %s", path, e)
+                _gazetteer = Gazetteer({}, {})
+    return _gazetteer
+
+
+def use_gazetteer(gazetteer: Optional[Gazetteer]) -> None:
+    """Verzeichnis austauschen (Tests); `None` lädt beim nächsten Zugriff neu."""
+    global _gazetteer
+    with _load_lock:
+        _gazetteer = gazetteer
+
+
+def lookup_postal(code: str, country: Optional[str] = None,
+                  place: Optional[str] = None) -> Optional[Tuple[float, float]]:
+    return get_gazetteer().postal(code, country, place)
+
+
+def lookup_place(name: str, country: Optional[str] = None) -> Optional[Tuple[float, float]]:
+    return get_gazetteer().place(name, country)
+
+
+__all__ = [
+    "Gazetteer",
+    "country_code",
+    "normalize_place",
+    "get_gazetteer",
+    "use_gazetteer",
+    "lookup_postal",
+    "lookup_place",
+]
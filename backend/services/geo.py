@@ -3,12 +3,17 @@
 """Geolocation helpers (geocoding + distance) for PepeBooking.
 
 Usage:
-    from services.geo import geocode_address, haversine_km
+    from services.geo import geocode_address, haversine_km, haversine_km_batch
 
 Notes:
 - Uses OpenStreetMap Nominatim for geocoding ("search" endpoint).
 - Provide a proper User-Agent via Flask config GEO_USER_AGENT to respect the API policy.
 - Returns (lat, lon) as floats or None if not found.
+- Results are cached in-process and in the `geocode_cache` table, so a cold
+  instance does not pay the Nominatim throttle for addresses seen before.
+- With GEO_GAZETTEER enabled, the postal-code and city tiers of the cascade
+  are answered from the offline gazetteer (`services.gazetteer`) before
+  Nominatim is asked.
 """
 from __future__ import annotations
 
@@ -17,10 +22,20 @@ import re
 import threading
 import time
 from collections import OrderedDict
-from typing import Optional, Tuple
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Tuple
 
 import requests
 from flask import current_app
+from sqlalchemy import select
+
+from services import gazetteer
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy ist optional
+    np = None
 
 # Nominatim erlaubt maximal 1 Request/Sekunde. Der Lock serialisiert die
 # Aufrufe prozessweit; bei mehreren Workern greift zusätzlich deren Trennung.
@@ -28,47 +43,232 @@ _NOMINATIM_MIN_INTERVAL = 1.0
 _throttle_lock = threading.Lock()
 _last_request_ts = 0.0
 
+# Nach einem Netzfehler bleibt Nominatim eine Weile außen vor. Sonst zahlt
+# jede Stufe einer Adresse und jede weitere Anfrage erneut das volle Timeout,
+# solange der Dienst nicht antwortet. In der Zeit springt das Ortsverzeichnis
+# ein.
+_NOMINATIM_COOLDOWN = 60.0
+_nominatim_down_until = 0.0
+
 # Ergebnis-Cache. Adressen wiederholen sich stark (dieselbe Event-Adresse beim
 # zweiten Anlauf, derselbe Artist in mehreren Anfragen). Jeder Treffer spart
 # eine Sekunde Wartezeit im Request-Pfad und einen Aufruf gegen ein Limit, das
 # wir nicht kontrollieren. Auch Fehlschläge werden gemerkt, sonst rennt jeder
 # Retry erneut ins Leere.
+#
+# Zwei Ebenen: vorne ein kleiner LRU im Prozess, dahinter die Tabelle
+# `geocode_cache`. Der Prozessspeicher allein half wenig — jede neue
+# Serverless-Instanz und jeder Neustart begann leer und fragte dieselben
+# Adressen erneut bei Nominatim an.
 _GEOCODE_CACHE_MAX = 512
 _GEOCODE_CACHE_TTL = 24 * 3600
-_geocode_cache: "OrderedDict[str, Tuple[float, Optional[Tuple[float, float]]]]" = OrderedDict()
+# In der Tabelle bleibt ein Treffer deutlich länger: Orte ziehen nicht um.
+_GEOCODE_PERSIST_TTL = 90 * 24 * 3600
+# Ein Fehlschlag dagegen nur kurz. Eine Adresse kann nachträglich bei
+# OpenStreetMap eingetragen werden, und ein "nicht gefunden" soll sie nicht
+# wochenlang festhalten.
+_GEOCODE_NEGATIVE_TTL = 6 * 3600
+
+# key -> (Ablauf in time.monotonic(), (lat, lon) oder None, Genauigkeit oder None)
+_geocode_cache: "OrderedDict[str, Tuple[float, Optional[Tuple[float, float]], Optional[str]]]" = OrderedDict()
 _cache_lock = threading.Lock()
 
+# Schlüssel, die die Stufensuche schon vergeblich in der Tabelle gesucht hat.
+# Gilt nur für die Dauer eines `geocode_address_cascade`-Aufrufs; so fragt
+# `_cache_get` dafür nicht noch einmal je Stufe die Datenbank.
+_prefetched_misses: ContextVar[frozenset] = ContextVar("geocode_prefetched_misses", default=frozenset())
+
 
 def _cache_key(address: str) -> str:
     return " ".join(address.lower().split())
 
 
-def _cache_get(key: str):
-    """(hit, value) — `hit=False` heißt: nicht im Cache, `value` ist dann None."""
+def _memory_ttl(value) -> float:
+    return _GEOCODE_CACHE_TTL if value is not None else _GEOCODE_NEGATIVE_TTL
+
+
+def _memory_put(key: str, value, precision=None, ttl: Optional[float] = None) -> None:
+    with _cache_lock:
+        ttl = _memory_ttl(value) if ttl is None else min(ttl, _memory_ttl(value))
+        _geocode_cache[key] = (time.monotonic() + ttl, value, precision)
+        _geocode_cache.move_to_end(key)
+        while len(_geocode_cache) > _GEOCODE_CACHE_MAX:
+            _geocode_cache.popitem(last=False)
+
+
+def _memory_get(key: str):
+    """(hit, value, precision) aus dem Prozessspeicher."""
     with _cache_lock:
         entry = _geocode_cache.get(key)
         if not entry:
-            return False, None
-        stored_at, value = entry
-        if time.monotonic() - stored_at > _GEOCODE_CACHE_TTL:
+            return False, None, None
+        expires, value, precision = entry
+        if time.monotonic() >= expires:
             _geocode_cache.pop(key, None)
-            return False, None
+            return False, None, None
         _geocode_cache.move_to_end(key)
+        return True, value, precision
+
+
+# --- Persistente Ebene ------------------------------------------------------
+#
+# Fehler der Datenbank werden nur geloggt: Ohne Cache-Tabelle (etwa vor der
+# Migration oder in einem Skript ohne App) geht die Suche eben ans Netz, statt
+# zu scheitern. Geschrieben wird über eine eigene Verbindung, damit ein
+# Cache-Eintrag nie mit der Transaktion des Aufrufers festgeschrieben oder
+# zurückgerollt wird.
+
+# Länge von geocode_cache.query_key; längere Suchtexte bleiben im Prozess.
+_QUERY_KEY_MAX = 255
+
+
+def _db_load(keys) -> dict:
+    """{key: (value, precision, Restlaufzeit in s)} für alle gültigen Einträge.
+
+    Eine einzige Abfrage, egal wie viele Schlüssel — die Stufensuche holt so
+    alle Varianten einer Adresse in einem Roundtrip.
+    """
+    keys = [k for k in dict.fromkeys(keys) if k and len(k) <= _QUERY_KEY_MAX]
+    if not keys:
+        return {}
+    from models import db, GeocodeCacheEntry
+
+    table = GeocodeCacheEntry.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.query_key, table.c.lat, table.c.lon,
+                       table.c.precision, table.c.expires_at)
+                .where(table.c.query_key.in_(keys))
+                .where(table.c.expires_at > now)
+            ).fetchall()
+    except Exception as e:
+        current_app.logger.warning(f"Geocode cache lookup failed: {e}")
+        return {}
+
+    found = {}
+    for key, lat, lon, precision, expires_at in rows:
+        value = (float(lat), float(lon)) if lat is not None and lon is not None else None
+        found[key] = (value, precision, (expires_at - now).total_seconds())
+    return found
+
+
+def _db_store(key: str, value, precision=None) -> None:
+    """Treffer oder Fehlschlag festhalten (Upsert über den Schlüssel)."""
+    if len(key) > _QUERY_KEY_MAX:
+        return
+    from models import db, GeocodeCacheEntry
+
+    table = GeocodeCacheEntry.__table__
+    now = datetime.utcnow()
+    ttl = _GEOCODE_PERSIST_TTL if value is not None else _GEOCODE_NEGATIVE_TTL
+    values = {
+        "query_key": key,
+        "lat": value[0] if value else None,
+        "lon": value[1] if value else None,
+        "precision": precision,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": now + timedelta(seconds=ttl),
+    }
+    changed = ("lat", "lon", "precision", "updated_at", "expires_at")
+    try:
+        with db.engine.begin() as conn:
+            dialect = conn.dialect.name
+            if dialect in ("postgresql", "sqlite"):
+                if dialect == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+                stmt = dialect_insert(table).values(**values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.query_key],
+                    set_={c: stmt.excluded[c] for c in changed},
+                )
+                conn.execute(stmt)
+            else:
+                conn.execute(table.delete().where(table.c.query_key == key))
+                conn.execute(table.insert().values(**values))
+    except Exception as e:
+        current_app.logger.warning(f"Geocode cache write failed for '{key}': {e}")
+
+
+def _db_set_precision(key: str, precision: str) -> None:
+    from models import db, GeocodeCacheEntry
+
+    table = GeocodeCacheEntry.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                table.update()
+                .where(table.c.query_key == key)
+                .values(precision=precision, updated_at=datetime.utcnow())
+            )
+    except Exception as e:
+        current_app.logger.warning(f"Geocode cache update failed for '{key}': {e}")
+
+
+# --- Zugriff für die Suche --------------------------------------------------
+
+def _cache_get(key: str):
+    """(hit, value) — `hit=False` heißt: nicht im Cache, `value` ist dann None."""
+    hit, value, _ = _memory_get(key)
+    if hit:
         return True, value
+    if key in _prefetched_misses.get():
+        return False, None
+    loaded = _db_load([key]).get(key)
+    if loaded is None:
+        return False, None
+    value, precision, remaining = loaded
+    _memory_put(key, value, precision, ttl=remaining)
+    return True, value
 
 
-def _cache_put(key: str, value) -> None:
-    with _cache_lock:
-        _geocode_cache[key] = (time.monotonic(), value)
-        _geocode_cache.move_to_end(key)
-        while len(_geocode_cache) > _GEOCODE_CACHE_MAX:
-            _geocode_cache.popitem(last=False)
+def _cache_put(key: str, value, precision=None) -> None:
+    _memory_put(key, value, precision)
+    _db_store(key, value, precision)
 
 
-def clear_geocode_cache() -> None:
-    """Cache leeren — für Tests und für einen erzwungenen Neuabgleich."""
+def _cache_prefetch(keys) -> frozenset:
+    """Lädt alle noch nicht im Prozess bekannten Schlüssel in einem Roundtrip.
+
+    Gibt die Schlüssel zurück, die auch die Tabelle nicht kennt.
+    """
+    missing = [k for k in keys if not _memory_get(k)[0]]
+    loaded = _db_load(missing)
+    for key, (value, precision, remaining) in loaded.items():
+        _memory_put(key, value, precision, ttl=remaining)
+    return frozenset(k for k in missing if k not in loaded)
+
+
+def _cache_note_precision(key: str, precision: str) -> None:
+    """Hält fest, auf welcher Stufe ein Suchtext gefunden wurde.
+
+    `geocode_address` kennt die Stufe nicht, nur die Stufensuche darüber. Sie
+    trägt die Genauigkeit nach — einmal je Schlüssel, danach steht sie im
+    Prozessspeicher und in der Tabelle.
+    """
+    hit, value, known = _memory_get(key)
+    if not hit or value is None or known == precision:
+        return
+    _memory_put(key, value, precision)
+    _db_set_precision(key, precision)
+
+
+def clear_geocode_cache(persistent: bool = False) -> None:
+    """Cache leeren — für Tests und für einen erzwungenen Neuabgleich.
+
+    Ohne `persistent` nur den Prozessspeicher; mit `persistent=True` auch die
+    Tabelle (braucht einen App-Context).
+    """
     with _cache_lock:
         _geocode_cache.clear()
+    if persistent:
+        from models import db, GeocodeCacheEntry
+        with db.engine.begin() as conn:
+            conn.execute(GeocodeCacheEntry.__table__.delete())
 
 
 def _throttle() -> None:
@@ -81,6 +281,22 @@ def _throttle() -> None:
         _last_request_ts = time.monotonic()
 
 
+def nominatim_available() -> bool:
+    """False, solange nach einem Netzfehler die Pause läuft."""
+    return time.monotonic() >= _nominatim_down_until
+
+
+def _mark_nominatim_down() -> None:
+    global _nominatim_down_until
+    _nominatim_down_until = time.monotonic() + _NOMINATIM_COOLDOWN
+
+
+def reset_nominatim_state() -> None:
+    """Pause aufheben — für Tests."""
+    global _nominatim_down_until
+    _nominatim_down_until = 0.0
+
+
 def _user_agent() -> str:
     """Return a polite User-Agent for Nominatim requests."""
     # Allow override via Flask config; otherwise use a sensible default.
@@ -95,6 +311,8 @@ def geocode_address(address: str, *, timeout: float = 8.0) -> Optional[Tuple[flo
     """Geocode a free-form address to (lat, lon) using Nominatim.
 
     Returns None if the address is empty, not found, or the request fails.
+    After a network error Nominatim is skipped for `_NOMINATIM_COOLDOWN`
+    seconds; cached results are still served in that time.
     """
     if not address:
         return None
@@ -103,6 +321,8 @@ def geocode_address(address: str, *, timeout: float = 8.0) -> Optional[Tuple[flo
     hit, cached = _cache_get(key)
     if hit:
         return cached
+    if not nominatim_available():
+        return None
 
     try:
         _throttle()
@@ -127,10 +347,15 @@ def geocode_address(address: str, *, timeout: float = 8.0) -> Optional[Tuple[flo
         lon = float(data[0]["lon"])  # type: ignore[index]
         _cache_put(key, (lat, lon))
         return (lat, lon)
-    except Exception as e:
-        # Netz- oder Parsefehler bewusst NICHT cachen: ein kurzer Nominatim-
+    except requests.RequestException as e:
+        # Netz- oder HTTP-Fehler bewusst NICHT cachen: ein kurzer Nominatim-
         # Ausfall würde die Adresse sonst stundenlang als unauflösbar festhalten.
         current_app.logger.warning(f"Geocode failed for '{address}': {e}")
+        _mark_nominatim_down()
+        return None
+    except Exception as e:
+        # Parsefehler ebenso wenig.
+        current_app.logger.warning(f"Geocode failed for '{address}': {e}")
         return None
 
 
@@ -192,6 +417,21 @@ def _without_house_number(street: str) -> str:
     return " ".join(tokens)
 
 
+def _address_parts(address: str):
+    """(Glieder ohne Land, Land, PLZ, Ort); nicht Ermittelbares ist None."""
+    parts, country = _split_address(address)
+    postal = city = None
+    for p in parts:
+        m = _POSTAL_CITY.match(p)
+        if m:
+            postal, city = m.group(1), m.group(2).strip()
+            break
+    # Kein "PLZ Ort"-Glied? Dann ist das letzte Glied nach der Straße der Ort.
+    if city is None and len(parts) > 1:
+        city = parts[-1]
+    return parts, country, postal, city
+
+
 def address_variants(address: str) -> list:
     """[(Suchtext, Genauigkeit), …] von genau nach grob, ohne Doppelte.
 
@@ -202,19 +442,9 @@ def address_variants(address: str) -> list:
     if not address:
         return []
 
-    parts, country = _split_address(address)
+    parts, country, postal, city = _address_parts(address)
     tail = f", {country}" if country else ""
 
-    postal = city = None
-    for p in parts:
-        m = _POSTAL_CITY.match(p)
-        if m:
-            postal, city = m.group(1), m.group(2).strip()
-            break
-    # Kein "PLZ Ort"-Glied? Dann ist das letzte Glied nach der Straße der Ort.
-    if city is None and len(parts) > 1:
-        city = parts[-1]
-
     variants = [(address, GEO_PRECISION_EXACT)]
 
     if parts:
@@ -239,21 +469,87 @@ def address_variants(address: str) -> list:
     return unique
 
 
+def _gazetteer_lookup(precision: str, postal, city, country):
+    """Koordinate der PLZ- bzw. Ortsstufe aus dem Ortsverzeichnis.
+
+    Nur mit `GEO_GAZETTEER`: Der mitgelieferte Grundbestand kennt kaum Orte.
+    """
+    if not current_app.config.get("GEO_GAZETTEER"):
+        return None
+    cc = gazetteer.country_code(country)
+    if precision == GEO_PRECISION_POSTAL and postal:
+        return gazetteer.lookup_postal(postal, cc, city)
+    if precision == GEO_PRECISION_CITY and city:
+        return gazetteer.lookup_place(city, cc)
+    return None
+
+
+def _offline_fallback(address: str):
+    """Grobster Treffer ohne Netz, wenn Nominatim gerade nicht erreichbar ist.
+
+    Deckt die Adressen ab, für die `address_variants` gar keine PLZ- oder
+    Ortsstufe bildet — etwa ein bloßes "München", das nur als genaue Stufe
+    vorkommt.
+    """
+    parts, country, postal, city = _address_parts(address)
+    if city is None and len(parts) == 1 and _looks_like_a_place(parts[0]):
+        city = parts[0]
+    for precision in (GEO_PRECISION_POSTAL, GEO_PRECISION_CITY):
+        coord = _gazetteer_lookup(precision, postal, city, country)
+        if coord:
+            return coord, precision
+    return None, None
+
+
 def geocode_address_cascade(address: str, *, timeout: float = 8.0):
     """Sucht eine Adresse in Stufen und meldet mit, wie genau der Treffer war.
 
     Rückgabe `((lat, lon), Genauigkeit)` oder `(None, None)`, wenn keine Stufe
     etwas findet. `Genauigkeit` ist eine der GEO_PRECISION_*-Konstanten.
+
+    Mit `GEO_GAZETTEER` fragen PLZ- und Ortsstufe zuerst das Ortsverzeichnis
+    und nur bei dessen Fehlanzeige Nominatim. Ist Nominatim nicht erreichbar, liefert das
+    Verzeichnis auch für die genaue Stufe den groben Treffer.
     """
-    for query, precision in address_variants(address):
+    variants = address_variants(address)
+    # Alle Stufen in einem Roundtrip aus der Cache-Tabelle holen, statt je
+    # Stufe einzeln nachzufragen — auch die Fehlanzeigen gelten bis zum Ende
+    # dieses Aufrufs.
+    token = _prefetched_misses.set(_cache_prefetch([_cache_key(query) for query, _ in variants]))
+    try:
+        return _cascade(address, variants, timeout)
+    finally:
+        _prefetched_misses.reset(token)
+
+
+def _cascade(address: str, variants, timeout: float):
+    """Die Stufen der Reihe nach; siehe `geocode_address_cascade`."""
+    _, country, postal, city = _address_parts(address or "")
+    for query, precision in variants:
+        coord = _gazetteer_lookup(precision, postal, city, country)
+        if coord:
+            current_app.logger.info(
+                "Geocode: %r nicht gefunden, benutze Ortsverzeichnis fuer %r (Genauigkeit %s)",
+                address, query, precision,
+            )
+            return coord, precision
         coord = geocode_address(query, timeout=timeout)
         if coord:
+            _cache_note_precision(_cache_key(query), precision)
             if precision != GEO_PRECISION_EXACT:
                 current_app.logger.info(
                     "Geocode: %r nicht gefunden, benutze %r (Genauigkeit %s)",
                     address, query, precision,
                 )
             return coord, precision
+    if variants and not nominatim_available():
+        coord, precision = _offline_fallback(address)
+        if coord:
+            current_app.logger.info(
+                "Geocode: Nominatim nicht erreichbar, %r grob aus dem Ortsverzeichnis (Genauigkeit %s)",
+                address, precision,
+            )
+            return coord, precision
     current_app.logger.warning("Geocode: keine Stufe fuehrte zu einem Treffer fuer %r", address)
     return None, None
 
@@ -274,12 +570,42 @@ def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     return 2 * R * math.atan2(math.sqrt(s), math.sqrt(1 - s))
 
 
+def haversine_km_batch(
+    origin: Tuple[float, float],
+    lats: Sequence[float],
+    lons: Sequence[float],
+) -> list:
+    """Entfernungen von `origin` zu vielen Punkten, in der Reihenfolge der Eingabe.
+
+    Dieselbe Formel wie `haversine_km`, mit NumPy in einem Durchgang über alle
+    Punkte. Ohne NumPy läuft sie als Schleife über `haversine_km` — gleiches
+    Ergebnis, nur langsamer.
+    """
+    if len(lats) != len(lons):
+        raise ValueError("lats and lons must have the same length")
+    if np is None:
+        return [haversine_km((lat, lon), origin) for lat, lon in zip(lats, lons)]
+
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))
+    lat2 = math.radians(origin[0])
+    lon2 = math.radians(origin[1])
+    s = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * math.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return (2 * 6371.0 * np.arctan2(np.sqrt(s), np.sqrt(1 - s))).tolist()
+
+
 __all__ = [
     "geocode_address",
     "geocode_address_cascade",
     "address_variants",
     "haversine_km",
+    "haversine_km_batch",
     "clear_geocode_cache",
+    "nominatim_available",
+    "reset_nominatim_state",
     "GEO_PRECISION_EXACT",
     "GEO_PRECISION_STREET",
     "GEO_PRECISION_POSTAL",
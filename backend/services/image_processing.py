@@ -0,0 +1,238 @@
+"""Bildverarbeitung für Uploads: drehen, verkleinern, WebP — außerhalb des Request-Threads.
+
+Usage:
+    from services import image_processing
+    webp = image_processing.encode(data, profile='fast')     # bytes
+    image_processing.encode_image(data, 1200, 1200, 'max')   # direkt, ohne Pool
+
+Notes:
+- Bisher lief alles im Request-Thread unseres einzigen Sync-Workers, WebP
+  mit method=6. Ein 4-MB-Handyfoto hielt so jeden anderen API-Aufruf auf.
+  Jetzt rechnet ein Prozess-Pool (`IMAGE_POOL_WORKERS`); der Request wartet
+  höchstens `IMAGE_TIMEOUT_SECONDS`. Sind schon `IMAGE_POOL_MAX_PENDING`
+  Bilder in Arbeit, kommt sofort `ImagePoolBusy` statt einer langen Schlange.
+- Encoder-Profile (`ENCODER_PROFILES`): 'fast' für den Upload, 'max' für die
+  Neucodierung im Hintergrund, die die kleinere Datei nachträglich einsetzt.
+- JPEGs werden schon beim Decodieren verkleinert (`Image.draft`, DCT-Skalierung
+  um 1/2, 1/4, 1/8), größere Sprünge danach mit `reducing_gap` in zwei Stufen
+  (erst `reduce`, dann LANCZOS). Die Zielgröße ist dieselbe wie bisher.
+- Mit `IMAGE_POOL_WORKERS=0` (Standard auf Vercel) rechnet der aufrufende
+  Thread selbst.
+"""
+from __future__ import annotations
+
+import io
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional, Tuple
+
+from flask import current_app
+from PIL import Image
+
+MAX_WIDTH = 1200
+MAX_HEIGHT = 1200
+
+# EXIF-Tag für die Ausrichtung
+_ORIENTATION = 274
+_TRANSPOSE = {
+    3: Image.Transpose.ROTATE_180,
+    6: Image.Transpose.ROTATE_270,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class EncoderProfile(NamedTuple):
+    quality: int
+    method: int                            # WebP: 0 schnell … 6 klein
+    reducing_gap: Optional[float] = None   # None = LANCZOS in einem Schritt
+
+
+ENCODER_PROFILES = {
+    # Upload: der Nutzer wartet; method=2 ist ein Vielfaches schneller als 6
+    "fast": EncoderProfile(quality=85, method=2, reducing_gap=2.0),
+    # Neucodierung im Hintergrund: kleinste Datei, volle LANCZOS-Qualität
+    "max": EncoderProfile(quality=85, method=6),
+}
+
+
+class ImagePoolBusy(Exception):
+    """Zu viele Bilder gleichzeitig in Arbeit."""
+
+
+class ImageTimeout(Exception):
+    """Das Bild wurde nicht innerhalb von `IMAGE_TIMEOUT_SECONDS` fertig."""
+
+
+# --- Verarbeitung (läuft im Worker-Prozess) -------------------------------------
+
+def _fit(size: Tuple[int, int], max_width: int, max_height: int) -> Tuple[int, int]:
+    width, height = size
+    if width <= max_width and height <= max_height:
+        return size
+    ratio = min(max_width / width, max_height / height)
+    return int(width * ratio), int(height * ratio)
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def encode_image(data: bytes, max_width: int = MAX_WIDTH, max_height: int = MAX_HEIGHT,
+                 profile: str = "fast") -> bytes:
+    """Bild drehen (EXIF), auf max_width × max_height einpassen, als WebP codieren.
+
+    Raises:
+        ValueError: kein lesbares Bild oder unbekanntes Profil
+    """
+    settings = ENCODER_PROFILES.get(profile)
+    if settings is None:
+        raise ValueError(f'Unbekanntes Encoder-Profil: {profile}')
+    try:
+        image = Image.open(io.BytesIO(data))
+        transpose = _TRANSPOSE.get(image.getexif().get(_ORIENTATION))
+        swapped = transpose in (Image.Transpose.ROTATE_270, Image.Transpose.ROTATE_90)
+
+        # Zielgröße in der angezeigten Ausrichtung, wie bisher nach dem Drehen
+        width, height = image.size
+        target = _fit((height, width) if swapped else (width, height), max_width, max_height)
+        if image.format == 'JPEG':
+            # Nur die Skalierung; `draft` bleibt über der Zielgröße
+            image.draft(image.mode, (target[1], target[0]) if swapped else target)
+
+        if transpose is not None:
+            image = image.transpose(transpose)
+        image = _to_rgb(image)
+        if image.size != target:
+            image = image.resize(target, Image.Resampling.LANCZOS,
+                                 reducing_gap=settings.reducing_gap)
+
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=settings.quality, method=settings.method)
+        return output.getvalue()
+    except Exception as e:
+        # Nur ValueError verlässt den Worker: PIL-Ausnahmen sind nicht alle picklebar.
+        raise ValueError(f'Bildverarbeitung fehlgeschlagen: {e}') from None
+
+
+# --- Pool ---------------------------------------------------------------------------
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+_lock = threading.Lock()
+_pending = 0
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # 'spawn': kein fork aus einem Prozess mit Hintergrund-Threads
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def _acquire(limit: int) -> bool:
+    global _pending
+    with _lock:
+        if _pending >= limit:
+            return False
+        _pending += 1
+        return True
+
+
+def _release(_future: Future | None = None) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def pending() -> int:
+    """Bilder, die gerade im Pool sind oder darauf warten."""
+    return _pending
+
+
+def shutdown() -> None:
+    """Pool beenden (Tests, Shutdown); der nächste Aufruf startet ihn neu."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def encode(data: bytes, max_width: int = MAX_WIDTH, max_height: int = MAX_HEIGHT,
+           profile: str | None = None, max_pending: int | None = None) -> bytes:
+    """`encode_image` im Prozess-Pool; Profil ohne Angabe aus `IMAGE_UPLOAD_PROFILE`.
+
+    Muss innerhalb eines App-Contexts aufgerufen werden. `max_pending` senkt
+    die Grenze aus `IMAGE_POOL_MAX_PENDING` für diesen Aufruf — Arbeit im
+    Hintergrund lässt so Plätze für Uploads frei.
+
+    Raises:
+        ValueError: kein lesbares Bild
+        ImagePoolBusy: `IMAGE_POOL_MAX_PENDING` Bilder schon in Arbeit
+        ImageTimeout: nach `IMAGE_TIMEOUT_SECONDS` nicht fertig
+    """
+    global _executor
+    config = current_app.config
+    profile = profile or config.get('IMAGE_UPLOAD_PROFILE', 'fast')
+    workers = config.get('IMAGE_POOL_WORKERS', 0)
+    if workers <= 0:
+        return encode_image(data, max_width, max_height, profile)
+
+    limit = config.get('IMAGE_POOL_MAX_PENDING', 4)
+    if max_pending is not None:
+        limit = min(limit, max_pending)
+    if not _acquire(limit):
+        raise ImagePoolBusy()
+    executor = None
+    submitted = False
+    try:
+        executor = _get_executor(workers)
+        future = executor.submit(encode_image, data, max_width, max_height, profile)
+        submitted = True
+        # Der Platz wird erst frei, wenn der Worker wirklich fertig ist — auch
+        # nach einem Timeout rechnet er weiter.
+        future.add_done_callback(_release)
+        try:
+            return future.result(timeout=config.get('IMAGE_TIMEOUT_SECONDS', 20))
+        except FuturesTimeout:
+            future.cancel()
+            raise ImageTimeout() from None
+    except BrokenProcessPool:
+        # Worker abgestürzt (z. B. zu wenig Speicher): Pool beim nächsten Aufruf neu
+        current_app.logger.exception('Bild-Pool defekt, wird neu gestartet')
+        with _lock:
+            if _executor is executor:
+                _executor = None
+        raise
+    finally:
+        # Kam es gar nicht bis zum Worker (Pool ließ sich nicht starten,
+        # `submit` schlug fehl), gibt es keinen Rückruf, der freigibt.
+        if not submitted:
+            _release()
+
+
+__all__ = [
+    "ENCODER_PROFILES",
+    "EncoderProfile",
+    "ImagePoolBusy",
+    "ImageTimeout",
+    "encode",
+    "encode_image",
+    "pending",
+    "shutdown",
+]
@@ -0,0 +1,125 @@
+"""Räumlicher Index über Artist-Koordinaten.
+
+Usage:
+    from services.spatial_index import SpatialIndex
+    index = SpatialIndex([(artist_id, lat, lon), ...])
+    index.within((lat, lon), 150)        # [(artist_id, km), …] nach Entfernung
+    index.nearest((lat, lon), k=5)       # die fünf nächsten
+
+Notes:
+- Ein festes Gitter aus Zellen von 0,5° × 0,5° (in DACH rund 55 × 35 km).
+  Eine Umkreissuche schaut nur in die Zellen, die das Umkreis-Rechteck
+  berührt, und rechnet die genaue Entfernung nur für deren Punkte.
+- Die k nächsten werden über wachsende Radien gesucht: Liegen im Radius r
+  mindestens k Punkte, sind die k nächsten sicher darunter.
+- Der Index ist unveränderlich; bei Änderungen wird er neu gebaut. Bei ein
+  paar hundert bis tausend Artists dauert das Millisekunden.
+"""
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.geo import haversine_km_batch
+
+CELL_DEG = 0.5
+
+# Radien für die Suche nach den k nächsten, in km. Danach bleibt nur noch,
+# alles zu durchsuchen.
+_KNN_RADII = (25.0, 50.0, 100.0, 200.0, 400.0, 800.0)
+
+_KM_PER_DEG_LAT = 111.2
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+class SpatialIndex:
+    """Gitterindex über (id, lat, lon)."""
+
+    def __init__(self, points: Iterable[Tuple[int, float, float]]):
+        self._cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = {}
+        self._size = 0
+        for pid, lat, lon in points:
+            if lat is None or lon is None:
+                continue
+            lat, lon = float(lat), float(lon)
+            self._cells.setdefault(_cell(lat, lon), []).append((pid, lat, lon))
+            self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _candidates(self, coord, radius_km: float):
+        """Alle Punkte in Zellen, die das Umkreis-Rechteck berühren."""
+        lat, lon = coord
+        dlat = radius_km / _KM_PER_DEG_LAT
+        # Zum Pol hin werden Längengrade schmaler; am polnäheren Rand des
+        # Rechtecks gemessen, damit es den Kreis sicher umschließt.
+        edge = min(89.0, abs(lat) + dlat)
+        dlon = radius_km / (_KM_PER_DEG_LAT * max(math.cos(math.radians(edge)), 1e-6))
+        if dlon >= 180.0 or len(self._cells) <= (2 * dlat / CELL_DEG + 1) * (2 * dlon / CELL_DEG + 1):
+            # Das Rechteck deckt mehr Zellen ab, als es belegte gibt: dann
+            # einfach alle belegten durchgehen.
+            for points in self._cells.values():
+                yield from points
+            return
+        lat0, lon0 = _cell(lat - dlat, lon - dlon)
+        lat1, lon1 = _cell(lat + dlat, lon + dlon)
+        for ci in range(lat0, lat1 + 1):
+            for cj in range(lon0, lon1 + 1):
+                yield from self._cells.get((ci, cj), ())
+
+    def _ranked(self, coord, points) -> List[Tuple[int, float]]:
+        if not points:
+            return []
+        kms = haversine_km_batch(coord, [p[1] for p in points], [p[2] for p in points])
+        return sorted(zip((p[0] for p in points), kms), key=lambda t: (t[1], t[0]))
+
+    def within(self, coord, radius_km: float) -> List[Tuple[int, float]]:
+        """[(id, km), …] aller Punkte im Umkreis, der nächste zuerst."""
+        points = list(self._candidates(coord, radius_km))
+        return [(pid, km) for pid, km in self._ranked(coord, points) if km <= radius_km]
+
+    def nearest(
+        self,
+        coord,
+        k: int,
+        max_km: Optional[float] = None,
+        accept: Optional[Callable[[List[int]], set]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Die k nächsten Punkte als [(id, km), …], der nächste zuerst.
+
+        `accept` filtert Kandidaten (etwa: verfügbar am Datum) und bekommt je
+        Radius nur die neu hinzugekommenen IDs; es gibt die zulässigen als
+        Menge zurück. So fragt die Suche die Datenbank einmal je Radius, nicht
+        einmal je Artist.
+        """
+        if k <= 0 or not self._size:
+            return []
+        radii = [r for r in _KNN_RADII if max_km is None or r < max_km]
+        radii.append(max_km if max_km is not None else math.inf)
+
+        found: List[Tuple[int, float]] = []
+        seen: set = set()
+        for radius in radii:
+            if math.isinf(radius):
+                ranked = self._ranked(coord, [p for ps in self._cells.values() for p in ps])
+            else:
+                ranked = self.within(coord, radius)
+            fresh = [(pid, km) for pid, km in ranked if pid not in seen]
+            seen.update(pid for pid, _ in fresh)
+            if accept is not None and fresh:
+                ok = accept([pid for pid, _ in fresh])
+                fresh = [(pid, km) for pid, km in fresh if pid in ok]
+            found.extend(fresh)
+            # Alles im Radius r ist gefunden; liegen k davon drin, kann
+            # außerhalb keiner näher sein.
+            if len(found) >= k:
+                break
+        found.sort(key=lambda t: (t[1], t[0]))
+        return found[:k]
+
+
+__all__ = ["SpatialIndex", "CELL_DEG"]
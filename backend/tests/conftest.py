@@ -13,6 +13,13 @@ os.environ.setdefault("CLERK_JWKS_URL", "https://clerk.test.invalid/.well-known/
 TEST_ISSUER = "https://clerk.test.invalid"
 os.environ["CLERK_ISSUER"] = TEST_ISSUER
 
+# Kein Outbox-Worker-Thread beim Import der App: Er würde parallel zu den
+# Tests Mails verschicken. Tests rufen `email_outbox.drain` selbst auf.
+os.environ["EMAIL_OUTBOX_DELIVERY"] = "cron"
+
+# Kein JWKS-Abruf beim Start: Die Tests hängen ihren eigenen Schlüssel ein.
+os.environ["CLERK_JWKS_PREFETCH"] = "0"
+
 import pytest
 import jwt as pyjwt
 from cryptography.hazmat.primitives import serialization
@@ -214,11 +221,33 @@ def app_context(app):
 
 @pytest.fixture(autouse=True)
 def clean_geocode_cache():
-    """Der Geocoding-Cache lebt im Modul und überdauert sonst jeden Test."""
-    from services.geo import clear_geocode_cache
+    """Der Geocoding-Cache lebt im Modul und überdauert sonst jeden Test.
+
+    Dazu ein leeres Ortsverzeichnis: Die Tests stubben Nominatim und sollen
+    nicht davon abhängen, welche Orte gerade in der ausgelieferten Datei
+    stehen. Wer es braucht, setzt per `use_gazetteer` ein eigenes ein.
+    """
+    from services import gazetteer
+    from services.geo import clear_geocode_cache, reset_nominatim_state
     clear_geocode_cache()
+    reset_nominatim_state()
+    gazetteer.use_gazetteer(gazetteer.Gazetteer({}, {}))
     yield
     clear_geocode_cache()
+    reset_nominatim_state()
+    gazetteer.use_gazetteer(None)
+
+
+@pytest.fixture(autouse=True)
+def clean_auth_caches():
+    """Geprüfte Tokens und JWKS-Schlüssel nicht von einem Test in den nächsten tragen.
+
+    Zwei Tokens für denselben `sub` in derselben Sekunde sind identisch; ein
+    Test, der eines abweisen will, bekäme sonst die Claims des vorigen.
+    """
+    clerk_auth.reset_caches()
+    yield
+    clerk_auth.reset_caches()
 
 
 @pytest.fixture(autouse=True)
@@ -316,3 +345,24 @@ def get_artist(app):
         db.session.expire_all()
         return db.session.get(Artist, artist_id)
     return _get
+
+
+# ---------------------------------------------------------------------------
+# Lokaler SMTP-Stand-in (tests/fake_smtp.py)
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def smtp_server(app, monkeypatch):
+    """Startet den SMTP-Stand-in und richtet die App-Config darauf aus."""
+    from tests.fake_smtp import FakeSMTPServer
+
+    server = FakeSMTPServer()
+    monkeypatch.setitem(app.config, "SMTP_HOST", server.host)
+    monkeypatch.setitem(app.config, "SMTP_PORT", server.port)
+    monkeypatch.setitem(app.config, "SMTP_USER", "pepe")
+    monkeypatch.setitem(app.config, "SMTP_PASSWORD", "secret")
+    monkeypatch.setitem(app.config, "SMTP_FROM", "noreply@pepeshows.test")
+    monkeypatch.setitem(app.config, "SMTP_STARTTLS", False)
+    yield server
+    from helpers.emails import close_smtp_pool
+    close_smtp_pool()
+    server.close()
@@ -0,0 +1,103 @@
+"""SMTP-Stand-in für Tests und `scripts/bench_smtp.py`."""
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer:
+    """Minimaler SMTP-Server auf localhost: EHLO, AUTH PLAIN, MAIL/RCPT/DATA.
+
+    Zählt Verbindungen und Anmeldungen und hebt jede Mail auf. Kein TLS —
+    die Tests schalten `SMTP_STARTTLS` ab. Fehler lassen sich einstellen:
+    `refuse_connections` (so viele Verbindungen sofort mit 421 beenden),
+    `reject` (Empfänger mit 550 ablehnen) und `drop_after` (Verbindung nach
+    so vielen Mails kappen). `handshake_delay` verzögert den Gruß und steht
+    für die Kosten von TLS und Login bei einem echten Anbieter.
+    """
+
+    def __init__(self, handshake_delay: float = 0.0):
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self.logins = 0
+        self.messages = []  # [(rcpt_list, raw_bytes)]
+        self.refuse_connections = 0
+        self.reject = set()
+        self.drop_after = None
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def send(self, line):
+                self.wfile.write((line + "\r\n").encode())
+
+            def handle(self):
+                with fake.lock:
+                    fake.connections += 1
+                    if fake.refuse_connections:
+                        fake.refuse_connections -= 1
+                        self.send("421 try again later")
+                        return
+                if fake.handshake_delay:
+                    time.sleep(fake.handshake_delay)
+                self.send("220 fake-smtp ready")
+                rcpts, sent_here = [], 0
+                while True:
+                    raw = self.rfile.readline()
+                    if not raw:
+                        return
+                    cmd = raw.decode().strip()
+                    verb = cmd.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.send("250-fake-smtp")
+                        self.send("250 AUTH PLAIN")
+                    elif verb == "AUTH":
+                        with fake.lock:
+                            fake.logins += 1
+                        self.send("235 ok")
+                    elif verb == "MAIL":
+                        rcpts = []
+                        self.send("250 ok")
+                    elif verb == "RCPT":
+                        addr = cmd.split(":", 1)[1].strip().strip("<>")
+                        if addr in fake.reject:
+                            self.send("550 no such user")
+                        else:
+                            rcpts.append(addr)
+                            self.send("250 ok")
+                    elif verb == "DATA":
+                        self.send("354 go ahead")
+                        data = []
+                        while True:
+                            line = self.rfile.readline()
+                            if not line or line in (b".\r\n", b".\n"):
+                                break
+                            data.append(line)
+                        with fake.lock:
+                            fake.messages.append((rcpts, b"".join(data)))
+                        sent_here += 1
+                        if fake.drop_after is not None and sent_here >= fake.drop_after:
+                            return  # Verbindung ohne Antwort kappen
+                        self.send("250 queued")
+                    elif verb in ("RSET", "NOOP"):
+                        self.send("250 ok")
+                    elif verb == "QUIT":
+                        self.send("221 bye")
+                        return
+                    else:
+                        self.send("502 not implemented")
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.host, self.port = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def recipients(self):
+        return [r for rcpts, _ in self.messages for r in rcpts]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,199 @@
+"""Upstash-REST-Stand-in für die Tests von `helpers.shared_store`."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from helpers import idempotency, rate_limit
+
+
+class FakeUpstash:
+    """Minimaler Redis hinter der Upstash-REST-Schnittstelle auf localhost.
+
+    Versteht POST / (ein Kommando), /pipeline und /multi-exec (eine Liste von
+    Kommandos) mit GET, SET [EX n] [NX], INCR, EXPIRE, DEL, MGET, HMGET, HSET
+    und EVAL. Zählt TCP-Verbindungen und Requests, damit Tests Keep-Alive und
+    Round-Trips prüfen können. `status` ungleich 200 lässt jeden Request
+    scheitern.
+
+    Lua gibt es hier nicht: EVAL kennt nur die Skripte in `scripts` (Quelltext
+    -> Python-Nachbau). Vorbelegt sind die von `helpers.rate_limit` und
+    `helpers.idempotency`.
+    """
+
+    def __init__(self, token: str = "test-token"):
+        self.token = token
+        self.data = {}  # key -> (expires_at | None, value)
+        self.connections = 0
+        self.requests = []  # [(path, body)]
+        self.status = 200
+        self.lock = threading.Lock()
+        self.scripts = {
+            rate_limit._SLIDING_LUA: _sliding_script,
+            rate_limit._BUCKET_LUA: _bucket_script,
+            idempotency._CLAIM_LUA: _claim_script,
+            idempotency._COMPLETE_LUA: _complete_script,
+            idempotency._RELEASE_LUA: _release_script,
+        }
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, payload):
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                with fake.lock:
+                    fake.requests.append((self.path, body))
+                if self.headers.get("Authorization") != f"Bearer {fake.token}":
+                    return self.reply(401, {"error": "Unauthorized"})
+                if fake.status != 200:
+                    return self.reply(fake.status, {"error": "unavailable"})
+                if self.path == "/":
+                    return self.reply(200, fake.run(body))
+                if self.path in ("/pipeline", "/multi-exec"):
+                    with fake.lock:  # multi-exec: alles am Stück
+                        return self.reply(200, [fake.run(cmd, locked=True) for cmd in body])
+                return self.reply(404, {"error": "not found"})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05},
+                         daemon=True).start()
+
+    # --- Redis ---------------------------------------------------------------
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[0] is not None and entry[0] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def run(self, command, locked=False):
+        if not locked:
+            with self.lock:
+                return self.run(command, locked=True)
+        verb, args = command[0].upper(), command[1:]
+        if verb == "GET":
+            entry = self._live(args[0])
+            return {"result": entry[1] if entry else None}
+        if verb == "MGET":
+            return {"result": [(self._live(k) or (None, None))[1] for k in args]}
+        if verb == "SET":
+            key, value, opts = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in opts and self._live(key):
+                return {"result": None}
+            expires = time.time() + int(args[2 + opts.index("EX") + 1]) if "EX" in opts else None
+            self.data[key] = (expires, value)
+            return {"result": "OK"}
+        if verb == "INCR":
+            entry = self._live(args[0]) or (None, "0")
+            value = int(entry[1]) + 1
+            self.data[args[0]] = (entry[0], str(value))
+            return {"result": value}
+        if verb == "EXPIRE":
+            entry = self._live(args[0])
+            if not entry:
+                return {"result": 0}
+            self.data[args[0]] = (time.time() + int(args[1]), entry[1])
+            return {"result": 1}
+        if verb == "HMGET":
+            entry = self._live(args[0])
+            fields = entry[1] if entry else {}
+            return {"result": [fields.get(f) for f in args[1:]]}
+        if verb == "HSET":
+            entry = self._live(args[0]) or (None, {})
+            fields = dict(entry[1])
+            fields.update(zip(args[1::2], (str(v) for v in args[2::2])))
+            self.data[args[0]] = (entry[0], fields)
+            return {"result": len(args[1:]) // 2}
+        if verb == "EVAL":
+            script = self.scripts.get(args[0])
+            if script is None:
+                return {"error": "NOSCRIPT unknown script"}
+            n = int(args[1])
+            call = lambda *cmd: self.run(list(cmd), locked=True)["result"]  # noqa: E731
+            return {"result": script(call, args[2:2 + n], args[2 + n:])}
+        if verb == "DEL":
+            return {"result": sum(1 for k in args if self.data.pop(k, None) is not None)}
+        return {"error": f"ERR unknown command '{verb}'"}
+
+    def ttl(self, key):
+        entry = self._live(key)
+        return None if not entry or entry[0] is None else entry[0] - time.time()
+
+    @property
+    def commands(self):
+        """Alle empfangenen Kommandos, unabhängig davon, wie sie gebündelt kamen."""
+        out = []
+        for path, body in self.requests:
+            out.extend([body] if path == "/" else body)
+        return out
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Nachbauten der Lua-Skripte, Zeile für Zeile -----------------------------
+
+def _sliding_script(call, keys, argv):
+    prev = int(call("GET", keys[1]) or 0)
+    cur = int(call("GET", keys[0]) or 0)
+    if prev * float(argv[0]) + cur + 1 > int(argv[1]):
+        return [0, cur, prev]
+    cur = call("INCR", keys[0])
+    if cur == 1:
+        call("EXPIRE", keys[0], argv[2])
+    return [1, cur, prev]
+
+
+def _bucket_script(call, keys, argv):
+    rate, cap, now = float(argv[0]), float(argv[1]), float(argv[2])
+    state = call("HMGET", keys[0], "tokens", "ts")
+    tokens = float(state[0]) if state[0] is not None else cap
+    ts = float(state[1]) if state[1] is not None else now
+    tokens = min(cap, tokens + max(0.0, now - ts) * rate)
+    allowed = 0
+    if tokens >= 1:
+        tokens -= 1
+        allowed = 1
+    call("HSET", keys[0], "tokens", repr(tokens), "ts", repr(now))
+    call("EXPIRE", keys[0], argv[3])
+    return [allowed, repr(tokens)]
+
+
+def _claim_script(call, keys, argv):
+    if call("SET", keys[0], argv[0], "EX", argv[1], "NX"):
+        return [1, argv[0]]
+    return [0, call("GET", keys[0])]
+
+
+def _complete_script(call, keys, argv):
+    if call("GET", keys[0]) == argv[0]:
+        call("SET", keys[0], argv[1], "EX", argv[2])
+        return 1
+    return 0
+
+
+def _release_script(call, keys, argv):
+    if call("GET", keys[0]) == argv[0]:
+        return call("DEL", keys[0])
+    return 0
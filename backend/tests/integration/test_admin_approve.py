@@ -81,3 +81,33 @@ def test_approve_survives_broken_smtp(client, admin_headers, artist_pending, get
     assert resp.status_code == 200, resp.get_data(as_text=True)
     assert resp.get_json()["email_sent"] is False
     assert get_artist(artist_pending).approval_status == "approved"
+
+
+def _open_days(artist_id):
+    from datetime import date, timedelta
+    from managers.availability_manager import AvailabilityManager
+
+    today = date.today()
+    runs = AvailabilityManager().availability_runs(today, today + timedelta(days=364), [artist_id])
+    return sum((b - a).days + 1 for a, b in runs.get(artist_id, []))
+
+
+def test_approve_fills_a_year_of_availability(client, admin_headers, artist_pending):
+    resp = client.post(f"/api/admin/artists/{artist_pending}/approve", headers=admin_headers)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert _open_days(artist_pending) == 365
+
+
+def test_approve_opens_the_default_window_in_exceptions_mode(app, client, admin_headers,
+                                                             artist_pending, get_artist, monkeypatch):
+    monkeypatch.setitem(app.config, 'AVAILABILITY_MODE', 'exceptions')
+    resp = client.post(f"/api/admin/artists/{artist_pending}/approve", headers=admin_headers)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert get_artist(artist_pending).default_available_days == 365
+    assert _open_days(artist_pending) == 365
+
+
+def test_fill_availability_route(client, admin_headers, artist_pending):
+    resp = client.post(f"/api/admin/artists/{artist_pending}/fill-availability", headers=admin_headers)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert _open_days(artist_pending) == 365
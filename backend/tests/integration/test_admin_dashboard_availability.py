@@ -0,0 +1,72 @@
+"""Verfügbarkeiten im Admin-Dashboard: je Artist kompakt statt je Tag ein Objekt.
+
+Jeder Artist bekommt bei Anlage und Freigabe 365 Verfügbarkeitstage. Das
+Dashboard lieferte sie alle als einzelne Objekte aus; jetzt kommen sie je
+Artist als Läufe oder Bitfeld, und nur für das angefragte Fenster.
+"""
+
+import base64
+from datetime import date, timedelta
+
+import pytest
+
+from managers.availability_manager import AvailabilityManager
+from models import db
+
+
+@pytest.fixture
+def artist_with_gap(artist_approved_row):
+    """365 Tage ab heute, ohne den fünften Tag."""
+    today = date.today()
+    avail = AvailabilityManager()
+    avail.add_availabilities_bulk(artist_approved_row['id'], [today + timedelta(days=i) for i in range(365)])
+    db.session.commit()
+    gap = today + timedelta(days=4)
+    slot = next(s for s in avail.get_availabilities(artist_approved_row['id']) if s.date == gap)
+    db.session.delete(slot)
+    db.session.commit()
+    return artist_approved_row['id'], today
+
+
+def test_ranges_are_the_default(client, admin_headers, artist_with_gap):
+    artist_id, today = artist_with_gap
+    window = f'avail_from={today}&avail_to={today + timedelta(days=29)}'
+    data = client.get(f'/api/admin/dashboard?{window}', headers=admin_headers).get_json()
+
+    assert 'slots' not in data
+    availability = data['availability']
+    assert availability['encoding'] == 'ranges'
+    assert availability['artists'][str(artist_id)] == [
+        [today.isoformat(), (today + timedelta(days=3)).isoformat()],
+        [(today + timedelta(days=5)).isoformat(), (today + timedelta(days=29)).isoformat()],
+    ]
+
+
+def test_bitset_covers_the_window(client, admin_headers, artist_with_gap):
+    artist_id, today = artist_with_gap
+    window = f'avail_from={today}&avail_to={today + timedelta(days=9)}&avail_format=bitset'
+    data = client.get(f'/api/admin/dashboard?{window}', headers=admin_headers).get_json()
+
+    bits = base64.b64decode(data['availability']['artists'][str(artist_id)])
+    days = [bool(bits[i >> 3] & (1 << (i & 7))) for i in range(10)]
+    assert days == [True] * 4 + [False] + [True] * 5
+
+
+def test_legacy_slots_are_limited_to_the_window(client, admin_headers, artist_with_gap):
+    artist_id, today = artist_with_gap
+    window = f'avail_from={today}&avail_to={today + timedelta(days=6)}&avail_format=slots'
+    data = client.get(f'/api/admin/dashboard?{window}', headers=admin_headers).get_json()
+
+    assert 'availability' not in data
+    assert [s['date'] for s in data['slots'] if s['artist_id'] == artist_id] == [
+        (today + timedelta(days=i)).isoformat() for i in range(7) if i != 4]
+
+
+@pytest.mark.parametrize('query', [
+    'avail_from=morgen',
+    'avail_format=xml',
+    'avail_from=2030-02-01&avail_to=2030-01-01',
+    'avail_from=2030-01-01&avail_to=2033-01-01',
+])
+def test_invalid_window_is_rejected(client, admin_headers, query):
+    assert client.get(f'/api/admin/dashboard?{query}', headers=admin_headers).status_code == 400
@@ -0,0 +1,149 @@
+"""Admin-Listen der Buchungsanfragen: seitenweise statt alles auf einmal.
+
+/api/admin/requests/all und /api/admin/dashboard lasen bisher jede Anfrage
+als ORM-Objekt und je Anfrage noch einmal deren Artists. Jetzt blättern beide
+per Cursor über (created_at, id) und lesen nur Spalten.
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from managers.booking_requests_manager import PAGE_LIMIT_DEFAULT
+from models import BookingRequest, booking_artists, db
+
+
+def _request(i, created_at, status='angefragt', event_date=None):
+    return BookingRequest(
+        client_name=f'Kunde {i}', client_email=f'kunde{i}@example.com',
+        event_type='Firmenfeier', show_type='solo', show_discipline='["Zauberer"]',
+        team_size='1', event_date=event_date or date(2030, 1, 1), duration_minutes=30,
+        status=status, created_at=created_at, updated_at=created_at,
+    )
+
+
+@pytest.fixture
+def requests_with_ties(artist_approved_row, artist_pending_row):
+    """Sieben Anfragen, drei davon mit derselben created_at-Sekunde."""
+    base = datetime(2030, 1, 1, 12, 0, 0)
+    stamps = [base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+              base + timedelta(minutes=1), base + timedelta(minutes=2),
+              base + timedelta(minutes=3), base + timedelta(minutes=4)]
+    rows = [_request(i, ts) for i, ts in enumerate(stamps)]
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.execute(booking_artists.insert(), [
+        {'booking_id': rows[0].id, 'artist_id': artist_approved_row['id']},
+        {'booking_id': rows[0].id, 'artist_id': artist_pending_row['id']},
+        {'booking_id': rows[3].id, 'artist_id': artist_approved_row['id']},
+    ])
+    db.session.commit()
+    return rows
+
+
+def _all_pages(client, headers, url, key='requests'):
+    seen, cursor = [], None
+    while True:
+        sep = '&' if '?' in url else '?'
+        resp = client.get(f"{url}{sep}cursor={cursor}" if cursor else url, headers=headers)
+        assert resp.status_code == 200, resp.get_json()
+        data = resp.get_json()
+        seen.append([r['id'] for r in data[key]])
+        cursor = data['next_cursor']
+        if not cursor:
+            return seen
+
+
+def test_pages_cover_every_request_once_newest_first(client, admin_headers, requests_with_ties):
+    pages = _all_pages(client, admin_headers, '/api/admin/requests/all?limit=2')
+
+    expected = [r.id for r in sorted(requests_with_ties, key=lambda r: (r.created_at, r.id), reverse=True)]
+    assert [len(p) for p in pages] == [2, 2, 2, 1]
+    assert [i for p in pages for i in p] == expected
+
+
+def test_artist_ids_come_along(client, admin_headers, requests_with_ties, artist_approved_row, artist_pending_row):
+    data = client.get('/api/admin/requests/all', headers=admin_headers).get_json()
+    by_id = {r['id']: r for r in data['requests']}
+
+    assert sorted(by_id[requests_with_ties[0].id]['artist_ids']) == sorted(
+        [artist_approved_row['id'], artist_pending_row['id']])
+    assert by_id[requests_with_ties[3].id]['artist_ids'] == [artist_approved_row['id']]
+    assert by_id[requests_with_ties[1].id]['artist_ids'] == []
+
+
+def test_query_count_does_not_grow_with_the_page(app, client, admin_headers, requests_with_ties):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if 'booking_requests' in statement or 'booking_artists' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        client.get('/api/admin/requests/all?limit=50', headers=admin_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert len(statements) == 2  # eine Seite, einmal alle Artist-IDs
+
+
+def test_filters_by_status_and_event_date(client, admin_headers, artist_approved_row):
+    now = datetime(2030, 1, 1)
+    db.session.add_all([
+        _request(1, now, status='angeboten', event_date=date(2030, 5, 1)),
+        _request(2, now, status='angeboten', event_date=date(2030, 7, 1)),
+        _request(3, now, status='angefragt', event_date=date(2030, 5, 2)),
+    ])
+    db.session.commit()
+
+    data = client.get('/api/admin/requests/all?status=offered&from=2030-04-01&to=2030-06-30',
+                      headers=admin_headers).get_json()
+
+    assert [r['client_name'] for r in data['requests']] == ['Kunde 1']
+
+
+def test_unknown_status_gives_an_empty_page(client, admin_headers, requests_with_ties):
+    data = client.get('/api/admin/requests/all?status=gibtsnicht', headers=admin_headers).get_json()
+    assert data['requests'] == [] and data['next_cursor'] is None
+
+
+@pytest.mark.parametrize('query', ['cursor=kaputt', 'from=gestern', 'limit=0', 'limit=abc'])
+def test_invalid_parameters_are_rejected(client, admin_headers, query):
+    resp = client.get(f'/api/admin/requests/all?{query}', headers=admin_headers)
+    assert resp.status_code == 400
+
+
+def test_limit_is_capped(client, admin_headers):
+    data = client.get('/api/admin/requests/all?limit=100000', headers=admin_headers).get_json()
+    assert data['limit'] == 500
+
+
+def test_dashboard_offers_are_paginated(client, admin_headers, requests_with_ties):
+    pages = _all_pages(client, admin_headers, '/api/admin/dashboard?limit=3', key='offers')
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sorted(i for p in pages for i in p) == sorted(r.id for r in requests_with_ties)
+
+
+def test_without_limit_the_full_list_comes_back(client, admin_headers):
+    """Das Admin-Frontend blättert nicht; ohne limit und cursor kommt alles."""
+    base = datetime(2030, 1, 1)
+    db.session.add_all([_request(i, base + timedelta(seconds=i)) for i in range(PAGE_LIMIT_DEFAULT + 5)])
+    db.session.commit()
+
+    data = client.get('/api/admin/requests/all', headers=admin_headers).get_json()
+    assert len(data['requests']) == PAGE_LIMIT_DEFAULT + 5
+    assert data['next_cursor'] is None and data['limit'] is None
+
+    offers = client.get('/api/admin/dashboard', headers=admin_headers).get_json()['offers']
+    assert len(offers) == PAGE_LIMIT_DEFAULT + 5
+
+    paged = client.get(f"/api/admin/requests/all?cursor={_first_cursor(client, admin_headers)}",
+                       headers=admin_headers).get_json()
+    assert paged['limit'] == PAGE_LIMIT_DEFAULT
+
+
+def _first_cursor(client, headers):
+    return client.get('/api/admin/requests/all?limit=1', headers=headers).get_json()['next_cursor']
@@ -0,0 +1,147 @@
+"""Posteingang eines Artists (GET /api/requests/requests): eine Abfrage, seitenweise.
+
+Bisher kam je Anfrage eine Abfrage auf booking_artists und ein Nachladen der
+beteiligten Artists dazu. Jetzt liefert eine Abfrage Anfrage, Pivot-Spalten
+und alle Artist-IDs; mit limit/cursor wird per Keyset geblättert.
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import BookingRequest, booking_artists, db
+
+
+def _request(i, created_at, event_date=date(2030, 1, 1)):
+    return BookingRequest(
+        client_name=f'Kunde {i}', client_email=f'kunde{i}@example.com',
+        event_type='Firmenfeier', show_type='solo', show_discipline='["Zauberer"]',
+        team_size='1', event_date=event_date, duration_minutes=30,
+        status='angefragt', created_at=created_at, updated_at=created_at,
+    )
+
+
+@pytest.fixture
+def inbox(artist_approved_row, artist_pending_row):
+    """Sechs Anfragen für den Artist (eine davon mit Angebot), eine fremde."""
+    base = datetime(2030, 1, 1, 12, 0, 0)
+    rows = [_request(i, base + timedelta(minutes=i // 2), date(2030, 3, 1 + i)) for i in range(7)]
+    db.session.add_all(rows)
+    db.session.flush()
+    me, other = artist_approved_row['id'], artist_pending_row['id']
+    db.session.execute(booking_artists.insert(), [
+        *({'booking_id': r.id, 'artist_id': me} for r in rows[:6]),
+        {'booking_id': rows[0].id, 'artist_id': other},
+        {'booking_id': rows[6].id, 'artist_id': other},
+    ])
+    db.session.execute(
+        booking_artists.update()
+        .where(booking_artists.c.booking_id == rows[2].id, booking_artists.c.artist_id == me)
+        .values(status='angeboten', requested_gage=800, comment='gern')
+    )
+    db.session.commit()
+    return rows
+
+
+def test_without_paging_the_whole_list_comes_as_before(client, user_headers, inbox,
+                                                       artist_approved_row, artist_pending_row):
+    data = client.get('/api/requests/requests', headers=user_headers).get_json()
+
+    assert isinstance(data, list)
+    by_id = {r['id']: r for r in data}
+    assert sorted(by_id) == sorted(r.id for r in inbox[:6])
+    assert by_id[inbox[0].id]['artist_ids'] == sorted([artist_approved_row['id'], artist_pending_row['id']])
+    offered = by_id[inbox[2].id]
+    assert (offered['status'], offered['artist_gage'], offered['artist_comment']) == ('angeboten', 800, 'gern')
+    assert offered['recommended_price_min'] > 0
+
+
+def test_pages_cover_the_inbox_once_newest_first(client, user_headers, inbox):
+    seen, cursor = [], None
+    while True:
+        url = '/api/requests/requests?limit=4' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url, headers=user_headers).get_json()
+        seen.append([r['id'] for r in data['requests']])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    expected = [r.id for r in sorted(inbox[:6], key=lambda r: (r.created_at, r.id), reverse=True)]
+    assert [len(p) for p in seen] == [4, 2]
+    assert [i for p in seen for i in p] == expected
+
+
+def test_one_query_per_page(client, user_headers, inbox):
+    client.get('/api/requests/requests', headers=user_headers)  # Empfehlungen speichern
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if 'booking_artists' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        client.get('/api/requests/requests?limit=50', headers=user_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert len(statements) == 1
+
+
+def test_filters_by_visible_status_and_event_date(client, user_headers, inbox):
+    offered = client.get('/api/requests/requests?status=offered', headers=user_headers).get_json()
+    window = client.get('/api/requests/requests?from=2030-03-02&to=2030-03-03', headers=user_headers).get_json()
+
+    assert [r['id'] for r in offered] == [inbox[2].id]
+    assert sorted(r['id'] for r in window) == [inbox[1].id, inbox[2].id]
+
+
+@pytest.mark.parametrize('query', ['cursor=kaputt', 'from=gestern', 'limit=0'])
+def test_invalid_parameters_are_rejected(client, user_headers, query):
+    assert client.get(f'/api/requests/requests?{query}', headers=user_headers).status_code == 400
+
+
+class TestStoredRecommendations:
+    """Empfehlungen stehen an booking_artists und werden nur bei neuem Stand gerechnet."""
+
+    def _inbox(self, client, headers):
+        return {r['id']: r for r in client.get('/api/requests/requests', headers=headers).get_json()}
+
+    def test_second_load_is_a_pure_lookup(self, client, user_headers, inbox, monkeypatch):
+        first = self._inbox(client, user_headers)
+
+        import managers.booking_requests_manager as brm
+        monkeypatch.setattr(brm, 'calculate_price', lambda *a, **kw: pytest.fail('neu gerechnet'))
+        assert self._inbox(client, user_headers) == first
+
+    def test_created_requests_come_with_a_recommendation(self, booking_request_manager, artist_approved_row):
+        req = booking_request_manager.create_request(
+            client_name='Neu', client_email='neu@example.com', event_date='2030-06-06',
+            duration_minutes=30, event_type='Firmenfeier', show_type='solo',
+            show_discipline=['Zauberer'], team_size='1', number_of_guests=50,
+            event_address='', is_indoor=True, special_requests='', needs_light=False,
+            needs_sound=False, artists=[artist_approved_row['id']], defer_pricing=True,
+        )
+        row = db.session.execute(
+            booking_artists.select().where(booking_artists.c.booking_id == req.id)
+        ).one()
+        assert row.recommended_min and row.client_price_max > row.recommended_max
+        assert row.pricing_version
+
+    def test_gage_override_and_recalculation_refresh_it(self, client, user_headers, inbox,
+                                                        artist_manager, artist_approved_row):
+        before = self._inbox(client, user_headers)[inbox[1].id]
+
+        artist_manager.set_admin_gage_override(artist_approved_row['id'], 3000)
+        stored = db.session.execute(
+            booking_artists.select().where(booking_artists.c.booking_id == inbox[1].id,
+                                           booking_artists.c.artist_id == artist_approved_row['id'])
+        ).one()
+        after = self._inbox(client, user_headers)[inbox[1].id]
+        assert after['recommended_price_max'] > before['recommended_price_max']
+        assert stored.recommended_max == after['recommended_price_max']
+
+        artist_manager.set_admin_gage_override(artist_approved_row['id'], None)
+        artist_manager.recalculate_all_gages()
+        assert self._inbox(client, user_headers)[inbox[1].id]['recommended_price_max'] < after['recommended_price_max']
@@ -0,0 +1,194 @@
+"""Preisberechnung im Hintergrund (`Prefer: respond-async`).
+
+Mit kaltem Geocoder kostet POST /requests bis zu vier Nominatim-Aufrufe für die
+Event-Adresse und weitere für jeden Artist ohne Koordinaten, jeweils im
+Sekundentakt. Im asynchronen Modus wird die Anfrage sofort gespeichert, die
+Antwort kommt mit `price_status='pending'`, und der Preis folgt über
+`price_url`.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from helpers import background
+from models import BookingRequest, db
+
+MUNICH = (48.1372, 11.5756)
+HAMBURG = (53.5511, 9.9937)
+
+MUNICH_ADDRESS = 'Leopoldstr. 1, 80802 München'
+HAMBURG_ADDRESS = 'Reeperbahn 1, 20359 Hamburg'
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit():
+    from helpers import shared_store
+    shared_store.reset_for_tests()
+    yield
+    shared_store.reset_for_tests()
+
+
+@pytest.fixture(autouse=True)
+def geocode_calls(monkeypatch):
+    import services.geo as geo
+
+    calls = []
+
+    def fake_geocode(address, **kwargs):
+        calls.append(address)
+        if address and 'hamburg' in address.lower():
+            return HAMBURG
+        return MUNICH
+
+    monkeypatch.setattr(geo, 'geocode_address', fake_geocode)
+    yield calls
+    # Kein Hintergrundlauf darf in das Aufräumen der Datenbank hineinlaufen.
+    assert background.wait_for_idle(timeout=10)
+
+
+@pytest.fixture
+def mixed_artists(artist_manager):
+    artists = []
+    for name, address, coord in (
+        ('MucMike', MUNICH_ADDRESS, MUNICH),
+        ('HansaHanna', HAMBURG_ADDRESS, HAMBURG),
+    ):
+        artist = artist_manager.create_artist(
+            name, f'{name.lower()}@async-test.de', 'pw', ['Zauberer'],
+            address=address, price_min=1200, price_max=1800,
+            approval_status='approved',
+        )
+        artist.lat, artist.lon = coord
+        artists.append(artist)
+    db.session.commit()
+    return artists
+
+
+def payload(**overrides):
+    body = {
+        'client_name': 'Testkunde',
+        'client_email': 'kunde@example.com',
+        'event_date': (date.today() + timedelta(days=30)).isoformat(),
+        'event_time': '19:00',
+        'duration_minutes': 30,
+        'event_type': 'Firmenfeier',
+        'show_type': 'solo',
+        'disciplines': ['Zauberer'],
+        'team_size': 1,
+        'number_of_guests': 300,
+        'event_address': MUNICH_ADDRESS,
+        'is_indoor': False,
+    }
+    body.update(overrides)
+    return body
+
+
+def test_pending_answer_does_not_wait_for_the_geocoder(client, mixed_artists, geocode_calls, monkeypatch):
+    # Hintergrund anhalten, um den Zustand direkt nach der Antwort zu sehen
+    monkeypatch.setattr(background, 'submit', lambda fn, *a, **kw: None)
+    geocode_calls.clear()  # das Anlegen der Artists hat schon geocodiert
+
+    res = client.post('/api/requests/requests', json=payload(), headers=ASYNC)
+
+    assert res.status_code == 202
+    data = res.get_json()
+    assert data['price_status'] == 'pending'
+    assert data['price_min'] is None
+    assert data['num_available_artists'] == 2
+    assert '/price?token=' in data['price_url']
+    assert geocode_calls == []
+
+    req = db.session.get(BookingRequest, data['request_id'])
+    assert req.price_status == 'pending'
+    assert req.event_lat is None
+
+
+def test_polling_returns_the_same_price_as_the_sync_path(client, mixed_artists):
+    sync = client.post('/api/requests/requests', json=payload()).get_json()
+
+    pending = client.post('/api/requests/requests', json=payload(), headers=ASYNC).get_json()
+    assert background.wait_for_idle(timeout=10)
+    db.session.expire_all()
+
+    res = client.get(pending['price_url'])
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data['price_status'] == 'range'
+    assert (data['price_min'], data['price_max']) == (sync['price_min'], sync['price_max'])
+    assert [a['name'] for a in data['matched_artists']] == ['MucMike', 'HansaHanna']
+    assert data['matched_artists'][1]['distance_km'] == pytest.approx(600, rel=0.1)
+
+    req = db.session.get(BookingRequest, pending['request_id'])
+    assert req.event_lat == pytest.approx(MUNICH[0])
+    assert req.price_status == 'range'
+
+
+def test_duo_prices_are_reported_after_polling(client, mixed_artists):
+    pending = client.post('/api/requests/requests', headers=ASYNC,
+                          json=payload(team_size=2, show_type='duo')).get_json()
+    assert background.wait_for_idle(timeout=10)
+
+    data = client.get(pending['price_url']).get_json()
+    assert data['duo_price_min'] == 2400
+    assert data['duo_price_max'] == 3600
+
+
+def test_a_pending_price_asks_the_client_to_retry(client, mixed_artists, monkeypatch):
+    monkeypatch.setattr(background, 'submit', lambda fn, *a, **kw: None)
+    pending = client.post('/api/requests/requests', json=payload(), headers=ASYNC).get_json()
+
+    res = client.get(pending['price_url'])
+    assert res.get_json()['price_status'] == 'pending'
+    assert res.headers['Retry-After']
+
+
+def test_the_price_needs_the_token(client, mixed_artists):
+    pending = client.post('/api/requests/requests', json=payload(), headers=ASYNC).get_json()
+    rid = pending['request_id']
+
+    assert client.get(f'/api/requests/requests/{rid}/price').status_code == 403
+    assert client.get(f'/api/requests/requests/{rid}/price?token=abc').status_code == 403
+
+
+def test_catch_up_prices_requests_the_background_lost(client, mixed_artists, monkeypatch):
+    """Stirbt der Prozess vor dem Hintergrundlauf, holt der Nachlauf ihn nach."""
+    from cron_jobs.pending_prices import run_pending_prices
+
+    monkeypatch.setattr(background, 'submit', lambda fn, *a, **kw: None)
+    pending = client.post('/api/requests/requests', json=payload(), headers=ASYNC).get_json()
+
+    # Frisch angelegt: gehört noch dem Hintergrund-Thread
+    assert run_pending_prices()['found'] == 0
+
+    result = run_pending_prices(min_age_seconds=0)
+    assert result == {'found': 1, 'done': 1, 'failed': 0}
+    req = db.session.get(BookingRequest, pending['request_id'])
+    assert req.price_status == 'range'
+    assert req.price_min is not None
+
+
+def test_a_request_is_priced_only_once(app, client, mixed_artists, monkeypatch):
+    """Hintergrund und Nachlauf dürfen nicht beide rechnen und beide mailen."""
+    from cron_jobs import pending_prices
+    from managers.booking_requests_manager import BookingRequestManager
+
+    notified = []
+    monkeypatch.setattr('helpers.emails.notify_new_request', lambda req, artists: notified.append(req.id))
+    monkeypatch.setattr(background, 'submit', lambda fn, *a, **kw: None)
+    pending = client.post('/api/requests/requests', json=payload(), headers=ASYNC).get_json()
+
+    assert pending_prices.finish_pending_request(pending['request_id']) is not None
+    assert pending_prices.finish_pending_request(pending['request_id']) is None
+    assert BookingRequestManager().complete_pricing(pending['request_id']) is None
+    assert notified == [pending['request_id']]
+
+
+def test_sync_requests_store_the_price_status(client, mixed_artists):
+    data = client.post('/api/requests/requests', json=payload(duration_minutes=120)).get_json()
+
+    req = db.session.get(BookingRequest, data['request_id'])
+    assert req.price_status == 'individual_offer'
+    assert req.price_reason == 'duration'
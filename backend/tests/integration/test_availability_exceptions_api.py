@@ -0,0 +1,77 @@
+"""/api/availability mit AVAILABILITY_MODE='exceptions': dieselbe Schnittstelle wie mit Tageszeilen."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from models import Artist, BlockedDate, db
+
+
+@pytest.fixture
+def artist_id(app, monkeypatch, artist_approved_row):
+    monkeypatch.setitem(app.config, 'AVAILABILITY_MODE', 'exceptions')
+    artist = db.session.get(Artist, artist_approved_row['id'])
+    artist.default_available_days = 30
+    db.session.commit()
+    return artist.id
+
+
+def _day(n):
+    return (date.today() + timedelta(days=n)).isoformat()
+
+
+def test_get_delete_post_round_trip(client, user_headers, artist_id):
+    slots = client.get('/api/availability', headers=user_headers).get_json()
+    assert [s['date'] for s in slots] == [_day(i) for i in range(30)]
+    assert {s['artist_id'] for s in slots} == {artist_id}
+
+    slot = slots[2]
+    resp = client.delete(f"/api/availability/{slot['id']}", headers=user_headers)
+    assert resp.get_json() == {'deleted': slot['id']}
+    assert client.delete(f"/api/availability/{slot['id']}", headers=user_headers).status_code == 404
+    assert len(client.get('/api/availability', headers=user_headers).get_json()) == 29
+
+    resp = client.post('/api/availability', headers=user_headers, json={'date': slot['date']})
+    assert resp.status_code == 201
+    assert resp.get_json() == [{'id': slot['id'], 'date': slot['date']}]
+    assert BlockedDate.query.count() == 0
+
+
+def test_post_outside_the_window_is_rejected(client, user_headers, artist_id):
+    resp = client.post('/api/availability', headers=user_headers, json={'date': _day(60)})
+    assert resp.status_code == 400
+
+
+def test_put_stores_only_the_gaps(client, user_headers, artist_id):
+    resp = client.put('/api/availability', headers=user_headers,
+                      json={'dates': [_day(i) for i in range(30) if i not in (4, 9)]})
+
+    assert resp.status_code == 200
+    assert len(resp.get_json()['removed']) == 2
+    assert sorted(b.date.isoformat() for b in BlockedDate.query.all()) == [_day(4), _day(9)]
+
+
+def test_other_artists_slot_is_forbidden(client, user_headers, artist_id, artist_pending_row):
+    other = db.session.get(Artist, artist_pending_row['id'])
+    other.default_available_days = 30
+    db.session.commit()
+    slot_id = other.id * 100_000 + (date.today() - date(1970, 1, 1)).days
+
+    assert client.delete(f'/api/availability/{slot_id}', headers=user_headers).status_code == 403
+
+
+def test_debug_matching_counts_the_open_window(client, user_headers, admin_headers, artist_id):
+    client.delete(f"/api/availability/{artist_id * 100_000 + (date.today() - date(1970, 1, 1)).days + 3}",
+                  headers=user_headers)
+
+    def info(day):
+        resp = client.get(f'/api/requests/debug/matching?date={_day(day)}', headers=admin_headers)
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body['availability_mode'] == 'exceptions'
+        return next(a for a in body['approved_artists'] if a['id'] == artist_id)
+
+    open_day = info(2)
+    assert open_day['total_availability_days'] == 29
+    assert open_day['has_availability_for_date'] is True
+    assert info(3)['has_availability_for_date'] is False
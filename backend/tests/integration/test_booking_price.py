@@ -281,3 +281,48 @@ def test_admin_email_shows_the_phone_number(app, client, munich_artists):
     assert 'Muster GmbH' in html
     assert '2.500 bis 5.000 €' in html
     assert 'dringend' in html
+
+
+def test_same_idempotency_key_replays_instead_of_booking_twice(client, munich_artists):
+    from models import BookingRequest
+
+    headers = {'Idempotency-Key': 'wizard-1'}
+    first = client.post('/api/requests/requests', json=payload(), headers=headers)
+    second = client.post('/api/requests/requests', json=payload(), headers=headers)
+
+    assert first.status_code == 201, first.get_json()
+    assert second.status_code == 201
+    assert first.headers['Idempotent-Replay'] == 'false'
+    assert second.headers['Idempotent-Replay'] == 'true'
+    assert second.get_json()['request_id'] == first.get_json()['request_id']
+    assert db.session.query(BookingRequest).count() == 1
+
+
+def test_key_still_in_progress_answers_409(app, client, munich_artists, monkeypatch):
+    """Doppelklick: Der zweite Aufruf legt nichts an, solange der erste läuft."""
+    import routes.request_routes as rr
+    from helpers import idempotency
+    from models import BookingRequest
+
+    monkeypatch.setattr(rr, '_IDEMPOTENCY_WAIT_SECONDS', 0.05)
+    monkeypatch.setattr(idempotency, 'POLL_SECONDS', 0.01)
+    with app.app_context():
+        running = idempotency.claim('booking', 'wizard-2')
+    assert running.owned
+
+    res = client.post('/api/requests/requests', json=payload(), headers={'Idempotency-Key': 'wizard-2'})
+
+    assert res.status_code == 409
+    assert res.headers['Retry-After']
+    assert db.session.query(BookingRequest).count() == 0
+
+
+def test_failed_request_frees_its_idempotency_key(client, munich_artists):
+    """Nach einem Validierungsfehler darf derselbe Key korrigiert erneut kommen."""
+    headers = {'Idempotency-Key': 'wizard-3'}
+    bad = client.post('/api/requests/requests', json=payload(event_date=None), headers=headers)
+    good = client.post('/api/requests/requests', json=payload(), headers=headers)
+
+    assert bad.status_code == 400
+    assert good.status_code == 201
+    assert good.headers['Idempotent-Replay'] == 'false'
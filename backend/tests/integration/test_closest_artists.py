@@ -0,0 +1,143 @@
+"""Nächstgelegene Artists: Manager-Suche und Admin-Ansicht."""
+from datetime import date, time, timedelta
+
+import pytest
+
+from models import Availability, BookingRequest, db
+
+MUNICH = (48.1372, 11.5756)
+AUGSBURG = (48.3705, 10.8978)
+NUREMBERG = (49.4521, 11.0767)
+HAMBURG = (53.5511, 9.9937)
+
+EVENT_DATE = date.today() + timedelta(days=30)
+
+
+@pytest.fixture(autouse=True)
+def no_geocoding(monkeypatch):
+    import services.geo as geo
+    monkeypatch.setattr(geo, 'geocode_address', lambda address, **kw: MUNICH)
+
+
+def _artist(artist_manager, name, coord, disciplines=('Zauberer',), status='approved'):
+    artist = artist_manager.create_artist(
+        name, f'{name.lower()}@closest-test.de', 'pw', list(disciplines),
+        address='Teststr. 1, 80331 München', price_min=1000, price_max=1500,
+        approval_status=status,
+    )
+    artist.lat, artist.lon = coord
+    db.session.commit()
+    return artist
+
+
+@pytest.fixture
+def artists(artist_manager):
+    return {
+        'augsburg': _artist(artist_manager, 'Augusta', AUGSBURG),
+        'nuremberg': _artist(artist_manager, 'Noris', NUREMBERG),
+        'hamburg': _artist(artist_manager, 'Hansa', HAMBURG),
+        'juggler': _artist(artist_manager, 'Jongleur', MUNICH, disciplines=('Jonglage',)),
+        'pending': _artist(artist_manager, 'Wartend', MUNICH, status='pending'),
+    }
+
+
+def test_nearest_filters_by_discipline_and_approval(artist_manager, artists):
+    nearest = artist_manager.get_nearest_available_artists(['Zauberer'], EVENT_DATE, MUNICH, k=2)
+    assert [a.name for a, _ in nearest] == ['Augusta', 'Noris']
+    assert nearest[0][1] == pytest.approx(56, abs=3)
+
+
+def test_nearest_skips_artists_booked_out_on_the_date(artist_manager, artists):
+    Availability.query.filter_by(artist_id=artists['augsburg'].id, date=EVENT_DATE).delete()
+    db.session.commit()
+
+    nearest = artist_manager.get_nearest_available_artists(['Zauberer'], EVENT_DATE, MUNICH, k=1)
+    assert [a.name for a, _ in nearest] == ['Noris']
+
+
+def test_within_returns_only_the_radius(artist_manager, artists):
+    within = artist_manager.get_available_artists_within(['Zauberer'], EVENT_DATE, MUNICH, 200)
+    assert [a.name for a, _ in within] == ['Augusta', 'Noris']
+
+
+def test_the_index_sees_new_and_moved_artists(artist_manager, artists):
+    assert artist_manager.get_nearest_available_artists(None, None, HAMBURG, k=1)[0][0].name == 'Hansa'
+
+    harburg = (53.46, 9.98)
+    assert artist_manager.get_nearest_available_artists(None, None, harburg, k=1)[0][0].name == 'Hansa'
+    _artist(artist_manager, 'Elbe', harburg)
+    assert artist_manager.get_nearest_available_artists(None, None, harburg, k=1)[0][0].name == 'Elbe'
+
+    artists['augsburg'].lat, artists['augsburg'].lon = HAMBURG
+    db.session.commit()
+    nearest = artist_manager.get_nearest_available_artists(['Zauberer'], EVENT_DATE, MUNICH, k=1)
+    assert [a.name for a, _ in nearest] == ['Noris']
+
+
+def _booking_request(**overrides):
+    fields = dict(
+        client_name='Kunde', client_email='kunde@example.com', event_date=EVENT_DATE,
+        event_time=time(19, 0), duration_minutes=30, event_type='Firmenfeier',
+        show_type='solo', show_discipline='Zauberer', team_size='1',
+        number_of_guests=100, event_address='Leopoldstr. 1, 80802 München',
+        is_indoor=True, event_lat=MUNICH[0], event_lon=MUNICH[1],
+    )
+    fields.update(overrides)
+    req = BookingRequest(**fields)
+    db.session.add(req)
+    db.session.commit()
+    return req
+
+
+def test_admin_sees_the_closest_matching_artists(client, admin_headers, artists):
+    req = _booking_request()
+    req.artists.append(artists['nuremberg'])
+    db.session.commit()
+
+    res = client.get(f'/api/admin/requests/{req.id}/closest-artists?k=5', headers=admin_headers)
+
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [a['name'] for a in data['artists']] == ['Augusta', 'Noris', 'Hansa']
+    assert [a['in_request'] for a in data['artists']] == [False, True, False]
+
+
+def test_admin_can_list_all_artists_by_distance(client, admin_headers, artists):
+    req = _booking_request()
+
+    res = client.get(f'/api/admin/requests/{req.id}/closest-artists?all=1&radius_km=100',
+                     headers=admin_headers)
+
+    names = [a['name'] for a in res.get_json()['artists']]
+    assert names[0] == 'Jongleur'
+    assert 'Augusta' in names and 'Hansa' not in names and 'Wartend' not in names
+
+
+def test_closest_artists_is_admin_only(client, user_headers, artists):
+    req = _booking_request()
+    res = client.get(f'/api/admin/requests/{req.id}/closest-artists', headers=user_headers)
+    assert res.status_code == 403
+
+
+def test_closest_artists_unknown_request(client, admin_headers):
+    res = client.get('/api/admin/requests/999999/closest-artists', headers=admin_headers)
+    assert res.status_code == 404
+
+
+def test_match_radius_limits_who_gets_the_request(app, client, artists, monkeypatch):
+    from helpers import shared_store
+    shared_store.reset_for_tests()
+    monkeypatch.setitem(app.config, 'MATCH_RADIUS_KM', 200)
+
+    res = client.post('/api/requests/requests', json={
+        'client_name': 'Kunde', 'client_email': 'kunde@example.com',
+        'event_date': EVENT_DATE.isoformat(), 'event_time': '19:00',
+        'duration_minutes': 30, 'event_type': 'Firmenfeier', 'show_type': 'solo',
+        'disciplines': ['Zauberer'], 'team_size': 1, 'number_of_guests': 100,
+        'event_address': 'Leopoldstr. 1, 80802 München', 'is_indoor': True,
+    })
+
+    assert res.status_code == 201
+    data = res.get_json()
+    assert data['num_available_artists'] == 2
+    assert [a['name'] for a in data['matched_artists']] == ['Augusta', 'Noris']
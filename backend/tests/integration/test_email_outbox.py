@@ -0,0 +1,265 @@
+"""Mails über die Outbox: gespeichert mit ihrem Anlass, gesammelt verschickt."""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from helpers import email_outbox
+from models import EmailOutbox, db
+
+MUNICH = (48.1372, 11.5756)
+
+
+@pytest.fixture(autouse=True)
+def setup(app, monkeypatch):
+    import services.geo as geo
+    from helpers import shared_store
+
+    shared_store.reset_for_tests()
+    monkeypatch.setattr(geo, 'geocode_address', lambda address, **kw: MUNICH)
+    monkeypatch.setitem(app.config, 'ADMIN_EMAIL', 'admin@pepeshows.test')
+    yield
+    shared_store.reset_for_tests()
+
+
+@pytest.fixture
+def artists(artist_manager):
+    result = []
+    for i in range(3):
+        artist = artist_manager.create_artist(
+            f'Artist{i}', f'artist{i}@outbox-test.de', 'pw', ['Zauberer'],
+            address='Teststr. 1', price_min=1000, price_max=1500,
+            approval_status='approved',
+        )
+        artist.lat, artist.lon = MUNICH
+        result.append(artist)
+    db.session.commit()
+    return result
+
+
+def booking_payload():
+    return {
+        'client_name': 'Kunde', 'client_email': 'kunde@example.com',
+        'event_date': (date.today() + timedelta(days=30)).isoformat(),
+        'event_time': '19:00', 'duration_minutes': 30, 'event_type': 'Firmenfeier',
+        'show_type': 'solo', 'disciplines': ['Zauberer'], 'team_size': 1,
+        'number_of_guests': 100, 'event_address': 'Leopoldstr. 1, 80802 München',
+    }
+
+
+def queue(n, prefix='kunde'):
+    for i in range(n):
+        email_outbox.enqueue(f'{prefix}{i}@example.com', f'Betreff {i}', f'<p>{i}</p>')
+    db.session.commit()
+
+
+def make_due():
+    EmailOutbox.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+
+def test_a_new_request_queues_mails_instead_of_sending(client, artists, smtp_server):
+    res = client.post('/api/requests/requests', json=booking_payload())
+
+    assert res.status_code == 201
+    assert smtp_server.connections == 0
+    queued = EmailOutbox.query.all()
+    assert sorted(e.to_email for e in queued) == [
+        'admin@pepeshows.test', 'artist0@outbox-test.de',
+        'artist1@outbox-test.de', 'artist2@outbox-test.de',
+    ]
+    assert {e.status for e in queued} == {'pending'}
+
+
+def test_one_session_carries_the_whole_batch(app, client, artists, smtp_server, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 1)
+    client.post('/api/requests/requests', json=booking_payload())
+
+    result = email_outbox.drain()
+
+    assert result == {'claimed': 4, 'sent': 4, 'retried': 0, 'failed': 0}
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+    assert len(smtp_server.messages) == 4
+    assert {e.status for e in EmailOutbox.query.all()} == {'sent'}
+    # Nichts mehr fällig
+    assert email_outbox.drain()['claimed'] == 0
+
+
+def test_mails_roll_back_with_their_cause(app):
+    email_outbox.enqueue('a@example.com', 'Betreff', '<p>x</p>')
+    db.session.rollback()
+    assert EmailOutbox.query.count() == 0
+
+
+def test_an_unreachable_server_schedules_a_retry(app, smtp_server, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 2)
+    queue(10)
+    smtp_server.refuse_connections = 100
+
+    result = email_outbox.drain()
+
+    assert result == {'claimed': 10, 'sent': 0, 'retried': 10, 'failed': 0}
+    assert smtp_server.connections <= 2  # nicht einmal je Mail
+    entry = EmailOutbox.query.first()
+    assert entry.attempts == 1
+    assert entry.next_attempt_at > datetime.utcnow() + timedelta(seconds=30)
+    assert 'SMTP' in entry.last_error
+
+    # Noch nicht wieder fällig
+    assert email_outbox.drain()['claimed'] == 0
+    make_due()
+    smtp_server.refuse_connections = 0
+    assert email_outbox.drain()['sent'] == 10
+
+
+def test_backoff_grows_and_gives_up(smtp_server, monkeypatch):
+    queue(1)
+    delays = []
+    for _ in range(email_outbox.MAX_ATTEMPTS):
+        smtp_server.refuse_connections = 1
+        before = datetime.utcnow()
+        email_outbox.drain()
+        entry = EmailOutbox.query.one()
+        delays.append((entry.next_attempt_at - before).total_seconds())
+        make_due()
+
+    entry = EmailOutbox.query.one()
+    assert entry.status == 'failed'
+    assert entry.attempts == email_outbox.MAX_ATTEMPTS
+    assert delays[:-1] == sorted(delays[:-1])
+    assert email_outbox.drain()['claimed'] == 0
+
+
+def test_a_rejected_recipient_does_not_stop_the_batch(app, smtp_server, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 1)
+    queue(3)
+    smtp_server.reject = {'kunde1@example.com'}
+
+    result = email_outbox.drain()
+
+    assert result['sent'] == 2
+    assert result['retried'] == 1
+    assert smtp_server.connections == 1
+    assert sorted(smtp_server.recipients) == ['kunde0@example.com', 'kunde2@example.com']
+
+
+def test_a_dropped_connection_is_reopened(smtp_server):
+    queue(4)
+    smtp_server.drop_after = 2
+
+    result = email_outbox.drain()
+
+    # Die zweite Mail kam an, ihre Bestätigung nicht: Sie wird wiederholt.
+    assert result['sent'] + result['retried'] == 4
+    assert smtp_server.connections >= 2
+    make_due()
+    smtp_server.drop_after = None
+    email_outbox.drain()
+    assert {e.status for e in EmailOutbox.query.all()} == {'sent'}
+
+
+def test_without_smtp_config_nothing_is_claimed(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_HOST', None)
+    queue(2)
+
+    assert email_outbox.drain()['claimed'] == 0
+    assert {e.attempts for e in EmailOutbox.query.all()} == {0}
+
+
+def test_bulk_status_change_queues_one_mail_per_artist(client, admin_headers, artists,
+                                                       booking_request_manager, smtp_server):
+    res = client.post('/api/requests/requests', json=booking_payload())
+    req_id = res.get_json()['request_id']
+    EmailOutbox.query.delete()
+    db.session.commit()
+
+    res = client.put(f'/api/admin/requests/{req_id}/artist_status',
+                     json={'status': 'abgelehnt'}, headers=admin_headers)
+
+    assert res.status_code == 200
+    assert smtp_server.connections == 0
+    assert sorted(e.to_email for e in EmailOutbox.query.all()) == [
+        'artist0@outbox-test.de', 'artist1@outbox-test.de', 'artist2@outbox-test.de',
+    ]
+
+
+def test_bulk_status_without_change_queues_nothing(client, admin_headers, artists):
+    res = client.post('/api/requests/requests', json=booking_payload())
+    req_id = res.get_json()['request_id']
+    EmailOutbox.query.delete()
+    db.session.commit()
+
+    res = client.put(f'/api/admin/requests/{req_id}/artist_status',
+                     json={'status': 'gibtsnicht'}, headers=admin_headers)
+
+    assert res.get_json()['updated'] == 0
+    assert EmailOutbox.query.count() == 0
+
+
+def test_bulk_status_for_unknown_artists_queues_nothing(client, admin_headers, artists):
+    res = client.post('/api/requests/requests', json=booking_payload())
+    req_id = res.get_json()['request_id']
+    EmailOutbox.query.delete()
+    db.session.commit()
+
+    res = client.put(f'/api/admin/requests/{req_id}/artist_status',
+                     json={'status': 'abgelehnt', 'artist_ids': [999999]}, headers=admin_headers)
+
+    assert res.get_json()['updated'] == 0
+    assert EmailOutbox.query.count() == 0
+
+
+def test_bulk_status_mails_only_the_updated_artists(client, admin_headers, artists, artist_manager):
+    res = client.post('/api/requests/requests', json=booking_payload())
+    req_id = res.get_json()['request_id']
+    outsider = artist_manager.create_artist(
+        'Fremd', 'fremd@outbox-test.de', 'pw', ['Zauberer'], approval_status='approved',
+    )
+    EmailOutbox.query.delete()
+    db.session.commit()
+
+    res = client.put(f'/api/admin/requests/{req_id}/artist_status',
+                     json={'status': 'abgelehnt', 'artist_ids': [artists[0].id, outsider.id]},
+                     headers=admin_headers)
+
+    assert res.get_json()['updated'] == 1
+    assert [e.to_email for e in EmailOutbox.query.all()] == ['artist0@outbox-test.de']
+
+
+def test_cron_endpoint_drains_the_outbox(client, smtp_server, monkeypatch):
+    monkeypatch.delenv('CRON_SECRET', raising=False)
+    queue(2)
+
+    res = client.post('/api/cron/email-outbox')
+
+    assert res.status_code == 200
+    assert res.get_json()['result']['sent'] == 2
+    assert len(smtp_server.messages) == 2
+
+
+def test_cli_command_sends(app, smtp_server):
+    queue(1)
+    result = app.test_cli_runner().invoke(args=['send-emails'])
+    assert 'sent=1' in result.output
+
+
+def test_a_commit_with_new_mails_wakes_the_worker(app):
+    email_outbox._wakeup.clear()
+    email_outbox.enqueue('a@example.com', 'Betreff', '<p>x</p>')
+    assert not email_outbox._wakeup.is_set()
+    db.session.commit()
+    assert email_outbox._wakeup.is_set()
+    email_outbox._wakeup.clear()
+
+
+def test_background_delivery_sends_after_the_commit(app, client, artists, smtp_server, monkeypatch):
+    """Serverless: kein Worker-Thread, der Versand folgt dem Commit."""
+    from helpers import background
+
+    monkeypatch.setitem(app.config, 'EMAIL_OUTBOX_DELIVERY', 'background')
+    client.post('/api/requests/requests', json=booking_payload())
+
+    assert background.wait_for_idle(timeout=10)
+    db.session.expire_all()
+    assert {e.status for e in EmailOutbox.query.all()} == {'sent'}
+    assert len(smtp_server.messages) == 4
@@ -0,0 +1,241 @@
+"""Gage-Neuberechnung als Hintergrundlauf in Blöcken.
+
+POST /api/admin/gage/recalculate-all rechnete alle Artists im Request und in
+einer Transaktion. Jetzt legt die Route einen Job an, der Lauf geht in
+Blöcken nach ID mit je einem Commit und setzt nach einem Abbruch hinter dem
+letzten fertigen Block wieder an.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from cron_jobs import recalculate_gages
+from helpers import background
+from managers.artist_manager import ArtistManager
+from models import Artist, GageRecalcJob, db
+from services.gage_calculator import GageCalculator
+
+
+@pytest.fixture
+def artists():
+    """Sieben Artists mit Kriterien, aber ohne berechnete Gage; einer mit Override."""
+    rows = [
+        Artist(name=f'Gage {i}', email=f'gage{i}@recalc-test.de',
+               stage_experience='10+' if i % 2 else '3-7', employment_type='vollzeit',
+               circus_education=bool(i % 3), pepe_years=i)
+        for i in range(7)
+    ]
+    rows[3].admin_gage_override = 2000
+    rows[3].price_min, rows[3].price_max = 1600, 2000
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def idle_background():
+    yield
+    # Kein Hintergrundlauf darf in das Aufräumen der Datenbank hineinlaufen.
+    assert background.wait_for_idle(timeout=10)
+
+
+def _expected(artist):
+    return GageCalculator.calculate_gage(artist), GageCalculator.get_price_range(artist)
+
+
+def test_chunks_write_gages_and_price_bands(artists):
+    expected = {a.id: _expected(a) for a in artists}
+
+    summary = ArtistManager().recalculate_all_gages(chunk_size=3)
+
+    total = Artist.query.count()
+    assert summary['total_artists'] == total
+    assert [c['rows'] for c in summary['chunks']] == [3] * (total // 3) + ([total % 3] if total % 3 else [])
+    for a in artists:
+        db.session.refresh(a)
+        gage, (price_min, price_max) = expected[a.id]
+        assert a.calculated_gage == gage
+        if a.admin_gage_override:
+            assert (a.price_min, a.price_max) == (1600, 2000)
+        else:
+            assert (a.price_min, a.price_max) == (price_min, price_max)
+
+
+def test_unchanged_artists_are_not_written(artists):
+    ArtistManager().recalculate_all_gages()
+    assert ArtistManager().recalculate_all_gages()['updated_count'] == 0
+
+
+def test_one_update_per_chunk(artists):
+    updates = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.startswith('UPDATE artists'):
+            updates.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        ArtistManager().recalculate_all_gages(chunk_size=100)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert len(updates) == 2  # mit und ohne Override
+
+
+def test_api_runs_the_job_in_the_background(client, admin_headers, artists):
+    resp = client.post('/api/admin/gage/recalculate-all', headers=admin_headers, json={'chunk_size': 2})
+    assert resp.status_code == 202
+    status_url = resp.get_json()['status_url']
+
+    assert background.wait_for_idle(timeout=10)
+    status = client.get(status_url, headers=admin_headers).get_json()
+
+    assert status['status'] == 'done'
+    assert status['processed'] == status['total'] == Artist.query.count()
+    assert status['progress'] == 1.0
+    assert all(c['rows'] <= 2 and c['ms'] >= 0 for c in status['chunks'])
+    assert status['avg_chunk_ms'] is not None
+
+
+def test_the_job_does_not_hold_up_other_background_work(app, client, admin_headers, artists, monkeypatch):
+    """Die Preisberechnung neuer Anfragen läuft weiter, solange ein Gage-Lauf rechnet."""
+    real_chunk = ArtistManager.recalculate_gage_chunk
+    release = threading.Event()
+
+    def slow(self, after_id=0, chunk_size=500):
+        release.wait(timeout=10)
+        return real_chunk(self, after_id, chunk_size)
+
+    monkeypatch.setattr(ArtistManager, 'recalculate_gage_chunk', slow)
+    resp = client.post('/api/admin/gage/recalculate-all', headers=admin_headers, json={})
+    assert resp.status_code == 202
+
+    with app.app_context():
+        quick = background.submit(lambda: 'fertig')
+    try:
+        assert quick.result(timeout=5) == 'fertig'
+    finally:
+        release.set()
+
+
+def test_failed_job_resumes_after_the_last_chunk(app, artists, monkeypatch):
+    real_chunk = ArtistManager.recalculate_gage_chunk
+    seen = []
+
+    def flaky(self, after_id=0, chunk_size=500):
+        seen.append(after_id)
+        if len(seen) == 2:
+            raise RuntimeError('Verbindung weg')
+        return real_chunk(self, after_id, chunk_size)
+
+    monkeypatch.setattr(ArtistManager, 'recalculate_gage_chunk', flaky)
+    job, _ = recalculate_gages.start_job(chunk_size=3)
+    job = recalculate_gages.run_job(job.id)
+    assert job.status == 'failed' and 'Verbindung weg' in job.error
+    first_chunk_end = job.last_artist_id
+    assert job.processed == 3
+
+    job, resumed = recalculate_gages.start_job(chunk_size=3)
+    assert resumed
+    job = recalculate_gages.run_job(job.id)
+
+    assert job.status == 'done'
+    assert job.processed == Artist.query.count()
+    assert seen[2] == first_chunk_end  # setzt hinter dem fertigen Block an
+
+
+def _stale_job(**values):
+    seen = datetime.utcnow() - timedelta(seconds=recalculate_gages.STALE_SECONDS + 1)
+    job = GageRecalcJob(chunk_size=3, last_artist_id=0, processed=0, updated=0, chunks=[],
+                        created_at=seen, heartbeat_at=seen, **values)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_cron_finishes_a_stale_job(client, artists, monkeypatch):
+    monkeypatch.delenv('CRON_SECRET', raising=False)
+    job = _stale_job(status='running')
+
+    resp = client.post('/api/cron/gage-recalculation')
+
+    assert resp.status_code == 200
+    result = resp.get_json()['result']
+    assert result['resumed'] is True
+    assert result['job']['job_id'] == job.id
+    assert result['job']['status'] == 'done'
+    assert result['job']['processed'] == Artist.query.count()
+
+
+def test_cron_leaves_live_and_finished_jobs_alone(client, monkeypatch):
+    monkeypatch.delenv('CRON_SECRET', raising=False)
+    assert client.post('/api/cron/gage-recalculation').get_json()['result'] == {'resumed': False, 'job': None}
+
+    job = GageRecalcJob(status='running', chunk_size=500, last_artist_id=0,
+                        processed=0, updated=0, chunks=[], heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    result = client.post('/api/cron/gage-recalculation').get_json()['result']
+    assert result['resumed'] is False
+    assert result['job']['status'] == 'running'
+
+
+def test_cron_requires_the_secret(client, monkeypatch):
+    monkeypatch.setenv('CRON_SECRET', 'geheim')
+    assert client.post('/api/cron/gage-recalculation').status_code == 403
+
+
+def test_second_start_while_running_is_rejected(client, admin_headers):
+    job = GageRecalcJob(status='running', chunk_size=500, last_artist_id=0,
+                        processed=0, updated=0, chunks=[])
+    db.session.add(job)
+    db.session.commit()
+
+    resp = client.post('/api/admin/gage/recalculate-all', headers=admin_headers, json={})
+
+    assert resp.status_code == 409
+    assert resp.get_json()['details']['job']['job_id'] == job.id
+
+
+@pytest.mark.parametrize('body', [{'limit': 0}, {'chunk_size': 0}, {'chunk_size': 'viele'}])
+def test_invalid_parameters_are_rejected(client, admin_headers, body):
+    resp = client.post('/api/admin/gage/recalculate-all', headers=admin_headers, json=body)
+    assert resp.status_code == 400
+
+
+def test_unknown_job_is_404(client, admin_headers):
+    assert client.get('/api/admin/gage/recalculate-all/999', headers=admin_headers).status_code == 404
+
+
+class TestRepriceInOneUpdate:
+    def test_matches_the_chunked_run(self, artists):
+        ArtistManager().reprice_all_artists()
+        by_sql = {a.id: (a.calculated_gage, a.price_min, a.price_max) for a in Artist.query.all()}
+
+        db.session.execute(Artist.__table__.update().values(calculated_gage=None))
+        db.session.commit()
+        ArtistManager().recalculate_all_gages()
+        by_python = {a.id: (a.calculated_gage, a.price_min, a.price_max) for a in Artist.query.all()}
+
+        assert by_sql == by_python
+        assert by_sql[artists[3].id] == (2000, 1600, 2000)
+
+    def test_single_statement_and_nothing_left_to_do(self, artists):
+        updates = []
+
+        def count(conn, cursor, statement, *args):
+            if statement.startswith('UPDATE artists'):
+                updates.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            first = ArtistManager().reprice_all_artists()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        assert len(updates) == 1
+        assert first['updated_count'] >= len(artists)
+        assert ArtistManager().reprice_all_artists()['updated_count'] == 0
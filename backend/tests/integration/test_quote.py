@@ -0,0 +1,134 @@
+"""Preisauskunft ohne Anlage (POST /api/requests/quote)."""
+from datetime import date, timedelta
+
+import pytest
+
+from models import BookingRequest, db
+
+MUNICH = (48.1372, 11.5756)
+HAMBURG = (53.5511, 9.9937)
+
+MUNICH_ADDRESS = 'Leopoldstr. 1, 80802 München'
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    from helpers import shared_store
+    shared_store.reset_for_tests()
+    yield
+    shared_store.reset_for_tests()
+
+
+@pytest.fixture(autouse=True)
+def geocode_calls(monkeypatch):
+    import services.geo as geo
+
+    calls = []
+
+    def fake_geocode(address, **kwargs):
+        calls.append(address)
+        if address and 'hamburg' in address.lower():
+            return HAMBURG
+        return MUNICH
+
+    monkeypatch.setattr(geo, 'geocode_address', fake_geocode)
+    return calls
+
+
+@pytest.fixture
+def artists(artist_manager):
+    result = []
+    for name, coord in (('MucMike', MUNICH), ('HansaHanna', HAMBURG)):
+        artist = artist_manager.create_artist(
+            name, f'{name.lower()}@quote-test.de', 'pw', ['Zauberer'],
+            address='Teststr. 1', price_min=1200, price_max=1800,
+            approval_status='approved',
+        )
+        artist.lat, artist.lon = coord
+        result.append(artist)
+    db.session.commit()
+    return result
+
+
+def payload(**overrides):
+    body = {
+        'event_date': (date.today() + timedelta(days=30)).isoformat(),
+        'duration_minutes': 30,
+        'event_type': 'Firmenfeier',
+        'disciplines': ['Zauberer'],
+        'team_size': 1,
+        'number_of_guests': 300,
+        'event_address': MUNICH_ADDRESS,
+        'is_indoor': False,
+    }
+    body.update(overrides)
+    return body
+
+
+def test_quote_matches_the_real_request_and_stores_nothing(client, artists):
+    from models import EmailOutbox
+
+    res = client.post('/api/requests/quote', json=payload())
+
+    assert res.status_code == 200
+    quote = res.get_json()
+    assert 'request_id' not in quote
+    assert BookingRequest.query.count() == 0
+    assert EmailOutbox.query.count() == 0
+
+    real = client.post('/api/requests/requests', json=payload(
+        client_name='Kunde', client_email='kunde@example.com', event_time='19:00', show_type='solo',
+    )).get_json()
+    for field in ('price_min', 'price_max', 'price_status', 'num_available_artists'):
+        assert quote[field] == real[field]
+    assert quote['matched_artists'] == real['matched_artists']
+
+
+def test_repeated_quotes_come_from_the_cache(client, artists, monkeypatch):
+    from routes import request_routes
+
+    matched = []
+    original = request_routes.artist_mgr.get_artists_by_discipline
+    monkeypatch.setattr(request_routes.artist_mgr, 'get_artists_by_discipline',
+                        lambda *a: matched.append(a) or original(*a))
+
+    first = client.post('/api/requests/quote', json=payload())
+    # Andere Schreibweise, gleiche Eingaben
+    second = client.post('/api/requests/quote', json=payload(disciplines=[' zauberer ']))
+
+    assert first.headers['X-Quote-Cache'] == 'miss'
+    assert second.headers['X-Quote-Cache'] == 'hit'
+    assert second.get_json() == first.get_json()
+    assert len(matched) == 1
+
+
+@pytest.mark.parametrize('change', [
+    dict(number_of_guests=900),
+    dict(is_indoor=True),
+    dict(team_size='duo'),
+    dict(event_address='Reeperbahn 1, 20359 Hamburg'),
+])
+def test_changed_inputs_are_quoted_anew(client, artists, change):
+    client.post('/api/requests/quote', json=payload())
+    res = client.post('/api/requests/quote', json=payload(**change))
+    assert res.headers['X-Quote-Cache'] == 'miss'
+
+
+def test_quote_does_not_count_against_the_booking_limit(client, artists):
+    for _ in range(6):
+        assert client.post('/api/requests/quote', json=payload()).status_code == 200
+    res = client.post('/api/requests/requests', json=payload(
+        client_name='Kunde', client_email='kunde@example.com', event_time='19:00', show_type='solo',
+    ))
+    assert res.status_code == 201
+
+
+@pytest.mark.parametrize('body', [
+    payload(event_address=''),
+    payload(event_type='Hochzeit'),
+    payload(event_date='morgen'),
+    payload(team_size='viele'),
+    payload(disciplines='Zauberer'),
+])
+def test_invalid_quotes_are_rejected(client, body):
+    assert client.post('/api/requests/quote', json=body).status_code == 400
@@ -0,0 +1,103 @@
+"""Verfügbarkeit als rollender Standard plus gesperrte Tage (AVAILABILITY_MODE='exceptions').
+
+Statt 365 Zeilen je Artist gibt es eine Zahl am Artist und eine Zeile je
+gesperrtem Tag. Nach außen soll sich nichts ändern: Manager und Matching
+sprechen weiter von verfügbaren Tagen.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from managers.artist_manager import ArtistManager
+from managers.availability_manager import AvailabilityManager, AvailabilityWindowError
+from models import Availability, BlockedDate, db
+
+
+@pytest.fixture
+def exceptions_mode(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'AVAILABILITY_MODE', 'exceptions')
+
+
+def _day(n):
+    return date.today() + timedelta(days=n)
+
+
+def test_new_artist_gets_a_default_instead_of_rows(exceptions_mode):
+    artist = ArtistManager().create_artist('Ex', 'ex@ex.de', 'pw', ['Zauberer'])
+
+    assert artist.default_available_days == 365
+    assert Availability.query.count() == 0
+    slots = AvailabilityManager().get_availabilities(artist.id)
+    assert len(slots) == 365
+    assert (slots[0].date, slots[-1].date) == (_day(0), _day(364))
+
+
+def test_remove_and_add_translate_to_blocks(exceptions_mode):
+    manager = AvailabilityManager()
+    artist = ArtistManager().create_artist('Block', 'block@ex.de', 'pw', ['Zauberer'])
+    slot = next(s for s in manager.get_availabilities(artist.id) if s.date == _day(3))
+
+    assert manager.remove_availability(slot.id) == slot
+    assert manager.remove_availability(slot.id) is None
+    assert [b.date for b in BlockedDate.query.all()] == [_day(3)]
+    assert manager.get_slot(slot.id) is None
+
+    assert manager.add_availability(artist.id, _day(3)).id == slot.id
+    assert BlockedDate.query.count() == 0
+    with pytest.raises(AvailabilityWindowError):
+        manager.add_availability(artist.id, _day(400))
+
+
+def test_replace_blocks_everything_not_listed(exceptions_mode):
+    manager = AvailabilityManager()
+    artist = ArtistManager().create_artist('Repl', 'repl@ex.de', 'pw', ['Zauberer'])
+    manager.remove_availability(next(s.id for s in manager.get_availabilities(artist.id) if s.date == _day(1)))
+
+    result = manager.replace_availabilities_for_artist(
+        artist.id, [_day(i) for i in range(1, 365) if i != 200] + [_day(500)])
+
+    assert len(result['added']) == 1 and len(result['removed']) == 2
+    assert sorted(b.date for b in BlockedDate.query.all()) == [_day(0), _day(200)]
+    assert manager.availability_runs(_day(0), _day(364)) == {
+        artist.id: [(_day(1), _day(199)), (_day(201), _day(364))]
+    }
+
+
+def test_matching_is_an_anti_join_on_blocks(exceptions_mode):
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    free = artist_mgr.create_artist('Frei', 'frei@ex.de', 'pw', ['Zauberer'])
+    busy = artist_mgr.create_artist('Belegt', 'belegt@ex.de', 'pw', ['Zauberer'])
+    artist_mgr.create_artist('Jongleur', 'jong@ex.de', 'pw', ['Jonglage'])
+    manager.remove_availability(next(s.id for s in manager.get_availabilities(busy.id) if s.date == _day(30)))
+
+    assert [a.id for a in artist_mgr.get_artists_by_discipline(['Zauberer'], _day(30))] == [free.id]
+    assert {a.id for a in artist_mgr.get_artists_by_discipline(['Zauberer'], _day(31))} == {free.id, busy.id}
+    assert artist_mgr.get_artists_by_discipline(['Zauberer'], _day(365)) == []
+    assert artist_mgr.get_artists_by_discipline(['Zauberer'], _day(-1)) == []
+
+
+def test_rows_convert_to_default_and_blocks(app, monkeypatch):
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    artist = artist_mgr.create_artist('Alt', 'alt@ex.de', 'pw', ['Zauberer'])
+    for gap in (5, 6):
+        db.session.delete(Availability.query.filter_by(artist_id=artist.id, date=_day(gap)).one())
+    db.session.commit()
+    before = manager.availability_runs(_day(0), _day(364))
+
+    result = manager.convert_rows_to_exceptions(drop_rows=True)
+
+    assert result == {'artists': 1, 'blocked': 2, 'dropped_rows': 363}
+    monkeypatch.setitem(app.config, 'AVAILABILITY_MODE', 'exceptions')
+    assert manager.availability_runs(_day(0), _day(364)) == before
+
+
+def test_daily_cron_has_nothing_to_do(exceptions_mode):
+    from cron_jobs.auto_availability import run_daily_availability
+
+    ArtistManager().create_artist('Cron', 'cron@ex.de', 'pw', ['Zauberer'])
+
+    assert run_daily_availability()['created'] == 0
+    assert Availability.query.count() == 0
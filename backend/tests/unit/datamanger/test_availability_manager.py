@@ -96,4 +96,120 @@ def test_remove_availability():
     removed = manager.remove_availability(slot.id)
     assert removed.id == slot.id
     # Erneutes Löschen gibt None
-    assert manager.remove_availability(slot.id) is None
\ No newline at end of file
+    assert manager.remove_availability(slot.id) is None
+
+def test_availability_runs_collapse_consecutive_days():
+    """Zusammenhängende Tage kommen als ein Lauf, Lücken trennen Läufe."""
+    from models import db
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    a = artist_mgr.create_artist('Runs', 'runs@ex.de', 'pw', ['Zauberer'])
+    b = artist_mgr.create_artist('Runs2', 'runs2@ex.de', 'pw', ['Zauberer'])
+    today = date.today()
+    # Bei a zwei Tage herausnehmen: drei Läufe
+    for gap in (10, 11, 40):
+        slot = next(s for s in manager.get_availabilities(a.id) if s.date == today + timedelta(days=gap))
+        db.session.delete(slot)
+    db.session.commit()
+
+    runs = manager.availability_runs(today, today + timedelta(days=99))
+
+    assert runs[a.id] == [
+        (today, today + timedelta(days=9)),
+        (today + timedelta(days=12), today + timedelta(days=39)),
+        (today + timedelta(days=41), today + timedelta(days=99)),
+    ]
+    assert runs[b.id] == [(today, today + timedelta(days=99))]
+    assert manager.availability_runs(today, today, artist_ids=[b.id]) == {b.id: [(today, today)]}
+
+
+def test_bitset_marks_each_available_day():
+    from managers.availability_manager import encode_bitset
+    import base64
+
+    start = date(2030, 1, 1)
+    runs = [(date(2029, 12, 30), date(2030, 1, 2)), (date(2030, 1, 10), date(2030, 1, 10))]
+    bits = base64.b64decode(encode_bitset(runs, start, date(2030, 1, 12)))
+
+    assert bits == bytes([0b00000011, 0b00000010])
+
+
+def _count_statements(fn):
+    from sqlalchemy import event
+    from models import db
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'availabilities' in statement:
+            statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_replace_is_one_delete_and_one_insert():
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    artist = artist_mgr.create_artist('Set', 'set@ex.de', 'pw', ['Zauberer'])
+    today = date.today()
+    before = {s.date: s.id for s in manager.get_availabilities(artist.id)}
+    wanted = [today + timedelta(days=i) for i in range(5, 400)]
+
+    result, statements = _count_statements(
+        lambda: manager.replace_availabilities_for_artist(artist.id, wanted))
+
+    assert sorted(statements) == ['DELETE', 'INSERT', 'SELECT', 'SELECT']
+    assert result['removed'] == [before[today + timedelta(days=i)] for i in range(5)]
+    assert len(result['added']) == 35
+    assert [s.date for s in manager.get_availabilities(artist.id)] == wanted
+
+
+def test_fill_range_covers_all_approved_artists_in_one_insert():
+    from models import Availability, db
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    a = artist_mgr.create_artist('Fa', 'fa@ex.de', 'pw', ['Zauberer'], approval_status='approved')
+    b = artist_mgr.create_artist('Fb', 'fb@ex.de', 'pw', ['Zauberer'], approval_status='approved')
+    pending = artist_mgr.create_artist('Fp', 'fp@ex.de', 'pw', ['Zauberer'], approval_status='pending')
+    start = date.today() + timedelta(days=360)
+    end = start + timedelta(days=9)
+
+    result, statements = _count_statements(
+        lambda: manager.ensure_available_for_all_between(start, end))
+
+    assert statements.count('INSERT') == 1
+    # 360..364 gab es schon aus der Anlage, 365..369 sind neu
+    assert (result['created'], result['skipped']) == (10, 10)
+    assert result['elapsed_ms'] >= 0
+    for artist, expected in ((a, 370), (b, 370), (pending, 365)):
+        assert Availability.query.filter_by(artist_id=artist.id).count() == expected
+    assert manager.ensure_available_for_all_between(start, end)['created'] == 0
+
+
+def test_cron_catches_up_on_missed_days_only():
+    from cron_jobs.auto_availability import run_daily_availability
+    from models import Availability, CronRun, db
+    artist_mgr = ArtistManager()
+    manager = AvailabilityManager()
+    artist = artist_mgr.create_artist('Cu', 'cu@ex.de', 'pw', ['Zauberer'], approval_status='approved')
+    today = date.today()
+    # Letzter Lauf vor drei Tagen; den Tag 362 hat der Artist seitdem entfernt
+    db.session.add(CronRun(name='auto_availability', covered_until=today + timedelta(days=362)))
+    manager.remove_availability(next(s.id for s in manager.get_availabilities(artist.id)
+                                     if s.date == today + timedelta(days=362)))
+    db.session.commit()
+
+    result = run_daily_availability()
+
+    assert result['from'] == (today + timedelta(days=363)).isoformat()
+    # 363 und 364 lagen aus der Anlage vor, 365 fehlte
+    assert (result['created'], result['skipped']) == (1, 2)
+    days = {s.date for s in manager.get_availabilities(artist.id)}
+    assert today + timedelta(days=365) in days
+    assert today + timedelta(days=362) not in days
+    assert db.session.get(CronRun, 'auto_availability').covered_until == today + timedelta(days=365)
+    assert run_daily_availability()['created'] == 0
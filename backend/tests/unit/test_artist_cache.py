@@ -0,0 +1,104 @@
+"""Clerk-UID -> Artist über `helpers.artist_cache`.
+
+Bisher lief bei jedem authentifizierten Request eine Suche über
+`lower(supabase_user_id)`. Jetzt kommt die Artist-ID aus `shared_store`
+und der Artist über den Primärschlüssel.
+"""
+import pytest
+from sqlalchemy import event
+
+from helpers import artist_cache, shared_store
+from models import Artist, db
+
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    shared_store.reset_for_tests()
+    yield
+    shared_store.reset_for_tests()
+
+
+@pytest.fixture
+def uid_lookups(app):
+    """Zählt die Suchen über lower(supabase_user_id)."""
+    seen = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if 'lower(artists.supabase_user_id)' in statement:
+            seen.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    yield seen
+    event.remove(db.engine, 'before_cursor_execute', count)
+
+
+def _artist(name, uid):
+    artist = Artist(name=name, email=f'{name.lower()}@cache-test.de', supabase_user_id=uid)
+    db.session.add(artist)
+    db.session.commit()
+    return artist
+
+
+def test_the_second_lookup_skips_the_search(uid_lookups):
+    artist = _artist('Cara', 'user_Cara')
+
+    assert artist_cache.lookup('user_cara').id == artist.id
+    db.session.expunge_all()
+    assert artist_cache.lookup('USER_CARA').id == artist.id
+
+    assert len(uid_lookups) == 1
+
+
+def test_an_unknown_uid_is_not_cached(uid_lookups):
+    assert artist_cache.lookup('user_nobody') is None
+    assert artist_cache.lookup('user_nobody') is None
+    assert len(uid_lookups) == 2
+
+
+def test_changing_the_uid_drops_the_entry():
+    artist = _artist('Dora', 'user_dora_old')
+    artist_cache.lookup('user_dora_old')
+
+    artist.supabase_user_id = 'user_dora_new'
+    db.session.commit()
+
+    assert shared_store.get_json('artist_by_sub:user_dora_old') is None
+    assert artist_cache.lookup('user_dora_old') is None
+    assert artist_cache.lookup('user_dora_new').id == artist.id
+
+
+def test_deleting_the_artist_drops_the_entry():
+    artist = _artist('Emil', 'user_emil')
+    artist_cache.lookup('user_emil')
+
+    db.session.delete(artist)
+    db.session.commit()
+
+    assert shared_store.get_json('artist_by_sub:user_emil') is None
+    assert artist_cache.lookup('user_emil') is None
+
+
+def test_a_rolled_back_change_keeps_the_entry():
+    artist = _artist('Fritz', 'user_fritz')
+    artist_cache.lookup('user_fritz')
+
+    artist.name = 'Fritzi'
+    db.session.flush()
+    db.session.rollback()
+
+    assert shared_store.get_json('artist_by_sub:user_fritz') == artist.id
+
+
+def test_a_stale_entry_for_another_artist_is_not_trusted():
+    """Etwa nach einem Bulk-Delete, das an den Session-Events vorbeigeht."""
+    first = _artist('Gina', 'user_gina')
+    other = _artist('Hugo', 'user_hugo')
+    shared_store.set_json('artist_by_sub:user_gina', other.id, 60)
+
+    assert artist_cache.lookup('user_gina').id == first.id
+    assert shared_store.get_json('artist_by_sub:user_gina') == first.id
+
+
+def test_lower_indexes_are_declared():
+    names = {ix.name for ix in Artist.__table__.indexes}
+    assert {'ix_artists_lower_supabase_user_id', 'ix_artists_lower_email'} <= names
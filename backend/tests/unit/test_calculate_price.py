@@ -6,11 +6,14 @@ Richtung bewegt. Dazu kommen die Sonderfälle (Gruppe, Überlänge) und die
 Obergrenzen-Garantie aus dem Kern der Spec.
 """
 
+import random
+
 import pytest
 
 from services.calculate_price import (
     MAX_AUTOMATIC_DURATION_MINUTES,
     calculate_price,
+    calculate_prices_batch,
     client_price,
     requires_individual_offer,
     surcharges,
@@ -256,3 +259,83 @@ def test_local_discount_applies_once_per_event():
 def test_distances_take_precedence_over_the_collective_distance():
     """Ist `distances` gesetzt, spielen `distance_km` und `people` keine Rolle."""
     assert surcharges(distances=[100], distance_km=9999, people=7) == 50
+
+
+# --- Batch ------------------------------------------------------------------
+
+def _random_artists(n, seed):
+    rnd = random.Random(seed)
+    mins, maxs, legs = [], [], []
+    for _ in range(n):
+        lo = rnd.choice([0, 250, 800, 1234.5, 2000, rnd.uniform(100, 5000)])
+        hi = rnd.choice([lo, lo + 1, rnd.uniform(100, 8000)])  # auch vertauscht
+        mins.append(lo)
+        maxs.append(hi)
+        legs.append(rnd.choice([0, None, 12.3, 299.99, 300, 599.9, 600, rnd.uniform(0, 900)]))
+    return mins, maxs, legs
+
+
+@pytest.mark.parametrize('request_fields', [
+    {},
+    dict(event_type='Private Feier', num_guests=900, is_weekend=True),
+    dict(event_type='Firmenfeier', is_indoor=False, duration=45, needs_light=True),
+    dict(event_type='Hochzeit', needs_sound=True, event_address='Marienplatz 1, 80331 München'),
+    dict(fee_pct='kaputt', num_guests='viele', duration=None),
+])
+def test_batch_matches_the_scalar_price_exactly(request_fields):
+    mins, maxs, legs = _random_artists(300, seed=len(request_fields))
+    common = {k: v for k, v in {**BASE, **request_fields}.items()
+              if k not in ('base_min', 'base_max', 'team_size')}
+
+    batch = calculate_prices_batch(mins, maxs, legs, **common)
+
+    scalar = [
+        calculate_price(base_min=lo, base_max=hi, distances=[d], team_count=1, **common)
+        for lo, hi, d in zip(mins, maxs, legs)
+    ]
+    assert batch == scalar
+    assert all(type(v) is int for pair in batch for v in pair)
+
+
+def test_batch_reads_the_environment_like_the_scalar_price(monkeypatch):
+    monkeypatch.setenv('PRIVATE_MIN_FACTOR', '0.5')
+    monkeypatch.setenv('PRICE_FACTOR_SPAN', '0.7')
+    monkeypatch.setenv('PRICE_SPREAD_PCT', '0.33')
+    monkeypatch.setenv('RATE_PER_KM', '0.85')
+    mins, maxs, legs = _random_artists(50, seed=99)
+    common = {**{k: v for k, v in BASE.items() if k not in ('base_min', 'base_max')},
+              'event_type': 'Private Feier'}
+
+    assert calculate_prices_batch(mins, maxs, legs, **common) == [
+        calculate_price(base_min=lo, base_max=hi, distances=[d], team_count=1, **common)
+        for lo, hi, d in zip(mins, maxs, legs)
+    ]
+
+
+def test_batch_without_numpy_gives_the_same_result(monkeypatch):
+    import services.calculate_price as cp
+
+    mins, maxs, legs = _random_artists(100, seed=5)
+    common = {k: v for k, v in BASE.items() if k not in ('base_min', 'base_max', 'team_size')}
+    with_numpy = cp.calculate_prices_batch(mins, maxs, legs, **common)
+    monkeypatch.setattr(cp, 'np', None)
+    assert cp.calculate_prices_batch(mins, maxs, legs, **common) == with_numpy
+
+
+def test_batch_follows_changed_distance_tiers(monkeypatch):
+    import services.calculate_price as cp
+
+    monkeypatch.setattr(cp, '_DISTANCE_TIERS', ((800, 500), (400, 150), (100, 50)))
+    mins, maxs, legs = _random_artists(100, seed=7)
+    common = {k: v for k, v in BASE.items() if k not in ('base_min', 'base_max', 'team_size')}
+
+    assert cp.calculate_prices_batch(mins, maxs, legs, **common) == [
+        cp.calculate_price(base_min=lo, base_max=hi, distances=[d], team_count=1, **common)
+        for lo, hi, d in zip(mins, maxs, legs)
+    ]
+
+
+def test_batch_edge_cases():
+    assert calculate_prices_batch([], [], [], fee_pct=20) == []
+    with pytest.raises(ValueError):
+        calculate_prices_batch([1000], [2000, 3000], [0], fee_pct=20)
@@ -219,3 +219,177 @@ def test_pyjwt_encode_decode_roundtrip_uses_rs256(clerk_keys):
     header = pyjwt.get_unverified_header(token)
     assert header["alg"] == "RS256"
     assert pyjwt.decode(token, public_key, algorithms=["RS256"])["sub"] == "x"
+
+
+# ---------------------------------------------------------------------------
+# Zwischenspeicher: geprüfte Tokens und JWKS-Schlüssel
+# ---------------------------------------------------------------------------
+
+
+def _counting_key(public_key, calls):
+    def _get(self, token):
+        calls.append(token)
+        return type("K", (), {"key": public_key})()
+    return _get
+
+
+def test_a_verified_token_is_not_checked_again(real_jwks_client, clerk_keys, clerk_token):
+    _, public_key = clerk_keys
+    calls = []
+    _RecordingJWKSClient.get_signing_key_from_jwt = _counting_key(public_key, calls)
+    try:
+        token = clerk_token("user_cached", email="a@example.com")
+        first = clerk_auth.verify_clerk_token(token)
+        second = clerk_auth.verify_clerk_token(token)
+    finally:
+        del _RecordingJWKSClient.get_signing_key_from_jwt
+
+    assert first == second
+    assert second["sub"] == "user_cached"
+    assert len(calls) == 1
+    stats = clerk_auth.auth_cache_stats()
+    assert (stats["token_hits"], stats["token_misses"]) == (1, 1)
+
+
+def test_cached_claims_cannot_be_changed_by_the_caller(real_jwks_client, clerk_keys, clerk_token):
+    _, public_key = clerk_keys
+    _RecordingJWKSClient.get_signing_key_from_jwt = _counting_key(public_key, [])
+    try:
+        token = clerk_token("user_cached")
+        clerk_auth.verify_clerk_token(token)["sub"] = "user_other"
+        assert clerk_auth.verify_clerk_token(token)["sub"] == "user_cached"
+    finally:
+        del _RecordingJWKSClient.get_signing_key_from_jwt
+
+
+def test_a_cached_token_expires_with_its_exp(real_jwks_client, clerk_keys, clerk_token, monkeypatch):
+    import time
+
+    _, public_key = clerk_keys
+    calls = []
+    _RecordingJWKSClient.get_signing_key_from_jwt = _counting_key(public_key, calls)
+    try:
+        token = clerk_token("user_short", expires_in=30)
+        assert clerk_auth.verify_clerk_token(token) is not None
+        later = time.time() + 31
+        monkeypatch.setattr(clerk_auth.time, "time", lambda: later)
+        clerk_auth.verify_clerk_token(token)
+    finally:
+        del _RecordingJWKSClient.get_signing_key_from_jwt
+
+    stats = clerk_auth.auth_cache_stats()
+    assert (stats["token_hits"], stats["token_misses"]) == (0, 2)
+
+
+def test_rejected_tokens_are_not_cached(real_jwks_client, clerk_token):
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    _RecordingJWKSClient.get_signing_key_from_jwt = _counting_key(other_key.public_key(), [])
+    try:
+        token = clerk_token("user_wrong_key")
+        assert clerk_auth.verify_clerk_token(token) is None
+        assert clerk_auth.verify_clerk_token(token) is None
+    finally:
+        del _RecordingJWKSClient.get_signing_key_from_jwt
+
+    stats = clerk_auth.auth_cache_stats()
+    assert (stats["token_hits"], stats["token_misses"]) == (0, 2)
+
+
+def test_token_cache_drops_the_least_recently_used():
+    cache = clerk_auth._TokenCache(2)
+    far = 2**40
+    for name in ("a", "b"):
+        cache.put(name.encode(), {"sub": name, "exp": far})
+    cache.get(b"a")
+    cache.put(b"c", {"sub": "c", "exp": far})
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a")["sub"] == "a"
+    assert len(cache) == 2
+
+
+class _FakeJWKS:
+    """JWKS-Client mit abzählbaren Abrufen; `fail` lässt das Laden scheitern."""
+
+    def __init__(self, kids):
+        self.kids = kids
+        self.fetches = 0
+        self.fail = False
+
+    def get_signing_keys(self, refresh=False):
+        from jwt.exceptions import PyJWKClientConnectionError
+
+        self.fetches += 1
+        if self.fail:
+            raise PyJWKClientConnectionError("timed out")
+        return [type("K", (), {"key_id": kid, "key": f"key-{kid}-{self.fetches}"})()
+                for kid in self.kids]
+
+    def get_signing_key_from_jwt(self, token):
+        self.fetches += 1
+        return type("K", (), {"key_id": "new", "key": "key-new"})()
+
+
+def _token_with_kid(kid):
+    return pyjwt.encode({"sub": "x"}, "secret", algorithm="HS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def inline_background(monkeypatch):
+    """Hintergrundläufe sammeln statt starten; der Test führt sie selbst aus."""
+    from helpers import background
+
+    queued = []
+    monkeypatch.setattr(background, "submit", lambda fn, *a, **kw: queued.append(fn))
+    return queued
+
+
+def test_known_keys_come_without_a_fetch(app, inline_background):
+    client = _FakeJWKS(["k1", "k2"])
+    keys = clerk_auth._SigningKeys(client)
+    assert keys.refresh()
+
+    assert keys.for_token(_token_with_kid("k2")).key == "key-k2-1"
+    assert keys.for_token(_token_with_kid("k1")).key == "key-k1-1"
+    assert client.fetches == 1
+    assert inline_background == []
+
+
+def test_stale_keys_are_served_while_the_refresh_runs(app, inline_background, monkeypatch):
+    client = _FakeJWKS(["k1"])
+    keys = clerk_auth._SigningKeys(client)
+    keys.refresh()
+    keys.fetched_at -= clerk_auth.CLERK_JWKS_REFRESH_SECONDS + 1
+
+    # Der Request bekommt sofort den alten Schlüssel …
+    assert keys.for_token(_token_with_kid("k1")).key == "key-k1-1"
+    assert keys.for_token(_token_with_kid("k1")).key == "key-k1-1"
+    # … und es läuft genau ein Auffrischen.
+    assert len(inline_background) == 1
+    inline_background[0]()
+    assert keys.for_token(_token_with_kid("k1")).key == "key-k1-2"
+
+
+def test_a_failed_refresh_keeps_the_old_keys(app, inline_background, caplog):
+    client = _FakeJWKS(["k1"])
+    keys = clerk_auth._SigningKeys(client)
+    keys.refresh()
+    client.fail = True
+
+    with caplog.at_level("WARNING"):
+        assert not keys.refresh()
+
+    assert keys.for_token(_token_with_kid("k1")).key == "key-k1-1"
+    assert any("aufgefrischt" in r.getMessage() for r in caplog.records)
+
+
+def test_an_unknown_kid_asks_the_client(app, inline_background):
+    client = _FakeJWKS(["k1"])
+    keys = clerk_auth._SigningKeys(client)
+    keys.refresh()
+
+    assert keys.for_token(_token_with_kid("rotated")).key == "key-new"
+    assert keys.for_token(_token_with_kid("rotated")).key == "key-new"
+    assert client.fetches == 2
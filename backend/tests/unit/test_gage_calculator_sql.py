@@ -0,0 +1,105 @@
+"""Parität: `GageCalculator.gage_expression` rechnet wie `calculate_gage`.
+
+Alle Kombinationen der Kriterien, samt NULL und unbekannten Werten, landen
+als Zeilen in einer SQLite-Tabelle; SQL und Python müssen für jede Zeile
+dieselbe Gage und dasselbe Preisband liefern.
+"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import (Boolean, Column, Integer, MetaData, String, Table,
+                        create_engine, select)
+
+from services.gage_calculator import GageCalculator
+
+CRITERIA = {
+    'stage_experience': [k for k in GageCalculator.STAGE_EXPERIENCE_SCORES] + ['20+'],
+    'employment_type': [k for k in GageCalculator.EMPLOYMENT_TYPE_SCORES] + ['freelance'],
+    'circus_education': [True, False, None],
+    'awards_level': ['international', 'national', 'regional', 'lokal', 'keine', 'none', '', None],
+    'pepe_years': [None, -1, 0, 1, 2, 3, 4, 5, 12],
+    'pepe_exclusivity': [True, False, None],
+}
+
+metadata = MetaData()
+artists = Table(
+    'artists', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('stage_experience', String(10)),
+    Column('employment_type', String(20)),
+    Column('circus_education', Boolean),
+    Column('awards_level', String(20)),
+    Column('pepe_years', Integer),
+    Column('pepe_exclusivity', Boolean),
+    Column('admin_gage_override', Integer),
+    Column('calculated_gage', Integer),
+)
+
+
+def _combinations():
+    keys = list(CRITERIA)
+    for values in itertools.product(*CRITERIA.values()):
+        yield dict(zip(keys, values), admin_gage_override=None)
+    # Override schlägt alle Kriterien; 0 zählt wie kein Override
+    for override in (0, 1, 999, 2001, 5000):
+        yield dict(stage_experience='10+', employment_type='vollzeit', circus_education=True,
+                   awards_level='international', pepe_years=5, pepe_exclusivity=True,
+                   admin_gage_override=override)
+
+
+@pytest.fixture(scope='module')
+def evaluated():
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    rows = [dict(row, id=i) for i, row in enumerate(_combinations(), start=1)]
+    gage = GageCalculator.gage_expression(artists)
+    with engine.begin() as conn:
+        conn.execute(artists.insert(), rows)
+        result = conn.execute(
+            select(artists.c.id, gage.label('gage'),
+                   GageCalculator.price_min_expression(gage).label('price_min'))
+        ).all()
+    return rows, {r.id: r for r in result}
+
+
+def test_every_combination_matches_python(evaluated):
+    rows, sql = evaluated
+    mismatches = []
+    for row in rows:
+        artist = SimpleNamespace(**row)
+        expected = (GageCalculator.calculate_gage(artist), GageCalculator.get_price_range(artist)[0])
+        got = (sql[row['id']].gage, sql[row['id']].price_min)
+        if got != expected:
+            mismatches.append((row, expected, got))
+
+    assert len(rows) > 20_000
+    assert mismatches == []
+
+
+def test_no_score_lands_on_a_rounding_tie():
+    """ROUND und Pythons round() unterscheiden sich nur bei genau x.5.
+
+    Bei 3.5 runden beide auf 4, der Paritätstest sähe das nicht.
+    """
+    for row in _combinations():
+        artist = SimpleNamespace(**row)
+        if artist.admin_gage_override:
+            continue
+        scaled = _score(artist) * GageCalculator.GAGE_MAX / 25
+        assert scaled % 1 != 0.5, row
+
+
+def _score(artist):
+    """Punktsumme wie in `calculate_gage`, vor dem Runden."""
+    w = GageCalculator.WEIGHTS
+    awards = artist.awards_level
+    total = 0.0
+    total += GageCalculator.STAGE_EXPERIENCE_SCORES.get(artist.stage_experience, 0.0) * w['stage_experience']
+    total += GageCalculator.EMPLOYMENT_TYPE_SCORES.get(artist.employment_type, 0.0) * w['employment_type']
+    total += (1.0 if artist.circus_education else 0.0) * w['circus_education']
+    total += (1.0 if awards and awards not in ('keine', 'none') else 0.0) * w['awards']
+    total += GageCalculator._pepe_years_score(artist.pepe_years) * w['pepe_years']
+    total += (1.0 if artist.pepe_exclusivity else 0.0) * w['pepe_exclusivity']
+    return total
@@ -0,0 +1,178 @@
+"""Offline-Ortsverzeichnis als Stufe der Adresssuche.
+
+Jede Rückfallstufe war bisher ein weiterer, gedrosselter Nominatim-Aufruf mit
+8 s Timeout. PLZ und Ort beantwortet jetzt das Verzeichnis, und fällt
+Nominatim aus, bekommt eine Anfrage trotzdem noch eine Entfernung.
+"""
+import pytest
+import requests
+
+import services.geo as geo
+from services import gazetteer
+from services.gazetteer import Gazetteer
+
+FINSING = (48.2167, 11.8167)
+MUENCHEN = (48.1372, 11.5756)
+
+TYPO_ADDRESS = "Kiebtzweg 12a, 85464 Finsing, Deutschland"
+
+ROWS = [
+    ("DE", "85464", "Finsing", *FINSING),
+    ("DE", "80331", "München", *MUENCHEN),
+    ("DE", "80802", "München", 48.1620, 11.5880),
+    ("AT", "1010", "Wien", 48.2082, 16.3738),
+    ("CH", "1010", "Lausanne", 46.5197, 6.6323),
+    # Zwei weit auseinanderliegende Orte gleichen Namens
+    ("DE", "67433", "Neustadt", 49.3539, 8.1389),
+    ("DE", "23730", "Neustadt", 54.1072, 10.8158),
+]
+
+
+@pytest.fixture
+def gz(app, monkeypatch):
+    monkeypatch.setitem(app.config, "GEO_GAZETTEER", True)
+    g = Gazetteer.from_rows(ROWS)
+    gazetteer.use_gazetteer(g)
+    return g
+
+
+def _stub(known=None):
+    seen = []
+
+    def fake(query, **kwargs):
+        seen.append(query)
+        return (known or {}).get(" ".join(query.lower().split()))
+
+    fake.seen = seen
+    return fake
+
+
+# --- Verzeichnis -----------------------------------------------------------
+
+def test_postal_code_returns_the_centroid(gz):
+    assert gz.postal("85464", "DE") == FINSING
+
+
+def test_several_rows_of_one_place_are_averaged(gz):
+    lat, lon = gz.place("München", "DE")
+    assert lat == pytest.approx((MUENCHEN[0] + 48.1620) / 2, abs=1e-4)
+    assert lon == pytest.approx((MUENCHEN[1] + 11.5880) / 2, abs=1e-4)
+
+
+def test_place_names_ignore_case_and_umlaut_spelling(gz):
+    assert gz.place("muenchen") == gz.place("MÜNCHEN")
+
+
+def test_an_ambiguous_place_name_is_not_answered(gz):
+    """Ein Mittelwert zweier Neustadts laege irgendwo in Hessen."""
+    assert gz.place("Neustadt", "DE") is None
+
+
+def test_five_digit_codes_are_german(gz):
+    assert gz.postal("85464") == FINSING
+
+
+def test_four_digit_codes_are_told_apart_by_the_place_name(gz):
+    assert gz.postal("1010") is None
+    assert gz.postal("1010", place="Wien") == (48.2082, 16.3738)
+    assert gz.postal("1010", place="Lausanne") == (46.5197, 6.6323)
+    assert gz.postal("1010", "CH") == (46.5197, 6.6323)
+
+
+def test_the_bundled_file_loads(monkeypatch):
+    monkeypatch.delenv("GAZETTEER_PATH", raising=False)
+    gazetteer.use_gazetteer(None)
+    assert len(gazetteer.get_gazetteer()) > 0
+    assert gazetteer.lookup_postal("85464", "DE") == FINSING
+
+
+def test_a_missing_file_yields_an_empty_gazetteer(monkeypatch, tmp_path):
+    monkeypatch.setenv("GAZETTEER_PATH", str(tmp_path / "fehlt.tsv"))
+    gazetteer.use_gazetteer(None)
+    assert gazetteer.lookup_postal("85464", "DE") is None
+
+
+# --- Stufensuche -----------------------------------------------------------
+
+def test_typo_reaches_the_postal_tier_without_a_third_lookup(app, monkeypatch, gz):
+    """Genaue Stufe und Strasse fragen Nominatim, die PLZ nicht mehr."""
+    fake = _stub()
+    monkeypatch.setattr(geo, "geocode_address", fake)
+
+    coord, precision = geo.geocode_address_cascade(TYPO_ADDRESS)
+
+    assert coord == FINSING
+    assert precision == geo.GEO_PRECISION_POSTAL
+    assert len(fake.seen) == 2
+
+
+def test_an_exact_hit_still_wins_over_the_gazetteer(app, monkeypatch, gz):
+    exact = (48.2170, 11.8200)
+    fake = _stub({" ".join(TYPO_ADDRESS.lower().split()): exact})
+    monkeypatch.setattr(geo, "geocode_address", fake)
+
+    assert geo.geocode_address_cascade(TYPO_ADDRESS) == (exact, geo.GEO_PRECISION_EXACT)
+
+
+def test_unknown_postal_code_still_asks_nominatim(app, monkeypatch, gz):
+    fake = _stub({"99999 irgendwo, deutschland": MUENCHEN})
+    monkeypatch.setattr(geo, "geocode_address", fake)
+
+    coord, precision = geo.geocode_address_cascade("Weg 1, 99999 Irgendwo, Deutschland")
+
+    assert coord == MUENCHEN
+    assert precision == geo.GEO_PRECISION_POSTAL
+
+
+def test_without_the_setting_every_tier_asks_nominatim(app, monkeypatch, gz):
+    monkeypatch.setitem(app.config, "GEO_GAZETTEER", False)
+    fake = _stub()
+    monkeypatch.setattr(geo, "geocode_address", fake)
+
+    assert geo.geocode_address_cascade(TYPO_ADDRESS) == (None, None)
+    assert len(fake.seen) == len(geo.address_variants(TYPO_ADDRESS))
+
+
+def _nominatim_down(monkeypatch):
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(kwargs["params"]["q"])
+        raise requests.ConnectionError("nominatim down")
+
+    monkeypatch.setattr(geo.requests, "get", fake_get)
+    monkeypatch.setattr(geo, "_throttle", lambda: None)
+    return calls
+
+
+def test_an_outage_costs_one_timeout_not_one_per_tier(app, monkeypatch, gz):
+    calls = _nominatim_down(monkeypatch)
+
+    coord, precision = geo.geocode_address_cascade("Kiebitzweg 12a, 85464 Finsing, Deutschland")
+
+    assert coord == FINSING
+    assert precision == geo.GEO_PRECISION_POSTAL
+    assert len(calls) == 1
+    assert not geo.nominatim_available()
+
+
+def test_an_outage_answers_a_bare_city_from_the_gazetteer(app, monkeypatch, gz):
+    """'Wien' hat nur die genaue Stufe — die springt bei einem Ausfall ein."""
+    _nominatim_down(monkeypatch)
+
+    coord, precision = geo.geocode_address_cascade("Wien")
+
+    assert coord == (48.2082, 16.3738)
+    assert precision == geo.GEO_PRECISION_CITY
+
+
+def test_cached_results_are_served_during_an_outage(app, monkeypatch, gz):
+    geo._cache_put(geo._cache_key("Kiebitzweg 12a, 85464 Finsing"), (48.2170, 11.8200))
+    calls = _nominatim_down(monkeypatch)
+    geo.geocode_address("Irgendwas 1, Irgendwo")  # loest die Pause aus
+
+    coord, precision = geo.geocode_address_cascade("Kiebitzweg 12a, 85464 Finsing")
+
+    assert coord == (48.2170, 11.8200)
+    assert precision == geo.GEO_PRECISION_EXACT
+    assert len(calls) == 1
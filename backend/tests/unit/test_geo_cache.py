@@ -101,3 +101,134 @@ def test_empty_address_never_hits_the_network(app, monkeypatch):
         assert geo.geocode_address('') is None
 
     assert calls == []
+
+
+# --- Persistente Ebene -------------------------------------------------------
+#
+# Der Prozessspeicher allein ueberlebt keinen Neustart und keine neue
+# Serverless-Instanz. `clear_geocode_cache()` ohne Argument spielt hier genau
+# das nach: Der Prozess vergisst alles, die Tabelle nicht.
+
+def test_a_hit_survives_a_fresh_process(app, monkeypatch):
+    calls = _stub_requests(monkeypatch, HIT)
+
+    with app.app_context():
+        geo.geocode_address('Leopoldstr. 1, München')
+        geo.clear_geocode_cache()
+        again = geo.geocode_address('Leopoldstr. 1, München')
+
+    assert again == (48.1372, 11.5756)
+    assert len(calls) == 1
+
+
+def test_a_known_miss_survives_a_fresh_process(app, monkeypatch):
+    calls = _stub_requests(monkeypatch, [])
+
+    with app.app_context():
+        assert geo.geocode_address('Nirgendwo 1') is None
+        geo.clear_geocode_cache()
+        assert geo.geocode_address('Nirgendwo 1') is None
+
+    assert len(calls) == 1
+
+
+def test_a_miss_expires_sooner_than_a_hit(app, monkeypatch):
+    """Ein "nicht gefunden" darf eine Adresse nicht wochenlang festhalten."""
+    from models import GeocodeCacheEntry
+
+    _stub_requests(monkeypatch, [])
+    with app.app_context():
+        geo.geocode_address('Nirgendwo 1')
+    _stub_requests(monkeypatch, HIT)
+    with app.app_context():
+        geo.geocode_address('Leopoldstr. 1, München')
+
+    rows = {r.query_key: r for r in GeocodeCacheEntry.query.all()}
+    miss = rows['nirgendwo 1']
+    hit = rows['leopoldstr. 1, münchen']
+
+    assert miss.lat is None and miss.lon is None
+    assert (miss.expires_at - miss.created_at).total_seconds() == geo._GEOCODE_NEGATIVE_TTL
+    assert (hit.expires_at - hit.created_at).total_seconds() == geo._GEOCODE_PERSIST_TTL
+
+
+def test_an_expired_row_goes_back_to_the_network(app, monkeypatch):
+    from datetime import datetime, timedelta
+    from models import GeocodeCacheEntry, db
+
+    calls = _stub_requests(monkeypatch, HIT)
+    with app.app_context():
+        geo.geocode_address('Leopoldstr. 1, München')
+        geo.clear_geocode_cache()
+
+        row = GeocodeCacheEntry.query.filter_by(query_key='leopoldstr. 1, münchen').one()
+        row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        geo.geocode_address('Leopoldstr. 1, München')
+
+    assert len(calls) == 2
+
+
+def test_cascade_loads_all_variants_in_one_round_trip(app, monkeypatch):
+    """Vier Stufen, eine Abfrage an die Cache-Tabelle."""
+    calls = _stub_requests(monkeypatch, [])
+    with app.app_context():
+        geo.geocode_address_cascade('Kiebtzweg 12a, 85464 Finsing, Deutschland')
+    assert len(calls) == 4
+
+    geo.clear_geocode_cache()
+    loads = []
+    real_load = geo._db_load
+
+    def counting_load(keys):
+        loads.append(list(keys))
+        return real_load(keys)
+
+    monkeypatch.setattr(geo, '_db_load', counting_load)
+    with app.app_context():
+        coord, precision = geo.geocode_address_cascade('Kiebtzweg 12a, 85464 Finsing, Deutschland')
+
+    assert (coord, precision) == (None, None)
+    assert len(calls) == 4  # kein weiterer Netzaufruf
+    assert len(loads) == 1
+    assert len(loads[0]) == 4
+
+
+def test_cold_cascade_asks_the_table_only_once(app, monkeypatch):
+    """Was die Vorabfrage nicht fand, sucht keine Stufe noch einmal."""
+    calls = _stub_requests(monkeypatch, [])
+    loads = []
+    real_load = geo._db_load
+
+    def counting_load(keys):
+        loads.append(list(keys))
+        return real_load(keys)
+
+    monkeypatch.setattr(geo, '_db_load', counting_load)
+    with app.app_context():
+        geo.geocode_address_cascade('Kiebtzweg 12a, 85464 Finsing, Deutschland')
+        # außerhalb der Stufensuche wird wieder nachgeschlagen
+        geo.clear_geocode_cache()
+        geo.geocode_address('Kiebtzweg 12a, 85464 Finsing, Deutschland')
+
+    assert len(calls) == 4
+    assert [len(keys) for keys in loads] == [4, 1]
+
+
+def test_cascade_records_the_precision_of_the_hit(app, monkeypatch):
+    from models import GeocodeCacheEntry
+
+    def fake_get(url, **kwargs):
+        q = kwargs['params']['q'].lower()
+        return _FakeResponse(HIT if q.startswith('85464') else [])
+
+    monkeypatch.setattr(geo.requests, 'get', fake_get)
+    monkeypatch.setattr(geo, '_throttle', lambda: None)
+
+    with app.app_context():
+        _, precision = geo.geocode_address_cascade('Kiebtzweg 12a, 85464 Finsing, Deutschland')
+
+    row = GeocodeCacheEntry.query.filter_by(query_key='85464 finsing, deutschland').one()
+    assert precision == geo.GEO_PRECISION_POSTAL
+    assert row.precision == geo.GEO_PRECISION_POSTAL
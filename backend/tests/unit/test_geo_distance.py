@@ -0,0 +1,79 @@
+"""Entfernungen in einem Durchgang (`haversine_km_batch`).
+
+Die Batch-Variante muss dasselbe liefern wie die Schleife über
+`haversine_km` — sie ersetzt sie im Manager, sobald mehr als eine Handvoll
+Artists im Spiel ist.
+"""
+import random
+
+import pytest
+
+import services.geo as geo
+from services.geo import haversine_km, haversine_km_batch
+
+EVENT = (48.1372, 11.5756)  # München
+
+
+def _coords(n, seed=7):
+    rnd = random.Random(seed)
+    return [(rnd.uniform(45.8, 55.0), rnd.uniform(5.9, 17.2)) for _ in range(n)]
+
+
+def test_batch_matches_the_scalar_formula():
+    coords = _coords(500)
+    got = haversine_km_batch(EVENT, [c[0] for c in coords], [c[1] for c in coords])
+
+    assert got == pytest.approx([haversine_km(c, EVENT) for c in coords], abs=1e-9)
+
+
+def test_batch_keeps_the_input_order():
+    hamburg, berlin = (53.5511, 9.9937), (52.5200, 13.4050)
+    got = haversine_km_batch(EVENT, [hamburg[0], EVENT[0], berlin[0]], [hamburg[1], EVENT[1], berlin[1]])
+
+    assert got[0] == pytest.approx(612, abs=5)
+    assert got[1] == pytest.approx(0, abs=1e-9)
+    assert got[2] == pytest.approx(504, abs=5)
+
+
+def test_batch_of_nothing_is_empty():
+    assert haversine_km_batch(EVENT, [], []) == []
+
+
+def test_batch_rejects_mismatched_arrays():
+    with pytest.raises(ValueError):
+        haversine_km_batch(EVENT, [48.0, 49.0], [11.0])
+
+
+def test_batch_without_numpy_falls_back_to_the_loop(monkeypatch):
+    coords = _coords(20)
+    lats, lons = [c[0] for c in coords], [c[1] for c in coords]
+    with_numpy = haversine_km_batch(EVENT, lats, lons)
+
+    monkeypatch.setattr(geo, "np", None)
+    assert haversine_km_batch(EVENT, lats, lons) == pytest.approx(with_numpy, abs=1e-9)
+
+
+def test_manager_uses_the_batch_above_a_handful_of_artists(app, monkeypatch):
+    import managers.booking_requests_manager as brm
+
+    class _A:
+        def __init__(self, i, coord):
+            self.id, (self.lat, self.lon) = i, coord
+
+    batches = []
+    real = brm.haversine_km_batch
+
+    def counting(*args):
+        batches.append(len(args[1]))
+        return real(*args)
+
+    monkeypatch.setattr(brm, "haversine_km_batch", counting)
+    mgr = brm.BookingRequestManager()
+
+    few = [_A(i, c) for i, c in enumerate(_coords(brm.BATCH_DISTANCE_THRESHOLD))]
+    many = [_A(i, c) for i, c in enumerate(_coords(50))]
+    mgr.artist_distances(EVENT, few)
+    result = mgr.artist_distances(EVENT, many)
+
+    assert batches == [50]
+    assert result == {a.id: round(haversine_km((a.lat, a.lon), EVENT), 1) for a in many}
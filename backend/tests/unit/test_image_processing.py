@@ -0,0 +1,170 @@
+"""Bildverarbeitung: Zielgröße, Ausrichtung, Encoder-Profile und der Prozess-Pool."""
+
+import io
+
+import pytest
+from PIL import Image
+
+from services import image_processing
+from services.image_processing import ImagePoolBusy, ImageTimeout, encode_image
+
+
+def _photo(size=(4000, 3000), fmt='JPEG', mode='RGB', orientation=None):
+    # Muster statt Einheitsfarbe, sonst ist jede WebP-Datei gleich klein
+    image = Image.effect_mandelbrot(size, (-2.0, -1.2, 1.0, 1.2), 50).convert(mode)
+    exif = Image.Exif()
+    if orientation:
+        exif[274] = orientation
+    output = io.BytesIO()
+    image.save(output, format=fmt, exif=exif)
+    return output.getvalue()
+
+
+def _size(webp):
+    image = Image.open(io.BytesIO(webp))
+    assert image.format == 'WEBP'
+    return image.size
+
+
+@pytest.fixture
+def pool(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMAGE_POOL_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'IMAGE_POOL_MAX_PENDING', 4)
+    monkeypatch.setitem(app.config, 'IMAGE_TIMEOUT_SECONDS', 30)
+    with app.app_context():
+        yield
+    image_processing.shutdown()
+
+
+class TestEncode:
+    def test_fits_into_the_box_keeping_the_aspect_ratio(self):
+        assert _size(encode_image(_photo((4000, 3000)))) == (1200, 900)
+        assert _size(encode_image(_photo((300, 2000), fmt='PNG'))) == (180, 1200)
+
+    def test_small_images_keep_their_size(self):
+        assert _size(encode_image(_photo((640, 480)))) == (640, 480)
+
+    @pytest.mark.parametrize('orientation, expected', [(1, (1200, 600)), (3, (1200, 600)),
+                                                       (6, (600, 1200)), (8, (600, 1200))])
+    def test_exif_orientation_is_applied(self, orientation, expected):
+        assert _size(encode_image(_photo((2400, 1200), orientation=orientation))) == expected
+
+    def test_transparency_goes_onto_white(self):
+        data = _photo((200, 100), fmt='PNG', mode='RGBA')
+        image = Image.open(io.BytesIO(encode_image(data)))
+        assert image.mode == 'RGB'
+
+    def test_jpeg_is_scaled_while_decoding(self, monkeypatch):
+        from PIL.JpegImagePlugin import JpegImageFile
+
+        decoded = []
+        real_draft = JpegImageFile.draft
+
+        def spy(self, mode, size):
+            result = real_draft(self, mode, size)
+            decoded.append((size, self.size))
+            return result
+
+        monkeypatch.setattr(JpegImageFile, 'draft', spy)
+        encode_image(_photo((4000, 3000)))
+        # 1/2 ist die größte DCT-Stufe, die noch über 1200 × 900 bleibt
+        assert decoded == [((1200, 900), (2000, 1500))]
+
+    def test_max_profile_is_not_larger_than_fast(self):
+        data = _photo((600, 500))
+        assert len(encode_image(data, profile='max')) <= len(encode_image(data, profile='fast'))
+
+    def test_broken_input_and_unknown_profile_are_value_errors(self):
+        with pytest.raises(ValueError):
+            encode_image(b'kein Bild')
+        with pytest.raises(ValueError):
+            encode_image(_photo((10, 10)), profile='ultra')
+
+
+class TestPool:
+    def test_pool_result_matches_inline(self, pool):
+        data = _photo((800, 600))
+        assert image_processing.encode(data, profile='max') == encode_image(data, profile='max')
+        assert image_processing.pending() == 0
+
+    def test_errors_come_back_from_the_worker(self, pool):
+        with pytest.raises(ValueError, match='Bildverarbeitung fehlgeschlagen'):
+            image_processing.encode(b'kein Bild')
+        assert image_processing.pending() == 0
+
+    def test_full_queue_rejects_immediately(self, app, pool, monkeypatch):
+        monkeypatch.setitem(app.config, 'IMAGE_POOL_MAX_PENDING', 0)
+        with pytest.raises(ImagePoolBusy):
+            image_processing.encode(_photo((10, 10)))
+
+    def test_timeout_frees_the_slot_once_the_worker_is_done(self, app, pool, monkeypatch):
+        image_processing.encode(_photo((10, 10)))  # Worker starten
+        monkeypatch.setitem(app.config, 'IMAGE_TIMEOUT_SECONDS', 0.0001)
+        with pytest.raises(ImageTimeout):
+            image_processing.encode(_photo((3000, 3000)), profile='max')
+        image_processing.shutdown()
+        assert image_processing.pending() == 0
+
+    def test_without_workers_it_runs_inline(self, app, pool, monkeypatch):
+        monkeypatch.setitem(app.config, 'IMAGE_POOL_WORKERS', 0)
+        monkeypatch.setitem(app.config, 'IMAGE_POOL_MAX_PENDING', 0)
+        assert _size(image_processing.encode(_photo((10, 10)))) == (10, 10)
+
+    def test_a_pool_that_cannot_start_frees_its_slot(self, pool, monkeypatch):
+        def broken(workers):
+            raise OSError('keine Prozesse')
+
+        monkeypatch.setattr(image_processing, '_get_executor', broken)
+        with pytest.raises(OSError):
+            image_processing.encode(_photo((10, 10)))
+        assert image_processing.pending() == 0
+
+
+class _FakeBucket:
+    def __init__(self, stored):
+        self.stored = stored
+        self.updates = []
+
+    def download(self, path):
+        return self.stored
+
+    def update(self, path, data, file_options=None):
+        self.updates.append(path)
+        self.stored = data
+
+
+class TestReencodeInStorage:
+    @pytest.fixture
+    def bucket(self, monkeypatch):
+        import supabase
+
+        bucket = _FakeBucket(b'')
+        client = type('Client', (), {'storage': type('Storage', (), {'from_': lambda self, name: bucket})()})()
+        monkeypatch.setattr(supabase, 'create_client', lambda url, key: client)
+        return bucket
+
+    def _run(self, app, bucket, stored):
+        import hashlib
+        from routes.api_routes import _reencode_in_storage
+
+        data = _photo((800, 600))
+        uploaded = encode_image(data, profile='fast')
+        bucket.stored = stored if stored is not None else uploaded
+        with app.app_context():
+            _reencode_in_storage('profiles', '1/profile.webp', data,
+                                 hashlib.sha256(uploaded).hexdigest(), len(uploaded), 'max')
+
+    def test_replaces_the_file_of_this_upload(self, app, pool, bucket):
+        self._run(app, bucket, stored=None)
+        assert bucket.updates == ['1/profile.webp']
+
+    def test_leaves_the_last_pool_slot_to_uploads(self, app, pool, bucket, monkeypatch):
+        monkeypatch.setitem(app.config, 'IMAGE_POOL_MAX_PENDING', 1)
+        self._run(app, bucket, stored=None)
+        assert bucket.updates == []
+        assert image_processing.pending() == 0
+
+    def test_keeps_a_newer_upload(self, app, pool, bucket):
+        self._run(app, bucket, stored=b'neueres Bild')
+        assert bucket.updates == []
+        assert bucket.stored == b'neueres Bild'
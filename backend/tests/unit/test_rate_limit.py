@@ -0,0 +1,205 @@
+"""Rate-Limits: gleitendes Fenster, Token-Bucket, Vorprüfung und 429-Antwort.
+
+Die Uhr wird über `rate_limit.time.time` gestellt, nicht abgewartet. Der
+Upstash-Pfad läuft gegen `FakeUpstash`, der die Lua-Skripte in Python
+nachbaut.
+"""
+
+import pytest
+
+from helpers import rate_limit, shared_store
+from helpers.rate_limit import Policy
+from tests.fake_upstash import FakeUpstash
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    shared_store.reset_for_tests()
+    rate_limit.reset_local()
+    yield
+    shared_store.reset_for_tests()
+    rate_limit.reset_local()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Stellbare Uhr für `rate_limit`; beginnt am Anfang eines Stundenfensters."""
+    now = [3600.0 * 500_000]
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def upstash(monkeypatch):
+    fake = FakeUpstash()
+    monkeypatch.setattr(shared_store, '_REST_URL', fake.url)
+    monkeypatch.setattr(shared_store, '_REST_TOKEN', fake.token)
+    yield fake
+    fake.close()
+
+
+def _policy(monkeypatch, **kw):
+    policy = Policy(**{'name': 'test', 'limit': 3, 'window_seconds': 60, **kw})
+    monkeypatch.setitem(rate_limit.POLICIES, 'test', policy)
+    return policy
+
+
+class TestSlidingWindow:
+    def test_previous_window_counts_in_proportion(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=4, window_seconds=100)
+        assert [rate_limit.hit('test', 'ip:a').allowed for _ in range(5)] == [True] * 4 + [False]
+
+        # Halb durchs nächste Fenster: die vier zählen noch zur Hälfte
+        clock[0] += 150
+        assert [rate_limit.hit('test', 'ip:a').allowed for _ in range(3)] == [True, True, False]
+
+    def test_no_full_reset_at_the_window_boundary(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=4, window_seconds=100)
+        clock[0] += 99
+        for _ in range(4):
+            rate_limit.hit('test', 'ip:a')
+
+        clock[0] += 2  # gerade ins nächste Fenster
+        assert rate_limit.hit('test', 'ip:a').allowed is False
+
+    def test_retry_after_points_at_the_next_allowed_second(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=4, window_seconds=100)
+        for _ in range(4):
+            rate_limit.hit('test', 'ip:a')
+        clock[0] += 10
+        decision = rate_limit.hit('test', 'ip:a')
+        assert decision == (False, 115)
+
+        clock[0] += decision.retry_after - 1
+        assert rate_limit.hit('test', 'ip:a').allowed is False
+        clock[0] += 1
+        assert rate_limit.hit('test', 'ip:a').allowed is True
+
+    def test_rejected_attempts_do_not_count(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=2, window_seconds=100)
+        for _ in range(50):
+            rate_limit.hit('test', 'ip:a')
+
+        clock[0] += 200
+        assert rate_limit.hit('test', 'ip:a').allowed is True
+
+
+class TestTokenBucket:
+    def test_burst_up_to_the_limit_then_refill(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=10, window_seconds=100, algorithm='bucket')
+        assert [rate_limit.hit('test', 'ip:a').allowed for _ in range(11)] == [True] * 10 + [False]
+
+        decision = rate_limit.hit('test', 'ip:a')
+        assert decision == (False, 10)  # ein Token je 10 s
+
+        clock[0] += 10
+        assert rate_limit.hit('test', 'ip:a').allowed is True
+        assert rate_limit.hit('test', 'ip:a').allowed is False
+
+    def test_bucket_never_exceeds_its_capacity(self, monkeypatch, clock):
+        _policy(monkeypatch, limit=3, window_seconds=30, algorithm='bucket')
+        rate_limit.hit('test', 'ip:a')
+        clock[0] += 10_000
+        assert [rate_limit.hit('test', 'ip:a').allowed for _ in range(4)] == [True] * 3 + [False]
+
+
+class TestUpstash:
+    def test_one_round_trip_per_hit(self, app, monkeypatch, clock, upstash):
+        _policy(monkeypatch, limit=3, window_seconds=60)
+        before = len(upstash.requests)
+        with app.app_context():
+            assert rate_limit.hit('test', 'ip:a').allowed is True
+        assert len(upstash.requests) == before + 1
+        assert upstash.commands[-1][0] == 'EVAL'
+
+    @pytest.mark.parametrize('algorithm', ['sliding', 'bucket'])
+    def test_lua_and_in_process_agree(self, app, monkeypatch, clock, upstash, algorithm):
+        _policy(monkeypatch, limit=4, window_seconds=100, algorithm=algorithm)
+        steps = [0, 0, 30, 0, 0, 45, 0, 80, 0, 0, 0]
+
+        def run():
+            out = []
+            for step in steps:
+                clock[0] += step
+                out.append(rate_limit.hit('test', 'ip:a'))
+            return out
+
+        with app.app_context():
+            shared = run()
+            monkeypatch.setattr(shared_store, '_REST_URL', None)
+            rate_limit.reset_local()
+            clock[0] -= sum(steps)
+            local = run()
+        assert shared == local
+
+    def test_local_precheck_rejects_without_a_request(self, app, monkeypatch, clock, upstash):
+        _policy(monkeypatch, limit=3, window_seconds=60)
+        with app.app_context():
+            for _ in range(3):
+                rate_limit.hit('test', 'ip:a')
+            before = len(upstash.requests)
+
+            decisions = [rate_limit.hit('test', 'ip:a') for _ in range(20)]
+
+        assert not any(d.allowed for d in decisions)
+        assert len(upstash.requests) == before
+
+    def test_other_instances_count_too(self, app, monkeypatch, clock, upstash):
+        """Die Vorprüfung kennt nur die eigenen Treffer; Upstash entscheidet."""
+        _policy(monkeypatch, limit=3, window_seconds=60)
+        with app.app_context():
+            for _ in range(3):
+                rate_limit.hit('test', 'ip:a')
+            rate_limit.reset_local()  # wie ein zweiter Prozess
+            assert rate_limit.hit('test', 'ip:a').allowed is False
+
+    def test_falls_back_to_the_process_when_upstash_fails(self, app, monkeypatch, clock, upstash):
+        _policy(monkeypatch, limit=2, window_seconds=60)
+        upstash.status = 503
+        with app.app_context():
+            allowed = [rate_limit.hit('test', 'ip:a').allowed for _ in range(3)]
+        assert allowed == [True, True, False]
+
+
+class TestRoutes:
+    def test_decorator_answers_429_with_retry_after(self, app, monkeypatch, clock):
+        _policy(monkeypatch, limit=1, window_seconds=60)
+        view = rate_limit.rate_limited('test')(lambda: 'ok')
+
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '10.1.1.1'}):
+            assert view() == 'ok'
+            resp, status = view()
+
+        assert status == 429
+        assert resp.get_json()['error'] == 'rate_limited'
+        assert int(resp.headers['Retry-After']) > 0
+
+    def test_quote_route_is_limited_per_ip(self, client, monkeypatch):
+        monkeypatch.setitem(rate_limit.POLICIES, 'quote', Policy('quote', 2, 600, 'bucket', 'ip'))
+        statuses = [client.post('/api/requests/quote', json={}, environ_base={'REMOTE_ADDR': '10.2.2.2'}).status_code
+                    for _ in range(3)]
+        other = client.post('/api/requests/quote', json={}, environ_base={'REMOTE_ADDR': '10.2.2.3'})
+
+        assert statuses == [400, 400, 429]
+        assert other.status_code == 400
+
+    def test_upload_is_limited_per_artist(self, client, monkeypatch, user_headers, admin_headers):
+        monkeypatch.setitem(rate_limit.POLICIES, 'upload', Policy('upload', 1, 600, 'bucket', 'sub'))
+        first = client.post('/api/upload/image', headers=user_headers, data={})
+        second = client.post('/api/upload/image', headers=user_headers, data={})
+        admin = client.post('/api/upload/image', headers=admin_headers, data={})
+
+        assert first.status_code != 429
+        assert second.status_code == 429
+        assert 'Retry-After' in second.headers
+        assert admin.status_code != 429
+
+    def test_deletes_do_not_use_up_the_upload_quota(self, client, monkeypatch, user_headers):
+        monkeypatch.setitem(rate_limit.POLICIES, 'upload', Policy('upload', 1, 600, 'bucket', 'sub'))
+        monkeypatch.setitem(rate_limit.POLICIES, 'delete', Policy('delete', 1, 600, 'bucket', 'sub'))
+        deletes = [client.post('/api/upload/delete', headers=user_headers, json={}).status_code
+                   for _ in range(2)]
+        upload = client.post('/api/upload/image', headers=user_headers, data={})
+
+        assert deletes[0] != 429 and deletes[1] == 429
+        assert upload.status_code != 429
@@ -1,14 +1,15 @@
 """Rate-Limit und Idempotenz der oeffentlichen Anfrage-Route.
 
 Beide liegen im geteilten Store (`helpers/shared_store`). Ohne Zugangsdaten
-faellt der auf einen prozesslokalen Speicher zurueck — genau der Pfad, der hier
-geprueft wird. Der Redis-Pfad wird separat in test_shared_store.py geprueft.
+faellt das Rate-Limit auf einen prozesslokalen Speicher zurueck, die
+Idempotency-Keys auf die Tabelle `idempotency_keys` — genau die Pfade, die hier
+geprueft werden. Der Redis-Pfad wird separat in test_shared_store.py geprueft.
 """
 
 import pytest
 
-import routes.request_routes as rr
-from helpers import shared_store
+from helpers import idempotency, rate_limit, shared_store
+from models import IdempotencyKey, db
 
 
 @pytest.fixture(autouse=True)
@@ -20,7 +21,7 @@ def clean_store():
 
 def test_rate_limit_blocks_after_the_configured_number(app):
     with app.app_context():
-        allowed = [rr._rate_limit_allow('10.0.0.1') for _ in range(6)]
+        allowed = [rate_limit.hit('booking', 'ip:10.0.0.1').allowed for _ in range(6)]
 
     assert allowed[:5] == [True] * 5
     assert allowed[5] is False
@@ -30,45 +31,122 @@ def test_rate_limit_counts_per_ip(app):
     """Eine blockierte IP darf eine andere nicht mitblockieren."""
     with app.app_context():
         for _ in range(6):
-            rr._rate_limit_allow('10.0.0.1')
+            rate_limit.hit('booking', 'ip:10.0.0.1')
 
-        assert rr._rate_limit_allow('10.0.0.2') is True
+        assert rate_limit.hit('booking', 'ip:10.0.0.2').allowed is True
 
 
-def test_rate_limit_window_expires(app, monkeypatch):
+def test_rate_limit_window_expires(app):
     """Nach Ablauf des Fensters ist die IP wieder frei."""
-    monkeypatch.setattr(rr, '_RATE_LIMIT_WINDOW_SECONDS', 1)
-
     with app.app_context():
         for _ in range(6):
-            rr._rate_limit_allow('10.0.0.3')
-        assert rr._rate_limit_allow('10.0.0.3') is False
+            rate_limit.hit('booking', 'ip:10.0.0.3')
+        decision = rate_limit.hit('booking', 'ip:10.0.0.3')
+        assert decision.allowed is False
+        assert decision.retry_after > 0
 
         # Ablauf simulieren statt zu warten
         shared_store.reset_for_tests()
-        assert rr._rate_limit_allow('10.0.0.3') is True
+        assert rate_limit.hit('booking', 'ip:10.0.0.3').allowed is True
 
 
 def test_idempotency_replays_the_same_payload(app):
     with app.app_context():
-        rr._idempotency_store('key-1', {'request_id': 7})
+        first = idempotency.claim('booking', 'key-1')
+        assert first.owned
+        first.complete({'request_id': 7})
+
+        assert idempotency.claim('booking', 'key-1').replay == {'request_id': 7}
+
+
+def test_idempotency_second_claim_is_busy_while_the_first_runs(app):
+    """Doppelklick: Der zweite Aufruf bekommt weder Sperre noch Antwort."""
+    with app.app_context():
+        first = idempotency.claim('booking', 'key-3')
+        second = idempotency.claim('booking', 'key-3')
 
-        assert rr._idempotency_lookup('key-1') == {'request_id': 7}
+        assert first.owned
+        assert second.busy
 
 
-def test_idempotency_lookup_without_key_is_none(app):
+def test_idempotency_release_frees_the_key(app):
     with app.app_context():
-        assert rr._idempotency_lookup('') is None
-        assert rr._idempotency_lookup(None) is None
+        idempotency.claim('booking', 'key-4').release()
+
+        assert idempotency.claim('booking', 'key-4').owned
 
 
-def test_idempotency_unknown_key_is_none(app):
+def test_idempotency_complete_after_release_does_nothing(app):
     with app.app_context():
-        assert rr._idempotency_lookup('gibtsnicht') is None
+        first = idempotency.claim('booking', 'key-5')
+        first.complete({'request_id': 1})
+        first.release()
+
+        assert idempotency.claim('booking', 'key-5').replay == {'request_id': 1}
+
+
+def test_idempotency_expired_lease_can_be_taken_over(app, monkeypatch):
+    """Stirbt der erste Aufruf mittendrin, ist der Key nach der Sperrzeit frei."""
+    monkeypatch.setattr(idempotency, 'LEASE_SECONDS', 0)
+    with app.app_context():
+        stale = idempotency.claim('booking', 'key-6')
+        fresh = idempotency.claim('booking', 'key-6')
+        assert fresh.owned
+
+        # Die alte Sperre überschreibt die neue nicht mehr
+        stale.complete({'request_id': 1})
+        fresh.complete({'request_id': 2})
+        assert idempotency.claim('booking', 'key-6').replay == {'request_id': 2}
+
+
+def test_idempotency_wait_returns_the_first_response(app, monkeypatch):
+    monkeypatch.setattr(idempotency, 'POLL_SECONDS', 0.01)
+    with app.app_context():
+        first = idempotency.claim('booking', 'key-7')
+        second = idempotency.claim('booking', 'key-7')
+
+        calls = []
+        real_claim = idempotency.claim
+
+        def claim_and_finish(scope, key):
+            calls.append(key)
+            if len(calls) == 2:
+                first.complete({'request_id': 9})
+            return real_claim(scope, key)
+        monkeypatch.setattr(idempotency, 'claim', claim_and_finish)
+
+        assert idempotency.wait(second, timeout=5).replay == {'request_id': 9}
+
+
+def test_idempotency_wait_gives_up_after_the_timeout(app, monkeypatch):
+    monkeypatch.setattr(idempotency, 'POLL_SECONDS', 0.01)
+    with app.app_context():
+        idempotency.claim('booking', 'key-8')
+        second = idempotency.claim('booking', 'key-8')
+
+        assert idempotency.wait(second, timeout=0.05).busy
+
+
+def test_idempotency_uses_the_table_without_upstash(app):
+    """Ohne Upstash liegt der Key in der Datenbank, nicht im Prozessspeicher."""
+    with app.app_context():
+        idempotency.claim('booking', 'key-9')
+
+        row = db.session.get(IdempotencyKey, 'booking:key-9')
+        assert row is not None and row.lease and row.response is None
+        assert shared_store.get_json('idem:booking:key-9') is None
+
+
+def test_idempotency_hashes_overlong_keys(app):
+    key = 'x' * 400
+    with app.app_context():
+        idempotency.claim('booking', key).complete({'request_id': 3})
+
+        assert idempotency.claim('booking', key).replay == {'request_id': 3}
 
 
 def test_idempotency_survives_a_nested_payload(app):
-    """Der Store serialisiert nach JSON — verschachtelte Antworten muessen durch."""
+    """Die Antwort geht als JSON durch — verschachtelte Antworten muessen durch."""
     payload = {
         'request_id': 12,
         'price_min': 1627,
@@ -76,6 +154,6 @@ def test_idempotency_survives_a_nested_payload(app):
         'price_reason': None,
     }
     with app.app_context():
-        rr._idempotency_store('key-2', payload)
+        idempotency.claim('booking', 'key-2').complete(payload)
 
-        assert rr._idempotency_lookup('key-2') == payload
+        assert idempotency.claim('booking', 'key-2').replay == payload
@@ -7,14 +7,17 @@ Anfrage-Route nicht kaputt machen, sondern nur schlechter schuetzen.
 
 import pytest
 
-from helpers import shared_store
+from helpers import rate_limit, shared_store
+from tests.fake_upstash import FakeUpstash
 
 
 @pytest.fixture(autouse=True)
 def clean():
     shared_store.reset_for_tests()
+    rate_limit.reset_local()
     yield
     shared_store.reset_for_tests()
+    rate_limit.reset_local()
 
 
 class TestInProcessFallback:
@@ -44,6 +47,33 @@ class TestInProcessFallback:
         # Ablaufzeit lag beim ersten Treffer bereits in der Vergangenheit
         assert shared_store.incr_with_ttl('d', 0) == 1
 
+    def test_expired_entries_are_pruned_on_the_next_access(self, monkeypatch):
+        import time
+
+        shared_store.set_json('short', 1, 10)
+        shared_store.set_json('long', 2, 100)
+        later = time.time() + 11
+        monkeypatch.setattr(shared_store.time, 'time', lambda: later)
+
+        assert shared_store.get_json('long') == 2
+        assert 'short' not in shared_store._memory
+
+    def test_a_renewed_key_outlives_its_old_expiry(self, monkeypatch):
+        """Das alte Paar im Heap darf den neu gesetzten Wert nicht löschen."""
+        import time
+
+        shared_store.set_json('key', 'alt', 10)
+        shared_store.set_json('key', 'neu', 100)
+        later = time.time() + 11
+        monkeypatch.setattr(shared_store.time, 'time', lambda: later)
+
+        assert shared_store.get_json('key') == 'neu'
+
+    def test_the_expiry_heap_does_not_grow_with_rewrites(self):
+        for i in range(1000):
+            shared_store.set_json('same', i, 60)
+        assert len(shared_store._memory_expiry) <= 2 * len(shared_store._memory) + 64
+
     def test_memory_store_stays_bounded(self, monkeypatch):
         monkeypatch.setattr(shared_store, '_MEMORY_MAX_ENTRIES', 20)
         for i in range(200):
@@ -51,77 +81,240 @@ class TestInProcessFallback:
         assert len(shared_store._memory) <= 20
 
 
-class _FakeResponse:
-    def __init__(self, result, status=200):
-        self._result = result
-        self.status = status
-
-    def raise_for_status(self):
-        if self.status >= 400:
-            raise RuntimeError(f'HTTP {self.status}')
-
-    def json(self):
-        return {'result': self._result}
-
-
 class TestUpstashPath:
     @pytest.fixture
     def upstash(self, monkeypatch):
-        """Konfigurierten Upstash vorspiegeln und die Kommandos mitschreiben."""
-        monkeypatch.setattr(shared_store, '_REST_URL', 'https://fake.upstash.io')
-        monkeypatch.setattr(shared_store, '_REST_TOKEN', 'token')
-        calls = []
-        results = {}
-
-        def fake_post(url, **kwargs):
-            path = url.replace('https://fake.upstash.io/', '')
-            calls.append(path)
-            command = path.split('/')[0].upper()
-            if command == 'GET':
-                return _FakeResponse(results.get('value'))
-            if command == 'INCR':
-                results['count'] = results.get('count', 0) + 1
-                return _FakeResponse(results['count'])
-            return _FakeResponse('OK')
-
-        monkeypatch.setattr(shared_store.requests, 'post', fake_post)
-        return calls, results
+        """Upstash auf einen lokalen Stand-in umbiegen."""
+        fake = FakeUpstash()
+        monkeypatch.setattr(shared_store, '_REST_URL', fake.url)
+        monkeypatch.setattr(shared_store, '_REST_TOKEN', fake.token)
+        monkeypatch.setattr(shared_store, '_session', None)
+        yield fake
+        fake.close()
 
     def test_is_shared_with_credentials(self, upstash):
         assert shared_store.is_shared() is True
         assert shared_store.backend_name() == 'upstash-redis'
 
     def test_set_sends_set_with_expiry(self, upstash):
-        calls, _ = upstash
         shared_store.set_json('key', {'a': 1}, 120)
 
-        assert calls[0].startswith('SET/key/')
-        assert calls[0].endswith('/EX/120')
+        assert upstash.commands == [['SET', 'key', '{"a": 1}', 'EX', '120']]
+        assert 119 < upstash.ttl('key') <= 120
 
-    def test_incr_sets_expiry_only_on_first_hit(self, upstash):
-        calls, _ = upstash
-        shared_store.incr_with_ttl('key', 60)
+    def test_get_returns_the_decoded_value(self, upstash):
+        shared_store.set_json('key', {'a': 1}, 60)
+        assert shared_store.get_json('key') == {'a': 1}
+        assert shared_store.get_json('nope') is None
+
+    def test_incr_is_one_round_trip(self, upstash):
+        assert shared_store.incr_with_ttl('key', 60) == 1
+        assert shared_store.incr_with_ttl('key', 60) == 2
+
+        assert [path for path, _ in upstash.requests] == ['/multi-exec', '/multi-exec']
+        assert 59 < upstash.ttl('key') <= 60
+
+    def test_incr_keeps_the_first_expiry(self, upstash):
+        """Sonst rutscht das Zeitfenster bei jeder Anfrage nach vorn."""
         shared_store.incr_with_ttl('key', 60)
+        shared_store.incr_with_ttl('key', 3600)
+        assert upstash.ttl('key') <= 60
 
-        assert [c.split('/')[0] for c in calls] == ['INCR', 'EXPIRE', 'INCR']
+    def test_connections_are_reused(self, upstash):
+        for i in range(5):
+            shared_store.set_json(f'k{i}', i, 60)
+            shared_store.get_json(f'k{i}')
 
-    def test_get_returns_the_decoded_value(self, upstash):
-        _, results = upstash
-        results['value'] = '{"a": 1}'
+        assert len(upstash.requests) == 10
+        assert upstash.connections == 1
 
-        assert shared_store.get_json('key') == {'a': 1}
+    def test_mget_reads_several_keys_at_once(self, upstash):
+        shared_store.set_json('a', 1, 60)
+        shared_store.set_json('c', {'x': 3}, 60)
 
-    def test_upstash_failure_falls_back_to_memory(self, app, monkeypatch):
-        """Ein Ausfall darf die Route nicht kippen, nur schlechter schuetzen."""
-        monkeypatch.setattr(shared_store, '_REST_URL', 'https://fake.upstash.io')
-        monkeypatch.setattr(shared_store, '_REST_TOKEN', 'token')
+        assert shared_store.mget_json(['a', 'b', 'c']) == [1, None, {'x': 3}]
+        assert upstash.requests[-1] == ('/pipeline', [['MGET', 'a', 'b', 'c']])
+        assert shared_store.mget_json([]) == []
+
+    def test_pipeline_returns_results_in_order(self, upstash):
+        shared_store.set_json('idem', {'id': 7}, 60)
+        before = len(upstash.requests)
 
-        def failing_post(url, **kwargs):
-            raise OSError('connection reset')
+        pipe = shared_store.pipeline(transaction=True)
+        pipe.incr_with_ttl('count', 60).get_json('idem').get_json('none')
+        pipe.set_json('new', [1, 2], 60).delete('idem')
 
-        monkeypatch.setattr(shared_store.requests, 'post', failing_post)
+        assert pipe.execute() == [1, {'id': 7}, None, None, None]
+        assert len(upstash.requests) == before + 1
+        assert shared_store.get_json('new') == [1, 2]
+        assert shared_store.get_json('idem') is None
+
+    def test_delete_removes_the_key(self, upstash):
+        shared_store.set_json('key', 1, 60)
+        shared_store.delete('key')
+        assert shared_store.get_json('key') is None
+
+    def test_upstash_failure_falls_back_to_memory(self, app, upstash):
+        """Ein Ausfall darf die Route nicht kippen, nur schlechter schuetzen."""
+        upstash.status = 503
 
         with app.app_context():
             shared_store.set_json('key', {'a': 1}, 60)
             assert shared_store.get_json('key') == {'a': 1}
             assert shared_store.incr_with_ttl('cnt', 60) == 1
+            assert shared_store.pipeline().incr_with_ttl('cnt', 60).get_json('key').execute() == [2, {'a': 1}]
+
+    def test_unreachable_upstash_falls_back_to_memory(self, app, monkeypatch):
+        fake = FakeUpstash()
+        fake.close()
+        monkeypatch.setattr(shared_store, '_REST_URL', fake.url)
+        monkeypatch.setattr(shared_store, '_REST_TOKEN', fake.token)
+
+        with app.app_context():
+            assert shared_store.incr_with_ttl('cnt', 60) == 1
+            assert shared_store.mget_json(['cnt', 'x']) == [1, None]
+
+
+class TestBookingRoute:
+    @pytest.fixture
+    def upstash(self, monkeypatch):
+        fake = FakeUpstash()
+        monkeypatch.setattr(shared_store, '_REST_URL', fake.url)
+        monkeypatch.setattr(shared_store, '_REST_TOKEN', fake.token)
+        yield fake
+        fake.close()
+
+    def test_rate_limit_and_claim_share_one_round_trip(self, app, upstash):
+        from routes.request_routes import _rate_limit_and_claim
+
+        with app.app_context():
+            shared_store.set_json('idem:booking:abc', {'request_id': 1}, 60)
+            before = len(upstash.requests)
+
+            decision, claim = _rate_limit_and_claim('1.2.3.4', 'abc')
+            assert decision.allowed and claim.replay == {'request_id': 1}
+            decision, claim = _rate_limit_and_claim('1.2.3.4', None)
+            assert decision.allowed and claim is None
+
+            assert len(upstash.requests) == before + 2
+
+    def test_claim_is_a_lease_in_upstash(self, app, upstash):
+        from helpers import idempotency
+
+        with app.app_context():
+            first = idempotency.claim('booking', 'k1')
+            assert first.owned and first.backend == 'store'
+            assert idempotency.claim('booking', 'k1').busy
+            assert 0 < upstash.ttl('idem:booking:k1') <= idempotency.LEASE_SECONDS
+
+            first.complete({'request_id': 5})
+            assert idempotency.claim('booking', 'k1').replay == {'request_id': 5}
+            assert upstash.ttl('idem:booking:k1') > idempotency.LEASE_SECONDS
+
+    def test_release_only_drops_the_own_lease(self, app, upstash):
+        from helpers import idempotency
+
+        with app.app_context():
+            first = idempotency.claim('booking', 'k2')
+            upstash.run(['DEL', 'idem:booking:k2'])  # abgelaufen
+            second = idempotency.claim('booking', 'k2')
+
+            first.release()
+            assert idempotency.claim('booking', 'k2').busy
+            second.release()
+            assert idempotency.claim('booking', 'k2').owned
+
+    def test_claim_falls_back_to_the_table_when_upstash_fails(self, app, upstash):
+        from helpers import idempotency
+        from models import IdempotencyKey, db
+
+        upstash.status = 503
+        with app.app_context():
+            first = idempotency.claim('booking', 'k3')
+            assert first.owned and first.backend == 'db'
+            assert idempotency.claim('booking', 'k3').busy
+            assert db.session.get(IdempotencyKey, 'booking:k3') is not None
+
+
+class TestNearCache:
+    @pytest.fixture
+    def upstash(self, monkeypatch):
+        fake = FakeUpstash()
+        monkeypatch.setattr(shared_store, '_REST_URL', fake.url)
+        monkeypatch.setattr(shared_store, '_REST_TOKEN', fake.token)
+        monkeypatch.setattr(shared_store, '_session', None)
+        yield fake
+        fake.close()
+
+    def gets(self, upstash):
+        return [c for c in upstash.commands if c[0] == 'GET']
+
+    def test_near_reads_skip_the_network(self, upstash):
+        upstash.run(['SET', 'cfg', '{"a": 1}'])
+
+        assert shared_store.get_json('cfg', near_ttl=10) == {'a': 1}
+        assert shared_store.get_json('cfg', near_ttl=10) == {'a': 1}
+
+        assert len(self.gets(upstash)) == 1
+        stats = shared_store.near_cache_stats()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+
+    def test_strong_reads_always_ask_upstash(self, upstash):
+        shared_store.set_json('count', 1, 60, near_ttl=10)
+        upstash.run(['SET', 'count', '2'])
+
+        assert shared_store.get_json('count') == 2
+        assert shared_store.get_json('count', near_ttl=10) == 1
+
+    def test_hits_are_copies(self, upstash):
+        shared_store.set_json('cfg', {'a': [1]}, 60, near_ttl=10)
+        shared_store.get_json('cfg', near_ttl=10)['a'].append(2)
+
+        assert shared_store.get_json('cfg', near_ttl=10) == {'a': [1]}
+
+    def test_near_entries_expire(self, upstash, monkeypatch):
+        import time
+
+        shared_store.set_json('cfg', 1, 60, near_ttl=5)
+        upstash.run(['SET', 'cfg', '2'])
+        later = time.monotonic() + 6
+        monkeypatch.setattr(shared_store.time, 'monotonic', lambda: later)
+
+        assert shared_store.get_json('cfg', near_ttl=5) == 2
+
+    def test_near_ttl_is_capped(self, upstash, monkeypatch):
+        import time
+
+        monkeypatch.setattr(shared_store, '_NEAR_MAX_TTL', 2)
+        shared_store.get_json('x', near_ttl=10)  # kein Wert: kein Eintrag
+        upstash.run(['SET', 'cfg', '1'])
+        shared_store.get_json('cfg', near_ttl=3600)
+        upstash.run(['SET', 'cfg', '2'])
+        later = time.monotonic() + 3
+        monkeypatch.setattr(shared_store.time, 'monotonic', lambda: later)
+
+        assert shared_store.get_json('cfg', near_ttl=3600) == 2
+
+    def test_missing_values_are_not_near_cached(self, upstash):
+        assert shared_store.get_json('later', near_ttl=10) is None
+        upstash.run(['SET', 'later', '1'])
+        assert shared_store.get_json('later', near_ttl=10) == 1
+
+    def test_writes_and_deletes_replace_the_local_entry(self, upstash):
+        shared_store.set_json('cfg', 1, 60, near_ttl=10)
+        shared_store.set_json('cfg', 2, 60)
+        assert shared_store.get_json('cfg', near_ttl=10) == 2
+
+        shared_store.delete('cfg')
+        assert shared_store.get_json('cfg', near_ttl=10) is None
+
+    def test_the_near_cache_stays_bounded(self, upstash, monkeypatch):
+        monkeypatch.setattr(shared_store, '_NEAR_MAX_ENTRIES', 3)
+        for i in range(10):
+            shared_store.set_json(f'k{i}', i, 60, near_ttl=10)
+        assert shared_store.near_cache_stats()['size'] == 3
+
+    def test_without_upstash_there_is_no_near_cache(self):
+        shared_store.set_json('cfg', 1, 60, near_ttl=10)
+        assert shared_store.get_json('cfg', near_ttl=10) == 1
+        assert shared_store.near_cache_stats()['size'] == 0
@@ -0,0 +1,86 @@
+"""Wiederverwendete SMTP-Verbindungen und paralleler Versand (`send_many`)."""
+import threading
+
+from helpers import emails
+from helpers.emails import send_email, send_many
+
+
+def messages(n, prefix='kunde'):
+    return [(f'{prefix}{i}@example.com', f'Betreff {i}', f'<p>{i}</p>') for i in range(n)]
+
+
+def test_results_come_back_per_message_in_order(smtp_server):
+    smtp_server.reject = {'kunde2@example.com'}
+
+    results = send_many(messages(5))
+
+    assert [r.to_email for r in results] == [m[0] for m in messages(5)]
+    assert [r.ok for r in results] == [True, True, False, True, True]
+    assert '550' in results[2].error
+    assert len(smtp_server.messages) == 4
+
+
+def test_connections_are_reused_across_calls(smtp_server):
+    send_many(messages(10))
+    opened = smtp_server.connections
+
+    send_many(messages(10, prefix='zweite'))
+    send_email('einzeln@example.com', 'Betreff', '<p>x</p>')
+
+    assert smtp_server.connections == opened
+    assert smtp_server.logins == opened
+    assert len(smtp_server.messages) == 21
+
+
+def test_fan_out_is_bounded_by_the_pool_size(app, smtp_server, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 3)
+    assert all(r.ok for r in send_many(messages(30)))
+    assert 1 <= smtp_server.connections <= 3
+
+
+def test_a_dead_connection_is_replaced_after_noop(smtp_server):
+    pool = emails.get_smtp_pool()
+    server = pool.acquire()
+    server.close()  # vom Server getrennt, liegt aber noch im Pool
+    pool.release(server)
+
+    assert pool.send('kunde@example.com', 'Betreff', '<p>x</p>').ok
+    assert smtp_server.connections == 2
+
+
+def test_idle_connections_are_not_reused(smtp_server, monkeypatch):
+    monkeypatch.setattr(emails, '_SMTP_IDLE_SECONDS', -1)
+    send_email('a@example.com', 'Betreff', '<p>x</p>')
+    send_email('b@example.com', 'Betreff', '<p>x</p>')
+    assert smtp_server.connections == 2
+
+
+def test_a_connect_failure_fails_the_rest_fast(app, smtp_server, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 1)
+    smtp_server.refuse_connections = 100
+
+    results = send_many(messages(20))
+
+    assert not any(r.ok for r in results)
+    assert smtp_server.connections == 1
+
+
+def test_on_result_runs_in_the_calling_thread(smtp_server):
+    seen = []
+    send_many(messages(6), on_result=lambda i, r: seen.append((i, threading.current_thread())))
+    assert sorted(i for i, _ in seen) == list(range(6))
+    assert {t for _, t in seen} == {threading.current_thread()}
+
+
+def test_without_smtp_config_every_message_fails(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SMTP_HOST', None)
+    results = send_many(messages(2))
+    assert [r.ok for r in results] == [False, False]
+    assert send_email('a@example.com', 'Betreff', '<p>x</p>') is False
+
+
+def test_a_config_change_builds_a_new_pool(app, smtp_server, monkeypatch):
+    first = emails.get_smtp_pool()
+    monkeypatch.setitem(app.config, 'SMTP_POOL_SIZE', 7)
+    second = emails.get_smtp_pool()
+    assert second is not first and second.size == 7
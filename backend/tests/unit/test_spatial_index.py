@@ -0,0 +1,70 @@
+"""Gitterindex für Umkreis- und Nächste-Nachbarn-Suche."""
+import random
+
+import pytest
+
+from services.geo import haversine_km
+from services.spatial_index import SpatialIndex
+
+MUNICH = (48.1372, 11.5756)
+
+
+@pytest.fixture(scope="module")
+def points():
+    rnd = random.Random(7)
+    # Grob DACH, dazu ein paar Ausreißer weit weg
+    pts = [(i, rnd.uniform(45.8, 55.0), rnd.uniform(5.9, 17.2)) for i in range(600)]
+    pts += [(900, 40.4168, -3.7038), (901, 59.3293, 18.0686), (902, 52.52, 13.405)]
+    return pts
+
+
+def brute(points, coord):
+    return sorted(((pid, haversine_km(coord, (lat, lon))) for pid, lat, lon in points),
+                  key=lambda t: (t[1], t[0]))
+
+
+@pytest.mark.parametrize("radius", [5, 40, 120, 300])
+def test_within_matches_a_full_scan(points, radius):
+    expected = [(pid, km) for pid, km in brute(points, MUNICH) if km <= radius]
+    got = SpatialIndex(points).within(MUNICH, radius)
+    assert [pid for pid, _ in got] == [pid for pid, _ in expected]
+    assert [km for _, km in got] == pytest.approx([km for _, km in expected])
+
+
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_nearest_matches_a_full_scan(points, k):
+    got = SpatialIndex(points).nearest(MUNICH, k)
+    assert [pid for pid, _ in got] == [pid for pid, _ in brute(points, MUNICH)[:k]]
+
+
+def test_nearest_reaches_points_beyond_every_radius(points):
+    """Von Madrid aus liegt nur der Ausreißer unter 800 km."""
+    got = SpatialIndex(points).nearest((40.4, -3.7), 3)
+    assert [pid for pid, _ in got] == [pid for pid, _ in brute(points, (40.4, -3.7))[:3]]
+
+
+def test_nearest_respects_max_km(points):
+    got = SpatialIndex(points).nearest(MUNICH, 1000, max_km=60)
+    assert got and all(km <= 60 for _, km in got)
+    assert len(got) == len(SpatialIndex(points).within(MUNICH, 60))
+
+
+def test_accept_filters_and_is_asked_once_per_point(points):
+    asked = []
+
+    def even_only(ids):
+        asked.extend(ids)
+        return {pid for pid in ids if pid % 2 == 0}
+
+    got = SpatialIndex(points).nearest(MUNICH, 10, accept=even_only)
+
+    expected = [(pid, km) for pid, km in brute(points, MUNICH) if pid % 2 == 0][:10]
+    assert [pid for pid, _ in got] == [pid for pid, _ in expected]
+    assert len(asked) == len(set(asked))
+
+
+def test_points_without_coordinates_are_skipped():
+    index = SpatialIndex([(1, None, None), (2, 48.0, 11.0)])
+    assert len(index) == 1
+    assert index.nearest(MUNICH, 5)[0][0] == 2
+    assert SpatialIndex([]).nearest(MUNICH, 5) == []